@@ -241,9 +241,13 @@ public class AgentController {
             return ResponseEntity.notFound().build();
         }
         redisUtils.delete(RedisKeys.getAgentAudioIdKey(uuid));
+        // 新版本服务端上报的是Ogg/Opus音频，旧数据为WAV
+        boolean isOgg = audioData.length >= 4 && audioData[0] == 'O' && audioData[1] == 'g'
+                && audioData[2] == 'g' && audioData[3] == 'S';
         return ResponseEntity.ok()
-                .contentType(MediaType.APPLICATION_OCTET_STREAM)
-                .header(HttpHeaders.CONTENT_DISPOSITION, "attachment; filename=\"play.wav\"")
+                .contentType(isOgg ? MediaType.parseMediaType("audio/ogg") : MediaType.APPLICATION_OCTET_STREAM)
+                .header(HttpHeaders.CONTENT_DISPOSITION,
+                        "attachment; filename=\"" + (isOgg ? "play.ogg" : "play.wav") + "\"")
                 .body(audioData);
     }
 
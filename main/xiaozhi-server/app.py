@@ -9,8 +9,27 @@ from core.utils.util import get_local_ip, validate_mcp_endpoint
 from core.http_server import SimpleHttpServer
 from core.websocket_server import WebSocketServer
 from core.utils.util import check_ffmpeg_installed
-from core.providers.tools.server_mcp.mcp_manager import ServerMCPManager
+from core.providers.tools.server_mcp.mcp_manager import get_mcp_manager
+from core.providers.tools.server_mcp.mcp_pool import get_mcp_pool, shutdown_mcp_pool
 from core.utils.gc_manager import get_gc_manager
+from core.utils.async_pipeline import shutdown_shared_executor
+from core.utils.asr_service import get_asr_service, shutdown_asr_service
+from core.utils.tts_cache import get_tts_cache
+from core.utils.tts_pipeline import shutdown_tts_synth_executor
+from core.utils.asset_store import get_asset_store
+from core.utils.opus_encoder_service import get_opus_encoder_service
+from core.utils.audio_scheduler import get_audio_scheduler, shutdown_audio_scheduler
+from core.utils.http_client import get_http_clients, close_http_clients
+from core.utils.provider_pool import get_provider_pool, shutdown_provider_pool
+from core.utils.report_service import get_report_service, shutdown_report_service
+from core.providers.tools.server_plugins.plugin_runtime import (
+    get_plugin_runtime,
+    shutdown_plugin_runtime,
+)
+from core.utils.speculative_chat import get_speculative_chat_stats
+from core.utils.turn_trace import get_turn_tracer, shutdown_turn_tracer
+from core.utils.metrics import register_stats_source
+from config.manage_api_client import get_private_config_cache
 
 TAG = __name__
 logger = setup_logging()
@@ -38,6 +57,31 @@ async def wait_for_exit() -> None:
             pass
 
 
+def register_metrics_sources(config):
+    """/metrics 接口输出的各全局服务运行指标"""
+    register_stats_source("asr_service", get_asr_service().get_stats)
+    register_stats_source("http_client", get_http_clients().get_stats)
+    register_stats_source("provider_pool", get_provider_pool().get_stats)
+    register_stats_source(
+        "plugin_runtime", get_plugin_runtime().get_stats, label="plugin"
+    )
+    register_stats_source("mcp_pool", get_mcp_pool().get_stats, label="server")
+    register_stats_source("opus_encoder", get_opus_encoder_service().get_stats)
+    register_stats_source("audio_scheduler", get_audio_scheduler().get_stats)
+    register_stats_source("speculative_chat", get_speculative_chat_stats().get_stats)
+    tts_cache = get_tts_cache()
+    if tts_cache:
+        register_stats_source("tts_cache", tts_cache.get_stats)
+    turn_tracer = get_turn_tracer()
+    if turn_tracer is not None:
+        register_stats_source("turn_trace", turn_tracer.get_stats)
+    if config.get("read_config_from_api", False):
+        register_stats_source("report_service", get_report_service().get_stats)
+        config_cache = get_private_config_cache(config.get("private_config_cache"))
+        if config_cache is not None:
+            register_stats_source("private_config_cache", config_cache.get_stats)
+
+
 async def monitor_stdin():
     """监控标准输入，消费回车键"""
     while True:
@@ -65,15 +109,39 @@ async def main():
     # 添加 stdin 监控任务
     stdin_task = asyncio.create_task(monitor_stdin())
 
-    # 初始化用于HTTP API的MCP Manager
-    http_mcp_manager = ServerMCPManager(conn=None)
+    # 启动全局MCP服务池，所有设备连接和HTTP API共享MCP服务会话
+    get_mcp_pool(config.get("mcp_pool"))
+    http_mcp_manager = get_mcp_manager()
     await http_mcp_manager.initialize_servers()
-    logger.bind(tag=TAG).info("PromptX MCP服务已初始化用于HTTP API")
+    logger.bind(tag=TAG).info("服务端MCP服务池已启动，供设备连接和HTTP API共享")
 
     # 启动全局GC管理器（5分钟清理一次）
     gc_manager = get_gc_manager(interval_seconds=300)
     await gc_manager.start()
 
+    # 启动全局ASR执行服务
+    get_asr_service(config.get("asr_service"))
+    # 初始化全局HTTP连接池
+    get_http_clients(config.get("http_client"))
+    # 初始化按配置共享的模块实例池
+    get_provider_pool(config.get("provider_pool"))
+    # 启动聊天记录上报服务
+    if config.get("read_config_from_api", False):
+        get_report_service(config.get("report_service"))
+    # 初始化服务端插件执行层
+    get_plugin_runtime(config.get("plugin_runtime"))
+    # 初始化Opus编码服务
+    get_opus_encoder_service(config.get("opus_encoder"))
+    # 初始化全局音频发送调度器
+    get_audio_scheduler(config.get("audio_scheduler"))
+    # 初始化TTS音频缓存
+    get_tts_cache(config)
+    # 启动单轮对话耗时追踪
+    get_turn_tracer(config.get("turn_trace") or {})
+    register_metrics_sources(config)
+    # 后台预编码静态提示音，运行时直接从内存读取
+    asyncio.create_task(asyncio.to_thread(get_asset_store().preload))
+
     # 启动 WebSocket 服务器
     ws_server = WebSocketServer(config)
     ws_task = asyncio.create_task(ws_server.start())
@@ -94,6 +162,11 @@ async def main():
         get_local_ip(),
         port,
     )
+    logger.bind(tag=TAG).info(
+        "运行指标接口是\thttp://{}:{}/metrics",
+        get_local_ip(),
+        port,
+    )
     logger.bind(tag=TAG).info(
         "PromptX角色列表\thttp://{}:{}/api/promptx/roles",
         get_local_ip(),
@@ -145,6 +218,26 @@ async def main():
     finally:
         # 停止全局GC管理器
         await gc_manager.stop()
+        # 关闭异步流水线共享线程池
+        shutdown_shared_executor()
+        # 关闭TTS流水线合成线程池
+        shutdown_tts_synth_executor()
+        # 关闭全局ASR执行服务
+        shutdown_asr_service()
+        # 停止音频发送调度
+        shutdown_audio_scheduler()
+        # 关闭服务端插件执行层
+        shutdown_plugin_runtime()
+        # 关闭MCP服务池及其stdio子进程
+        await shutdown_mcp_pool()
+        # 关闭全局HTTP连接池
+        close_http_clients()
+        # 清空模块实例池
+        shutdown_provider_pool()
+        # 关闭聊天记录上报服务，未上传的上报写入磁盘
+        shutdown_report_service()
+        # 停止慢对话写入线程，写完已提交的记录
+        shutdown_turn_tracer()
 
         # 取消所有任务（关键修复点）
         stdin_task.cancel()
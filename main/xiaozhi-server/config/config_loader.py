@@ -1,7 +1,30 @@
 import os
 import yaml
 from collections.abc import Mapping
-from config.manage_api_client import init_service, get_server_config, get_agent_models
+from config.manage_api_client import (
+    init_service,
+    get_server_config,
+    get_agent_models_cached,
+)
+
+# 仅从本地配置文件读取、不由智控台下发的配置项
+LOCAL_ONLY_KEYS = (
+    "async_pipeline",
+    "asr_service",
+    "tts_cache",
+    "tts_pipeline",
+    "tts_segmenter",
+    "opus_encoder",
+    "audio_scheduler",
+    "plugin_runtime",
+    "mcp_pool",
+    "http_client",
+    "speculative_chat",
+    "provider_pool",
+    "private_config_cache",
+    "report_service",
+    "turn_trace",
+)
 
 
 def get_project_dir():
@@ -77,6 +100,10 @@ async def get_config_from_api_async(config):
             "vision_explain": config["server"].get("vision_explain", ""),
             "auth_key": config["server"].get("auth_key", ""),
         }
+    # 以下性能相关配置以本地为准
+    for key in LOCAL_ONLY_KEYS:
+        if config.get(key) is not None:
+            config_data[key] = config[key]
     # 如果服务器没有prompt_template，则从本地配置读取
     if not config_data.get("prompt_template"):
         config_data["prompt_template"] = config.get("prompt_template")
@@ -84,8 +111,13 @@ async def get_config_from_api_async(config):
 
 
 async def get_private_config_from_api(config, device_id, client_id):
-    """从Java API获取私有配置"""
-    return await get_agent_models(device_id, client_id, config["selected_module"])
+    """从Java API获取私有配置，开启 private_config_cache 时优先使用缓存"""
+    return await get_agent_models_cached(
+        device_id,
+        client_id,
+        config["selected_module"],
+        config.get("private_config_cache"),
+    )
 
 
 def ensure_directories(config):
@@ -1,11 +1,21 @@
 import os
+import copy
+import json
+import time
 import base64
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
 from typing import Optional, Dict
 
 import httpx
 
 TAG = __name__
 
+# 服务端返回304时的标记
+NOT_MODIFIED = object()
+
 
 class DeviceNotFoundException(Exception):
     pass
@@ -76,15 +86,35 @@ class ManageApiClient:
     @classmethod
     async def _async_request(cls, method: str, endpoint: str, **kwargs) -> Dict:
         """发送单次异步HTTP请求并处理响应"""
+        data, _ = await cls._async_request_with_etag(method, endpoint, **kwargs)
+        return data
+
+    @classmethod
+    async def _async_request_with_etag(
+        cls, method: str, endpoint: str, etag: Optional[str] = None, **kwargs
+    ):
+        """
+        发送单次异步HTTP请求，支持条件请求
+
+        Returns:
+            (data, etag)：服务端返回304时data为NOT_MODIFIED
+        """
         # 确保客户端已创建
         client = await cls._ensure_async_client()
         endpoint = endpoint.lstrip("/")
+        if etag:
+            headers = dict(kwargs.pop("headers", None) or {})
+            headers["If-None-Match"] = etag
+            kwargs["headers"] = headers
         response = await client.request(method, endpoint, **kwargs)
+        if response.status_code == 304:
+            return NOT_MODIFIED, etag
         response.raise_for_status()
+        return cls._parse_result(response.json()), response.headers.get("ETag")
 
-        result = response.json()
-
-        # 处理API返回的业务错误
+    @staticmethod
+    def _parse_result(result: Dict):
+        """处理API返回的业务错误，返回data"""
         if result.get("code") == 10041:
             raise DeviceNotFoundException(result.get("msg"))
         elif result.get("code") == 10042:
@@ -112,15 +142,17 @@ class ManageApiClient:
         return False
 
     @classmethod
-    async def _execute_async_request(cls, method: str, endpoint: str, **kwargs) -> Dict:
-        """带重试机制的异步请求执行器"""
-        import asyncio
+    async def _execute_async_request(
+        cls, method: str, endpoint: str, with_etag=False, **kwargs
+    ) -> Dict:
+        """带重试机制的异步请求执行器，with_etag为True时返回 (data, etag)"""
         retry_count = 0
+        request = cls._async_request_with_etag if with_etag else cls._async_request
 
         while retry_count <= cls.max_retries:
             try:
                 # 执行异步请求
-                return await cls._async_request(method, endpoint, **kwargs)
+                return await request(method, endpoint, **kwargs)
             except Exception as e:
                 # 判断是否应该重试
                 if retry_count < cls.max_retries and cls._should_retry(e):
@@ -134,6 +166,13 @@ class ManageApiClient:
                     # 不重试，直接抛出异常
                     raise
 
+    @classmethod
+    async def close_async_client(cls):
+        """关闭当前事件循环的异步客户端，用于长期运行的事件循环退出前"""
+        client = cls._async_clients.pop(id(asyncio.get_running_loop()), None)
+        if client is not None:
+            await client.aclose()
+
     @classmethod
     def safe_close(cls):
         """安全关闭所有异步连接池"""
@@ -167,6 +206,266 @@ async def get_agent_models(
     )
 
 
+class PrivateConfigCache:
+    """
+    设备差异化配置缓存
+
+    设备休眠唤醒、网络抖动时会频繁重连，每次连接都要请求 /config/agent-models，
+    重连风暴时会给manager-api带来很大压力。这里按设备缓存差异化配置：
+    - ttl 秒内直接使用缓存
+    - 超过 ttl 但未超过 stale_ttl 时先返回旧配置，同时在后台重新获取（stale-while-revalidate）
+    - 重新获取时带上 If-None-Match，服务端支持ETag时未变化的配置只返回304；
+      不支持时按内容哈希判断是否变化
+    - 同一设备的并发请求只向manager-api发出一次
+    - 收到 server 类型的 update_config 消息时失效缓存
+    """
+
+    def __init__(self, ttl=60, stale_ttl=0, max_entries=10000):
+        """
+        Args:
+            ttl: 缓存有效期（秒）
+            stale_ttl: 过期后仍可先返回旧配置的最长时间（秒），0表示不启用
+            max_entries: 最多缓存的设备数
+        """
+        self.ttl = float(ttl)
+        self.stale_ttl = float(stale_ttl)
+        self.max_entries = int(max_entries)
+        # key -> {"data", "etag", "digest", "fetched_at"}
+        self._entries = OrderedDict()
+        # key -> 进行中的请求Future
+        self._inflight = {}
+        # 缓存失效的次数，用于丢弃失效前发出的请求结果
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.changed = 0
+
+    @staticmethod
+    def make_key(mac_address, client_id, selected_module):
+        selected = json.dumps(selected_module, sort_keys=True, ensure_ascii=False)
+        return f"{mac_address}|{client_id}|{selected}"
+
+    @staticmethod
+    def _digest(data):
+        payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key, fetch):
+        """
+        获取差异化配置
+
+        Args:
+            fetch: async fetch(etag) -> (data, etag)，未变化时data为NOT_MODIFIED
+
+        Returns:
+            配置的深拷贝，调用方可以随意修改
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry["fetched_at"]
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(entry["data"])
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    data = entry["data"]
+                    stale = True
+                else:
+                    stale = False
+            else:
+                stale = False
+            if not stale:
+                self.misses += 1
+
+        if stale:
+            self._revalidate_in_background(key, fetch)
+            return copy.deepcopy(data)
+        data = await self._fetch(key, fetch)
+        return copy.deepcopy(data)
+
+    def _revalidate_in_background(self, key, fetch):
+        # 后台刷新失败时继续使用旧配置，等待下次过期后再刷新
+        self._start_fetch(key, fetch)
+
+    async def _fetch(self, key, fetch):
+        """向manager-api获取配置，同一设备的并发请求共享同一个请求"""
+        return await asyncio.shield(self._start_fetch(key, fetch))
+
+    def _start_fetch(self, key, fetch):
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        if task is not None and not task.done() and task.get_loop() is loop:
+            return task
+        # 请求以独立任务运行，某个调用方被取消（如连接断开）不影响其他等待者
+        task = loop.create_task(self._do_fetch(key, fetch))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._on_fetch_done(key, t))
+        return task
+
+    def _on_fetch_done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 所有等待者都已取消时避免 "exception was never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    async def _do_fetch(self, key, fetch):
+        with self._lock:
+            entry = self._entries.get(key)
+            etag = entry["etag"] if entry is not None else None
+            generation = self._generation
+        try:
+            data, new_etag = await fetch(etag)
+            if data is NOT_MODIFIED and etag is not None:
+                with self._lock:
+                    missing = key not in self._entries
+                if missing:
+                    # 请求期间缓存已被失效，重新完整获取
+                    data, new_etag = await fetch(None)
+        except (DeviceNotFoundException, DeviceBindException):
+            # 设备未绑定或已解绑，不再使用旧配置
+            self.invalidate(key)
+            raise
+        return self._store(key, data, new_etag, generation)
+
+    def _store(self, key, data, etag, generation):
+        with self._lock:
+            entry = self._entries.get(key)
+            if data is NOT_MODIFIED:
+                if entry is None:
+                    raise Exception("manager-api返回304，但本地没有缓存的配置")
+                self.not_modified += 1
+                entry["fetched_at"] = time.monotonic()
+                return entry["data"]
+            if generation != self._generation:
+                # 请求期间缓存已失效，结果可能是旧配置，只返回给本次调用方，不写入缓存
+                return data
+            digest = self._digest(data)
+            if entry is not None and entry["digest"] == digest:
+                self.not_modified += 1
+            elif entry is not None:
+                self.changed += 1
+            self._entries[key] = {
+                "data": data,
+                "etag": etag,
+                "digest": digest,
+                "fetched_at": time.monotonic(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return data
+
+    def invalidate(self, key=None):
+        """失效指定设备的缓存，key为None时失效全部"""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+                # 失效前发出的请求可能拿到旧配置，之后的调用方不再等待它们
+                self._inflight.clear()
+            else:
+                self._entries.pop(key, None)
+                self._inflight.pop(key, None)
+
+    def invalidate_device(self, mac_address):
+        """失效某个设备的所有缓存（不同client_id、模块选择）"""
+        prefix = f"{mac_address}|"
+        with self._lock:
+            self._generation += 1
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+            for key in [k for k in self._inflight if k.startswith(prefix)]:
+                del self._inflight[key]
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "refreshing": len(self._inflight),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.stale_hits) / total if total else 0.0,
+                "not_modified": self.not_modified,
+                "changed": self.changed,
+            }
+
+
+_private_config_cache = None
+_private_config_cache_lock = threading.Lock()
+
+
+def get_private_config_cache(config=None) -> Optional[PrivateConfigCache]:
+    """
+    获取全局差异化配置缓存（单例模式）
+
+    Args:
+        config: private_config_cache配置，仅在第一次创建时生效
+
+    Returns:
+        PrivateConfigCache实例，配置中未开启（默认不开启）时返回None
+    """
+    global _private_config_cache
+    if _private_config_cache is None:
+        config = config or {}
+        if str(config.get("enable", False)).lower() not in ("true", "1", "yes"):
+            return None
+        with _private_config_cache_lock:
+            if _private_config_cache is None:
+                _private_config_cache = PrivateConfigCache(
+                    ttl=config.get("ttl", 60),
+                    stale_ttl=config.get("stale_ttl") or 0,
+                    max_entries=config.get("max_entries") or 10000,
+                )
+    return _private_config_cache
+
+
+def invalidate_private_config(mac_addresses=None):
+    """失效差异化配置缓存，mac_addresses为空时失效全部"""
+    cache = _private_config_cache
+    if cache is None:
+        return
+    if not mac_addresses:
+        cache.invalidate()
+        return
+    for mac_address in mac_addresses:
+        cache.invalidate_device(mac_address)
+
+
+async def get_agent_models_cached(
+    mac_address: str, client_id: str, selected_module: Dict, cache_config=None
+) -> Optional[Dict]:
+    """获取代理模型配置，优先使用缓存"""
+    cache = get_private_config_cache(cache_config)
+    if cache is None:
+        return await get_agent_models(mac_address, client_id, selected_module)
+
+    async def fetch(etag):
+        return await ManageApiClient._instance._execute_async_request(
+            "POST",
+            "/config/agent-models",
+            with_etag=True,
+            etag=etag,
+            json={
+                "macAddress": mac_address,
+                "clientId": client_id,
+                "selectedModule": selected_module,
+            },
+        )
+
+    key = PrivateConfigCache.make_key(mac_address, client_id, selected_module)
+    return await cache.get(key, fetch)
+
+
 async def save_mem_local_short(mac_address: str, short_momery: str) -> Optional[Dict]:
     try:
         return await ManageApiClient._instance._execute_async_request(
@@ -181,6 +480,27 @@ async def save_mem_local_short(mac_address: str, short_momery: str) -> Optional[
         return None
 
 
+def build_report_payload(
+    mac_address: str, session_id: str, chat_type: int, content: str, audio, report_time
+) -> Dict:
+    """组装聊天记录上报的请求体"""
+    return {
+        "macAddress": mac_address,
+        "sessionId": session_id,
+        "chatType": chat_type,
+        "content": content,
+        "reportTime": report_time,
+        "audioBase64": base64.b64encode(audio).decode("utf-8") if audio else None,
+    }
+
+
+async def send_report(payload: Dict) -> Optional[Dict]:
+    """发送一条聊天记录上报，不做重试，异常由调用方处理"""
+    return await ManageApiClient._instance._async_request(
+        "POST", "/agent/chat-history/report", json=payload
+    )
+
+
 async def report(
     mac_address: str, session_id: str, chat_type: int, content: str, audio, report_time
 ) -> Optional[Dict]:
@@ -191,16 +511,9 @@ async def report(
         return await ManageApiClient._instance._execute_async_request(
             "POST",
             f"/agent/chat-history/report",
-            json={
-                "macAddress": mac_address,
-                "sessionId": session_id,
-                "chatType": chat_type,
-                "content": content,
-                "reportTime": report_time,
-                "audioBase64": (
-                    base64.b64encode(audio).decode("utf-8") if audio else None
-                ),
-            },
+            json=build_report_payload(
+                mac_address, session_id, chat_type, content, audio, report_time
+            ),
         )
     except Exception as e:
         print(f"TTS上报失败: {e}")
@@ -0,0 +1,17 @@
+from aiohttp import web
+from core.utils.metrics import render_metrics
+
+TAG = __name__
+
+# Prometheus文本格式
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsHandler:
+    """/metrics 接口：单轮对话耗时直方图及各全局服务的运行指标"""
+
+    async def handle_get(self, request):
+        return web.Response(
+            body=render_metrics().encode("utf-8"),
+            headers={"Content-Type": CONTENT_TYPE},
+        )
@@ -4,6 +4,8 @@ from aiohttp import web
 from config.logger import setup_logging
 from core.utils.util import get_vision_url, is_valid_image_file
 from core.utils.vllm import create_instance
+from core.utils.modules_initialize import create_pooled
+from core.utils.provider_pool import get_provider_pool, is_provider_pool_enabled
 from config.config_loader import get_private_config_from_api
 from core.utils.auth import AuthToken
 import base64
@@ -115,11 +117,20 @@ class VisionHandler:
             if not vllm_type:
                 raise ValueError(f"无法找到VLLM模块对应的供应器{vllm_type}")
 
-            vllm = create_instance(
-                vllm_type, current_config["VLLM"][select_vllm_module]
+            vllm_config = current_config["VLLM"][select_vllm_module]
+            pooled = [] if is_provider_pool_enabled(self.config) else None
+            vllm = create_pooled(
+                "vllm",
+                vllm_type,
+                vllm_config,
+                lambda: create_instance(vllm_type, vllm_config),
+                pooled,
             )
-
-            result = vllm.response(question, image_base64)
+            try:
+                result = vllm.response(question, image_base64)
+            finally:
+                if pooled:
+                    get_provider_pool().release_all(pooled)
 
             return_json = {
                 "success": True,
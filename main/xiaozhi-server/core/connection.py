@@ -4,6 +4,7 @@ import copy
 import json
 import uuid
 import time
+import contextlib
 import queue
 import asyncio
 import threading
@@ -23,8 +24,8 @@ from core.utils.modules_initialize import (
     initialize_modules,
     initialize_tts,
     initialize_asr,
+    create_pooled,
 )
-from core.handle.reportHandle import report
 from core.providers.tts.default import DefaultTTS
 from concurrent.futures import ThreadPoolExecutor
 from core.utils.dialogue import Message, Dialogue
@@ -41,6 +42,14 @@ from config.manage_api_client import DeviceNotFoundException, DeviceBindExceptio
 from core.utils.prompt_manager import PromptManager
 from core.utils.voiceprint_provider import VoiceprintProvider
 from core.utils import textUtils
+from core.utils.async_pipeline import (
+    LoopAwareQueue,
+    get_shared_executor,
+    is_async_pipeline_enabled,
+)
+from core.utils.speculative_chat import SpeculativeChat, is_speculative_chat_enabled
+from core.utils.provider_pool import get_provider_pool, is_provider_pool_enabled
+from core.utils.turn_trace import finish_turn, get_turn_trace, trace_span
 
 TAG = __name__
 
@@ -89,15 +98,22 @@ class ConnectionHandler:
         self.client_abort = False
         self.client_is_speaking = False
         self.client_listen_mode = "auto"
+        # 全局音频调度器中本连接的音频流，第一次发送音频时创建
+        self.audio_stream = None
 
         # 线程任务相关
         self.loop = None  # 在 handle_connection 中获取运行中的事件循环
         self.stop_event = threading.Event()
-        self.executor = ThreadPoolExecutor(max_workers=5)
+        # 异步流水线模式：不再为每个连接创建线程，改为事件循环任务+全局共享线程池
+        self.async_pipeline = is_async_pipeline_enabled(self.config)
+        if self.async_pipeline:
+            self.executor = get_shared_executor(
+                self.config["async_pipeline"].get("max_workers")
+            )
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=5)
 
-        # 添加上报线程池
-        self.report_queue = queue.Queue()
-        self.report_thread = None
+        # 聊天记录统一提交到全局上报服务
         # 未来可以通过修改此处，调节asr的上报和tts的上报，目前默认都开启
         self.report_asr_enable = self.read_config_from_api
         self.report_tts_enable = self.read_config_from_api
@@ -111,27 +127,45 @@ class ConnectionHandler:
         self.llm = _llm
         self.memory = _memory
         self.intent = _intent
+        # 从全局实例池获取的共享实例，连接关闭时释放；未开启实例池时为None
+        self.pooled_providers = [] if is_provider_pool_enabled(self.config) else None
 
         # 为每个连接单独管理声纹识别
         self.voiceprint_provider = None
 
         # vad相关变量
-        self.client_audio_buffer = bytearray()
         self.client_have_voice = False
         self.client_voice_window = deque(maxlen=5)
         self.first_activity_time = 0.0  # 记录首次活动的时间（毫秒）
         self.last_activity_time = 0.0  # 统一的活动时间戳（毫秒）
         self.client_voice_stop = False
         self.last_is_voice = False
+        # 连接私有的VAD模型状态、音频环形缓冲区和Opus解码器，避免不同设备之间互相干扰
+        self.vad_stream = None
+        self.vad_decoder = None
+        # 断句策略使用的连接私有信号（VAD概率、流式ASR中间结果、语速）
+        self.endpoint_state = None
 
         # asr相关变量
         # 因为实际部署时可能会用到公共的本地ASR，不能把变量暴露给公共ASR
         # 所以涉及到ASR的变量，需要在这里定义，属于connection的私有变量
         self.asr_audio = []
-        self.asr_audio_queue = queue.Queue()
+        # 与asr_audio对应的VAD已解码PCM：(opus包, pcm帧, 解码耗时ms)，语音结束时直接复用
+        self.asr_pcm = []
+        self.asr_audio_queue = LoopAwareQueue()
 
         # llm相关变量
         self.llm_finish_task = True
+        # 进行中的对话任务，打断时取消
+        self.chat_tasks = set()
+        # 当前轮次的耗时追踪
+        self.turn_trace = None
+        # 流式ASR推测执行，中间结果稳定后提前请求大模型
+        self.speculative_chat = (
+            SpeculativeChat.from_config(self)
+            if is_speculative_chat_enabled(self.config)
+            else None
+        )
         self.dialogue = Dialogue()
 
         # tts相关变量
@@ -168,6 +202,8 @@ class ConnectionHandler:
         try:
             # 获取运行中的事件循环（必须在异步上下文中）
             self.loop = asyncio.get_running_loop()
+            if self.async_pipeline:
+                self.asr_audio_queue.bind_loop(self.loop)
 
             # 获取并验证headers
             self.headers = dict(ws.request.headers)
@@ -473,8 +509,6 @@ class ConnectionHandler:
             self._initialize_memory()
             """加载意图识别"""
             self._initialize_intent()
-            """初始化上报线程"""
-            self._init_report_threads()
             """更新系统提示词 - 仅Normal模式"""
             # ✅ 修改：PromptX模式不需要增强提示词
             if agent_type != "promptx":
@@ -493,19 +527,6 @@ class ConnectionHandler:
             self.change_system_prompt(enhanced_prompt)
             self.logger.bind(tag=TAG).debug("系统提示词已增强更新")
 
-    def _init_report_threads(self):
-        """初始化ASR和TTS上报线程"""
-        if not self.read_config_from_api or self.need_bind:
-            return
-        if self.chat_history_conf == 0:
-            return
-        if self.report_thread is None or not self.report_thread.is_alive():
-            self.report_thread = threading.Thread(
-                target=self._report_worker, daemon=True
-            )
-            self.report_thread.start()
-            self.logger.bind(tag=TAG).info("TTS上报线程已启动")
-
     def _initialize_tts(self):
         """初始化TTS"""
         tts = None
@@ -669,10 +690,16 @@ class ConnectionHandler:
                 init_tts,
                 init_memory,
                 init_intent,
+                self.pooled_providers,
             )
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"初始化组件失败: {e}")
             modules = {}
+        if self.stop_event.is_set() and self.pooled_providers:
+            # 初始化期间连接已关闭
+            get_provider_pool().release_all(self.pooled_providers)
+            self.pooled_providers.clear()
+            return
         if modules.get("tts", None) is not None:
             self.tts = modules["tts"]
         if modules.get("vad", None) is not None:
@@ -716,8 +743,14 @@ class ConnectionHandler:
 
                 memory_llm_config = self.config["LLM"][memory_llm_name]
                 memory_llm_type = memory_llm_config.get("type", memory_llm_name)
-                memory_llm = llm_utils.create_instance(
-                    memory_llm_type, memory_llm_config
+                memory_llm = create_pooled(
+                    "llm",
+                    memory_llm_type,
+                    memory_llm_config,
+                    lambda: llm_utils.create_instance(
+                        memory_llm_type, memory_llm_config
+                    ),
+                    self.pooled_providers,
                 )
                 self.logger.bind(tag=TAG).info(
                     f"为记忆总结创建了专用LLM: {memory_llm_name}, 类型: {memory_llm_type}"
@@ -758,8 +791,14 @@ class ConnectionHandler:
 
                 intent_llm_config = self.config["LLM"][intent_llm_name]
                 intent_llm_type = intent_llm_config.get("type", intent_llm_name)
-                intent_llm = llm_utils.create_instance(
-                    intent_llm_type, intent_llm_config
+                intent_llm = create_pooled(
+                    "llm",
+                    intent_llm_type,
+                    intent_llm_config,
+                    lambda: llm_utils.create_instance(
+                        intent_llm_type, intent_llm_config
+                    ),
+                    self.pooled_providers,
                 )
                 self.logger.bind(tag=TAG).info(
                     f"为意图识别创建了专用LLM: {intent_llm_name}, 类型: {intent_llm_type}"
@@ -782,7 +821,42 @@ class ConnectionHandler:
         # 更新系统prompt至上下文
         self.dialogue.update_system_message(self.prompt)
 
+    def start_chat(self, query):
+        """
+        以任务的形式在事件循环中开始一轮对话，需在事件循环中调用
+
+        打断时调用 cancel_chat 取消任务，大模型的流式连接会被立即关闭
+        """
+        prefetched = None
+        if self.speculative_chat is not None:
+            prefetched = self.speculative_chat.claim(query)
+        task = self.loop.create_task(self.achat(query, prefetched=prefetched))
+        self.chat_tasks.add(task)
+        task.add_done_callback(self._on_chat_task_done)
+        return task
+
+    def _on_chat_task_done(self, task):
+        self.chat_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.bind(tag=TAG).error(f"对话任务出错: {task.exception()}")
+
+    def cancel_chat(self):
+        """取消正在进行的对话任务"""
+        for task in list(self.chat_tasks):
+            if not task.done():
+                task.cancel()
+
     def chat(self, query, depth=0):
+        """同步接口，供工作线程调用，在事件循环中执行对话并等待结束"""
+        return asyncio.run_coroutine_threadsafe(
+            self.achat(query, depth), self.loop
+        ).result()
+
+    async def achat(self, query, depth=0, prefetched=None):
+        """
+        Args:
+            prefetched: 命中的推测请求（SpeculativeRun），直接使用其输出，不再请求大模型
+        """
         if query is not None:
             self.logger.bind(tag=TAG).info(f"大模型收到用户消息: {query}")
 
@@ -827,34 +901,52 @@ class ConnectionHandler:
             functions = self.func_handler.get_functions()
         response_message = []
 
+        # 被打断的对话在新一轮对话开始后才结束时，避免用新的会话ID发送LAST
+        sentence_id = self.sentence_id
         try:
-            # 使用带记忆的对话
-            memory_str = None
-            if self.memory is not None:
-                future = asyncio.run_coroutine_threadsafe(
-                    self.memory.query_memory(query), self.loop
+            return await self._achat_turn(
+                query, depth, functions, response_message, prefetched
+            )
+        except asyncio.CancelledError:
+            self.logger.bind(tag=TAG).info("对话被打断，已关闭大模型流式响应")
+            raise
+        finally:
+            # 存储对话内容，被打断时保留已经生成的部分
+            if len(response_message) > 0:
+                text_buff = "".join(response_message)
+                self.tts_MessageText = text_buff
+                self.dialogue.put(Message(role="assistant", content=text_buff))
+            if depth == 0:
+                self.tts.tts_text_queue.put(
+                    TTSMessageDTO(
+                        sentence_id=sentence_id,
+                        sentence_type=SentenceType.LAST,
+                        content_type=ContentType.ACTION,
+                    )
                 )
-                memory_str = future.result()
-
-            if self.intent_type == "function_call" and functions is not None:
-                # 使用支持functions的streaming接口
-                llm_responses = self.llm.response_with_functions(
-                    self.session_id,
-                    self.dialogue.get_llm_dialogue_with_memory(
-                        memory_str, self.config.get("voiceprint", {})
-                    ),
-                    functions=functions,
+                self.llm_finish_task = True
+                # 使用lambda延迟计算，只有在DEBUG级别时才执行get_llm_dialogue()
+                self.logger.bind(tag=TAG).debug(
+                    lambda: json.dumps(
+                        self.dialogue.get_llm_dialogue(), indent=4, ensure_ascii=False
+                    )
                 )
+
+    async def _achat_turn(
+        self, query, depth, functions, response_message, prefetched=None
+    ):
+        try:
+            if prefetched is not None:
+                # 推测请求已经在静音窗口内开始，回放已缓存的输出并继续接收
+                functions = prefetched.functions
+                llm_responses = prefetched.replay()
             else:
-                llm_responses = self.llm.response(
-                    self.session_id,
-                    self.dialogue.get_llm_dialogue_with_memory(
-                        memory_str, self.config.get("voiceprint", {})
-                    ),
-                )
+                llm_responses = await self._start_llm_stream(query, functions)
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"LLM 处理出错 {query}: {e}")
             return None
+        llm_start_time = time.monotonic()
+        trace = get_turn_trace(self)
 
         # 处理流式响应
         tool_call_flag = False
@@ -863,46 +955,51 @@ class ConnectionHandler:
         content_arguments = ""
         self.client_abort = False
         emotion_flag = True
-        for response in llm_responses:
-            if self.client_abort:
-                break
-            if self.intent_type == "function_call" and functions is not None:
-                content, tools_call = response
-                if "content" in response:
-                    content = response["content"]
-                    tools_call = None
-                if content is not None and len(content) > 0:
-                    content_arguments += content
-
-                if not tool_call_flag and content_arguments.startswith("<tool_call>"):
-                    # print("content_arguments", content_arguments)
-                    tool_call_flag = True
+        # 任务被取消时退出循环并关闭生成器，提供者随之关闭上游连接
+        async with contextlib.aclosing(llm_responses):
+            async for response in llm_responses:
+                if self.client_abort:
+                    break
+                if trace is not None:
+                    trace.add_span("llm_first_token", llm_start_time, time.monotonic())
+                if self.intent_type == "function_call" and functions is not None:
+                    content, tools_call = response
+                    if "content" in response:
+                        content = response["content"]
+                        tools_call = None
+                    if content is not None and len(content) > 0:
+                        content_arguments += content
+
+                    if not tool_call_flag and content_arguments.startswith(
+                        "<tool_call>"
+                    ):
+                        # print("content_arguments", content_arguments)
+                        tool_call_flag = True
+
+                    if tools_call is not None and len(tools_call) > 0:
+                        tool_call_flag = True
+                        self._merge_tool_calls(tool_calls_list, tools_call)
+                else:
+                    content = response
 
-                if tools_call is not None and len(tools_call) > 0:
-                    tool_call_flag = True
-                    self._merge_tool_calls(tool_calls_list, tools_call)
-            else:
-                content = response
+                # 在llm回复中获取情绪表情，一轮对话只在开头获取一次
+                if emotion_flag and content is not None and content.strip():
+                    asyncio.create_task(textUtils.get_emotion(self, content))
+                    emotion_flag = False
 
-            # 在llm回复中获取情绪表情，一轮对话只在开头获取一次
-            if emotion_flag and content is not None and content.strip():
-                asyncio.run_coroutine_threadsafe(
-                    textUtils.get_emotion(self, content),
-                    self.loop,
-                )
-                emotion_flag = False
-
-            if content is not None and len(content) > 0:
-                if not tool_call_flag:
-                    response_message.append(content)
-                    self.tts.tts_text_queue.put(
-                        TTSMessageDTO(
-                            sentence_id=self.sentence_id,
-                            sentence_type=SentenceType.MIDDLE,
-                            content_type=ContentType.TEXT,
-                            content_detail=content,
+                if content is not None and len(content) > 0:
+                    if not tool_call_flag:
+                        response_message.append(content)
+                        if trace is not None:
+                            trace.mark("tts_text")
+                        self.tts.tts_text_queue.put(
+                            TTSMessageDTO(
+                                sentence_id=self.sentence_id,
+                                sentence_type=SentenceType.MIDDLE,
+                                content_type=ContentType.TEXT,
+                                content_detail=content,
+                            )
                         )
-                    )
         # 处理function call
         if tool_call_flag:
             bHasError = False
@@ -945,55 +1042,51 @@ class ConnectionHandler:
                     f"检测到 {len(tool_calls_list)} 个工具调用"
                 )
 
-                # 收集所有工具调用的 Future
-                futures_with_data = []
                 for tool_call_data in tool_calls_list:
                     self.logger.bind(tag=TAG).debug(
                         f"function_name={tool_call_data['name']}, function_id={tool_call_data['id']}, function_arguments={tool_call_data['arguments']}"
                     )
 
-                    future = asyncio.run_coroutine_threadsafe(
-                        self.func_handler.handle_llm_function_call(
-                            self, tool_call_data
-                        ),
-                        self.loop,
-                    )
-                    futures_with_data.append((future, tool_call_data))
-
-                # 等待协程结束（实际等待时长为最慢的那个）
-                tool_results = []
-                for future, tool_call_data in futures_with_data:
-                    result = future.result()
-                    tool_results.append((result, tool_call_data))
+                # 并发执行所有工具调用（实际等待时长为最慢的那个）
+                results = await asyncio.gather(
+                    *[
+                        self.func_handler.handle_llm_function_call(self, tool_call_data)
+                        for tool_call_data in tool_calls_list
+                    ]
+                )
+                tool_results = list(zip(results, tool_calls_list))
 
                 # 统一处理所有工具调用结果
                 if tool_results:
-                    self._handle_function_result(tool_results, depth=depth)
-
-        # 存储对话内容
-        if len(response_message) > 0:
-            text_buff = "".join(response_message)
-            self.tts_MessageText = text_buff
-            self.dialogue.put(Message(role="assistant", content=text_buff))
-        if depth == 0:
-            self.tts.tts_text_queue.put(
-                TTSMessageDTO(
-                    sentence_id=self.sentence_id,
-                    sentence_type=SentenceType.LAST,
-                    content_type=ContentType.ACTION,
-                )
-            )
-            self.llm_finish_task = True
-            # 使用lambda延迟计算，只有在DEBUG级别时才执行get_llm_dialogue()
-            self.logger.bind(tag=TAG).debug(
-                lambda: json.dumps(
-                    self.dialogue.get_llm_dialogue(), indent=4, ensure_ascii=False
-                )
-            )
+                    await self._handle_function_result(tool_results, depth=depth)
 
         return True
 
-    def _handle_function_result(self, tool_results, depth):
+    async def _start_llm_stream(self, query, functions):
+        """查询记忆并开始大模型流式请求，返回异步生成器"""
+        # 使用带记忆的对话
+        memory_str = None
+        if self.memory is not None:
+            with trace_span(self, "memory"):
+                memory_str = await self.memory.query_memory(query)
+
+        if self.intent_type == "function_call" and functions is not None:
+            # 使用支持functions的streaming接口
+            return self.llm.aresponse_with_functions(
+                self.session_id,
+                self.dialogue.get_llm_dialogue_with_memory(
+                    memory_str, self.config.get("voiceprint", {})
+                ),
+                functions=functions,
+            )
+        return self.llm.aresponse(
+            self.session_id,
+            self.dialogue.get_llm_dialogue_with_memory(
+                memory_str, self.config.get("voiceprint", {})
+            ),
+        )
+
+    async def _handle_function_result(self, tool_results, depth):
         need_llm_tools = []
 
         for result, tool_call_data in tool_results:
@@ -1045,41 +1138,7 @@ class ConnectionHandler:
                         )
                     )
 
-            self.chat(None, depth=depth + 1)
-
-    def _report_worker(self):
-        """聊天记录上报工作线程"""
-        while not self.stop_event.is_set():
-            try:
-                # 从队列获取数据，设置超时以便定期检查停止事件
-                item = self.report_queue.get(timeout=1)
-                if item is None:  # 检测毒丸对象
-                    break
-                try:
-                    # 检查线程池状态
-                    if self.executor is None:
-                        continue
-                    # 提交任务到线程池
-                    self.executor.submit(self._process_report, *item)
-                except Exception as e:
-                    self.logger.bind(tag=TAG).error(f"聊天记录上报线程异常: {e}")
-            except queue.Empty:
-                continue
-            except Exception as e:
-                self.logger.bind(tag=TAG).error(f"聊天记录上报工作线程异常: {e}")
-
-        self.logger.bind(tag=TAG).info("聊天记录上报线程已退出")
-
-    def _process_report(self, type, text, audio_data, report_time):
-        """处理上报任务"""
-        try:
-            # 执行异步上报（在事件循环中运行）
-            asyncio.run(report(self, type, text, audio_data, report_time))
-        except Exception as e:
-            self.logger.bind(tag=TAG).error(f"上报处理异常: {e}")
-        finally:
-            # 标记任务完成
-            self.report_queue.task_done()
+            await self.achat(None, depth=depth + 1)
 
     def clearSpeakStatus(self):
         self.client_is_speaking = False
@@ -1101,6 +1160,20 @@ class ConnectionHandler:
                     pass
                 self.timeout_task = None
 
+            # 取消进行中的对话任务和推测请求
+            self.cancel_chat()
+            finish_turn(self, "closed")
+            # 丢弃尚未发送的音频帧
+            if self.audio_stream is not None:
+                self.audio_stream.close()
+            if self.speculative_chat is not None:
+                self.speculative_chat.cancel()
+
+            # 归还共享的模块实例
+            if self.pooled_providers:
+                get_provider_pool().release_all(self.pooled_providers)
+                self.pooled_providers.clear()
+
             # 清理工具处理器资源
             if hasattr(self, "func_handler") and self.func_handler:
                 try:
@@ -1156,6 +1229,18 @@ class ConnectionHandler:
             if self.tts:
                 await self.tts.close()
 
+            # 取消异步流水线任务
+            for task in (
+                getattr(self, "asr_priority_task", None),
+                getattr(self.tts, "tts_priority_task", None),
+                getattr(self.tts, "audio_play_priority_task", None),
+            ):
+                if task and not task.done():
+                    task.cancel()
+
+            # 共享线程池由全局管理，不随连接关闭
+            if self.async_pipeline:
+                self.executor = None
             # 最后关闭线程池（避免阻塞）
             if self.executor:
                 try:
@@ -1176,6 +1261,8 @@ class ConnectionHandler:
     def clear_queues(self):
         """清空所有任务队列"""
         if self.tts:
+            # 取消流水线中未完成的合成，避免打断后仍有音频写入队列
+            self.tts.cancel_synthesis()
             self.logger.bind(tag=TAG).debug(
                 f"开始清理: TTS队列大小={self.tts.tts_text_queue.qsize()}, 音频队列大小={self.tts.tts_audio_queue.qsize()}"
             )
@@ -1184,7 +1271,6 @@ class ConnectionHandler:
             for q in [
                 self.tts.tts_text_queue,
                 self.tts.tts_audio_queue,
-                self.report_queue,
             ]:
                 if not q:
                     continue
@@ -1199,7 +1285,8 @@ class ConnectionHandler:
             )
 
     def reset_vad_states(self):
-        self.client_audio_buffer = bytearray()
+        if self.vad_stream is not None:
+            self.vad_stream.clear_audio()
         self.client_have_voice = False
         self.client_voice_stop = False
         self.logger.bind(tag=TAG).debug("VAD states reset.")
@@ -1291,7 +1378,7 @@ class ConnectionHandler:
         """
         try:
             from core.providers.tools.server_mcp.promptx_service import PromptXService
-            from core.providers.tools.server_mcp.manager import get_mcp_manager
+            from core.providers.tools.server_mcp.mcp_manager import get_mcp_manager
 
             self.logger.bind(tag=TAG).info(f"正在加载PromptX角色定义: {role_id}")
 
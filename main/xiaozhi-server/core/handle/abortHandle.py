@@ -1,4 +1,6 @@
 import json
+from core.utils.turn_trace import finish_turn
+from core.handle.sendAudioHandle import flush_audio
 
 TAG = __name__
 
@@ -7,7 +9,12 @@ async def handleAbortMessage(conn):
     conn.logger.bind(tag=TAG).info("Abort message received")
     # 设置成打断状态，会自动打断llm、tts任务
     conn.client_abort = True
+    finish_turn(conn, "abort")
+    # 取消进行中的对话任务，立即关闭大模型的流式连接
+    conn.cancel_chat()
     conn.clear_queues()
+    # 丢弃已提交但尚未发给设备的音频帧
+    flush_audio(conn)
     # 打断客户端说话状态
     await conn.websocket.send(
         json.dumps({"type": "tts", "state": "stop", "session_id": conn.session_id})
@@ -7,6 +7,7 @@ from core.handle.helloHandle import checkWakeupWords
 from plugins_func.register import Action, ActionResponse
 from core.handle.sendAudioHandle import send_stt_message
 from core.utils.util import remove_punctuation_and_length
+from core.utils.turn_trace import trace_span
 from core.providers.tts.dto.dto import TTSMessageDTO, SentenceType
 
 TAG = __name__
@@ -36,7 +37,8 @@ async def handle_user_intent(conn, text):
         # 使用支持function calling的聊天方法,不再进行意图分析
         return False
     # 使用LLM进行意图分析
-    intent_result = await analyze_intent_with_llm(conn, text)
+    with trace_span(conn, "intent"):
+        intent_result = await analyze_intent_with_llm(conn, text)
     if not intent_result:
         return False
     # 会话开始时生成sentence_id
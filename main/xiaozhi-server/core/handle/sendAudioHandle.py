@@ -2,14 +2,22 @@ import json
 import time
 import asyncio
 from core.utils import textUtils
-from core.utils.util import audio_to_data
+from core.utils.asset_store import get_asset_store
 from core.providers.tts.dto.dto import SentenceType
-from core.utils.audioRateController import AudioRateController
+from core.utils.audio_scheduler import get_audio_scheduler
+from core.utils.turn_trace import finish_turn, get_turn_trace
 
 TAG = __name__
+# 固定延迟模式下直接发送的预缓冲帧数
+PRE_BUFFER_COUNT = 5
 
 
 async def sendAudioMessage(conn, sentenceType, audios, text):
+    if audios:
+        trace = get_turn_trace(conn)
+        if trace is not None:
+            trace.on_audio_ready()
+
     if conn.tts.tts_audio_first_sentence:
         conn.logger.bind(tag=TAG).info(f"发送第一段语音: {text}")
         conn.tts.tts_audio_first_sentence = False
@@ -53,20 +61,20 @@ async def _send_to_mqtt_gateway(conn, opus_packet, timestamp, sequence):
     await conn.websocket.send(complete_packet)
 
 
-# 播放音频 - 使用 AudioRateController 进行精确流控
+# 播放音频 - 由全局音频调度器按设备播放速度发送
 async def sendAudio(conn, audios, frame_duration=60):
     """
-    发送音频包，使用 AudioRateController 进行精确的流量控制
+    发送音频包，交给全局音频调度器按实时速度发送
 
     Args:
         conn: 连接对象
         audios: 单个opus包(bytes) 或 opus包列表
         frame_duration: 帧时长（毫秒），默认60ms
 
-    改进点：
-    1. 使用单一时间基准，避免累积误差
-    2. 每次检查队列时重新计算 elapsed_ms，更精准
-    3. 支持高并发而不产生时间偏差
+    说明：
+    1. 所有连接的音频帧由一个调度任务按节拍发送，不再每帧各自sleep
+    2. 开始播放时前几帧直接发送（设备端预缓冲），之后按实时速度发送
+    3. 配置了 tts_audio_send_delay 时仍按固定间隔直接发送
     """
     if audios is None or len(audios) == 0:
         return
@@ -82,107 +90,100 @@ async def sendAudio(conn, audios, frame_duration=60):
         await _sendAudio_list(conn, audios, send_delay, frame_duration)
 
 
+def _get_audio_stream(conn, frame_duration=60):
+    """获取连接的音频流，第一次发送时创建"""
+    stream = getattr(conn, "audio_stream", None)
+    if stream is None or stream.closed:
+        stream = get_audio_scheduler().open_stream(
+            conn,
+            lambda packet, flow_control: _do_send_audio(
+                conn, packet, flow_control, frame_duration
+            ),
+            frame_duration,
+        )
+        conn.audio_stream = stream
+    return stream
+
+
+def flush_audio(conn):
+    """丢弃连接尚未发送的音频帧，打断时调用"""
+    stream = getattr(conn, "audio_stream", None)
+    if stream is not None:
+        stream.flush()
+
+
+async def drain_audio(conn):
+    """等待连接已提交的音频帧全部发送，保证状态消息在音频之后到达设备"""
+    stream = getattr(conn, "audio_stream", None)
+    if stream is not None:
+        await stream.drain()
+
+
 async def _sendAudio_single(conn, opus_packet, send_delay, frame_duration=60):
     """
     发送单个 opus 包
-    使用 AudioRateController 进行流控
+    提交给连接的音频流，待发送帧数超过高水位时等待
     """
     # 重置流控状态，第一次读取和会话发生转变时
-    if not hasattr(conn, "audio_rate_controller") or conn.audio_flow_control.get("sentence_id") != conn.sentence_id:
-        if hasattr(conn, "audio_rate_controller"):
-            conn.audio_rate_controller.reset()
-        else:
-            conn.audio_rate_controller = AudioRateController(frame_duration)
-            conn.audio_rate_controller.reset()
-
-        conn.audio_flow_control = {
+    flow_control = getattr(conn, "audio_flow_control", None)
+    if flow_control is None or flow_control.get("sentence_id") != conn.sentence_id:
+        flow_control = {
             "packet_count": 0,
             "sequence": 0,
             "sentence_id": conn.sentence_id,
         }
+        conn.audio_flow_control = flow_control
 
     if conn.client_abort:
         return
 
     conn.last_activity_time = time.time() * 1000
 
-    rate_controller = conn.audio_rate_controller
-    flow_control = conn.audio_flow_control
-    packet_count = flow_control["packet_count"]
-
-    # 预缓冲：前5个包直接发送，不做延迟
-    pre_buffer_count = 5
-
-    if packet_count < pre_buffer_count or send_delay > 0:
-        # 预缓冲阶段或固定延迟模式，直接发送
+    if send_delay > 0:
+        # 固定延迟模式，直接发送
+        packet_count = flow_control["packet_count"]
         await _do_send_audio(conn, opus_packet, flow_control, frame_duration)
         conn.client_is_speaking = True
-
-        if send_delay > 0 and packet_count >= pre_buffer_count:
+        if packet_count >= PRE_BUFFER_COUNT:
             await asyncio.sleep(send_delay)
-    else:
-        # 使用流控器进行精确的速率控制
-        rate_controller.add_audio(opus_packet)
-
-        async def send_callback(packet):
-            await _do_send_audio(conn, packet, flow_control, frame_duration)
-
-        await rate_controller.check_queue(send_callback)
-        conn.client_is_speaking = True
+        return
 
-    # 更新流控状态
-    flow_control["packet_count"] += 1
-    flow_control["sequence"] += 1
+    await _get_audio_stream(conn, frame_duration).put(opus_packet, flow_control)
+    conn.client_is_speaking = True
 
 
 async def _sendAudio_list(conn, audios, send_delay, frame_duration=60):
     """
-    发送音频列表（如文件型音频）
+    发送音频列表（如文件型音频），返回时已全部发送
     """
     if not audios:
         return
 
-    rate_controller = AudioRateController(frame_duration)
-    rate_controller.reset()
-
     flow_control = {
         "packet_count": 0,
         "sequence": 0,
     }
 
-    # 预缓冲：前5个包直接发送
-    pre_buffer_frames = min(5, len(audios))
-    for i in range(pre_buffer_frames):
-        if conn.client_abort:
-            return
-        await _do_send_audio(conn, audios[i], flow_control, frame_duration)
-        conn.client_is_speaking = True
-
-    remaining_audios = audios[pre_buffer_frames:]
-
-    # 处理剩余音频帧
-    for i, opus_packet in enumerate(remaining_audios):
-        if conn.client_abort:
-            break
-
-        conn.last_activity_time = time.time() * 1000
-
-        if send_delay > 0:
-            # 固定延迟模式
-            await asyncio.sleep(send_delay)
-        else:
-            # 使用流控器进行精确延迟
-            rate_controller.add_audio(opus_packet)
-
-            async def send_callback(packet):
-                await _do_send_audio(conn, packet, flow_control, frame_duration)
-
-            await rate_controller.check_queue(send_callback)
+    if send_delay > 0:
+        # 固定延迟模式：前几帧直接发送，之后每帧间隔固定时长
+        for i, opus_packet in enumerate(audios):
+            if conn.client_abort:
+                return
+            conn.last_activity_time = time.time() * 1000
+            if i >= PRE_BUFFER_COUNT:
+                await asyncio.sleep(send_delay)
+            await _do_send_audio(conn, opus_packet, flow_control, frame_duration)
             conn.client_is_speaking = True
-            continue
+        return
 
-        await _do_send_audio(conn, opus_packet, flow_control, frame_duration)
-        conn.client_is_speaking = True
+    if conn.client_abort:
+        return
+    conn.last_activity_time = time.time() * 1000
+    stream = _get_audio_stream(conn, frame_duration)
+    for opus_packet in audios:
+        await stream.put(opus_packet, flow_control, wait=False)
+    conn.client_is_speaking = True
+    await stream.drain()
 
 
 async def _do_send_audio(conn, opus_packet, flow_control, frame_duration=60):
@@ -191,6 +192,9 @@ async def _do_send_audio(conn, opus_packet, flow_control, frame_duration=60):
     """
     packet_index = flow_control.get("packet_count", 0)
     sequence = flow_control.get("sequence", 0)
+    trace = get_turn_trace(conn)
+    if trace is not None:
+        trace.on_audio_sent()
 
     if conn.conn_from_mqtt_gateway:
         # 计算时间戳（基于播放位置）
@@ -214,6 +218,9 @@ async def send_tts_message(conn, state, text=None):
     if text is not None:
         message["text"] = textUtils.check_emoji(text)
 
+    # 状态消息需在已提交的音频之后到达设备
+    await drain_audio(conn)
+
     # TTS播放结束
     if state == "stop":
         # 播放提示音
@@ -222,10 +229,11 @@ async def send_tts_message(conn, state, text=None):
             stop_tts_notify_voice = conn.config.get(
                 "stop_tts_notify_voice", "config/assets/tts_notify.mp3"
             )
-            audios = audio_to_data(stop_tts_notify_voice, is_opus=True)
+            audios = get_asset_store().get(stop_tts_notify_voice)
             await sendAudio(conn, audios)
         # 清除服务端讲话状态
         conn.clearSpeakStatus()
+        finish_turn(conn)
 
     # 发送消息到客户端
     await conn.websocket.send(json.dumps(message))
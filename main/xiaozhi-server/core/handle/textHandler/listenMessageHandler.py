@@ -7,6 +7,7 @@ from core.handle.sendAudioHandle import send_stt_message, send_tts_message
 from core.handle.textMessageHandler import TextMessageHandler
 from core.handle.textMessageType import TextMessageType
 from core.utils.util import remove_punctuation_and_length
+from core.utils.turn_trace import start_turn
 
 TAG = __name__
 
@@ -36,6 +37,7 @@ class ListenTextMessageHandler(TextMessageHandler):
             conn.asr_audio.clear()
             if "text" in msg_json:
                 conn.last_activity_time = time.time() * 1000
+                start_turn(conn, "text")
                 original_text = msg_json["text"]  # 保留原始文本
                 filtered_len, filtered_text = remove_punctuation_and_length(
                     original_text
@@ -5,6 +5,7 @@ from typing import Dict, Any
 from core.handle.textMessageHandler import TextMessageHandler
 from core.handle.textMessageType import TextMessageType
 from core.providers.tools.device_mcp import handle_mcp_message
+from config.manage_api_client import invalidate_private_config
 
 TAG = __name__
 
@@ -36,6 +37,11 @@ class ServerTextMessageHandler(TextMessageHandler):
             return
         # 动态更新配置
         if msg_json["action"] == "update_config":
+            # 智控台修改了配置，失效差异化配置缓存；指定了设备时只失效这些设备
+            mac_addresses = msg_json.get("content", {}).get("mac_addresses")
+            if isinstance(mac_addresses, str):
+                mac_addresses = [mac_addresses]
+            invalidate_private_config(mac_addresses)
             try:
                 # 更新WebSocketServer的配置
                 if not conn.server:
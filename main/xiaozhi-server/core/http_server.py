@@ -4,6 +4,7 @@ from config.logger import setup_logging
 from core.api.ota_handler import OTAHandler
 from core.api.vision_handler import VisionHandler
 from core.api.promptx_handler import PromptXHandler
+from core.api.metrics_handler import MetricsHandler
 
 TAG = __name__
 
@@ -15,6 +16,7 @@ class SimpleHttpServer:
         self.ota_handler = OTAHandler(config)
         self.vision_handler = VisionHandler(config)
         self.promptx_handler = PromptXHandler(mcp_manager)
+        self.metrics_handler = MetricsHandler()
 
     def _get_websocket_url(self, local_ip: str, port: int) -> str:
         """获取websocket地址
@@ -63,6 +65,8 @@ class SimpleHttpServer:
                     web.post("/api/promptx/generate-prompt", self.promptx_handler.handle_generate_prompt),
                     web.options("/api/promptx/roles", self.promptx_handler.handle_options),
                     web.options("/api/promptx/generate-prompt", self.promptx_handler.handle_options),
+                    # 运行指标（Prometheus格式）
+                    web.get("/metrics", self.metrics_handler.handle_get),
                 ]
             )
 
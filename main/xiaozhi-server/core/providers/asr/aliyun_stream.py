@@ -250,6 +250,7 @@ class ASRProvider(ASRProviderBase):
                         text = payload.get("result", "")
                         if text:
                             self.text = text
+                            self.handle_partial_text(conn, text)
                     elif message_name == "SentenceEnd":
                         # 最终结果
                         text = payload.get("result", "")
@@ -9,7 +9,6 @@ import asyncio
 import traceback
 import threading
 import opuslib_next
-import concurrent.futures
 import gc
 from abc import ABC, abstractmethod
 from config.logger import setup_logging
@@ -17,6 +16,8 @@ from typing import Optional, Tuple, List
 from core.handle.receiveAudioHandle import startToChat
 from core.handle.reportHandle import enqueue_asr_report
 from core.utils.util import remove_punctuation_and_length
+from core.utils.asr_service import get_asr_service
+from core.utils.turn_trace import start_turn, trace_span
 from core.handle.receiveAudioHandle import handleAudioMessage
 
 TAG = __name__
@@ -29,11 +30,33 @@ class ASRProviderBase(ABC):
 
     # 打开音频通道
     async def open_audio_channels(self, conn):
+        if getattr(conn, "async_pipeline", False):
+            # 异步流水线模式：在事件循环中以任务方式消费音频，不占用线程
+            conn.asr_priority_task = asyncio.create_task(
+                self.asr_text_priority_task(conn)
+            )
+            return
         conn.asr_priority_thread = threading.Thread(
             target=self.asr_text_priority_thread, args=(conn,), daemon=True
         )
         conn.asr_priority_thread.start()
 
+    # 有序处理ASR音频（异步流水线模式）
+    async def asr_text_priority_task(self, conn):
+        while not conn.stop_event.is_set():
+            try:
+                message = await conn.asr_audio_queue.async_get(timeout=1)
+                await handleAudioMessage(conn, message)
+            except queue.Empty:
+                continue
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.bind(tag=TAG).error(
+                    f"处理ASR文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
+                )
+                continue
+
     # 有序处理ASR音频
     def asr_text_priority_thread(self, conn):
         while not conn.stop_event.is_set():
@@ -60,8 +83,10 @@ class ASRProviderBase(ABC):
             have_voice = conn.client_have_voice
         
         conn.asr_audio.append(audio)
+        self._append_decoded_pcm(conn, audio)
         if not have_voice and not conn.client_have_voice:
             conn.asr_audio = conn.asr_audio[-10:]
+            conn.asr_pcm = conn.asr_pcm[-10:]
             return
 
         if conn.client_voice_stop:
@@ -77,12 +102,21 @@ class ASRProviderBase(ABC):
         """并行处理ASR和声纹识别"""
         try:
             total_start_time = time.monotonic()
-            
+            trace = start_turn(conn, "voice")
+            if trace is not None and conn.client_listen_mode != "manual":
+                # 自动拾音模式下，最后一次检测到人声到判定说完的静音等待
+                silence_s = (time.time() * 1000 - conn.last_activity_time) / 1000
+                if 0 < silence_s < 10:
+                    trace.add_span(
+                        "vad", total_start_time - silence_s, total_start_time
+                    )
+
             # 准备音频数据
             if conn.audio_format == "pcm":
                 pcm_data = asr_audio_task
             else:
-                pcm_data = self.decode_opus(asr_audio_task)
+                with trace_span(conn, "opus_decode"):
+                    pcm_data = self._take_decoded_pcm(conn, asr_audio_task)
             
             combined_pcm_data = b"".join(pcm_data)
             
@@ -92,61 +126,44 @@ class ASRProviderBase(ABC):
                 wav_data = self._pcm_to_wav(combined_pcm_data)
             
             # 定义ASR任务
-            def run_asr():
+            async def run_asr():
                 start_time = time.monotonic()
                 try:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        result = loop.run_until_complete(
-                            self.speech_to_text(asr_audio_task, conn.session_id, conn.audio_format)
-                        )
-                        end_time = time.monotonic()
-                        logger.bind(tag=TAG).debug(f"ASR耗时: {end_time - start_time:.3f}s")
-                        return result
-                    finally:
-                        loop.close()
-                except Exception as e:
+                    result = await self.speech_to_text(pcm_data, conn.session_id, "pcm")
                     end_time = time.monotonic()
+                    logger.bind(tag=TAG).debug(f"ASR耗时: {end_time - start_time:.3f}s")
+                    return result
+                except Exception as e:
                     logger.bind(tag=TAG).error(f"ASR失败: {e}")
                     return ("", None)
-            
+
             # 定义声纹识别任务
-            def run_voiceprint():
-                if not wav_data:
-                    return None
+            async def run_voiceprint():
                 try:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        # 使用连接的声纹识别提供者
-                        result = loop.run_until_complete(
-                            conn.voiceprint_provider.identify_speaker(wav_data, conn.session_id)
-                        )
-                        return result
-                    finally:
-                        loop.close()
+                    # 使用连接的声纹识别提供者
+                    return await conn.voiceprint_provider.identify_speaker(
+                        wav_data, conn.session_id
+                    )
                 except Exception as e:
                     logger.bind(tag=TAG).error(f"声纹识别失败: {e}")
                     return None
-            
-            # 使用线程池执行器并行运行
-            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as thread_executor:
-                asr_future = thread_executor.submit(run_asr)
-                
+
+            # 提交到全局ASR执行服务并行运行，不阻塞事件循环
+            asr_service = get_asr_service()
+            provider_name = self.__class__.__module__.split(".")[-1]
+            with trace_span(conn, "asr"):
                 if conn.voiceprint_provider and wav_data:
-                    voiceprint_future = thread_executor.submit(run_voiceprint)
-                    
-                    # 等待两个线程都完成
-                    asr_result = asr_future.result(timeout=15)
-                    voiceprint_result = voiceprint_future.result(timeout=15)
-                    
+                    asr_result, voiceprint_result = await asyncio.gather(
+                        asr_service.run(provider_name, run_asr, timeout=15),
+                        asr_service.run("voiceprint", run_voiceprint, timeout=15),
+                    )
                     results = {"asr": asr_result, "voiceprint": voiceprint_result}
                 else:
-                    asr_result = asr_future.result(timeout=15)
+                    asr_result = await asr_service.run(
+                        provider_name, run_asr, timeout=15
+                    )
                     results = {"asr": asr_result, "voiceprint": None}
-            
-            
+
             # 处理结果
             raw_text, _ = results.get("asr", ("", None))
             speaker_name = results.get("voiceprint", None)
@@ -177,6 +194,64 @@ class ASRProviderBase(ABC):
             logger.bind(tag=TAG).error(f"处理语音停止失败: {e}")
             import traceback
             logger.bind(tag=TAG).debug(f"异常详情: {traceback.format_exc()}")
+        finally:
+            # 本轮语音已结束，未被对话认领的推测请求作废
+            if getattr(conn, "speculative_chat", None) is not None:
+                conn.speculative_chat.cancel()
+
+    def handle_partial_text(self, conn, text: str):
+        """流式识别的中间结果：供VAD断句参考，开启推测执行时在静音窗口内提前请求大模型"""
+        if not text:
+            return
+        if getattr(conn, "vad", None) is not None:
+            conn.vad.on_partial_text(conn, text)
+        if getattr(conn, "speculative_chat", None) is not None:
+            conn.speculative_chat.on_partial(text)
+
+    def _append_decoded_pcm(self, conn, audio):
+        """记录VAD对该音频包的解码结果，语音结束时无需再次解码"""
+        if not hasattr(conn, "asr_pcm"):
+            return
+        stream = getattr(conn, "vad_stream", None)
+        if stream is not None and stream.last_packet is audio:
+            conn.asr_pcm.append((audio, stream.last_pcm, stream.last_decode_ms))
+        # asr_audio可能在别处被清空，只保留与其尾部对应的部分
+        if len(conn.asr_pcm) > len(conn.asr_audio):
+            conn.asr_pcm = conn.asr_pcm[len(conn.asr_pcm) - len(conn.asr_audio) :]
+
+    def _take_decoded_pcm(self, conn, asr_audio_task: List[bytes]) -> List[bytes]:
+        """取出整句话的PCM数据，优先复用VAD已解码的结果，缺失的部分再解码"""
+        start_time = time.monotonic()
+        decoded = {id(packet): (pcm, cost) for packet, pcm, cost in getattr(conn, "asr_pcm", [])}
+        conn.asr_pcm = []
+
+        pcm_data = []
+        missing = []
+        saved_ms = 0.0
+        for packet in asr_audio_task:
+            if id(packet) in decoded:
+                pcm, cost = decoded[id(packet)]
+                pcm_data.append(pcm)
+                saved_ms += cost
+            elif packet:
+                missing.append(len(pcm_data))
+                pcm_data.append(packet)
+
+        if missing:
+            # 未经过VAD解码的数据包，按原方式补充解码
+            missing_pcm = self.decode_opus([pcm_data[i] for i in missing])
+            if len(missing_pcm) == len(missing):
+                for i, pcm in zip(missing, missing_pcm):
+                    pcm_data[i] = pcm
+            else:
+                return self.decode_opus(asr_audio_task)
+
+        logger.bind(tag=TAG).debug(
+            f"复用VAD解码PCM: {len(pcm_data) - len(missing)}/{len(pcm_data)}帧，"
+            f"补充解码耗时: {(time.monotonic() - start_time) * 1000:.1f}ms，"
+            f"节省解码耗时: {saved_ms:.1f}ms"
+        )
+        return pcm_data
 
     def _build_enhanced_text(self, text: str, speaker_name: Optional[str]) -> str:
         """构建包含说话人信息的文本"""
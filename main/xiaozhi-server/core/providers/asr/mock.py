@@ -0,0 +1,38 @@
+import asyncio
+import itertools
+from typing import Optional, Tuple, List
+from config.logger import setup_logging
+from core.providers.asr.dto.dto import InterfaceType
+from core.providers.asr.base import ASRProviderBase
+
+TAG = __name__
+logger = setup_logging()
+
+
+class ASRProvider(ASRProviderBase):
+    """
+    本地模拟ASR，不加载模型、不访问网络，用于压测服务端自身的处理能力
+
+    固定耗时后按顺序返回配置的文本
+    """
+
+    def __init__(self, config: dict, delete_audio_file: bool):
+        super().__init__()
+        # 无状态，一个实例可以被所有连接共享
+        self.interface_type = InterfaceType.LOCAL
+        texts = config.get("texts") or config.get("text") or "今天天气怎么样"
+        if isinstance(texts, str):
+            texts = [texts]
+        self._texts = itertools.cycle([str(text) for text in texts])
+        self.delay_ms = float(config.get("delay_ms", 100))
+        self.output_dir = config.get("output_dir", "tmp/")
+        self.delete_audio_file = delete_audio_file
+
+    async def speech_to_text(
+        self, opus_data: List[bytes], session_id: str, audio_format="opus"
+    ) -> Tuple[Optional[str], Optional[str]]:
+        if self.delay_ms > 0:
+            await asyncio.sleep(self.delay_ms / 1000)
+        text = next(self._texts)
+        logger.bind(tag=TAG).debug(f"模拟识别: {len(opus_data)}帧 -> {text}")
+        return text, None
@@ -319,6 +319,7 @@ class ASRProvider(ASRProviderBase):
                                     else:
                                         # 中间状态替换为新的识别结果
                                         self.text = result_text
+                                        self.handle_partial_text(conn, self.text)
 
                                     logger.bind(tag=TAG).info(
                                         f"实时更新识别文本: {self.text} (最终帧已发送: {self.last_frame_sent})"
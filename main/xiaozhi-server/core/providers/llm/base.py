@@ -1,9 +1,67 @@
+import asyncio
+import threading
 from abc import ABC, abstractmethod
 from config.logger import setup_logging
 
 TAG = __name__
 logger = setup_logging()
 
+_STREAM_END = object()
+
+
+async def iterate_in_thread(make_generator):
+    """
+    在独立线程中迭代同步生成器，以异步生成器的形式返回结果
+
+    用于尚未实现原生异步接口的提供者。协程被取消或提前关闭时通知线程停止，
+    线程在拿到下一个数据块后关闭同步生成器，释放其持有的HTTP连接
+
+    Args:
+        make_generator: 返回同步生成器的函数，在线程中调用
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def put(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            # 事件循环已关闭
+            stop.set()
+
+    def worker():
+        generator = None
+        try:
+            generator = make_generator()
+            for item in generator:
+                if stop.is_set():
+                    break
+                put((item, None))
+        except Exception as e:
+            put((None, e))
+        finally:
+            if generator is not None:
+                try:
+                    generator.close()
+                except Exception as e:
+                    logger.bind(tag=TAG).debug(f"关闭LLM流式响应失败: {e}")
+            put(_STREAM_END)
+
+    threading.Thread(target=worker, name="llm-stream", daemon=True).start()
+    try:
+        while True:
+            item = await queue.get()
+            if item is _STREAM_END:
+                return
+            value, error = item
+            if error is not None:
+                raise error
+            yield value
+    finally:
+        stop.set()
+
+
 class LLMProviderBase(ABC):
     @abstractmethod
     def response(self, session_id, dialogue):
@@ -25,7 +83,7 @@ class LLMProviderBase(ABC):
         except Exception as e:
             logger.bind(tag=TAG).error(f"Error in Ollama response generation: {e}")
             return "【LLM服务响应异常】"
-    
+
     def response_with_functions(self, session_id, dialogue, functions=None):
         """
         Default implementation for function calling (streaming)
@@ -37,3 +95,25 @@ class LLMProviderBase(ABC):
         for token in self.response(session_id, dialogue):
             yield token, None
 
+    async def aresponse(self, session_id, dialogue, **kwargs):
+        """
+        异步流式响应，输出内容与 response 一致
+
+        默认在独立线程中迭代 response，支持原生异步的提供者应覆盖此方法，
+        使任务被取消时能立即关闭上游的流式连接
+        """
+        async for token in iterate_in_thread(
+            lambda: self.response(session_id, dialogue, **kwargs)
+        ):
+            yield token
+
+    async def aresponse_with_functions(
+        self, session_id, dialogue, functions=None, **kwargs
+    ):
+        """异步流式响应（支持函数调用），输出内容与 response_with_functions 一致"""
+        async for item in iterate_in_thread(
+            lambda: self.response_with_functions(
+                session_id, dialogue, functions=functions, **kwargs
+            )
+        ):
+            yield item
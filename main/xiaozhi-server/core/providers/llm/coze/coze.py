@@ -6,7 +6,9 @@ from core.providers.llm.base import LLMProviderBase
 from cozepy import COZE_CN_BASE_URL
 from cozepy import (
     Coze,
+    AsyncCoze,
     TokenAuth,
+    AsyncTokenAuth,
     Message,
     ChatEventType,
 )  # noqa
@@ -23,6 +25,7 @@ class LLMProvider(LLMProviderBase):
         self.bot_id = str(config.get("bot_id"))
         self.user_id = str(config.get("user_id"))
         self.session_conversation_map = {}  # 存储session_id和conversation_id的映射
+        self._async_coze = None
         model_key_msg = check_model_key("CozeLLM", self.personal_access_token)
         if model_key_msg:
             logger.bind(tag=TAG).error(model_key_msg)
@@ -54,7 +57,8 @@ class LLMProvider(LLMProviderBase):
                 print(event.message.content, end="", flush=True)
                 yield event.message.content
 
-    def response_with_functions(self, session_id, dialogue, functions=None):
+    @staticmethod
+    def _prepare_function_dialogue(dialogue, functions):
         if len(dialogue) == 2 and functions is not None and len(functions) > 0:
             # 第一次调用llm， 取最后一条用户消息，附加tool提示词
             last_msg = dialogue[-1]["content"]
@@ -70,6 +74,46 @@ class LLMProvider(LLMProviderBase):
                     dialogue[-1]["content"] = assistant_msg + dialogue[-1]["content"]
                     break
                 dialogue.pop()
+        return dialogue
 
+    def response_with_functions(self, session_id, dialogue, functions=None):
+        dialogue = self._prepare_function_dialogue(dialogue, functions)
         for token in self.response(session_id, dialogue):
             yield token, None
+
+    async def aresponse(self, session_id, dialogue, **kwargs):
+        last_msg = next(m for m in reversed(dialogue) if m["role"] == "user")
+
+        # 异步客户端内部持有连接池，复用同一个实例
+        if self._async_coze is None:
+            self._async_coze = AsyncCoze(
+                auth=AsyncTokenAuth(token=self.personal_access_token),
+                base_url=COZE_CN_BASE_URL,
+            )
+        coze = self._async_coze
+        conversation_id = self.session_conversation_map.get(session_id)
+
+        # 如果没有找到conversation_id，则创建新的对话
+        if not conversation_id:
+            conversation = await coze.conversations.create(messages=[])
+            conversation_id = conversation.id
+            self.session_conversation_map[session_id] = conversation_id  # 更新映射
+
+        # 任务被取消时流式请求随之取消，上游连接立即关闭
+        async for event in coze.chat.stream(
+            bot_id=self.bot_id,
+            user_id=self.user_id,
+            additional_messages=[
+                Message.build_user_question_text(last_msg["content"]),
+            ],
+            conversation_id=conversation_id,
+        ):
+            if event.event == ChatEventType.CONVERSATION_MESSAGE_DELTA:
+                yield event.message.content
+
+    async def aresponse_with_functions(
+        self, session_id, dialogue, functions=None, **kwargs
+    ):
+        dialogue = self._prepare_function_dialogue(dialogue, functions)
+        async for token in self.aresponse(session_id, dialogue):
+            yield token, None
@@ -4,6 +4,7 @@ import requests
 from core.providers.llm.base import LLMProviderBase
 from core.providers.llm.system_prompt import get_system_prompt_for_function
 from core.utils.util import check_model_key
+from core.utils.http_client import get_http_clients
 
 TAG = __name__
 logger = setup_logging()
@@ -19,79 +20,60 @@ class LLMProvider(LLMProviderBase):
         if model_key_msg:
             logger.bind(tag=TAG).error(model_key_msg)
 
-    def response(self, session_id, dialogue, **kwargs):
-        try:
-            # 取最后一条用户消息
-            last_msg = next(m for m in reversed(dialogue) if m["role"] == "user")
-            conversation_id = self.session_conversation_map.get(session_id)
+    def _build_request_json(self, session_id, dialogue):
+        # 取最后一条用户消息
+        last_msg = next(m for m in reversed(dialogue) if m["role"] == "user")
+        conversation_id = self.session_conversation_map.get(session_id)
 
-            # 发起流式请求
-            if self.mode == "chat-messages":
-                request_json = {
-                    "query": last_msg["content"],
-                    "response_mode": "streaming",
-                    "user": session_id,
-                    "inputs": {},
-                    "conversation_id": conversation_id,
-                }
-            elif self.mode == "workflows/run":
-                request_json = {
-                    "inputs": {"query": last_msg["content"]},
-                    "response_mode": "streaming",
-                    "user": session_id,
-                }
-            elif self.mode == "completion-messages":
-                request_json = {
-                    "inputs": {"query": last_msg["content"]},
-                    "response_mode": "streaming",
-                    "user": session_id,
-                }
+        if self.mode == "chat-messages":
+            return {
+                "query": last_msg["content"],
+                "response_mode": "streaming",
+                "user": session_id,
+                "inputs": {},
+                "conversation_id": conversation_id,
+            }
+        elif self.mode == "workflows/run":
+            return {
+                "inputs": {"query": last_msg["content"]},
+                "response_mode": "streaming",
+                "user": session_id,
+            }
+        elif self.mode == "completion-messages":
+            return {
+                "inputs": {"query": last_msg["content"]},
+                "response_mode": "streaming",
+                "user": session_id,
+            }
 
-            with requests.post(
-                f"{self.base_url}/{self.mode}",
-                headers={"Authorization": f"Bearer {self.api_key}"},
-                json=request_json,
-                stream=True,
-            ) as r:
-                if self.mode == "chat-messages":
-                    for line in r.iter_lines():
-                        if line.startswith(b"data: "):
-                            event = json.loads(line[6:])
-                            # 如果没有找到conversation_id，则获取此次conversation_id
-                            if not conversation_id:
-                                conversation_id = event.get("conversation_id")
-                                self.session_conversation_map[session_id] = (
-                                    conversation_id  # 更新映射
-                                )
-                            # 过滤 message_replace 事件，此事件会全量推一次
-                            if event.get("event") != "message_replace" and event.get(
-                                "answer"
-                            ):
-                                yield event["answer"]
-                elif self.mode == "workflows/run":
-                    for line in r.iter_lines():
-                        if line.startswith(b"data: "):
-                            event = json.loads(line[6:])
-                            if event.get("event") == "workflow_finished":
-                                if event["data"]["status"] == "succeeded":
-                                    yield event["data"]["outputs"]["answer"]
-                                else:
-                                    yield "【服务响应异常】"
-                elif self.mode == "completion-messages":
-                    for line in r.iter_lines():
-                        if line.startswith(b"data: "):
-                            event = json.loads(line[6:])
-                            # 过滤 message_replace 事件，此事件会全量推一次
-                            if event.get("event") != "message_replace" and event.get(
-                                "answer"
-                            ):
-                                yield event["answer"]
+    def _handle_line(self, session_id, line):
+        """处理一行SSE数据，返回需要输出的文本，没有则返回None"""
+        if not line.startswith(b"data: "):
+            return None
+        event = json.loads(line[6:])
+        if self.mode == "chat-messages":
+            # 如果没有找到conversation_id，则获取此次conversation_id
+            if not self.session_conversation_map.get(session_id):
+                self.session_conversation_map[session_id] = event.get(
+                    "conversation_id"
+                )  # 更新映射
+            # 过滤 message_replace 事件，此事件会全量推一次
+            if event.get("event") != "message_replace" and event.get("answer"):
+                return event["answer"]
+        elif self.mode == "workflows/run":
+            if event.get("event") == "workflow_finished":
+                if event["data"]["status"] == "succeeded":
+                    return event["data"]["outputs"]["answer"]
+                else:
+                    return "【服务响应异常】"
+        elif self.mode == "completion-messages":
+            # 过滤 message_replace 事件，此事件会全量推一次
+            if event.get("event") != "message_replace" and event.get("answer"):
+                return event["answer"]
+        return None
 
-        except Exception as e:
-            logger.bind(tag=TAG).error(f"Error in response generation: {e}")
-            yield "【服务响应异常】"
-
-    def response_with_functions(self, session_id, dialogue, functions=None):
+    @staticmethod
+    def _prepare_function_dialogue(dialogue, functions):
         if len(dialogue) == 2 and functions is not None and len(functions) > 0:
             # 第一次调用llm， 取最后一条用户消息，附加tool提示词
             last_msg = dialogue[-1]["content"]
@@ -107,6 +89,53 @@ class LLMProvider(LLMProviderBase):
                     dialogue[-1]["content"] = assistant_msg + dialogue[-1]["content"]
                     break
                 dialogue.pop()
+        return dialogue
+
+    def response(self, session_id, dialogue, **kwargs):
+        try:
+            # 发起流式请求
+            with requests.post(
+                f"{self.base_url}/{self.mode}",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                json=self._build_request_json(session_id, dialogue),
+                stream=True,
+            ) as r:
+                for line in r.iter_lines():
+                    text = self._handle_line(session_id, line)
+                    if text:
+                        yield text
+
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error in response generation: {e}")
+            yield "【服务响应异常】"
 
+    def response_with_functions(self, session_id, dialogue, functions=None):
+        dialogue = self._prepare_function_dialogue(dialogue, functions)
         for token in self.response(session_id, dialogue):
             yield token, None
+
+    async def aresponse(self, session_id, dialogue, **kwargs):
+        try:
+            session = get_http_clients().get_session()
+            # 任务被取消时退出 async with，连接随之关闭
+            async with session.post(
+                f"{self.base_url}/{self.mode}",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                json=self._build_request_json(session_id, dialogue),
+                timeout=get_http_clients().stream_timeout(),
+            ) as r:
+                async for line in r.content:
+                    text = self._handle_line(session_id, line.rstrip(b"\r\n"))
+                    if text:
+                        yield text
+
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error in response generation: {e}")
+            yield "【服务响应异常】"
+
+    async def aresponse_with_functions(
+        self, session_id, dialogue, functions=None, **kwargs
+    ):
+        dialogue = self._prepare_function_dialogue(dialogue, functions)
+        async for token in self.aresponse(session_id, dialogue):
+            yield token, None
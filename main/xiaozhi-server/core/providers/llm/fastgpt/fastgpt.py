@@ -3,10 +3,13 @@ from config.logger import setup_logging
 import requests
 from core.providers.llm.base import LLMProviderBase
 from core.utils.util import check_model_key
+from core.utils.http_client import get_http_clients
 
 TAG = __name__
 logger = setup_logging()
 
+_DONE = object()
+
 
 class LLMProvider(LLMProviderBase):
     def __init__(self, config):
@@ -18,50 +21,80 @@ class LLMProvider(LLMProviderBase):
         if model_key_msg:
             logger.bind(tag=TAG).error(model_key_msg)
 
-    def response(self, session_id, dialogue, **kwargs):
+    def _build_request_json(self, session_id, dialogue):
+        # 取最后一条用户消息
+        last_msg = next(m for m in reversed(dialogue) if m["role"] == "user")
+        return {
+            "stream": True,
+            "chatId": session_id,
+            "detail": self.detail,
+            "variables": self.variables,
+            "messages": [{"role": "user", "content": last_msg["content"]}],
+        }
+
+    @staticmethod
+    def _parse_line(line):
+        """解析一行SSE数据，返回需要输出的文本，流结束时返回_DONE"""
+        if not line:
+            return None
         try:
-            # 取最后一条用户消息
-            last_msg = next(m for m in reversed(dialogue) if m["role"] == "user")
+            if line.startswith(b"data: "):
+                if line[6:].decode("utf-8") == "[DONE]":
+                    return _DONE
+
+                data = json.loads(line[6:])
+                if "choices" in data and len(data["choices"]) > 0:
+                    delta = data["choices"][0].get("delta", {})
+                    if delta and "content" in delta and delta["content"] is not None:
+                        content = delta["content"]
+                        if "<think>" in content:
+                            return None
+                        if "</think>" in content:
+                            return None
+                        return content
 
+        except json.JSONDecodeError as e:
+            return None
+        except Exception as e:
+            return None
+        return None
+
+    def response(self, session_id, dialogue, **kwargs):
+        try:
             # 发起流式请求
             with requests.post(
                 f"{self.base_url}/chat/completions",
                 headers={"Authorization": f"Bearer {self.api_key}"},
-                json={
-                    "stream": True,
-                    "chatId": session_id,
-                    "detail": self.detail,
-                    "variables": self.variables,
-                    "messages": [{"role": "user", "content": last_msg["content"]}],
-                },
+                json=self._build_request_json(session_id, dialogue),
                 stream=True,
             ) as r:
                 for line in r.iter_lines():
-                    if line:
-                        try:
-                            if line.startswith(b"data: "):
-                                if line[6:].decode("utf-8") == "[DONE]":
-                                    break
+                    content = self._parse_line(line)
+                    if content is _DONE:
+                        break
+                    if content:
+                        yield content
 
-                                data = json.loads(line[6:])
-                                if "choices" in data and len(data["choices"]) > 0:
-                                    delta = data["choices"][0].get("delta", {})
-                                    if (
-                                        delta
-                                        and "content" in delta
-                                        and delta["content"] is not None
-                                    ):
-                                        content = delta["content"]
-                                        if "<think>" in content:
-                                            continue
-                                        if "</think>" in content:
-                                            continue
-                                        yield content
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error in response generation: {e}")
+            yield "【服务响应异常】"
 
-                        except json.JSONDecodeError as e:
-                            continue
-                        except Exception as e:
-                            continue
+    async def aresponse(self, session_id, dialogue, **kwargs):
+        try:
+            session = get_http_clients().get_session()
+            # 任务被取消时退出 async with，连接随之关闭
+            async with session.post(
+                f"{self.base_url}/chat/completions",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                json=self._build_request_json(session_id, dialogue),
+                timeout=get_http_clients().stream_timeout(),
+            ) as r:
+                async for line in r.content:
+                    content = self._parse_line(line.rstrip(b"\r\n"))
+                    if content is _DONE:
+                        break
+                    if content:
+                        yield content
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"Error in response generation: {e}")
@@ -125,7 +125,18 @@ class LLMProvider(LLMProviderBase):
     def response_with_functions(self, session_id, dialogue, functions=None):
         yield from self._generate(dialogue, self._build_tools(functions))
 
-    def _generate(self, dialogue, tools):
+    async def aresponse(self, session_id, dialogue, **kwargs):
+        async for token in self._agenerate(dialogue, None):
+            yield token
+
+    async def aresponse_with_functions(
+        self, session_id, dialogue, functions=None, **kwargs
+    ):
+        async for item in self._agenerate(dialogue, self._build_tools(functions)):
+            yield item
+
+    @staticmethod
+    def _build_contents(dialogue):
         role_map = {"assistant": "model", "user": "user"}
         contents: list = []
         # 拼接对话
@@ -164,23 +175,21 @@ class LLMProvider(LLMProviderBase):
                     "parts": [{"text": str(m.get("content", ""))}],
                 }
             )
+        return contents
 
-        stream: GenerateContentResponse = self.model.generate_content(
-            contents=contents,
-            generation_config=self.gen_cfg,
-            tools=tools,
-            stream=True,
-            timeout=self.timeout,
-        )
-
-        try:
-            for chunk in stream:
-                cand = chunk.candidates[0]
-                for part in cand.content.parts:
-                    # a) 函数调用-通常是最后一段话才是函数调用
-                    if getattr(part, "function_call", None):
-                        fc = part.function_call
-                        yield None, [
+    @staticmethod
+    def _parse_chunk(chunk, tools):
+        """解析一个流式chunk，返回 (输出列表, 是否为函数调用)，函数调用之后的内容不再输出"""
+        outputs = []
+        cand = chunk.candidates[0]
+        for part in cand.content.parts:
+            # a) 函数调用-通常是最后一段话才是函数调用
+            if getattr(part, "function_call", None):
+                fc = part.function_call
+                outputs.append(
+                    (
+                        None,
+                        [
                             SimpleNamespace(
                                 id=uuid.uuid4().hex,
                                 type="function",
@@ -191,16 +200,55 @@ class LLMProvider(LLMProviderBase):
                                     ),
                                 ),
                             )
-                        ]
-                        return
-                    # b) 普通文本
-                    if getattr(part, "text", None):
-                        yield part.text if tools is None else (part.text, None)
+                        ],
+                    )
+                )
+                return outputs, True
+            # b) 普通文本
+            if getattr(part, "text", None):
+                outputs.append(part.text if tools is None else (part.text, None))
+        return outputs, False
+
+    def _generate(self, dialogue, tools):
+        stream: GenerateContentResponse = self.model.generate_content(
+            contents=self._build_contents(dialogue),
+            generation_config=self.gen_cfg,
+            tools=tools,
+            stream=True,
+            request_options={"timeout": self.timeout},
+        )
+
+        try:
+            for chunk in stream:
+                outputs, is_function_call = self._parse_chunk(chunk, tools)
+                yield from outputs
+                if is_function_call:
+                    return
 
         finally:
             if tools is not None:
                 yield None, None  # function‑mode 结束，返回哑包
 
+    async def _agenerate(self, dialogue, tools):
+        stream = await self.model.generate_content_async(
+            contents=self._build_contents(dialogue),
+            generation_config=self.gen_cfg,
+            tools=tools,
+            stream=True,
+            request_options={"timeout": self.timeout},
+        )
+
+        # 任务被取消时，正在等待的流式请求随之取消，上游连接立即关闭
+        async for chunk in stream:
+            outputs, is_function_call = self._parse_chunk(chunk, tools)
+            for output in outputs:
+                yield output
+            if is_function_call:
+                break
+
+        if tools is not None:
+            yield None, None  # function‑mode 结束，返回哑包
+
     # 关闭stream，预留后续打断对话功能的功能方法，官方文档推荐打断对话要关闭上一个流，可以有效减少配额计费和资源占用
     @staticmethod
     def _safe_finish_stream(stream: GenerateContentResponse):
@@ -0,0 +1,53 @@
+import time
+import asyncio
+from config.logger import setup_logging
+from core.providers.llm.base import LLMProviderBase
+
+TAG = __name__
+logger = setup_logging()
+
+
+class LLMProvider(LLMProviderBase):
+    """
+    本地模拟LLM，不访问网络，用于压测服务端自身的处理能力
+
+    首字延迟 first_token_ms 后，每隔 token_interval_ms 输出 chunk_chars 个字符的固定回复
+    """
+
+    def __init__(self, config):
+        self.reply = str(
+            config.get("response")
+            or "好的，我来回答你的问题。今天是晴天，气温二十度左右，很适合出门散步。还有什么想聊的吗？"
+        )
+        self.first_token_ms = float(config.get("first_token_ms", 300))
+        self.token_interval_ms = float(config.get("token_interval_ms", 30))
+        self.chunk_chars = max(1, int(config.get("chunk_chars", 2)))
+
+    def _chunks(self):
+        for start in range(0, len(self.reply), self.chunk_chars):
+            yield self.reply[start : start + self.chunk_chars]
+
+    def response(self, session_id, dialogue, **kwargs):
+        time.sleep(self.first_token_ms / 1000)
+        for index, chunk in enumerate(self._chunks()):
+            if index:
+                time.sleep(self.token_interval_ms / 1000)
+            yield chunk
+
+    def response_with_functions(self, session_id, dialogue, functions=None, **kwargs):
+        for chunk in self.response(session_id, dialogue):
+            yield chunk, None
+
+    async def aresponse(self, session_id, dialogue, **kwargs):
+        """原生异步实现，不占用线程，取消时立即停止"""
+        await asyncio.sleep(self.first_token_ms / 1000)
+        for index, chunk in enumerate(self._chunks()):
+            if index:
+                await asyncio.sleep(self.token_interval_ms / 1000)
+            yield chunk
+
+    async def aresponse_with_functions(
+        self, session_id, dialogue, functions=None, **kwargs
+    ):
+        async for chunk in self.aresponse(session_id, dialogue):
+            yield chunk, None
@@ -46,6 +46,9 @@ class LLMProvider(LLMProviderBase):
         if model_key_msg:
             logger.bind(tag=TAG).error(model_key_msg)
         self.client = openai.OpenAI(api_key=self.api_key, base_url=self.base_url, timeout=httpx.Timeout(self.timeout))
+        self.async_client = openai.AsyncOpenAI(
+            api_key=self.api_key, base_url=self.base_url, timeout=httpx.Timeout(self.timeout)
+        )
 
     @staticmethod
     def normalize_dialogue(dialogue):
@@ -55,88 +58,136 @@ class LLMProvider(LLMProviderBase):
                 msg["content"] = ""
         return dialogue
 
-    def response(self, session_id, dialogue, **kwargs):
-        try:
-            dialogue = self.normalize_dialogue(dialogue)
+    def _build_request_params(self, dialogue, functions=None, **kwargs):
+        request_params = {
+            "model": self.model_name,
+            "messages": self.normalize_dialogue(dialogue),
+            "stream": True,
+        }
+        if functions is not None:
+            request_params["tools"] = functions
+
+        # 添加可选参数,只有当参数不为None时才添加
+        optional_params = {
+            "max_tokens": kwargs.get("max_tokens", self.max_tokens),
+            "temperature": kwargs.get("temperature", self.temperature),
+            "top_p": kwargs.get("top_p", self.top_p),
+            "frequency_penalty": kwargs.get("frequency_penalty", self.frequency_penalty),
+        }
 
-            request_params = {
-                "model": self.model_name,
-                "messages": dialogue,
-                "stream": True,
-            }
+        for key, value in optional_params.items():
+            if value is not None:
+                request_params[key] = value
+        return request_params
 
-            # 添加可选参数,只有当参数不为None时才添加
-            optional_params = {
-                "max_tokens": kwargs.get("max_tokens", self.max_tokens),
-                "temperature": kwargs.get("temperature", self.temperature),
-                "top_p": kwargs.get("top_p", self.top_p),
-                "frequency_penalty": kwargs.get("frequency_penalty", self.frequency_penalty),
-            }
+    @staticmethod
+    def _filter_think(chunk, is_active):
+        """提取chunk中的文本并过滤<think>标签，返回 (文本, 是否处于输出状态)"""
+        try:
+            delta = chunk.choices[0].delta if getattr(chunk, "choices", None) else None
+            content = getattr(delta, "content", "") if delta else ""
+        except IndexError:
+            content = ""
+        if not content:
+            return "", is_active
+        if "<think>" in content:
+            is_active = False
+            content = content.split("<think>")[0]
+        if "</think>" in content:
+            is_active = True
+            content = content.split("</think>")[-1]
+        return (content if is_active else ""), is_active
 
-            for key, value in optional_params.items():
-                if value is not None:
-                    request_params[key] = value
+    @staticmethod
+    def _parse_function_chunk(chunk):
+        """解析函数调用模式的chunk，返回 (文本, 工具调用)，用量统计chunk返回None"""
+        if getattr(chunk, "choices", None):
+            delta = chunk.choices[0].delta
+            return getattr(delta, "content", ""), getattr(delta, "tool_calls", None)
+        if isinstance(getattr(chunk, "usage", None), CompletionUsage):
+            usage_info = getattr(chunk, "usage", None)
+            logger.bind(tag=TAG).info(
+                f"Token 消耗：输入 {getattr(usage_info, 'prompt_tokens', '未知')}，"
+                f"输出 {getattr(usage_info, 'completion_tokens', '未知')}，"
+                f"共计 {getattr(usage_info, 'total_tokens', '未知')}"
+            )
+        return None
 
-            responses = self.client.chat.completions.create(**request_params)
+    def response(self, session_id, dialogue, **kwargs):
+        responses = None
+        try:
+            responses = self.client.chat.completions.create(
+                **self._build_request_params(dialogue, **kwargs)
+            )
 
             is_active = True
             for chunk in responses:
-                try:
-                    delta = chunk.choices[0].delta if getattr(chunk, "choices", None) else None
-                    content = getattr(delta, "content", "") if delta else ""
-                except IndexError:
-                    content = ""
+                content, is_active = self._filter_think(chunk, is_active)
                 if content:
-                    if "<think>" in content:
-                        is_active = False
-                        content = content.split("<think>")[0]
-                    if "</think>" in content:
-                        is_active = True
-                        content = content.split("</think>")[-1]
-                    if is_active:
-                        yield content
+                    yield content
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"Error in response generation: {e}")
+        finally:
+            if responses is not None:
+                responses.close()
 
     def response_with_functions(self, session_id, dialogue, functions=None, **kwargs):
+        stream = None
         try:
-            dialogue = self.normalize_dialogue(dialogue)
+            stream = self.client.chat.completions.create(
+                **self._build_request_params(dialogue, functions, **kwargs)
+            )
 
-            request_params = {
-                "model": self.model_name,
-                "messages": dialogue,
-                "stream": True,
-                "tools": functions,
-            }
+            for chunk in stream:
+                parsed = self._parse_function_chunk(chunk)
+                if parsed is not None:
+                    yield parsed
 
-            optional_params = {
-                "max_tokens": kwargs.get("max_tokens", self.max_tokens),
-                "temperature": kwargs.get("temperature", self.temperature),
-                "top_p": kwargs.get("top_p", self.top_p),
-                "frequency_penalty": kwargs.get("frequency_penalty", self.frequency_penalty),
-            }
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error in function call streaming: {e}")
+            yield f"【OpenAI服务响应异常: {e}】", None
+        finally:
+            if stream is not None:
+                stream.close()
 
-            for key, value in optional_params.items():
-                if value is not None:
-                    request_params[key] = value
+    async def aresponse(self, session_id, dialogue, **kwargs):
+        stream = None
+        try:
+            stream = await self.async_client.chat.completions.create(
+                **self._build_request_params(dialogue, **kwargs)
+            )
 
-            stream = self.client.chat.completions.create(**request_params)
+            is_active = True
+            async for chunk in stream:
+                content, is_active = self._filter_think(chunk, is_active)
+                if content:
+                    yield content
 
-            for chunk in stream:
-                if getattr(chunk, "choices", None):
-                    delta = chunk.choices[0].delta
-                    content = getattr(delta, "content", "")
-                    tool_calls = getattr(delta, "tool_calls", None)
-                    yield content, tool_calls
-                elif isinstance(getattr(chunk, "usage", None), CompletionUsage):
-                    usage_info = getattr(chunk, "usage", None)
-                    logger.bind(tag=TAG).info(
-                        f"Token 消耗：输入 {getattr(usage_info, 'prompt_tokens', '未知')}，"
-                        f"输出 {getattr(usage_info, 'completion_tokens', '未知')}，"
-                        f"共计 {getattr(usage_info, 'total_tokens', '未知')}"
-                    )
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error in response generation: {e}")
+        finally:
+            # 任务被取消时立即关闭上游连接，停止生成
+            if stream is not None:
+                await stream.close()
+
+    async def aresponse_with_functions(
+        self, session_id, dialogue, functions=None, **kwargs
+    ):
+        stream = None
+        try:
+            stream = await self.async_client.chat.completions.create(
+                **self._build_request_params(dialogue, functions, **kwargs)
+            )
+
+            async for chunk in stream:
+                parsed = self._parse_function_chunk(chunk)
+                if parsed is not None:
+                    yield parsed
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"Error in function call streaming: {e}")
             yield f"【OpenAI服务响应异常: {e}】", None
+        finally:
+            if stream is not None:
+                await stream.close()
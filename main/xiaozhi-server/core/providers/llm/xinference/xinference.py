@@ -1,5 +1,5 @@
 from config.logger import setup_logging
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 import json
 from core.providers.llm.base import LLMProviderBase
 
@@ -25,12 +25,53 @@ class LLMProvider(LLMProviderBase):
                 base_url=self.base_url,
                 api_key="xinference",  # Xinference has a similar setup to Ollama where it doesn't need an actual key
             )
+            self.async_client = AsyncOpenAI(
+                base_url=self.base_url, api_key="xinference"
+            )
             logger.bind(tag=TAG).info("Xinference client initialized successfully")
         except Exception as e:
             logger.bind(tag=TAG).error(f"Error initializing Xinference client: {e}")
             raise
 
+    @staticmethod
+    def _filter_think(chunk, is_active):
+        """提取chunk中的文本并过滤<think>标签，返回 (文本, 是否处于输出状态)"""
+        delta = chunk.choices[0].delta if getattr(chunk, "choices", None) else None
+        content = delta.content if hasattr(delta, "content") else ""
+        if not content:
+            return "", is_active
+        if "<think>" in content:
+            is_active = False
+            content = content.split("<think>")[0]
+        if "</think>" in content:
+            is_active = True
+            content = content.split("</think>")[-1]
+        return (content if is_active else ""), is_active
+
+    @staticmethod
+    def _parse_function_chunk(chunk):
+        """解析函数调用模式的chunk，返回 (文本, 工具调用)，没有内容时返回None"""
+        delta = chunk.choices[0].delta
+        content = delta.content
+        tool_calls = delta.tool_calls
+
+        if content:
+            return content, tool_calls
+        elif tool_calls:
+            return None, tool_calls
+        return None
+
+    def _log_function_request(self, dialogue, functions):
+        logger.bind(tag=TAG).debug(
+            f"Sending function call request to Xinference with model: {self.model_name}, dialogue length: {len(dialogue)}"
+        )
+        if functions:
+            logger.bind(tag=TAG).debug(
+                f"Function calls enabled with: {[f.get('function', {}).get('name') for f in functions]}"
+            )
+
     def response(self, session_id, dialogue, **kwargs):
+        responses = None
         try:
             logger.bind(tag=TAG).debug(
                 f"Sending request to Xinference with model: {self.model_name}, dialogue length: {len(dialogue)}"
@@ -41,37 +82,23 @@ class LLMProvider(LLMProviderBase):
             is_active = True
             for chunk in responses:
                 try:
-                    delta = (
-                        chunk.choices[0].delta
-                        if getattr(chunk, "choices", None)
-                        else None
-                    )
-                    content = delta.content if hasattr(delta, "content") else ""
+                    content, is_active = self._filter_think(chunk, is_active)
                     if content:
-                        if "<think>" in content:
-                            is_active = False
-                            content = content.split("<think>")[0]
-                        if "</think>" in content:
-                            is_active = True
-                            content = content.split("</think>")[-1]
-                        if is_active:
-                            yield content
+                        yield content
                 except Exception as e:
                     logger.bind(tag=TAG).error(f"Error processing chunk: {e}")
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"Error in Xinference response generation: {e}")
             yield "【Xinference服务响应异常】"
+        finally:
+            if responses is not None:
+                responses.close()
 
     def response_with_functions(self, session_id, dialogue, functions=None):
+        stream = None
         try:
-            logger.bind(tag=TAG).debug(
-                f"Sending function call request to Xinference with model: {self.model_name}, dialogue length: {len(dialogue)}"
-            )
-            if functions:
-                logger.bind(tag=TAG).debug(
-                    f"Function calls enabled with: {[f.get('function', {}).get('name') for f in functions]}"
-                )
+            self._log_function_request(dialogue, functions)
 
             stream = self.client.chat.completions.create(
                 model=self.model_name,
@@ -81,14 +108,64 @@ class LLMProvider(LLMProviderBase):
             )
 
             for chunk in stream:
-                delta = chunk.choices[0].delta
-                content = delta.content
-                tool_calls = delta.tool_calls
+                parsed = self._parse_function_chunk(chunk)
+                if parsed is not None:
+                    yield parsed
+
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error in Xinference function call: {e}")
+            yield {
+                "type": "content",
+                "content": f"【Xinference服务响应异常: {str(e)}】",
+            }
+        finally:
+            if stream is not None:
+                stream.close()
+
+    async def aresponse(self, session_id, dialogue, **kwargs):
+        stream = None
+        try:
+            logger.bind(tag=TAG).debug(
+                f"Sending request to Xinference with model: {self.model_name}, dialogue length: {len(dialogue)}"
+            )
+            stream = await self.async_client.chat.completions.create(
+                model=self.model_name, messages=dialogue, stream=True
+            )
+            is_active = True
+            async for chunk in stream:
+                try:
+                    content, is_active = self._filter_think(chunk, is_active)
+                    if content:
+                        yield content
+                except Exception as e:
+                    logger.bind(tag=TAG).error(f"Error processing chunk: {e}")
+
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error in Xinference response generation: {e}")
+            yield "【Xinference服务响应异常】"
+        finally:
+            # 任务被取消时立即关闭上游连接，停止生成
+            if stream is not None:
+                await stream.close()
+
+    async def aresponse_with_functions(
+        self, session_id, dialogue, functions=None, **kwargs
+    ):
+        stream = None
+        try:
+            self._log_function_request(dialogue, functions)
+
+            stream = await self.async_client.chat.completions.create(
+                model=self.model_name,
+                messages=dialogue,
+                stream=True,
+                tools=functions,
+            )
 
-                if content:
-                    yield content, tool_calls
-                elif tool_calls:
-                    yield None, tool_calls
+            async for chunk in stream:
+                parsed = self._parse_function_chunk(chunk)
+                if parsed is not None:
+                    yield parsed
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"Error in Xinference function call: {e}")
@@ -96,3 +173,6 @@ class LLMProvider(LLMProviderBase):
                 "type": "content",
                 "content": f"【Xinference服务响应异常: {str(e)}】",
             }
+        finally:
+            if stream is not None:
+                await stream.close()
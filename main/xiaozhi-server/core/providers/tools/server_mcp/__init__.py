@@ -1,7 +1,16 @@
 """服务端MCP工具模块"""
 
-from .mcp_manager import ServerMCPManager
+from .mcp_manager import ServerMCPManager, get_mcp_manager
 from .mcp_executor import ServerMCPExecutor
 from .mcp_client import ServerMCPClient
+from .mcp_pool import ServerMCPPool, get_mcp_pool, shutdown_mcp_pool
 
-__all__ = ["ServerMCPManager", "ServerMCPExecutor", "ServerMCPClient"]
+__all__ = [
+    "ServerMCPManager",
+    "ServerMCPExecutor",
+    "ServerMCPClient",
+    "ServerMCPPool",
+    "get_mcp_manager",
+    "get_mcp_pool",
+    "shutdown_mcp_pool",
+]
@@ -11,7 +11,7 @@ from contextlib import AsyncExitStack
 from typing import Optional, List, Dict, Any
 
 from mcp import ClientSession, StdioServerParameters, Implementation
-from mcp.client.session import SamplingFnT, ListRootsFnT, LoggingFnT, MessageHandlerFnT
+from mcp.client.session import SamplingFnT, ElicitationFnT, ListRootsFnT, LoggingFnT, MessageHandlerFnT
 from mcp.client.stdio import stdio_client
 from mcp.client.sse import sse_client
 from mcp.client.streamable_http import streamablehttp_client
@@ -46,6 +46,7 @@ class ServerMCPClient:
 
     async def initialize(self, read_timeout_seconds: timedelta | None = None,
              sampling_callback: SamplingFnT | None = None,
+             elicitation_callback: ElicitationFnT | None = None,
              list_roots_callback: ListRootsFnT | None = None,
              logging_callback: LoggingFnT | None = None,
              message_handler: MessageHandlerFnT | None = None,
@@ -140,6 +141,24 @@ class ServerMCPClient:
         fut: concurrent.futures.Future = asyncio.run_coroutine_threadsafe(coro, loop)
         return await asyncio.wrap_future(fut)
 
+    async def ping(self):
+        """发送ping请求检查MCP服务是否仍可用
+
+        Raises:
+            RuntimeError: 客户端未初始化时抛出
+        """
+        if not self.session:
+            raise RuntimeError("服务端MCP客户端未初始化")
+
+        loop = self._worker_task.get_loop()
+        coro = self.session.send_ping()
+
+        if loop is asyncio.get_running_loop():
+            return await coro
+
+        fut: concurrent.futures.Future = asyncio.run_coroutine_threadsafe(coro, loop)
+        return await asyncio.wrap_future(fut)
+
     def is_connected(self) -> bool:
         """检查MCP客户端是否连接正常
 
@@ -163,6 +182,7 @@ class ServerMCPClient:
 
     async def _worker(self, read_timeout_seconds: timedelta | None = None,
              sampling_callback: SamplingFnT | None = None,
+             elicitation_callback: ElicitationFnT | None = None,
              list_roots_callback: ListRootsFnT | None = None,
              logging_callback: LoggingFnT | None = None,
              message_handler: MessageHandlerFnT | None = None,
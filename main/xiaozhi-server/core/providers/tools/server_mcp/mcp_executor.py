@@ -13,6 +13,8 @@ class ServerMCPExecutor(ToolExecutor):
         self.conn = conn
         self.mcp_manager: Optional[ServerMCPManager] = None
         self._initialized = False
+        # 上次读取工具列表时MCP服务池的版本号
+        self._tools_version = None
 
     async def initialize(self):
         """初始化MCP管理器"""
@@ -58,6 +60,7 @@ class ServerMCPExecutor(ToolExecutor):
             return {}
 
         tools = {}
+        self._tools_version = self.mcp_manager.pool.version
         mcp_tools = self.mcp_manager.get_all_tools()
 
         for tool in mcp_tools:
@@ -71,6 +74,12 @@ class ServerMCPExecutor(ToolExecutor):
 
         return tools
 
+    def tools_changed(self) -> bool:
+        """MCP服务在设备连接后才连上或重启后，服务池的工具列表会变化，需要刷新工具缓存"""
+        if not self._initialized or not self.mcp_manager:
+            return False
+        return self.mcp_manager.pool.version != self._tools_version
+
     def has_tool(self, tool_name: str) -> bool:
         """检查是否有指定的服务端MCP工具"""
         if not self._initialized or not self.mcp_manager:
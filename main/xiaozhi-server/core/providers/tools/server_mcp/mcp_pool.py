@@ -0,0 +1,437 @@
+"""
+服务端MCP服务池
+
+data/.mcp_server_settings.json 中的每个MCP服务在进程内只保持一个长连接会话，由所有设备连接共享，
+不再为每个设备连接启动一遍stdio子进程或新建SSE/HTTP会话：
+- 服务启动时并发连接各MCP服务，设备连接直接使用已连接服务的工具列表
+- MCP会话按JSON-RPC请求ID区分响应，同一会话上可以同时进行多个工具调用
+- 每个MCP服务单独的并发上限和调用超时，超出并发的调用排队等待
+- 定时ping做健康检查，连接断开时自动重启，重启失败按指数退避重试
+"""
+
+import os
+import json
+import time
+import asyncio
+import threading
+from typing import Dict, Any, List, Optional
+
+from mcp.shared.exceptions import McpError
+from mcp.types import LoggingMessageNotificationParams
+
+from config.config_loader import get_project_dir
+from config.logger import setup_logging
+from .mcp_client import ServerMCPClient
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_INIT_TIMEOUT = 5
+DEFAULT_CALL_TIMEOUT = 60
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_HEALTH_CHECK_INTERVAL = 30
+DEFAULT_PING_TIMEOUT = 5
+DEFAULT_RESTART_BACKOFF_MAX = 60
+DEFAULT_CALL_RETRIES = 1
+
+
+class MCPServerUnavailableError(Exception):
+    """MCP服务未连接、正在重启或并发已满"""
+
+
+async def _logging_callback(params: LoggingMessageNotificationParams):
+    logger.bind(tag=TAG).info(f"[Server Log - {params.level.upper()}] {params.data}")
+
+
+class PooledMCPServer:
+    """服务池中的单个MCP服务，负责连接、健康检查和重启"""
+
+    def __init__(self, name, config, pool):
+        self.name = name
+        self.config = config
+        self.pool = pool
+        self.max_concurrency = max(
+            1, int(config.get("max_concurrency") or pool.max_concurrency)
+        )
+        self.call_timeout = float(config.get("call_timeout") or pool.call_timeout)
+        self.client: Optional[ServerMCPClient] = None
+        # 最后一次连接成功时的工具列表，服务重启期间保留，调用时返回服务不可用
+        self.tools: List[Dict[str, Any]] = []
+        self.generation = 0
+        self.failures = 0
+        self.restarts = 0
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.in_flight = 0
+        self.last_error = None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._restart_lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def is_connected(self) -> bool:
+        return self.client is not None and self.client.is_connected()
+
+    async def _close_client(self):
+        client, self.client = self.client, None
+        if client is None:
+            return
+        try:
+            await asyncio.wait_for(client.cleanup(), timeout=20)
+        except (asyncio.TimeoutError, Exception) as e:
+            logger.bind(tag=TAG).error(f"关闭MCP服务 {self.name} 时出错: {e}")
+
+    async def connect(self) -> bool:
+        """连接MCP服务，失败时记录错误并返回False"""
+        client = ServerMCPClient(self.config)
+        try:
+            # 添加超时机制，防止单个MCP服务连接卡死导致整个服务无法启动
+            await asyncio.wait_for(
+                client.initialize(logging_callback=_logging_callback),
+                timeout=self.pool.init_timeout,
+            )
+            if not client.is_connected():
+                raise MCPServerUnavailableError("连接建立后立即断开")
+        except asyncio.TimeoutError:
+            self.last_error = "连接超时"
+            logger.bind(tag=TAG).error(
+                f"Timeout initializing MCP server {self.name}. Verify the service is running at {self.config.get('url') or self.config.get('command')}"
+            )
+        except Exception as e:
+            self.last_error = str(e)
+            logger.bind(tag=TAG).error(f"Failed to initialize MCP server {self.name}: {e}")
+        else:
+            self.client = client
+            self.tools = client.get_available_tools()
+            self.generation += 1
+            self.failures = 0
+            self.last_error = None
+            return True
+
+        self.failures += 1
+        try:
+            await asyncio.wait_for(client.cleanup(), timeout=5)
+        except (asyncio.TimeoutError, Exception):
+            pass
+        return False
+
+    async def restart(self, generation) -> bool:
+        """
+        重启MCP服务，同一时刻只有一个重启在进行
+
+        Args:
+            generation: 调用方发现故障时的连接代数，已被其他调用方重启过时直接返回
+        """
+        async with self._restart_lock:
+            if self.generation != generation and self.is_connected():
+                return True
+            logger.bind(tag=TAG).warning(f"重启MCP服务: {self.name}")
+            await self._close_client()
+            if not await self.connect():
+                return False
+            self.restarts += 1
+            logger.bind(tag=TAG).info(f"MCP服务已重新连接: {self.name}")
+        self.pool.rebuild_tools()
+        return True
+
+    async def _healthy(self) -> bool:
+        try:
+            await asyncio.wait_for(self.client.ping(), timeout=self.pool.ping_timeout)
+            return True
+        except Exception as e:
+            self.last_error = f"健康检查失败: {str(e) or type(e).__name__}"
+            logger.bind(tag=TAG).warning(f"MCP服务 {self.name} {self.last_error}")
+            return False
+
+    def _next_delay(self) -> Optional[float]:
+        if not self.is_connected():
+            backoff = min(2 ** min(self.failures, 16), self.pool.restart_backoff_max)
+            return float(max(1, backoff))
+        if self.pool.health_check_interval > 0:
+            return self.pool.health_check_interval
+        return None
+
+    def request_check(self):
+        """调用出错时立即检查一次服务状态"""
+        self._wake.set()
+
+    async def supervise(self):
+        """后台健康检查，断开的服务按指数退避重启"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._next_delay())
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            generation = self.generation
+            if self.is_connected() and await self._healthy():
+                continue
+            await self.restart(generation)
+
+    def start_supervisor(self):
+        if self._task is None:
+            self._task = asyncio.create_task(
+                self.supervise(), name=f"MCPPoolSupervisor-{self.name}"
+            )
+
+    async def call_tool(self, tool_name, arguments, progress_callback=None):
+        """
+        在共享会话上调用工具
+
+        Raises:
+            MCPServerUnavailableError: 服务未连接或排队等待并发名额超时
+            asyncio.TimeoutError: 工具执行超过调用超时
+        """
+        start_time = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.call_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise MCPServerUnavailableError(f"MCP服务 {self.name} 并发已满，等待超时")
+
+        self.in_flight += 1
+        try:
+            for attempt in range(self.pool.call_retries + 1):
+                if not self.is_connected():
+                    self.request_check()
+                    raise MCPServerUnavailableError(
+                        f"MCP服务 {self.name} 未连接: {self.last_error or '正在重启'}"
+                    )
+                client = self.client
+                generation = self.generation
+                remaining = self.call_timeout - (time.monotonic() - start_time)
+                self.calls += 1
+                try:
+                    return await asyncio.wait_for(
+                        client.call_tool(
+                            tool_name, arguments, progress_callback=progress_callback
+                        ),
+                        max(0.1, remaining),
+                    )
+                except McpError:
+                    # 服务端返回的错误响应，连接本身正常
+                    self.errors += 1
+                    raise
+                except asyncio.TimeoutError:
+                    # 工具执行慢不一定是服务故障，交给健康检查判断，调用不重试
+                    self.timeouts += 1
+                    self.request_check()
+                    raise
+                except Exception as e:
+                    self.errors += 1
+                    if attempt >= self.pool.call_retries:
+                        raise
+                    logger.bind(tag=TAG).warning(
+                        f"执行工具 {tool_name} 失败 (尝试 {attempt+1}/{self.pool.call_retries + 1}): {str(e) or type(e).__name__}"
+                    )
+                    await self.restart(generation)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        await self._close_client()
+        logger.bind(tag=TAG).info(f"服务端MCP客户端已关闭: {self.name}")
+
+    def get_stats(self) -> dict:
+        return {
+            "connected": self.is_connected(),
+            "tools": len(self.tools),
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts,
+            "failures": self.failures,
+        }
+
+
+class ServerMCPPool:
+    """进程内共享的MCP服务池"""
+
+    def __init__(
+        self,
+        init_timeout=DEFAULT_INIT_TIMEOUT,
+        call_timeout=DEFAULT_CALL_TIMEOUT,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+        health_check_interval=DEFAULT_HEALTH_CHECK_INTERVAL,
+        ping_timeout=DEFAULT_PING_TIMEOUT,
+        restart_backoff_max=DEFAULT_RESTART_BACKOFF_MAX,
+        call_retries=DEFAULT_CALL_RETRIES,
+    ):
+        """
+        Args:
+            init_timeout: 单个MCP服务的连接超时（秒）
+            call_timeout: 默认的工具调用超时（秒），含排队等待
+            max_concurrency: 默认的单个MCP服务最大并发调用数
+            health_check_interval: 健康检查间隔（秒），0表示只在调用出错时检查
+            ping_timeout: 健康检查ping超时（秒）
+            restart_backoff_max: 重启失败后的最长重试间隔（秒）
+            call_retries: 连接异常时重启服务后重试调用的次数
+        """
+        self.init_timeout = float(init_timeout)
+        self.call_timeout = float(call_timeout)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.health_check_interval = float(health_check_interval)
+        self.ping_timeout = float(ping_timeout)
+        self.restart_backoff_max = float(restart_backoff_max)
+        self.call_retries = max(0, int(call_retries))
+        self.config_path = get_project_dir() + "data/.mcp_server_settings.json"
+        self.servers: Dict[str, PooledMCPServer] = {}
+        self.tools: List[Dict[str, Any]] = []
+        self._tool_servers: Dict[str, PooledMCPServer] = {}
+        # 工具列表变化时加一，设备连接的ServerMCPExecutor据此判断是否需要刷新工具缓存
+        self.version = 0
+        self._started = False
+        self._start_lock: Optional[asyncio.Lock] = None
+
+    def load_config(self) -> Dict[str, Any]:
+        """加载MCP服务配置"""
+        if not os.path.exists(self.config_path):
+            logger.bind(tag=TAG).warning(
+                "请检查mcp服务配置文件：data/.mcp_server_settings.json"
+            )
+            return {}
+
+        try:
+            with open(self.config_path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+            return config.get("mcpServers", {})
+        except Exception as e:
+            logger.bind(tag=TAG).error(
+                f"Error loading MCP config from {self.config_path}: {e}"
+            )
+            return {}
+
+    async def start(self):
+        """并发连接所有MCP服务并启动健康检查，只执行一次"""
+        if self._started:
+            return
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._started:
+                return
+            for name, srv_config in self.load_config().items():
+                if not srv_config.get("command") and not srv_config.get("url"):
+                    logger.bind(tag=TAG).warning(
+                        f"Skipping server {name}: neither command nor url specified"
+                    )
+                    continue
+                logger.bind(tag=TAG).info(f"初始化服务端MCP客户端: {name}")
+                self.servers[name] = PooledMCPServer(name, srv_config, self)
+
+            await asyncio.gather(*(server.connect() for server in self.servers.values()))
+            for server in self.servers.values():
+                server.start_supervisor()
+            self.rebuild_tools()
+            self._started = True
+
+            connected = [n for n, s in self.servers.items() if s.is_connected()]
+            if self.servers:
+                logger.bind(tag=TAG).info(
+                    f"MCP服务池已启动，已连接 {len(connected)}/{len(self.servers)}: {connected}"
+                )
+
+    def rebuild_tools(self):
+        """按配置顺序合并各服务的工具，同名工具以先配置的服务为准"""
+        tools = []
+        tool_servers = {}
+        for server in self.servers.values():
+            for tool in server.tools:
+                tool_name = tool["function"]["name"]
+                if tool_name in tool_servers:
+                    continue
+                tool_servers[tool_name] = server
+                tools.append(tool)
+        self.tools = tools
+        self._tool_servers = tool_servers
+        self.version += 1
+
+    def get_all_tools(self) -> List[Dict[str, Any]]:
+        """获取所有服务的工具function定义"""
+        return self.tools
+
+    def is_mcp_tool(self, tool_name: str) -> bool:
+        """检查是否是MCP工具"""
+        return tool_name in self._tool_servers
+
+    async def execute_tool(
+        self, tool_name: str, arguments: Dict[str, Any], progress_callback=None
+    ) -> Any:
+        """
+        执行工具调用
+
+        Raises:
+            ValueError: 工具不属于任何MCP服务
+        """
+        server = self._tool_servers.get(tool_name)
+        if server is None:
+            raise ValueError(f"工具 {tool_name} 在任意MCP服务中未找到")
+        return await server.call_tool(tool_name, arguments, progress_callback)
+
+    def get_stats(self) -> dict:
+        """获取各MCP服务的连接状态和调用计数"""
+        return {name: server.get_stats() for name, server in self.servers.items()}
+
+    async def close(self):
+        """关闭所有MCP服务"""
+        await asyncio.gather(
+            *(server.close() for server in self.servers.values()),
+            return_exceptions=True,
+        )
+        self.servers.clear()
+        self.rebuild_tools()
+
+
+_mcp_pool = None
+_mcp_pool_lock = threading.Lock()
+
+
+def get_mcp_pool(config=None) -> ServerMCPPool:
+    """
+    获取全局MCP服务池（单例模式）
+
+    Args:
+        config: mcp_pool配置，仅在第一次创建时生效
+
+    Returns:
+        ServerMCPPool实例，需要在事件循环中调用start()后才会连接MCP服务
+    """
+    global _mcp_pool
+    if _mcp_pool is None:
+        with _mcp_pool_lock:
+            if _mcp_pool is None:
+                config = config or {}
+                _mcp_pool = ServerMCPPool(
+                    init_timeout=config.get("init_timeout") or DEFAULT_INIT_TIMEOUT,
+                    call_timeout=config.get("call_timeout") or DEFAULT_CALL_TIMEOUT,
+                    max_concurrency=config.get("max_concurrency")
+                    or DEFAULT_MAX_CONCURRENCY,
+                    health_check_interval=config.get(
+                        "health_check_interval", DEFAULT_HEALTH_CHECK_INTERVAL
+                    ),
+                    ping_timeout=config.get("ping_timeout") or DEFAULT_PING_TIMEOUT,
+                    restart_backoff_max=config.get("restart_backoff_max")
+                    or DEFAULT_RESTART_BACKOFF_MAX,
+                    call_retries=config.get("call_retries", DEFAULT_CALL_RETRIES),
+                )
+    return _mcp_pool
+
+
+async def shutdown_mcp_pool():
+    """关闭全局MCP服务池"""
+    global _mcp_pool
+    with _mcp_pool_lock:
+        pool, _mcp_pool = _mcp_pool, None
+    if pool is not None:
+        await pool.close()
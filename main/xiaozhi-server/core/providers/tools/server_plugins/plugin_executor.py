@@ -3,6 +3,7 @@
 from typing import Dict, Any
 from ..base import ToolType, ToolDefinition, ToolExecutor
 from plugins_func.register import all_function_registry, Action, ActionResponse
+from .plugin_runtime import get_plugin_runtime, PluginTimeoutError
 
 
 class ServerPluginExecutor(ToolExecutor):
@@ -27,19 +28,25 @@ class ServerPluginExecutor(ToolExecutor):
             if hasattr(func_item, "type"):
                 func_type = func_item.type
                 if func_type.code in [4, 5]:  # SYSTEM_CTL, IOT_CTL (需要conn参数)
-                    result = func_item.func(conn, **arguments)
+                    args = (conn,)
                 elif func_type.code == 2:  # WAIT
-                    result = func_item.func(**arguments)
+                    args = ()
                 elif func_type.code == 3:  # CHANGE_SYS_PROMPT
-                    result = func_item.func(conn, **arguments)
+                    args = (conn,)
                 else:
-                    result = func_item.func(**arguments)
+                    args = ()
             else:
                 # 默认不传conn参数
-                result = func_item.func(**arguments)
+                args = ()
 
-            return result
+            # 同步插件在工作线程池中执行，不阻塞事件循环
+            return await get_plugin_runtime().run(func_item, *args, **arguments)
 
+        except PluginTimeoutError as e:
+            return ActionResponse(
+                action=Action.ERROR,
+                response=f"{e}，请稍后再试",
+            )
         except Exception as e:
             return ActionResponse(
                 action=Action.ERROR,
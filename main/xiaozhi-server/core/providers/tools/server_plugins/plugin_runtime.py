@@ -0,0 +1,247 @@
+"""
+服务端插件执行层
+
+天气、新闻、Home Assistant、RAGFlow等插件内部使用同步的requests发起HTTP请求，
+直接在事件循环中调用时，一个响应慢的网站会让所有设备的音频收发一起卡住。这里：
+- 同步插件放到有界的工作线程池中执行，不阻塞事件循环
+- async def 定义的插件直接在事件循环中执行，超时后取消
+- 每个插件单独的超时时间和并发上限
+- 每个插件的执行耗时直方图
+"""
+
+import time
+import asyncio
+import functools
+import threading
+import concurrent.futures
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_MAX_WORKERS = 32
+DEFAULT_TIMEOUT = 30
+DEFAULT_MAX_CONCURRENCY = 8
+# 耗时直方图的分桶上限（毫秒），最后一个桶为+Inf
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class PluginTimeoutError(Exception):
+    """插件执行超时"""
+
+
+class PluginLatencyHistogram:
+    """单个插件的执行耗时直方图"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        self.errors = 0
+        self.timeouts = 0
+
+    def observe(self, elapsed_ms, status="ok"):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if elapsed_ms <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if status == "error":
+            self.errors += 1
+        elif status == "timeout":
+            self.timeouts += 1
+
+    def percentile(self, percent):
+        """按分桶估算百分位耗时，返回所在分桶的上限"""
+        if not self.count:
+            return 0.0
+        target = self.count * percent / 100
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return self.buckets[i] if i < len(self.buckets) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self):
+        labels = [f"<={bound}ms" for bound in self.buckets] + ["+Inf"]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "avg_ms": self.sum_ms / self.count if self.count else 0.0,
+            "max_ms": self.max_ms,
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class PluginRuntime:
+    """插件执行层"""
+
+    def __init__(
+        self,
+        max_workers=DEFAULT_MAX_WORKERS,
+        timeout=DEFAULT_TIMEOUT,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+        limits=None,
+    ):
+        """
+        Args:
+            max_workers: 同步插件工作线程数
+            timeout: 默认执行超时（秒）
+            max_concurrency: 默认的单插件最大并发数
+            limits: 按插件覆盖的配置，如 {"get_weather": {"timeout": 10, "max_concurrency": 4}}
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.timeout = float(timeout)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.limits = limits or {}
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="plugin-worker"
+        )
+        self._semaphores = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def _get_option(self, func_item, key, default):
+        override = self.limits.get(func_item.name) or {}
+        value = override.get(key)
+        if value is None:
+            value = getattr(func_item, key, None)
+        return value if value is not None else default
+
+    def _get_semaphore(self, func_item):
+        semaphore = self._semaphores.get(func_item.name)
+        if semaphore is None:
+            limit = int(
+                self._get_option(func_item, "max_concurrency", self.max_concurrency)
+            )
+            semaphore = self._semaphores.setdefault(
+                func_item.name, asyncio.Semaphore(max(1, limit))
+            )
+        return semaphore
+
+    def _observe(self, name, start_time, status):
+        elapsed_ms = (time.monotonic() - start_time) * 1000
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = PluginLatencyHistogram()
+            histogram.observe(elapsed_ms, status)
+        if status == "timeout":
+            logger.bind(tag=TAG).warning(f"插件 {name} 执行超时，耗时{elapsed_ms:.0f}ms")
+
+    async def run(self, func_item, *args, **kwargs):
+        """
+        执行插件函数
+
+        Raises:
+            PluginTimeoutError: 排队等待并发名额或执行超过超时时间
+        """
+        timeout = float(self._get_option(func_item, "timeout", self.timeout))
+        semaphore = self._get_semaphore(func_item)
+        start_time = time.monotonic()
+        status = "ok"
+        try:
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout)
+            except asyncio.TimeoutError:
+                raise PluginTimeoutError(f"插件 {func_item.name} 并发已满，等待超时")
+            remaining = max(0.0, timeout - (time.monotonic() - start_time))
+
+            if getattr(func_item, "is_async", False):
+                try:
+                    return await asyncio.wait_for(
+                        func_item.func(*args, **kwargs), remaining
+                    )
+                except asyncio.TimeoutError:
+                    raise PluginTimeoutError(f"插件 {func_item.name} 执行超时")
+                finally:
+                    semaphore.release()
+
+            if not getattr(func_item, "blocking", True):
+                try:
+                    return func_item.func(*args, **kwargs)
+                finally:
+                    semaphore.release()
+
+            loop = asyncio.get_running_loop()
+            try:
+                future = loop.run_in_executor(
+                    self._executor, functools.partial(func_item.func, *args, **kwargs)
+                )
+            except BaseException:
+                semaphore.release()
+                raise
+            # 线程无法被强制终止，超时后直到线程真正结束才归还并发名额，
+            # 避免卡住的插件不断占用新的工作线程
+            future.add_done_callback(lambda _: semaphore.release())
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), remaining)
+            except asyncio.TimeoutError:
+                raise PluginTimeoutError(f"插件 {func_item.name} 执行超时")
+        except PluginTimeoutError:
+            status = "timeout"
+            raise
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self._observe(func_item.name, start_time, status)
+
+    def get_stats(self) -> dict:
+        """获取各插件的耗时直方图"""
+        with self._lock:
+            return {
+                name: histogram.to_dict() for name, histogram in self._histograms.items()
+            }
+
+    def shutdown(self):
+        """关闭工作线程池，不等待仍在执行的插件"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_plugin_runtime = None
+_plugin_runtime_lock = threading.Lock()
+
+
+def get_plugin_runtime(config=None) -> PluginRuntime:
+    """
+    获取全局插件执行层（单例模式）
+
+    Args:
+        config: plugin_runtime配置，仅在第一次创建时生效
+
+    Returns:
+        PluginRuntime实例
+    """
+    global _plugin_runtime
+    if _plugin_runtime is None:
+        with _plugin_runtime_lock:
+            if _plugin_runtime is None:
+                config = config or {}
+                _plugin_runtime = PluginRuntime(
+                    max_workers=config.get("max_workers") or DEFAULT_MAX_WORKERS,
+                    timeout=config.get("timeout") or DEFAULT_TIMEOUT,
+                    max_concurrency=config.get("max_concurrency")
+                    or DEFAULT_MAX_CONCURRENCY,
+                    limits=config.get("limits") or {},
+                )
+    return _plugin_runtime
+
+
+def shutdown_plugin_runtime():
+    """关闭全局插件执行层"""
+    global _plugin_runtime
+    with _plugin_runtime_lock:
+        if _plugin_runtime is not None:
+            _plugin_runtime.shutdown()
+            _plugin_runtime = None
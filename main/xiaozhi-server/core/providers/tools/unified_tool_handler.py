@@ -116,8 +116,15 @@ class UnifiedToolHandler:
         except Exception as e:
             self.logger.error(f"初始化Home Assistant失败: {e}")
 
+    def _refresh_if_server_mcp_changed(self):
+        """服务端MCP工具列表变化后刷新工具缓存"""
+        if self.server_mcp_executor.tools_changed():
+            self.tool_manager.refresh_tools()
+            self.logger.info("服务端MCP工具列表已变化，刷新函数描述列表")
+
     def get_functions(self) -> List[Dict[str, Any]]:
         """获取所有工具的函数描述"""
+        self._refresh_if_server_mcp_changed()
         return self.tool_manager.get_function_descriptions()
 
     def current_support_functions(self) -> List[str]:
@@ -133,6 +140,7 @@ class UnifiedToolHandler:
 
     def has_tool(self, tool_name: str) -> bool:
         """检查是否有指定工具"""
+        self._refresh_if_server_mcp_changed()
         return self.tool_manager.has_tool(tool_name)
 
     async def handle_llm_function_call(
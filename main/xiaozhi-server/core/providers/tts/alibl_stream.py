@@ -119,6 +119,7 @@ class TTSProvider(TTSProviderBase):
                             self.conn.sentence_id = uuid.uuid4().hex
                             logger.bind(tag=TAG).info(f"自动生成新的 会话ID: {self.conn.sentence_id}")
 
+                        self.markdown_cleaner.reset()
                         logger.bind(tag=TAG).info("开始启动TTS会话...")
                         future = asyncio.run_coroutine_threadsafe(
                             self.start_session(self.conn.sentence_id),
@@ -132,13 +133,13 @@ class TTSProvider(TTSProviderBase):
                         continue
 
                 elif ContentType.TEXT == message.content_type:
-                    if message.content_detail:
+                    # 按token增量清理Markdown和表情，未闭合的标记留到后续文本
+                    text = self.markdown_cleaner.feed(message.content_detail)
+                    if text:
                         try:
-                            logger.bind(tag=TAG).debug(
-                                f"开始发送TTS文本: {message.content_detail}"
-                            )
+                            logger.bind(tag=TAG).debug(f"开始发送TTS文本: {text}")
                             future = asyncio.run_coroutine_threadsafe(
-                                self.text_to_speak(message.content_detail, None),
+                                self.text_to_speak(text, None),
                                 loop=self.conn.loop,
                             )
                             future.result()
@@ -157,6 +158,13 @@ class TTSProvider(TTSProviderBase):
 
                 if message.sentence_type == SentenceType.LAST:
                     try:
+                        # 发送清理后剩余的文本
+                        text = self.markdown_cleaner.flush()
+                        if text:
+                            asyncio.run_coroutine_threadsafe(
+                                self.text_to_speak(text, None),
+                                loop=self.conn.loop,
+                            ).result()
                         logger.bind(tag=TAG).info("开始结束TTS会话...")
                         future = asyncio.run_coroutine_threadsafe(
                             self.finish_session(self.conn.sentence_id),
@@ -182,9 +190,6 @@ class TTSProvider(TTSProviderBase):
                 logger.bind(tag=TAG).warning("WebSocket连接不存在，终止发送文本")
                 return
 
-            # 过滤Markdown
-            filtered_text = MarkdownCleaner.clean_markdown(text)
-
             # 发送continue-task消息
             continue_task_message = {
                 "header": {
@@ -192,12 +197,12 @@ class TTSProvider(TTSProviderBase):
                     "task_id": self.conn.sentence_id,
                     "streaming": "duplex",
                 },
-                "payload": {"input": {"text": filtered_text}},
+                "payload": {"input": {"text": text}},
             }
 
             await self.ws.send(json.dumps(continue_task_message))
             self.last_active_time = time.time()
-            logger.bind(tag=TAG).debug(f"已发送文本: {filtered_text}")
+            logger.bind(tag=TAG).debug(f"已发送文本: {text}")
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
@@ -227,6 +227,7 @@ class TTSProvider(TTSProviderBase):
                 if message.sentence_type == SentenceType.FIRST:
                     # 初始化参数
                     try:
+                        self.markdown_cleaner.reset()
                         logger.bind(tag=TAG).debug("开始启动TTS会话...")
                         future = asyncio.run_coroutine_threadsafe(
                             self.start_session(self.task_id),
@@ -241,13 +242,13 @@ class TTSProvider(TTSProviderBase):
                         continue
 
                 elif ContentType.TEXT == message.content_type:
-                    if message.content_detail:
+                    # 按token增量清理Markdown和表情，未闭合的标记留到后续文本
+                    text = self.markdown_cleaner.feed(message.content_detail)
+                    if text:
                         try:
-                            logger.bind(tag=TAG).debug(
-                                f"开始发送TTS文本: {message.content_detail}"
-                            )
+                            logger.bind(tag=TAG).debug(f"开始发送TTS文本: {text}")
                             future = asyncio.run_coroutine_threadsafe(
-                                self.text_to_speak(message.content_detail, None),
+                                self.text_to_speak(text, None),
                                 loop=self.conn.loop,
                             )
                             future.result()
@@ -265,6 +266,13 @@ class TTSProvider(TTSProviderBase):
                         self._process_audio_file_stream(message.content_file, callback=lambda audio_data: self.handle_audio_file(audio_data, message.content_detail))
                 if message.sentence_type == SentenceType.LAST:
                     try:
+                        # 发送清理后剩余的文本
+                        text = self.markdown_cleaner.flush()
+                        if text:
+                            asyncio.run_coroutine_threadsafe(
+                                self.text_to_speak(text, None),
+                                loop=self.conn.loop,
+                            ).result()
                         logger.bind(tag=TAG).debug("开始结束TTS会话...")
                         future = asyncio.run_coroutine_threadsafe(
                             self.finish_session(self.task_id),
@@ -287,7 +295,6 @@ class TTSProvider(TTSProviderBase):
             if self.ws is None:
                 logger.bind(tag=TAG).warning(f"WebSocket连接不存在，终止发送文本")
                 return
-            filtered_text = MarkdownCleaner.clean_markdown(text)
             run_request = {
                 "header": {
                     "message_id": uuid.uuid4().hex,
@@ -296,7 +303,7 @@ class TTSProvider(TTSProviderBase):
                     "name": "RunSynthesis",
                     "appkey": self.appkey,
                 },
-                "payload": {"text": filtered_text},
+                "payload": {"text": text},
             }
             await self.ws.send(json.dumps(run_request))
             self.last_active_time = time.time()
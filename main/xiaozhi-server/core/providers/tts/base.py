@@ -1,5 +1,6 @@
 import os
 import re
+import json
 import time
 import uuid
 import queue
@@ -8,15 +9,19 @@ import threading
 import traceback
 from core.utils import p3
 from datetime import datetime
-from core.utils import textUtils
 from typing import Callable, Any
 from abc import ABC, abstractmethod
 from config.logger import setup_logging
-from core.utils.tts import MarkdownCleaner
+from core.utils.tts import MarkdownCleaner, StreamingMarkdownCleaner
 from core.utils.output_counter import add_device_output
 from core.handle.reportHandle import enqueue_tts_report
 from core.handle.sendAudioHandle import sendAudioMessage
 from core.utils.util import audio_bytes_to_data_stream, audio_to_data_stream
+from core.utils.async_pipeline import LoopAwareQueue, get_shared_executor
+from core.utils.tts_cache import get_tts_cache
+from core.utils.http_client import run_coroutine, close_thread_loop
+from core.utils.tts_pipeline import create_synth_pipeline
+from core.utils.sentence_segmenter import StreamingSegmenter
 from core.providers.tts.dto.dto import (
     TTSMessageDTO,
     SentenceType,
@@ -34,40 +39,26 @@ class TTSProviderBase(ABC):
         self.conn = None
         self.delete_audio_file = delete_audio_file
         self.audio_file_type = "wav"
+        # 影响合成结果的配置，作为TTS缓存键的一部分
+        self.tts_cache_params = json.dumps(
+            {k: v for k, v in config.items() if k != "output_dir"},
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
         self.output_file = config.get("output_dir", "tmp/")
-        self.tts_text_queue = queue.Queue()
-        self.tts_audio_queue = queue.Queue()
+        self.tts_text_queue = LoopAwareQueue()
+        self.tts_audio_queue = LoopAwareQueue()
         self.tts_audio_first_sentence = True
         self.before_stop_play_files = []
 
-        self.tts_text_buff = []
-        self.punctuations = (
-            "。",
-            "？",
-            "?",
-            "！",
-            "!",
-            "；",
-            ";",
-            "：",
-        )
-        self.first_sentence_punctuations = (
-            "，",
-            "~",
-            "、",
-            ",",
-            "。",
-            "？",
-            "?",
-            "！",
-            "!",
-            "；",
-            ";",
-            "：",
-        )
+        # 大模型流式输出的文本先按token增量清理Markdown和表情，再增量断句，
+        # 切出的每一段交给 _on_segment 合成
+        self.markdown_cleaner = StreamingMarkdownCleaner()
+        self.segmenter = StreamingSegmenter(self._on_segment)
         self.tts_stop_request = False
-        self.processed_chars = 0
-        self.is_first_sentence = True
+        # 流水线合成，打开音频通道时按tts_pipeline配置创建，None表示逐句合成
+        self.synth_pipeline = None
 
     def generate_filename(self, extension=".wav"):
         return os.path.join(
@@ -82,16 +73,82 @@ class TTSProviderBase(ABC):
     def handle_audio_file(self, file_audio: bytes, text):
         self.before_stop_play_files.append((file_audio, text))
 
-    def to_tts_stream(self, text, opus_handler: Callable[[bytes], None] = None) -> None:
-        text = MarkdownCleaner.clean_markdown(text)
+    def to_tts_stream(
+        self,
+        text,
+        opus_handler: Callable[[bytes], None] = None,
+        audio_queue=None,
+        cleaned=False,
+    ) -> None:
+        """
+        合成一句话，句子开始标记写入audio_queue（默认为音频队列），音频帧交给opus_handler
+
+        Args:
+            cleaned: 文本已经过 StreamingMarkdownCleaner 清理时为True，不再重复清理
+        """
+        if audio_queue is None:
+            audio_queue = self.tts_audio_queue
+        if not cleaned:
+            text = MarkdownCleaner.clean_markdown(text)
+        cache = get_tts_cache()
+        cache_key = None
+        if cache is not None:
+            audio_format = (
+                "pcm"
+                if not self.delete_audio_file
+                and self.conn is not None
+                and self.conn.audio_format == "pcm"
+                else "opus"
+            )
+            cache_key = cache.make_key(
+                type(self).__module__,
+                getattr(self, "voice", ""),
+                self.tts_cache_params,
+                text,
+                audio_format,
+            )
+            cached = cache.get(cache_key)
+            if cached is not None:
+                # 命中缓存，跳过TTS接口调用和音频编码
+                frames, synth_ms = cached
+                logger.bind(tag=TAG).debug(
+                    f"TTS缓存命中: {text}，节省合成耗时: {synth_ms:.0f}ms"
+                )
+                audio_queue.put((SentenceType.FIRST, None, text))
+                for frame in frames:
+                    opus_handler(frame)
+                return None
+
+        if cache_key is None:
+            self._to_tts_stream(text, opus_handler, audio_queue)
+            return None
+
+        # 未命中缓存，合成的同时收集音频帧
+        frames = []
+
+        def collect_handler(data):
+            frames.append(data)
+            opus_handler(data)
+
+        start_time = time.monotonic()
+        if self._to_tts_stream(text, collect_handler, audio_queue):
+            cache.put(cache_key, frames, (time.monotonic() - start_time) * 1000)
+        return None
+
+    def _to_tts_stream(
+        self, text, opus_handler: Callable[[bytes], None] = None, audio_queue=None
+    ) -> bool:
+        """合成语音并以流的方式输出音频帧，返回是否合成成功"""
+        if audio_queue is None:
+            audio_queue = self.tts_audio_queue
         max_repeat_time = 5
         if self.delete_audio_file:
             # 需要删除文件的直接转为音频数据
             while max_repeat_time > 0:
                 try:
-                    audio_bytes = asyncio.run(self.text_to_speak(text, None))
+                    audio_bytes = run_coroutine(self.text_to_speak(text, None))
                     if audio_bytes:
-                        self.tts_audio_queue.put((SentenceType.FIRST, None, text))
+                        audio_queue.put((SentenceType.FIRST, None, text))
                         audio_bytes_to_data_stream(
                             audio_bytes,
                             file_type=self.audio_file_type,
@@ -114,13 +171,13 @@ class TTSProviderBase(ABC):
                 logger.bind(tag=TAG).error(
                     f"语音生成失败: {text}，请检查网络或服务是否正常"
                 )
-            return None
+            return max_repeat_time > 0
         else:
             tmp_file = self.generate_filename()
             try:
                 while not os.path.exists(tmp_file) and max_repeat_time > 0:
                     try:
-                        asyncio.run(self.text_to_speak(text, tmp_file))
+                        run_coroutine(self.text_to_speak(text, tmp_file))
                     except Exception as e:
                         logger.bind(tag=TAG).warning(
                             f"语音生成失败{5 - max_repeat_time + 1}次: {text}，错误: {e}"
@@ -138,11 +195,12 @@ class TTSProviderBase(ABC):
                     logger.bind(tag=TAG).error(
                         f"语音生成失败: {text}，请检查网络或服务是否正常"
                     )
-                    self.tts_audio_queue.put((SentenceType.FIRST, None, text))
+                    audio_queue.put((SentenceType.FIRST, None, text))
                 self._process_audio_file_stream(tmp_file, callback=opus_handler)
+                return max_repeat_time > 0
             except Exception as e:
                 logger.bind(tag=TAG).error(f"Failed to generate TTS file: {e}")
-                return None
+                return False
     
     def to_tts(self, text):
         text = MarkdownCleaner.clean_markdown(text)
@@ -151,7 +209,7 @@ class TTSProviderBase(ABC):
             # 需要删除文件的直接转为音频数据
             while max_repeat_time > 0:
                 try:
-                    audio_bytes = asyncio.run(self.text_to_speak(text, None))
+                    audio_bytes = run_coroutine(self.text_to_speak(text, None))
                     if audio_bytes:
                         audio_datas = []
                         audio_bytes_to_data_stream(
@@ -182,7 +240,7 @@ class TTSProviderBase(ABC):
             try:
                 while not os.path.exists(tmp_file) and max_repeat_time > 0:
                     try:
-                        asyncio.run(self.text_to_speak(text, tmp_file))
+                        run_coroutine(self.text_to_speak(text, tmp_file))
                     except Exception as e:
                         logger.bind(tag=TAG).warning(
                             f"语音生成失败{5 - max_repeat_time + 1}次: {text}，错误: {e}"
@@ -252,9 +310,19 @@ class TTSProviderBase(ABC):
 
     async def open_audio_channels(self, conn):
         self.conn = conn
+        self.segmenter.configure(conn.config.get("tts_segmenter"))
+        if (
+            type(self).tts_text_priority_thread
+            is TTSProviderBase.tts_text_priority_thread
+        ):
+            # 非流式TTS按配置开启流水线合成，流式TTS自行实现了文本处理循环
+            self.synth_pipeline = create_synth_pipeline(conn.config, self.tts_audio_queue)
+        if getattr(conn, "async_pipeline", False):
+            self._open_async_audio_channels(conn)
+            return
         # tts 消化线程
         self.tts_priority_thread = threading.Thread(
-            target=self.tts_text_priority_thread, daemon=True
+            target=self._run_tts_text_thread, daemon=True
         )
         self.tts_priority_thread.start()
 
@@ -264,50 +332,127 @@ class TTSProviderBase(ABC):
         )
         self.audio_play_priority_thread.start()
 
+    def _open_async_audio_channels(self, conn):
+        """异步流水线模式：文本处理和音频播放以事件循环任务运行"""
+        self.tts_text_queue.bind_loop(conn.loop)
+        self.tts_audio_queue.bind_loop(conn.loop)
+        if (
+            type(self).tts_text_priority_thread
+            is TTSProviderBase.tts_text_priority_thread
+        ):
+            self.tts_priority_task = asyncio.create_task(
+                self._tts_text_priority_task()
+            )
+        else:
+            # 流式TTS自行实现了文本处理循环，仍使用独立线程
+            self.tts_priority_thread = threading.Thread(
+                target=self._run_tts_text_thread, daemon=True
+            )
+            self.tts_priority_thread.start()
+        self.audio_play_priority_task = asyncio.create_task(
+            self._audio_play_priority_task()
+        )
+
+    def _run_tts_text_thread(self):
+        """TTS文本处理线程入口，线程退出时关闭 run_coroutine 使用的事件循环"""
+        try:
+            self.tts_text_priority_thread()
+        finally:
+            close_thread_loop()
+
     # 这里默认是非流式的处理方式
     # 流式处理方式请在子类中重写
     def tts_text_priority_thread(self):
         while not self.conn.stop_event.is_set():
             try:
                 message = self.tts_text_queue.get(timeout=1)
-                if message.sentence_type == SentenceType.FIRST:
-                    self.conn.client_abort = False
-                if self.conn.client_abort:
-                    logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
-                    continue
-                if message.sentence_type == SentenceType.FIRST:
-                    # 初始化参数
-                    self.tts_stop_request = False
-                    self.processed_chars = 0
-                    self.tts_text_buff = []
-                    self.is_first_sentence = True
-                    self.tts_audio_first_sentence = True
-                elif ContentType.TEXT == message.content_type:
-                    self.tts_text_buff.append(message.content_detail)
-                    segment_text = self._get_segment_text()
-                    if segment_text:
-                        self.to_tts_stream(segment_text, opus_handler=self.handle_opus)
-                elif ContentType.FILE == message.content_type:
-                    self._process_remaining_text_stream(opus_handler=self.handle_opus)
-                    tts_file = message.content_file
-                    if tts_file and os.path.exists(tts_file):
-                        self._process_audio_file_stream(
-                            tts_file, callback=self.handle_opus
-                        )
-                if message.sentence_type == SentenceType.LAST:
-                    self._process_remaining_text_stream(opus_handler=self.handle_opus)
-                    self.tts_audio_queue.put(
-                        (message.sentence_type, [], message.content_detail)
-                    )
+                self._handle_tts_text_message(message)
+            except queue.Empty:
+                continue
+            except Exception as e:
+                logger.bind(tag=TAG).error(
+                    f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
+                )
+                continue
 
+    async def _tts_text_priority_task(self):
+        """TTS文本处理任务（异步流水线模式），阻塞的合成调用交给共享线程池"""
+        loop = asyncio.get_running_loop()
+        executor = get_shared_executor()
+        while not self.conn.stop_event.is_set():
+            try:
+                message = await self.tts_text_queue.async_get(timeout=1)
+                await loop.run_in_executor(
+                    executor, self._handle_tts_text_message, message
+                )
             except queue.Empty:
                 continue
+            except asyncio.CancelledError:
+                break
             except Exception as e:
                 logger.bind(tag=TAG).error(
                     f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
                 )
                 continue
 
+    def _handle_tts_text_message(self, message):
+        """处理一条TTS文本消息（非流式）"""
+        if message.sentence_type == SentenceType.FIRST:
+            self.conn.client_abort = False
+        if self.conn.client_abort:
+            logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
+            return
+        if message.sentence_type == SentenceType.FIRST:
+            # 初始化参数
+            self.tts_stop_request = False
+            self.markdown_cleaner.reset()
+            self.segmenter.reset()
+            self.tts_audio_first_sentence = True
+        elif ContentType.TEXT == message.content_type:
+            self.segmenter.feed(self.markdown_cleaner.feed(message.content_detail))
+        elif ContentType.FILE == message.content_type:
+            self._process_remaining_text_stream(opus_handler=self.handle_opus)
+            self._drain_synthesis()
+            tts_file = message.content_file
+            if tts_file and os.path.exists(tts_file):
+                self._process_audio_file_stream(tts_file, callback=self.handle_opus)
+        if message.sentence_type == SentenceType.LAST:
+            self._process_remaining_text_stream(opus_handler=self.handle_opus)
+            self._drain_synthesis()
+            self.tts_audio_queue.put(
+                (message.sentence_type, [], message.content_detail)
+            )
+
+    def _on_segment(self, text):
+        """断句器切出一段文本，流式TTS在子类中重写"""
+        self._speak_segment(text, opus_handler=self.handle_opus)
+
+    def _speak_segment(self, text, opus_handler: Callable[[bytes], None]):
+        """合成一段文本：开启流水线合成时提交后立即返回，否则在当前线程合成完成后返回"""
+        if self.synth_pipeline is None:
+            self.to_tts_stream(text, opus_handler=opus_handler, cleaned=True)
+            return
+        self.synth_pipeline.submit(self._synthesize_to_slot, text)
+
+    def _synthesize_to_slot(self, text, slot):
+        """流水线合成：句子开始标记和音频帧都写入该句的缓存，按句子顺序进入音频队列"""
+        self.to_tts_stream(
+            text,
+            opus_handler=lambda data: slot.put((SentenceType.MIDDLE, data, None)),
+            audio_queue=slot,
+            cleaned=True,
+        )
+
+    def _drain_synthesis(self):
+        """等待流水线中的句子都写入音频队列，之后写入的内容才能保持顺序"""
+        if self.synth_pipeline is not None:
+            self.synth_pipeline.drain()
+
+    def cancel_synthesis(self):
+        """打断时取消流水线中未完成的合成"""
+        if self.synth_pipeline is not None:
+            self.synth_pipeline.cancel()
+
     def _audio_play_priority_thread(self):
         # 需要上报的文本和音频列表
         enqueue_text = None
@@ -329,17 +474,9 @@ class TTSProviderBase(ABC):
                     enqueue_text, enqueue_audio = None, []
                     continue
 
-                # 收到下一个文本开始或会话结束时进行上报
-                if sentence_type is not SentenceType.MIDDLE:
-                    # 上报TTS数据
-                    if enqueue_text is not None and enqueue_audio is not None:
-                        enqueue_tts_report(self.conn, enqueue_text, enqueue_audio)
-                    enqueue_audio = []
-                    enqueue_text = text
-
-                # 收集上报音频数据
-                if isinstance(audio_datas, bytes) and enqueue_audio is not None:
-                    enqueue_audio.append(audio_datas)
+                enqueue_text, enqueue_audio = self._collect_tts_report(
+                    sentence_type, audio_datas, text, enqueue_text, enqueue_audio
+                )
 
                 # 发送音频
                 future = asyncio.run_coroutine_threadsafe(
@@ -355,6 +492,54 @@ class TTSProviderBase(ABC):
             except Exception as e:
                 logger.bind(tag=TAG).error(f"audio_play_priority_thread: {text} {e}")
 
+    async def _audio_play_priority_task(self):
+        """音频播放任务（异步流水线模式），直接在事件循环中发送"""
+        enqueue_text = None
+        enqueue_audio = None
+        while not self.conn.stop_event.is_set():
+            text = None
+            try:
+                try:
+                    sentence_type, audio_datas, text = (
+                        await self.tts_audio_queue.async_get(timeout=1)
+                    )
+                except queue.Empty:
+                    continue
+
+                if self.conn.client_abort:
+                    logger.bind(tag=TAG).debug("收到打断信号，跳过当前音频数据")
+                    enqueue_text, enqueue_audio = None, []
+                    continue
+
+                enqueue_text, enqueue_audio = self._collect_tts_report(
+                    sentence_type, audio_datas, text, enqueue_text, enqueue_audio
+                )
+
+                await sendAudioMessage(self.conn, sentence_type, audio_datas, text)
+
+                if self.conn.max_output_size > 0 and text:
+                    add_device_output(self.conn.headers.get("device-id"), len(text))
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"audio_play_priority_task: {text} {e}")
+
+    def _collect_tts_report(
+        self, sentence_type, audio_datas, text, enqueue_text, enqueue_audio
+    ):
+        """收集需要上报的TTS文本与音频，遇到新句子或会话结束时上报上一句"""
+        if sentence_type is not SentenceType.MIDDLE:
+            # 上报TTS数据
+            if enqueue_text is not None and enqueue_audio is not None:
+                enqueue_tts_report(self.conn, enqueue_text, enqueue_audio)
+            enqueue_audio = []
+            enqueue_text = text
+
+        # 收集上报音频数据
+        if isinstance(audio_datas, bytes) and enqueue_audio is not None:
+            enqueue_audio.append(audio_datas)
+        return enqueue_text, enqueue_audio
+
     async def start_session(self, session_id):
         pass
 
@@ -363,48 +548,10 @@ class TTSProviderBase(ABC):
 
     async def close(self):
         """资源清理方法"""
+        self.cancel_synthesis()
         if hasattr(self, "ws") and self.ws:
             await self.ws.close()
 
-    def _get_segment_text(self):
-        # 合并当前全部文本并处理未分割部分
-        full_text = "".join(self.tts_text_buff)
-        current_text = full_text[self.processed_chars :]  # 从未处理的位置开始
-        last_punct_pos = -1
-
-        # 根据是否是第一句话选择不同的标点符号集合
-        punctuations_to_use = (
-            self.first_sentence_punctuations
-            if self.is_first_sentence
-            else self.punctuations
-        )
-
-        for punct in punctuations_to_use:
-            pos = current_text.rfind(punct)
-            if (pos != -1 and last_punct_pos == -1) or (
-                pos != -1 and pos < last_punct_pos
-            ):
-                last_punct_pos = pos
-
-        if last_punct_pos != -1:
-            segment_text_raw = current_text[: last_punct_pos + 1]
-            segment_text = textUtils.get_string_no_punctuation_or_emoji(
-                segment_text_raw
-            )
-            self.processed_chars += len(segment_text_raw)  # 更新已处理字符位置
-
-            # 如果是第一句话，在找到第一个逗号后，将标志设置为False
-            if self.is_first_sentence:
-                self.is_first_sentence = False
-
-            return segment_text
-        elif self.tts_stop_request and current_text:
-            segment_text = current_text
-            self.is_first_sentence = True  # 重置标志
-            return segment_text
-        else:
-            return None
-
     def _process_audio_file_stream(
         self, tts_file, callback: Callable[[Any], Any]
     ) -> None:
@@ -443,12 +590,9 @@ class TTSProviderBase(ABC):
         Returns:
             bool: 是否成功处理了文本
         """
-        full_text = "".join(self.tts_text_buff)
-        remaining_text = full_text[self.processed_chars :]
-        if remaining_text:
-            segment_text = textUtils.get_string_no_punctuation_or_emoji(remaining_text)
-            if segment_text:
-                self.to_tts_stream(segment_text, opus_handler=opus_handler)
-                self.processed_chars += len(full_text)
-                return True
+        self.segmenter.feed(self.markdown_cleaner.flush())
+        segment_text = self.segmenter.flush()
+        if segment_text:
+            self._speak_segment(segment_text, opus_handler=opus_handler)
+            return True
         return False
@@ -1,8 +1,8 @@
 import uuid
 import json
 import base64
-import requests
 from core.utils.util import check_model_key
+from core.utils.http_client import get_http_clients
 from core.providers.tts.base import TTSProviderBase
 from config.logger import setup_logging
 
@@ -67,8 +67,9 @@ class TTSProvider(TTSProviderBase):
         }
 
         try:
-            resp = requests.post(
-                self.api_url, json.dumps(request_json), headers=self.header
+            # 复用全局连接池，避免每句话重新握手
+            resp = get_http_clients().get_client().post(
+                self.api_url, content=json.dumps(request_json), headers=self.header
             )
             if "data" in resp.json():
                 data = resp.json()["data"]
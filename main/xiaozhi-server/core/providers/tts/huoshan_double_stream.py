@@ -6,7 +6,6 @@ import asyncio
 import traceback
 from typing import Callable, Any
 import websockets
-from core.utils.tts import MarkdownCleaner
 from config.logger import setup_logging
 from core.utils import opus_encoder_utils
 from core.utils.util import check_model_key
@@ -240,6 +239,7 @@ class TTSProvider(TTSProviderBase):
                             self.conn.sentence_id = uuid.uuid4().hex
                             logger.bind(tag=TAG).debug(f"自动生成新的 会话ID: {self.conn.sentence_id}")
 
+                        self.markdown_cleaner.reset()
                         logger.bind(tag=TAG).debug("开始启动TTS会话...")
                         future = asyncio.run_coroutine_threadsafe(
                             self.start_session(self.conn.sentence_id),
@@ -253,13 +253,13 @@ class TTSProvider(TTSProviderBase):
                         continue
 
                 elif ContentType.TEXT == message.content_type:
-                    if message.content_detail:
+                    # 按token增量清理Markdown和表情，未闭合的标记留到后续文本
+                    text = self.markdown_cleaner.feed(message.content_detail)
+                    if text:
                         try:
-                            logger.bind(tag=TAG).debug(
-                                f"开始发送TTS文本: {message.content_detail}"
-                            )
+                            logger.bind(tag=TAG).debug(f"开始发送TTS文本: {text}")
                             future = asyncio.run_coroutine_threadsafe(
-                                self.text_to_speak(message.content_detail, None),
+                                self.text_to_speak(text, None),
                                 loop=self.conn.loop,
                             )
                             future.result()
@@ -277,6 +277,13 @@ class TTSProvider(TTSProviderBase):
                         self._process_audio_file_stream(message.content_file, callback=lambda audio_data: self.handle_audio_file(audio_data, message.content_detail))
                 if message.sentence_type == SentenceType.LAST:
                     try:
+                        # 发送清理后剩余的文本
+                        text = self.markdown_cleaner.flush()
+                        if text:
+                            asyncio.run_coroutine_threadsafe(
+                                self.text_to_speak(text, None),
+                                loop=self.conn.loop,
+                            ).result()
                         logger.bind(tag=TAG).debug("开始结束TTS会话...")
                         future = asyncio.run_coroutine_threadsafe(
                             self.finish_session(self.conn.sentence_id),
@@ -303,11 +310,8 @@ class TTSProvider(TTSProviderBase):
                 logger.bind(tag=TAG).warning(f"WebSocket连接不存在，终止发送文本")
                 return
 
-            #  过滤Markdown
-            filtered_text = MarkdownCleaner.clean_markdown(text)
-
             # 发送文本
-            await self.send_text(self.voice, filtered_text, self.conn.sentence_id)
+            await self.send_text(self.voice, text, self.conn.sentence_id)
             return
         except Exception as e:
             logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
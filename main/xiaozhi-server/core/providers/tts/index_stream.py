@@ -1,14 +1,13 @@
 import os
 import time
 import queue
-import aiohttp
-import asyncio
 import requests
 import traceback
 from config.logger import setup_logging
 from core.utils.tts import MarkdownCleaner
 from core.providers.tts.base import TTSProviderBase
-from core.utils import opus_encoder_utils, textUtils
+from core.utils.http_client import get_http_clients, run_coroutine
+from core.utils import opus_encoder_utils
 from core.providers.tts.dto.dto import SentenceType, ContentType, InterfaceType
 
 TAG = __name__
@@ -44,14 +43,13 @@ class TTSProvider(TTSProviderBase):
                 if message.sentence_type == SentenceType.FIRST:
                     # 初始化参数
                     self.tts_stop_request = False
-                    self.processed_chars = 0
-                    self.tts_text_buff = []
+                    self.markdown_cleaner.reset()
+                    self.segmenter.reset()
                     self.before_stop_play_files.clear()
                 elif ContentType.TEXT == message.content_type:
-                    self.tts_text_buff.append(message.content_detail)
-                    segment_text = self._get_segment_text()
-                    if segment_text:
-                        self.to_tts_single_stream(segment_text)
+                    self.segmenter.feed(
+                        self.markdown_cleaner.feed(message.content_detail)
+                    )
 
                 elif ContentType.FILE == message.content_type:
                     logger.bind(tag=TAG).info(
@@ -77,24 +75,22 @@ class TTSProvider(TTSProviderBase):
         Returns:
             bool: 是否成功处理了文本
         """
-        full_text = "".join(self.tts_text_buff)
-        remaining_text = full_text[self.processed_chars :]
-        if remaining_text:
-            segment_text = textUtils.get_string_no_punctuation_or_emoji(remaining_text)
-            if segment_text:
-                self.to_tts_single_stream(segment_text, is_last)
-                self.processed_chars += len(full_text)
-            else:
-                self._process_before_stop_play_files()
+        self.segmenter.feed(self.markdown_cleaner.flush())
+        segment_text = self.segmenter.flush()
+        if segment_text:
+            self.to_tts_single_stream(segment_text, is_last)
         else:
             self._process_before_stop_play_files()
 
+    def _on_segment(self, text):
+        self.to_tts_single_stream(text)
+
     def to_tts_single_stream(self, text, is_last=False):
+        # text为断句器切出的段落，已经过 StreamingMarkdownCleaner 清理
         try:
             max_repeat_time = 5
-            text = MarkdownCleaner.clean_markdown(text)
             try:
-                asyncio.run(self.text_to_speak(text, is_last))
+                run_coroutine(self.text_to_speak(text, is_last))
             except Exception as e:
                 logger.bind(tag=TAG).warning(
                     f"语音生成失败{5 - max_repeat_time + 1}次: {text}，错误: {e}"
@@ -126,49 +122,50 @@ class TTSProvider(TTSProviderBase):
             * 2
         )  # 16-bit = 2 bytes
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.api_url, json=payload, timeout=10) as resp:
+            # 复用全局连接池，避免每句话重新握手
+            session = get_http_clients().get_session()
+            async with session.post(self.api_url, json=payload, timeout=10) as resp:
 
-                    if resp.status != 200:
-                        logger.bind(tag=TAG).error(
-                            f"TTS请求失败: {resp.status}, {await resp.text()}"
-                        )
-                        self.tts_audio_queue.put((SentenceType.LAST, [], None))
-                        return
-
-                    self.pcm_buffer.clear()
-                    self.tts_audio_queue.put((SentenceType.FIRST, [], text))
+                if resp.status != 200:
+                    logger.bind(tag=TAG).error(
+                        f"TTS请求失败: {resp.status}, {await resp.text()}"
+                    )
+                    self.tts_audio_queue.put((SentenceType.LAST, [], None))
+                    return
 
-                    # 处理音频流数据
-                    async for chunk in resp.content.iter_any():
-                        data = chunk[0] if isinstance(chunk, (list, tuple)) else chunk
-                        if not data:
-                            continue
+                self.pcm_buffer.clear()
+                self.tts_audio_queue.put((SentenceType.FIRST, [], text))
 
-                        self.pcm_buffer.extend(data)
+                # 处理音频流数据
+                async for chunk in resp.content.iter_any():
+                    data = chunk[0] if isinstance(chunk, (list, tuple)) else chunk
+                    if not data:
+                        continue
 
-                        while len(self.pcm_buffer) >= frame_bytes:
-                            frame = bytes(self.pcm_buffer[:frame_bytes])
-                            del self.pcm_buffer[:frame_bytes]
+                    self.pcm_buffer.extend(data)
 
-                            self.opus_encoder.encode_pcm_to_opus_stream(
-                                frame,
-                                end_of_stream=False,
-                                callback=self.handle_opus
-                            )
+                    while len(self.pcm_buffer) >= frame_bytes:
+                        frame = bytes(self.pcm_buffer[:frame_bytes])
+                        del self.pcm_buffer[:frame_bytes]
 
-                    # flush 剩余不足一帧的数据
-                    if self.pcm_buffer:
                         self.opus_encoder.encode_pcm_to_opus_stream(
-                            bytes(self.pcm_buffer),
-                            end_of_stream=True,
+                            frame,
+                            end_of_stream=False,
                             callback=self.handle_opus
                         )
-                        self.pcm_buffer.clear()
 
-                    # 如果是最后一段，输出音频获取完毕
-                    if is_last:
-                        self._process_before_stop_play_files()
+                # flush 剩余不足一帧的数据
+                if self.pcm_buffer:
+                    self.opus_encoder.encode_pcm_to_opus_stream(
+                        bytes(self.pcm_buffer),
+                        end_of_stream=True,
+                        callback=self.handle_opus
+                    )
+                    self.pcm_buffer.clear()
+
+                # 如果是最后一段，输出音频获取完毕
+                if is_last:
+                    self._process_before_stop_play_files()
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"TTS请求异常: {e}")
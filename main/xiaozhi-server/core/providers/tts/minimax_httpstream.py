@@ -2,15 +2,14 @@ import os
 import json
 import time
 import queue
-import asyncio
-import aiohttp
 import requests
 import traceback
 from config.logger import setup_logging
 from core.utils.tts import MarkdownCleaner
 from core.utils.util import parse_string_to_list
 from core.providers.tts.base import TTSProviderBase
-from core.utils import opus_encoder_utils, textUtils
+from core.utils.http_client import get_http_clients, run_coroutine
+from core.utils import opus_encoder_utils
 from core.providers.tts.dto.dto import SentenceType, ContentType
 
 TAG = __name__
@@ -79,14 +78,13 @@ class TTSProvider(TTSProviderBase):
                 if message.sentence_type == SentenceType.FIRST:
                     # 初始化参数
                     self.tts_stop_request = False
-                    self.processed_chars = 0
-                    self.tts_text_buff = []
+                    self.markdown_cleaner.reset()
+                    self.segmenter.reset()
                     self.before_stop_play_files.clear()
                 elif ContentType.TEXT == message.content_type:
-                    self.tts_text_buff.append(message.content_detail)
-                    segment_text = self._get_segment_text()
-                    if segment_text:
-                        self.to_tts_single_stream(segment_text)
+                    self.segmenter.feed(
+                        self.markdown_cleaner.feed(message.content_detail)
+                    )
 
                 elif ContentType.FILE == message.content_type:
                     logger.bind(tag=TAG).info(
@@ -111,24 +109,22 @@ class TTSProvider(TTSProviderBase):
         Returns:
             bool: 是否成功处理了文本
         """
-        full_text = "".join(self.tts_text_buff)
-        remaining_text = full_text[self.processed_chars :]
-        if remaining_text:
-            segment_text = textUtils.get_string_no_punctuation_or_emoji(remaining_text)
-            if segment_text:
-                self.to_tts_single_stream(segment_text, is_last)
-                self.processed_chars += len(full_text)
-            else:
-                self._process_before_stop_play_files()
+        self.segmenter.feed(self.markdown_cleaner.flush())
+        segment_text = self.segmenter.flush()
+        if segment_text:
+            self.to_tts_single_stream(segment_text, is_last)
         else:
             self._process_before_stop_play_files()
 
+    def _on_segment(self, text):
+        self.to_tts_single_stream(text)
+
     def to_tts_single_stream(self, text, is_last=False):
+        # text为断句器切出的段落，已经过 StreamingMarkdownCleaner 清理
         try:
             max_repeat_time = 5
-            text = MarkdownCleaner.clean_markdown(text)
             try:
-                asyncio.run(self.text_to_speak(text, is_last))
+                run_coroutine(self.text_to_speak(text, is_last))
             except Exception as e:
                 logger.bind(tag=TAG).warning(
                     f"语音生成失败{5 - max_repeat_time + 1}次: {text}，错误: {e}"
@@ -171,79 +167,80 @@ class TTSProvider(TTSProviderBase):
             * 2
         )  # 16-bit = 2 bytes
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.api_url,
-                    headers=self.header,
-                    data=json.dumps(payload),
-                    timeout=10,
-                ) as resp:
-
-                    if resp.status != 200:
-                        logger.bind(tag=TAG).error(
-                            f"TTS请求失败: {resp.status}, {await resp.text()}"
-                        )
-                        self.tts_audio_queue.put((SentenceType.LAST, [], None))
-                        return
+            # 复用全局连接池，避免每句话重新握手
+            session = get_http_clients().get_session()
+            async with session.post(
+                self.api_url,
+                headers=self.header,
+                data=json.dumps(payload),
+                timeout=10,
+            ) as resp:
+
+                if resp.status != 200:
+                    logger.bind(tag=TAG).error(
+                        f"TTS请求失败: {resp.status}, {await resp.text()}"
+                    )
+                    self.tts_audio_queue.put((SentenceType.LAST, [], None))
+                    return
 
-                    self.pcm_buffer.clear()
-                    self.tts_audio_queue.put((SentenceType.FIRST, [], text))
+                self.pcm_buffer.clear()
+                self.tts_audio_queue.put((SentenceType.FIRST, [], text))
 
-                    # 处理音频流数据
-                    buffer = b""
-                    async for chunk in resp.content.iter_any():
-                        if not chunk:
+                # 处理音频流数据
+                buffer = b""
+                async for chunk in resp.content.iter_any():
+                    if not chunk:
+                        continue
+
+                    buffer += chunk
+                    while True:
+                        # 查找数据块分隔符
+                        header_pos = buffer.find(b"data: ")
+                        if header_pos == -1:
+                            break
+
+                        end_pos = buffer.find(b"\n\n", header_pos)
+                        if end_pos == -1:
+                            break
+
+                        # 提取单个完整JSON块
+                        json_str = buffer[header_pos + 6 : end_pos].decode("utf-8")
+                        buffer = buffer[end_pos + 2 :]
+
+                        try:
+                            data = json.loads(json_str)
+                            status = data.get("data", {}).get("status", 1)
+                            audio_hex = data.get("data", {}).get("audio")
+
+                            # 仅处理status=1的有效音频块 忽略status=2的结束汇总块
+                            if status == 1 and audio_hex:
+                                pcm_data = bytes.fromhex(audio_hex)
+                                self.pcm_buffer.extend(pcm_data)
+
+                        except json.JSONDecodeError as e:
+                            logger.bind(tag=TAG).error(f"JSON解析失败: {e}")
                             continue
 
-                        buffer += chunk
-                        while True:
-                            # 查找数据块分隔符
-                            header_pos = buffer.find(b"data: ")
-                            if header_pos == -1:
-                                break
-
-                            end_pos = buffer.find(b"\n\n", header_pos)
-                            if end_pos == -1:
-                                break
-
-                            # 提取单个完整JSON块
-                            json_str = buffer[header_pos + 6 : end_pos].decode("utf-8")
-                            buffer = buffer[end_pos + 2 :]
-
-                            try:
-                                data = json.loads(json_str)
-                                status = data.get("data", {}).get("status", 1)
-                                audio_hex = data.get("data", {}).get("audio")
-
-                                # 仅处理status=1的有效音频块 忽略status=2的结束汇总块
-                                if status == 1 and audio_hex:
-                                    pcm_data = bytes.fromhex(audio_hex)
-                                    self.pcm_buffer.extend(pcm_data)
-
-                            except json.JSONDecodeError as e:
-                                logger.bind(tag=TAG).error(f"JSON解析失败: {e}")
-                                continue
-
-                        while len(self.pcm_buffer) >= frame_bytes:
-                            frame = bytes(self.pcm_buffer[:frame_bytes])
-                            del self.pcm_buffer[:frame_bytes]
-
-                            self.opus_encoder.encode_pcm_to_opus_stream(
-                                frame, end_of_stream=False, callback=self.handle_opus
-                            )
-
-                    # flush 剩余不足一帧的数据
-                    if self.pcm_buffer:
+                    while len(self.pcm_buffer) >= frame_bytes:
+                        frame = bytes(self.pcm_buffer[:frame_bytes])
+                        del self.pcm_buffer[:frame_bytes]
+
                         self.opus_encoder.encode_pcm_to_opus_stream(
-                            bytes(self.pcm_buffer),
-                            end_of_stream=True,
-                            callback=self.handle_opus,
+                            frame, end_of_stream=False, callback=self.handle_opus
                         )
-                        self.pcm_buffer.clear()
 
-                    # 如果是最后一段，输出音频获取完毕
-                    if is_last:
-                        self._process_before_stop_play_files()
+                # flush 剩余不足一帧的数据
+                if self.pcm_buffer:
+                    self.opus_encoder.encode_pcm_to_opus_stream(
+                        bytes(self.pcm_buffer),
+                        end_of_stream=True,
+                        callback=self.handle_opus,
+                    )
+                    self.pcm_buffer.clear()
+
+                # 如果是最后一段，输出音频获取完毕
+                if is_last:
+                    self._process_before_stop_play_files()
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"TTS请求异常: {e}")
@@ -0,0 +1,67 @@
+import io
+import math
+import wave
+import asyncio
+import numpy as np
+from config.logger import setup_logging
+from core.providers.tts.base import TTSProviderBase
+
+TAG = __name__
+logger = setup_logging()
+
+SAMPLE_RATE = 16000
+# 服务端按60ms一帧编码opus
+FRAME_SAMPLES = 960
+
+
+def mock_audio_samples(text, ms_per_char, min_ms) -> int:
+    """模拟合成的音频时长（采样点数），与文本长度成正比"""
+    duration_ms = max(float(min_ms), len(text) * float(ms_per_char))
+    return int(SAMPLE_RATE * duration_ms / 1000)
+
+
+def mock_frame_count(text, config) -> int:
+    """一句话合成后服务端应下发的opus帧数，压测客户端据此统计丢帧"""
+    samples = mock_audio_samples(
+        text, config.get("ms_per_char", 200), config.get("min_ms", 300)
+    )
+    return math.ceil(samples / FRAME_SAMPLES)
+
+
+class TTSProvider(TTSProviderBase):
+    """
+    本地模拟TTS，不访问网络，用于压测服务端自身的处理能力
+
+    固定耗时 delay_ms 后返回一段正弦波WAV，时长为 文本字数 * ms_per_char（不少于 min_ms）
+    """
+
+    def __init__(self, config, delete_audio_file):
+        super().__init__(config, delete_audio_file)
+        self.audio_file_type = "wav"
+        self.delay_ms = float(config.get("delay_ms", 200))
+        self.ms_per_char = float(config.get("ms_per_char", 200))
+        self.min_ms = float(config.get("min_ms", 300))
+        t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+        self._tone = (np.sin(2 * np.pi * 440 * t) * 8000).astype(np.int16)
+
+    def _wav_bytes(self, text) -> bytes:
+        samples = mock_audio_samples(text, self.ms_per_char, self.min_ms)
+        repeats = samples // len(self._tone) + 1
+        pcm = np.tile(self._tone, repeats)[:samples].tobytes()
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(SAMPLE_RATE)
+            wf.writeframes(pcm)
+        return buffer.getvalue()
+
+    async def text_to_speak(self, text, output_file):
+        if self.delay_ms > 0:
+            await asyncio.sleep(self.delay_ms / 1000)
+        audio = self._wav_bytes(text)
+        if output_file:
+            with open(output_file, "wb") as f:
+                f.write(audio)
+        else:
+            return audio
@@ -1,5 +1,5 @@
-import requests
 from core.utils.util import check_model_key
+from core.utils.http_client import get_http_clients
 from core.providers.tts.base import TTSProviderBase
 from config.logger import setup_logging
 
@@ -41,7 +41,10 @@ class TTSProvider(TTSProviderBase):
             "response_format": "wav",
             "speed": self.speed,
         }
-        response = requests.post(self.api_url, json=data, headers=headers)
+        # 复用全局连接池，避免每句话重新握手
+        response = get_http_clients().get_client().post(
+            self.api_url, json=data, headers=headers
+        )
         if response.status_code == 200:
             if output_file:
                 with open(output_file, "wb") as audio_file:
@@ -171,6 +171,7 @@ class TTSProvider(TTSProviderBase):
                             self.conn.sentence_id = uuid.uuid4().hex
                             logger.bind(tag=TAG).info(f"自动生成新的 会话ID: {self.conn.sentence_id}")
 
+                        self.markdown_cleaner.reset()
                         logger.bind(tag=TAG).info("开始启动TTS会话...")
                         future = asyncio.run_coroutine_threadsafe(
                             self.start_session(self.conn.sentence_id),
@@ -186,13 +187,13 @@ class TTSProvider(TTSProviderBase):
 
                 # 处理文本内容
                 if ContentType.TEXT == message.content_type:
-                    if message.content_detail:
+                    # 按token增量清理Markdown和表情，未闭合的标记留到后续文本
+                    text = self.markdown_cleaner.feed(message.content_detail)
+                    if text:
                         try:
-                            logger.bind(tag=TAG).debug(
-                                f"开始发送TTS文本: {message.content_detail}"
-                            )
+                            logger.bind(tag=TAG).debug(f"开始发送TTS文本: {text}")
                             future = asyncio.run_coroutine_threadsafe(
-                                self.text_to_speak(message.content_detail, None),
+                                self.text_to_speak(text, None),
                                 loop=self.conn.loop,
                             )
                             future.result()
@@ -213,6 +214,13 @@ class TTSProvider(TTSProviderBase):
                 # 处理会话结束
                 if message.sentence_type == SentenceType.LAST:
                     try:
+                        # 发送清理后剩余的文本
+                        text = self.markdown_cleaner.flush()
+                        if text:
+                            asyncio.run_coroutine_threadsafe(
+                                self.text_to_speak(text, None),
+                                loop=self.conn.loop,
+                            ).result()
                         logger.bind(tag=TAG).info("开始结束TTS会话...")
                         asyncio.run_coroutine_threadsafe(
                             self.finish_session(self.conn.sentence_id),
@@ -236,10 +244,8 @@ class TTSProvider(TTSProviderBase):
                 logger.bind(tag=TAG).warning(f"WebSocket连接不存在，终止发送文本")
                 return
 
-            filtered_text = MarkdownCleaner.clean_markdown(text)
-
             # 发送文本合成请求
-            run_request = self._build_base_request(status=1,text=filtered_text)
+            run_request = self._build_base_request(status=1,text=text)
             await self.ws.send(json.dumps(run_request))
             return
 
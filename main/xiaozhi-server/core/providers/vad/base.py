@@ -1,9 +1,174 @@
+import time
+import threading
+import opuslib_next
 from abc import ABC, abstractmethod
 from typing import Optional
+from config.logger import setup_logging
+from core.utils.vad_batch import BatchedVADEngine, VADStreamState
+from core.utils.endpointing import EndpointerBase, create_endpointer
+
+TAG = __name__
+logger = setup_logging()
 
 
 class VADProviderBase(ABC):
+    # 断句策略，决定静音多久算一句话结束
+    endpointer: Optional[EndpointerBase] = None
+
     @abstractmethod
     def is_vad(self, conn, data) -> bool:
         """检测音频数据中的语音活动"""
         pass
+
+    async def is_vad_async(self, conn, data) -> bool:
+        """在事件循环中检测语音活动，支持批量推理的实现可重写此方法"""
+        return self.is_vad(conn, data)
+
+    def on_partial_text(self, conn, text):
+        """流式ASR的中间结果，供断句策略参考"""
+        if self.endpointer is not None:
+            self.endpointer.on_partial_text(conn, text)
+
+
+class SileroVADProviderBase(VADProviderBase):
+    """
+    Silero系列VAD的公共逻辑：连接私有状态、双阈值与滑动窗口判断、跨连接批量推理
+
+    子类只需实现 _forward(inputs, states) -> (probs, new_states)
+        inputs: (B, 576) float32，states: (2, B, 128) float32
+    """
+
+    def __init__(self, config):
+        # 处理空字符串的情况
+        threshold = config.get("threshold", "0.5")
+        threshold_low = config.get("threshold_low", "0.2")
+        min_silence_duration_ms = config.get("min_silence_duration_ms", "1000")
+
+        self.vad_threshold = float(threshold) if threshold else 0.5
+        self.vad_threshold_low = float(threshold_low) if threshold_low else 0.2
+
+        self.silence_threshold_ms = (
+            int(min_silence_duration_ms) if min_silence_duration_ms else 1000
+        )
+
+        # 至少要多少帧才算有语音
+        self.frame_window_threshold = 3
+
+        # 断句策略：fixed固定静音时长，adaptive按每句话自适应
+        self.endpointer = create_endpointer(config, self.silence_threshold_ms)
+
+        # 非批量模式下多个线程可能同时推理，需要加锁
+        self._model_lock = threading.Lock()
+
+        # 跨连接批量推理
+        batch_inference = config.get("batch_inference", True)
+        self.batch_engine = None
+        if str(batch_inference).lower() in ("true", "1", "yes"):
+            self.batch_engine = BatchedVADEngine(
+                self._forward,
+                max_batch_size=config.get("max_batch_size") or 256,
+                max_wait_ms=config.get("batch_wait_ms") or 0,
+                name=f"{type(self).__module__.rsplit('.', 1)[-1]}-vad-batch",
+            )
+            logger.bind(tag=TAG).info("VAD 已开启跨连接批量推理")
+
+    def __del__(self):
+        if getattr(self, "batch_engine", None) is not None:
+            self.batch_engine.close()
+
+    @abstractmethod
+    def _forward(self, inputs, states):
+        """批量推理：inputs为(B, 576)，states为(2, B, 128)"""
+        pass
+
+    def _get_stream(self, conn):
+        """获取连接私有的模型状态和Opus解码器"""
+        if getattr(conn, "vad_stream", None) is None:
+            conn.vad_stream = VADStreamState()
+        if getattr(conn, "vad_decoder", None) is None:
+            conn.vad_decoder = opuslib_next.Decoder(16000, 1)
+        return conn.vad_stream
+
+    def _decode_chunks(self, conn, opus_packet):
+        """解码opus包写入环形缓冲区，取出所有完整的512采样点音频块"""
+        stream = conn.vad_stream
+        start_time = time.perf_counter()
+        pcm_frame = conn.vad_decoder.decode(opus_packet, 960)
+        stream.last_decode_ms = (time.perf_counter() - start_time) * 1000
+        stream.last_packet = opus_packet
+        stream.last_pcm = pcm_frame
+        stream.write_pcm(pcm_frame)
+        return stream.read_chunks()
+
+    def _update_voice_state(self, conn, speech_prob, now_ms=None):
+        """根据语音概率更新连接的说话状态，返回当前窗口内是否有语音"""
+        if now_ms is None:
+            now_ms = time.time() * 1000
+        # 双阈值判断
+        if speech_prob >= self.vad_threshold:
+            is_voice = True
+        elif speech_prob <= self.vad_threshold_low:
+            is_voice = False
+        else:
+            is_voice = conn.last_is_voice
+
+        # 声音没低于最低值则延续前一个状态，判断为有声音
+        conn.last_is_voice = is_voice
+
+        # 更新滑动窗口
+        conn.client_voice_window.append(is_voice)
+        client_have_voice = (
+            conn.client_voice_window.count(True) >= self.frame_window_threshold
+        )
+
+        self.endpointer.on_frame(conn, speech_prob, client_have_voice, now_ms)
+
+        # 如果之前有声音，但本次没有声音，且与上次有声音的时间差已经超过了断句策略给出的静默时长，则认为已经说完一句话
+        if conn.client_have_voice and not client_have_voice and not conn.client_voice_stop:
+            stop_duration = now_ms - conn.last_activity_time
+            if stop_duration >= self.endpointer.silence_timeout_ms(conn, now_ms):
+                conn.client_voice_stop = True
+                self.endpointer.on_endpoint(conn, now_ms)
+        if client_have_voice:
+            conn.client_have_voice = True
+            conn.last_activity_time = now_ms
+        return client_have_voice
+
+    def is_vad(self, conn, opus_packet):
+        try:
+            stream = self._get_stream(conn)
+            client_have_voice = False
+            for chunk in self._decode_chunks(conn, opus_packet):
+                inputs = stream.prepare(chunk)
+
+                # 检测语音活动
+                with self._model_lock:
+                    probs, new_state = self._forward(inputs, stream.state)
+                stream.commit(new_state)
+
+                client_have_voice = self._update_voice_state(conn, float(probs[0]))
+            return client_have_voice
+        except opuslib_next.OpusError as e:
+            logger.bind(tag=TAG).info(f"解码错误: {e}")
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error processing audio packet: {e}")
+
+    async def is_vad_async(self, conn, opus_packet):
+        if self.batch_engine is None:
+            return self.is_vad(conn, opus_packet)
+        try:
+            stream = self._get_stream(conn)
+            chunks = self._decode_chunks(conn, opus_packet)
+            client_have_voice = False
+            if not len(chunks):
+                return client_have_voice
+
+            # 与其他连接的音频块合并成一个批次推理
+            probs = await self.batch_engine.infer(stream, chunks)
+            for speech_prob in probs:
+                client_have_voice = self._update_voice_state(conn, speech_prob)
+            return client_have_voice
+        except opuslib_next.OpusError as e:
+            logger.bind(tag=TAG).info(f"解码错误: {e}")
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error processing audio packet: {e}")
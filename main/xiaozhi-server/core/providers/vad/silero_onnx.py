@@ -0,0 +1,37 @@
+import os
+import numpy as np
+import onnxruntime
+from config.logger import setup_logging
+from core.providers.vad.base import SileroVADProviderBase
+
+TAG = __name__
+logger = setup_logging()
+
+# 随仓库附带的silero模型在 model_dir 下的相对路径
+DEFAULT_MODEL_FILE = os.path.join("src", "silero_vad", "data", "silero_vad.onnx")
+
+
+class VADProvider(SileroVADProviderBase):
+    """使用onnxruntime运行Silero VAD，不依赖PyTorch"""
+
+    def __init__(self, config):
+        logger.bind(tag=TAG).info("SileroOnnxVAD", config)
+        model_file = config.get("model_file") or os.path.join(
+            config["model_dir"], DEFAULT_MODEL_FILE
+        )
+
+        opts = onnxruntime.SessionOptions()
+        opts.inter_op_num_threads = 1
+        opts.intra_op_num_threads = int(config.get("intra_op_num_threads") or 1)
+        self.session = onnxruntime.InferenceSession(
+            model_file, providers=["CPUExecutionProvider"], sess_options=opts
+        )
+        self.sample_rate = np.array(16000, dtype=np.int64)
+        super().__init__(config)
+
+    def _forward(self, inputs, states):
+        """批量推理：inputs为(B, 576)，states为(2, B, 128)"""
+        out, new_states = self.session.run(
+            None, {"input": inputs, "state": states, "sr": self.sample_rate}
+        )
+        return out.reshape(-1), new_states
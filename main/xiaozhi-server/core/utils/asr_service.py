@@ -0,0 +1,230 @@
+"""
+全局ASR执行服务
+
+语音结束后的ASR识别和声纹识别统一提交到这里执行：
+- 固定数量的工作线程，每个线程运行一个长期存在的事件循环，避免每句话都创建线程池和事件循环
+- 任务以协程方式提交到当前任务最少的事件循环，远程ASR的网络等待可以在同一个循环中并发，
+  并发数不受线程数限制；本地模型等同步阻塞的识别最多同时运行工作线程数个
+- 支持按提供者限制并发数，超出的请求排队等待
+- 统计排队耗时、执行耗时等指标
+"""
+
+import time
+import asyncio
+import threading
+from collections import deque, defaultdict
+from concurrent.futures import Future
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_MAX_WORKERS = 16
+
+
+class _Job:
+    __slots__ = ("provider", "coro_fn", "future", "submit_time")
+
+    def __init__(self, provider, coro_fn):
+        self.provider = provider
+        self.coro_fn = coro_fn
+        self.future = Future()
+        self.submit_time = time.monotonic()
+
+
+class ASRExecutionService:
+    """ASR执行服务"""
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, provider_limits=None):
+        """
+        Args:
+            max_workers: 工作线程（事件循环）数，即同步阻塞的识别最多同时运行的数量
+            provider_limits: 各提供者的最大并发数，如 {"openai": 4}，未配置的不限制
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.provider_limits = {
+            name: int(limit) for name, limit in (provider_limits or {}).items() if limit
+        }
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._running = defaultdict(int)
+        self._stopped = False
+
+        # 指标
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._total_wait_ms = 0.0
+        self._max_wait_ms = 0.0
+        self._total_run_ms = 0.0
+        self._max_running = 0
+
+        self._loops = []
+        self._loop_jobs = [0] * self.max_workers
+        self._workers = []
+        for i in range(self.max_workers):
+            loop = asyncio.new_event_loop()
+            worker = threading.Thread(
+                target=self._worker_loop,
+                args=(loop,),
+                name=f"asr-worker-{i}",
+                daemon=True,
+            )
+            worker.start()
+            self._loops.append(loop)
+            self._workers.append(worker)
+        logger.bind(tag=TAG).info(
+            f"ASR执行服务已启动，工作线程{self.max_workers}个，提供者并发限制: {self.provider_limits}"
+        )
+
+    def submit(self, provider, coro_fn) -> Future:
+        """
+        提交任务
+
+        Args:
+            provider: 提供者名称，用于并发限制和统计
+            coro_fn: 无参函数，返回要执行的协程，会在工作线程的事件循环中创建并执行
+        """
+        job = _Job(provider, coro_fn)
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("ASR执行服务已停止")
+            self._submitted += 1
+            if self._has_capacity(provider):
+                self._start(job)
+            else:
+                self._pending.append(job)
+        return job.future
+
+    async def run(self, provider, coro_fn, timeout=None):
+        """在事件循环中提交任务并等待结果，不阻塞当前事件循环"""
+        future = asyncio.wrap_future(self.submit(provider, coro_fn))
+        return await asyncio.wait_for(future, timeout)
+
+    def _has_capacity(self, provider) -> bool:
+        """提供者是否未达到并发限制，需在持有锁时调用"""
+        limit = self.provider_limits.get(provider)
+        return not limit or self._running[provider] < limit
+
+    def _start(self, job):
+        """把任务提交到当前任务最少的事件循环，需在持有锁时调用"""
+        # 调用方已超时取消的任务直接丢弃
+        if not job.future.set_running_or_notify_cancel():
+            return
+        self._running[job.provider] += 1
+        self._max_running = max(self._max_running, sum(self._running.values()))
+        wait_ms = (time.monotonic() - job.submit_time) * 1000
+        self._total_wait_ms += wait_ms
+        self._max_wait_ms = max(self._max_wait_ms, wait_ms)
+        index = min(range(self.max_workers), key=self._loop_jobs.__getitem__)
+        self._loop_jobs[index] += 1
+        asyncio.run_coroutine_threadsafe(self._run_job(job, index), self._loops[index])
+
+    async def _run_job(self, job, index):
+        start_time = time.monotonic()
+        failed = False
+        try:
+            job.future.set_result(await job.coro_fn())
+        except asyncio.CancelledError:
+            # 只有服务停止时才会取消执行中的任务
+            failed = True
+            job.future.set_exception(RuntimeError("ASR执行服务已停止"))
+            raise
+        except BaseException as e:
+            failed = True
+            job.future.set_exception(e)
+        finally:
+            self._finish(job, index, start_time, failed)
+
+    def _finish(self, job, index, start_time, failed):
+        """任务结束，启动排队中已有并发额度的任务"""
+        with self._lock:
+            self._running[job.provider] -= 1
+            self._loop_jobs[index] -= 1
+            self._total_run_ms += (time.monotonic() - start_time) * 1000
+            if failed:
+                self._failed += 1
+            else:
+                self._completed += 1
+            if self._stopped or not self._pending:
+                return
+            for pending_job in list(self._pending):
+                if self._has_capacity(pending_job.provider):
+                    self._pending.remove(pending_job)
+                    self._start(pending_job)
+
+    def _worker_loop(self, loop):
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_forever()
+            # 停止时取消仍在执行的任务
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        finally:
+            loop.close()
+
+    def get_stats(self) -> dict:
+        """获取运行指标"""
+        with self._lock:
+            finished = self._completed + self._failed
+            started = finished + sum(self._running.values())
+            return {
+                "workers": self.max_workers,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "queued": len(self._pending),
+                "running": {k: v for k, v in self._running.items() if v},
+                "max_running": self._max_running,
+                "avg_wait_ms": self._total_wait_ms / started if started else 0.0,
+                "max_wait_ms": self._max_wait_ms,
+                "avg_run_ms": self._total_run_ms / finished if finished else 0.0,
+            }
+
+    def shutdown(self):
+        """停止服务，丢弃尚未开始的任务"""
+        with self._lock:
+            self._stopped = True
+            pending, self._pending = list(self._pending), deque()
+        for job in pending:
+            job.future.cancel()
+        for loop in self._loops:
+            loop.call_soon_threadsafe(loop.stop)
+
+
+_asr_service = None
+_asr_service_lock = threading.Lock()
+
+
+def get_asr_service(config=None) -> ASRExecutionService:
+    """
+    获取全局ASR执行服务（单例模式）
+
+    Args:
+        config: asr_service配置，仅在第一次创建时生效
+
+    Returns:
+        ASRExecutionService实例
+    """
+    global _asr_service
+    if _asr_service is None:
+        with _asr_service_lock:
+            if _asr_service is None:
+                config = config or {}
+                _asr_service = ASRExecutionService(
+                    max_workers=config.get("max_workers") or DEFAULT_MAX_WORKERS,
+                    provider_limits=config.get("provider_limits") or {},
+                )
+    return _asr_service
+
+
+def shutdown_asr_service():
+    """关闭全局ASR执行服务"""
+    global _asr_service
+    with _asr_service_lock:
+        if _asr_service is not None:
+            _asr_service.shutdown()
+            _asr_service = None
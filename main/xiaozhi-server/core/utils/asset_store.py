@@ -0,0 +1,147 @@
+"""
+静态提示音资源库
+
+绑定码、超出字数提示、播放结束提示音、唤醒词回复等音频在每次使用时都要经过
+ffmpeg解码和Opus编码。这里在启动时把 config/assets 下的音频预先编码为Opus帧列表，
+以p3格式保存到本地，运行时直接从内存返回；源文件修改后根据修改时间自动重新编码，
+源文件被删除后（如唤醒词回复重新生成）对应的缓存随之清除。
+"""
+
+import os
+import hashlib
+import threading
+from typing import Dict, List, Tuple
+from config.logger import setup_logging
+from core.utils import p3
+from core.utils.util import audio_to_data
+
+TAG = __name__
+logger = setup_logging()
+
+ASSETS_DIR = "config/assets"
+CACHE_DIR = "data/.assets_p3"
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".p3")
+
+
+class AudioAssetStore:
+    """静态音频资源库"""
+
+    def __init__(self, assets_dir=ASSETS_DIR, cache_dir=CACHE_DIR):
+        self.assets_dir = assets_dir
+        self.cache_dir = cache_dir
+        # 规范化路径 -> (源文件修改时间, opus帧列表)
+        self._entries: Dict[str, Tuple[float, List[bytes]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, file_path: str) -> List[bytes]:
+        """
+        获取音频文件对应的Opus帧列表
+
+        Args:
+            file_path: 音频文件路径
+        """
+        key = os.path.normpath(file_path)
+        try:
+            mtime = os.stat(key).st_mtime
+        except FileNotFoundError:
+            self._discard(key)
+            raise
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+
+        frames = self._load(key, mtime)
+        with self._lock:
+            self._entries[key] = (mtime, frames)
+        # 重新编码时顺便清除源文件已不存在的缓存
+        self._prune_missing()
+        return frames
+
+    def _discard(self, key):
+        """清除源文件已不存在的缓存，包括内存中的帧列表和预编码的p3文件"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        try:
+            os.remove(self._cache_path(key))
+        except OSError:
+            pass
+
+    def _prune_missing(self):
+        with self._lock:
+            keys = list(self._entries)
+        for key in keys:
+            if not os.path.exists(key):
+                self._discard(key)
+
+    def preload(self, dirs=None):
+        """预先编码目录下的所有音频文件"""
+        count = 0
+        for root_dir in dirs or [self.assets_dir]:
+            if not os.path.isdir(root_dir):
+                continue
+            for root, _, files in os.walk(root_dir):
+                for name in files:
+                    if not name.lower().endswith(AUDIO_EXTENSIONS):
+                        continue
+                    try:
+                        self.get(os.path.join(root, name))
+                        count += 1
+                    except Exception as e:
+                        logger.bind(tag=TAG).warning(
+                            f"预编码音频失败: {os.path.join(root, name)}, {e}"
+                        )
+        logger.bind(tag=TAG).info(f"静态提示音预编码完成，共{count}个文件")
+        return count
+
+    def _cache_path(self, key):
+        digest = hashlib.md5(os.path.abspath(key).encode("utf-8")).hexdigest()[:8]
+        name = os.path.splitext(os.path.basename(key))[0]
+        return os.path.join(self.cache_dir, f"{name}_{digest}.p3")
+
+    def _load(self, key, mtime) -> List[bytes]:
+        if key.lower().endswith(".p3"):
+            frames, _ = p3.decode_opus_from_file(key)
+            return frames
+
+        # 已编码的p3文件比源文件新，直接读取
+        cache_path = self._cache_path(key)
+        try:
+            if os.stat(cache_path).st_mtime >= mtime:
+                frames, _ = p3.decode_opus_from_file(cache_path)
+                return frames
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"读取预编码音频失败: {cache_path}, {e}")
+
+        frames = audio_to_data(key, is_opus=True)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+            p3.encode_opus_to_file(frames, tmp_path)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"保存预编码音频失败: {cache_path}, {e}")
+        return frames
+
+
+_asset_store = None
+_asset_store_lock = threading.Lock()
+
+
+def get_asset_store() -> AudioAssetStore:
+    """
+    获取全局静态音频资源库（单例模式）
+
+    Returns:
+        AudioAssetStore实例
+    """
+    global _asset_store
+    if _asset_store is None:
+        with _asset_store_lock:
+            if _asset_store is None:
+                _asset_store = AudioAssetStore()
+    return _asset_store
@@ -0,0 +1,115 @@
+"""
+异步音频流水线支持模块
+
+开启 async_pipeline 后，每个连接不再单独创建 ASR/TTS/音频播放/上报线程，
+而是作为 asyncio 任务运行在服务器主事件循环上，阻塞型的提供者调用统一
+提交到全局共享、有上限的线程池中执行。
+"""
+
+import queue
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_MAX_WORKERS = 64
+
+
+def is_async_pipeline_enabled(config) -> bool:
+    """判断配置中是否开启了异步流水线模式"""
+    pipeline_config = config.get("async_pipeline") or {}
+    if not isinstance(pipeline_config, dict):
+        return False
+    return str(pipeline_config.get("enable", False)).lower() in ("true", "1", "yes")
+
+
+class LoopAwareQueue(queue.Queue):
+    """
+    线程安全队列，同时支持在事件循环中以协程方式等待
+
+    - 任意线程仍可像 queue.Queue 一样 put/get/get_nowait
+    - 绑定事件循环后，可在该循环中 await async_get()，不占用线程
+    """
+
+    def __init__(self, maxsize=0):
+        super().__init__(maxsize)
+        self._loop = None
+        self._waiter = None
+
+    def bind_loop(self, loop):
+        """绑定事件循环，绑定后才可以使用 async_get"""
+        self._loop = loop
+        self._waiter = asyncio.Event()
+
+    def _put(self, item):
+        super()._put(item)
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._waiter.set)
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+
+    async def async_get(self, timeout=None):
+        """
+        在事件循环中等待并获取一个元素
+
+        Raises:
+            queue.Empty: 超时仍未获取到数据
+        """
+        if self._waiter is None:
+            raise RuntimeError("队列未绑定事件循环")
+        while True:
+            try:
+                return self.get_nowait()
+            except queue.Empty:
+                pass
+            # 先清除信号再检查一次，避免丢失唤醒
+            self._waiter.clear()
+            try:
+                return self.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                await asyncio.wait_for(self._waiter.wait(), timeout)
+            except asyncio.TimeoutError:
+                raise queue.Empty
+
+
+_shared_executor = None
+_shared_executor_lock = threading.Lock()
+
+
+def get_shared_executor(max_workers=None) -> ThreadPoolExecutor:
+    """
+    获取全局共享线程池（单例模式）
+
+    Args:
+        max_workers: 线程池上限，仅在第一次创建时生效
+
+    Returns:
+        ThreadPoolExecutor实例
+    """
+    global _shared_executor
+    if _shared_executor is None:
+        with _shared_executor_lock:
+            if _shared_executor is None:
+                workers = int(max_workers) if max_workers else DEFAULT_MAX_WORKERS
+                _shared_executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="pipeline"
+                )
+                logger.bind(tag=TAG).info(f"异步流水线共享线程池已创建，上限{workers}")
+    return _shared_executor
+
+
+def shutdown_shared_executor():
+    """关闭全局共享线程池"""
+    global _shared_executor
+    with _shared_executor_lock:
+        if _shared_executor is not None:
+            _shared_executor.shutdown(wait=False)
+            _shared_executor = None
@@ -0,0 +1,132 @@
+"""
+进程内音频解码
+
+TTS返回的音频原先全部交给pydub处理，每句话都要启动一次ffmpeg子进程，
+并发较高时进程创建的开销占据了TTS的大部分CPU。这里统一解码为
+16kHz/单声道/16位小端PCM：
+- WAV/PCM：进程内解析文件头，需要时用numpy重采样
+- MP3/OGG等压缩格式：使用libav（PyAV）在进程内解码
+- 以上方式无法处理的数据回退到pydub
+"""
+
+import wave
+import numpy as np
+import av
+from io import BytesIO
+from pydub import AudioSegment
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+TARGET_SAMPLE_RATE = 16000
+
+
+def decode_audio_to_pcm(source, file_type: str) -> bytes:
+    """
+    将音频解码为16kHz/单声道/16位小端PCM
+
+    Args:
+        source: 音频二进制数据或文件路径
+        file_type: 音频格式，如 wav、pcm、mp3、ogg
+    """
+    file_type = (file_type or "").lower().lstrip(".")
+    if file_type == "pcm":
+        # 裸PCM数据没有文件头，按16kHz/单声道/16位处理
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return bytes(source)
+        with open(source, "rb") as f:
+            return f.read()
+
+    if file_type == "wav":
+        try:
+            return _decode_wav(source)
+        except (wave.Error, EOFError, ValueError) as e:
+            # 非PCM编码的WAV（如float、ADPCM）交给ffmpeg处理
+            logger.bind(tag=TAG).debug(f"WAV快速解码失败，回退到pydub: {e}")
+    else:
+        try:
+            return _decode_with_av(source)
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"进程内解码{file_type}失败，回退到pydub: {e}")
+
+    return _decode_with_pydub(source, file_type)
+
+
+def resample_int16(samples: np.ndarray, src_rate: int, dst_rate=TARGET_SAMPLE_RATE):
+    """
+    线性插值重采样
+
+    与pydub的set_frame_rate（audioop.ratecv）同为线性插值，音质一致
+    """
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples.astype(np.int16, copy=False)
+    out_len = int(round(len(samples) * dst_rate / src_rate))
+    positions = np.arange(out_len, dtype=np.float64) * (src_rate / dst_rate)
+    resampled = np.interp(
+        positions, np.arange(len(samples), dtype=np.float64), samples
+    )
+    return np.clip(np.rint(resampled), -32768, 32767).astype(np.int16)
+
+
+def _decode_wav(source) -> bytes:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = BytesIO(source)
+    with wave.open(source, "rb") as wav_file:
+        channels = wav_file.getnchannels()
+        sample_width = wav_file.getsampwidth()
+        frame_rate = wav_file.getframerate()
+        raw = wav_file.readframes(wav_file.getnframes())
+
+    # 流式TTS返回的WAV可能把数据长度写成最大值，这里按实际读到的数据截断到整帧
+    frame_bytes = channels * sample_width
+    raw = raw[: len(raw) - len(raw) % frame_bytes]
+
+    if sample_width == 2:
+        samples = np.frombuffer(raw, dtype="<i2")
+    elif sample_width == 1:
+        # 8位WAV为无符号数
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.int16) - 128) << 8
+    elif sample_width == 3:
+        # 24位取高16位
+        samples = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)[:, 1:]
+        samples = np.ascontiguousarray(samples).view("<i2").reshape(-1)
+    elif sample_width == 4:
+        samples = (np.frombuffer(raw, dtype="<i4") >> 16).astype(np.int16)
+    else:
+        raise ValueError(f"不支持的采样位宽: {sample_width}")
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+        if frame_rate == TARGET_SAMPLE_RATE:
+            samples = np.rint(samples).astype(np.int16)
+
+    return resample_int16(samples, frame_rate).tobytes()
+
+
+def _decode_with_av(source) -> bytes:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = BytesIO(source)
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=TARGET_SAMPLE_RATE)
+    chunks = []
+    with av.open(source, mode="r") as container:
+        stream = container.streams.audio[0]
+        for frame in container.decode(stream):
+            for out_frame in resampler.resample(frame):
+                chunks.append(out_frame.to_ndarray().tobytes())
+    # 取出重采样器中剩余的数据
+    for out_frame in resampler.resample(None):
+        chunks.append(out_frame.to_ndarray().tobytes())
+    return b"".join(chunks)
+
+
+def _decode_with_pydub(source, file_type) -> bytes:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = BytesIO(source)
+    # -nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
+    audio = AudioSegment.from_file(
+        source, format=file_type or None, parameters=["-nostdin"]
+    )
+    # 转换为单声道/16kHz采样率/16位小端编码（确保与编码器匹配）
+    audio = audio.set_channels(1).set_frame_rate(TARGET_SAMPLE_RATE).set_sample_width(2)
+    return audio.raw_data
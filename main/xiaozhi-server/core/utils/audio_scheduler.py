@@ -0,0 +1,398 @@
+"""
+全局音频发送调度
+
+原先每个连接各自通过 AudioRateController 按60ms一帧 asyncio.sleep 控制发送节奏，
+1000台设备同时播放时每秒约有1.6万次定时器唤醒，事件循环繁忙时发送节奏抖动明显。
+这里改为整个服务共用一个调度任务：
+- 在最早一帧到期时唤醒，一起发送所有连接半个节拍（tick_ms/2）内到期的音频帧，
+  两次唤醒至少间隔半个节拍
+- 按设备端缓冲估算每个连接的发送额度：设备缓冲不足 pre_buffer_frames 帧时立即发送，
+  开始播放时前几帧直接发送，之后按实时速度发送
+- 每个连接的待发送帧数超过高水位时，生产方（TTS音频线程）等待降到低水位后再继续
+- 打断或连接关闭时清空待发送帧，不再发给设备
+- websocket写缓冲积压的连接本节拍跳过（上限低于websockets写缓冲高水位，调度任务里的
+  send 不会等待写缓冲排空），已断开的连接直接丢弃，慢网络的连接不会拖慢其他连接
+- 统计唤醒次数、发送帧数和实际发送时间相对计划时间的抖动
+"""
+
+import heapq
+import weakref
+import asyncio
+import threading
+from collections import deque
+from websockets.protocol import State
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_TICK_MS = 10
+DEFAULT_PRE_BUFFER_FRAMES = 5
+DEFAULT_HIGH_WATERMARK = 16
+DEFAULT_LOW_WATERMARK = 8
+# websockets的写缓冲超过高水位（默认32KB）后 send 会一直等到降到低水位（8KB），
+# 这里留出一次预缓冲突发的余量，保证调度发送时写缓冲不会超过高水位
+DEFAULT_WRITE_BUFFER_LIMIT = 12 * 1024
+# 抖动统计保留的最近样本数
+JITTER_SAMPLES = 4096
+
+
+class AudioStream:
+    """单个连接的待发送音频帧，由调度器按设备播放速度发送"""
+
+    def __init__(self, scheduler, conn, send_func, frame_duration=60):
+        """
+        Args:
+            scheduler: 所属的 AudioScheduler
+            conn: 连接对象，用于判断打断状态和websocket写缓冲
+            send_func: async def send_func(packet, flow_control) 实际发送一帧
+            frame_duration: 单帧时长（毫秒）
+        """
+        self.scheduler = scheduler
+        self.conn = conn
+        self.send_func = send_func
+        self.frame_seconds = frame_duration / 1000
+        self.queue = deque()
+        self.closed = False
+        # 估算的设备端缓冲播放结束时间（事件循环时间）
+        self.play_end = 0.0
+        # 当前在调度堆中的条目序号，None表示未加入调度
+        self._heap_seq = None
+        self._pumping = False
+        self._space_waiters = []
+        self._drain_waiters = []
+
+    @property
+    def pending(self) -> int:
+        return len(self.queue)
+
+    def _should_stop(self) -> bool:
+        if self.closed or self.conn.client_abort:
+            return True
+        # 连接不是OPEN状态时websocket的send会一直等到连接关闭，不能在调度任务中调用
+        state = getattr(self.conn.websocket, "state", State.OPEN)
+        if state is not State.OPEN:
+            self.closed = True
+            return True
+        return False
+
+    def _writable(self) -> bool:
+        transport = getattr(self.conn.websocket, "transport", None)
+        if transport is None:
+            return True
+        try:
+            limit = self.scheduler.write_buffer_limit
+            # 配置的上限不能超过写缓冲高水位的一半，否则 send 可能等待写缓冲排空
+            _, high = transport.get_write_buffer_limits()
+            if high:
+                limit = min(limit, high // 2)
+            return transport.get_write_buffer_size() < limit
+        except Exception:
+            return True
+
+    async def put(self, packet, flow_control, wait=True):
+        """
+        加入一帧音频，有发送额度时直接在调用方发送
+
+        Args:
+            wait: 待发送帧数超过高水位时是否等待降到低水位
+        """
+        if self._should_stop():
+            return
+        self.queue.append((packet, flow_control))
+        if self._heap_seq is None and not self._pumping:
+            await self._pump()
+        if not wait:
+            return
+        while len(self.queue) > self.scheduler.high_watermark and not self.closed:
+            self.scheduler._producer_waits += 1
+            waiter = asyncio.get_running_loop().create_future()
+            self._space_waiters.append(waiter)
+            await waiter
+
+    async def drain(self):
+        """等待已加入的音频帧全部发送（或被清空）"""
+        while self.queue or self._pumping:
+            waiter = asyncio.get_running_loop().create_future()
+            self._drain_waiters.append(waiter)
+            await waiter
+
+    def flush(self):
+        """清空待发送帧，唤醒所有等待方；设备端缓冲视为已清空"""
+        if self.queue:
+            self.scheduler._frames_dropped += len(self.queue)
+            self.queue.clear()
+        self._heap_seq = None
+        self.play_end = 0.0
+        self._wake(self._space_waiters)
+        self._wake(self._drain_waiters)
+
+    def close(self):
+        """连接关闭，之后加入的音频直接丢弃"""
+        self.closed = True
+        self.flush()
+        self.scheduler._streams.discard(self)
+
+    @staticmethod
+    def _wake(waiters):
+        while waiters:
+            waiter = waiters.pop()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def _pump(self, due=None):
+        """
+        发送所有已有额度的帧，剩余的帧按下一帧的发送时间加入调度
+
+        Args:
+            due: 由调度器触发时为计划发送时间，用于统计抖动
+        """
+        scheduler = self.scheduler
+        loop = asyncio.get_running_loop()
+        queue = self.queue
+        send_func = self.send_func
+        frame_seconds = self.frame_seconds
+        tolerance = scheduler.tolerance
+        pre_buffer = scheduler.pre_buffer_frames * frame_seconds
+        self._pumping = True
+        try:
+            while queue:
+                if self._should_stop():
+                    self.flush()
+                    return
+                now = loop.time()
+                next_due = self.play_end - pre_buffer
+                if next_due > now + tolerance:
+                    scheduler._schedule(self, next_due)
+                    return
+                if not self._writable():
+                    scheduler._write_blocked += 1
+                    scheduler._schedule(self, now + scheduler.tick)
+                    return
+                if due is not None:
+                    scheduler._observe_lateness(now - due)
+                    due = None
+                else:
+                    scheduler._frames_inline += 1
+                packet, flow_control = queue.popleft()
+                self.play_end = max(self.play_end, now) + frame_seconds
+                await send_func(packet, flow_control)
+                scheduler._frames_sent += 1
+                if self._space_waiters and len(queue) <= scheduler.low_watermark:
+                    self._wake(self._space_waiters)
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"发送音频失败，丢弃该连接的待发送音频: {e}")
+            self.closed = True
+            self.flush()
+        finally:
+            self._pumping = False
+            if not queue:
+                if self._space_waiters:
+                    self._wake(self._space_waiters)
+                if self._drain_waiters:
+                    self._wake(self._drain_waiters)
+
+
+class AudioScheduler:
+    """全局音频发送调度器，所有连接的音频帧由一个调度任务按节拍发送"""
+
+    def __init__(
+        self,
+        tick_ms=DEFAULT_TICK_MS,
+        pre_buffer_frames=DEFAULT_PRE_BUFFER_FRAMES,
+        high_watermark=DEFAULT_HIGH_WATERMARK,
+        low_watermark=DEFAULT_LOW_WATERMARK,
+        write_buffer_limit=DEFAULT_WRITE_BUFFER_LIMIT,
+    ):
+        """
+        Args:
+            tick_ms: 调度节拍（毫秒），最早一帧到期后半个节拍内到期的帧一起发送
+            pre_buffer_frames: 设备端预缓冲帧数
+            high_watermark: 单个连接待发送帧数的高水位，超过后生产方等待
+            low_watermark: 低水位，待发送帧数降到该值后生产方继续
+            write_buffer_limit: websocket写缓冲字节数上限，超过时本节拍跳过该连接
+        """
+        self.tick = max(1, int(tick_ms)) / 1000
+        # 提前不超过半个节拍的帧在本次唤醒时一起发送
+        self.tolerance = self.tick / 2
+        self.pre_buffer_frames = max(0, int(pre_buffer_frames))
+        self.high_watermark = max(1, int(high_watermark))
+        self.low_watermark = min(max(0, int(low_watermark)), self.high_watermark - 1)
+        self.write_buffer_limit = max(1, int(write_buffer_limit))
+
+        self._heap = []
+        self._seq = 0
+        self._streams = weakref.WeakSet()
+        self._loop = None
+        self._task = None
+        self._waiter = None
+        self._wake_at = None
+
+        self._wakeups = 0
+        self._ticks = 0
+        self._frames_sent = 0
+        self._frames_inline = 0
+        self._frames_dropped = 0
+        self._write_blocked = 0
+        self._producer_waits = 0
+        self._lateness = deque(maxlen=JITTER_SAMPLES)
+        self._max_lateness = 0.0
+
+    def open_stream(self, conn, send_func, frame_duration=60) -> AudioStream:
+        """为连接创建音频流，需在事件循环中调用"""
+        self._ensure_running()
+        stream = AudioStream(self, conn, send_func, frame_duration)
+        self._streams.add(stream)
+        return stream
+
+    def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._heap.clear()
+            self._task = loop.create_task(self._run())
+
+    def _schedule(self, stream, due):
+        self._seq += 1
+        stream._heap_seq = self._seq
+        heapq.heappush(self._heap, (due, self._seq, stream))
+        # 调度任务正在等待更晚的时间，提前唤醒
+        if (
+            self._waiter is not None
+            and not self._waiter.done()
+            and (self._wake_at is None or due < self._wake_at - self.tolerance)
+        ):
+            self._waiter.set_result(None)
+
+    def _observe_lateness(self, seconds):
+        self._lateness.append(seconds)
+        if seconds > self._max_lateness:
+            self._max_lateness = seconds
+
+    async def _run(self):
+        loop = self._loop
+        while True:
+            now = loop.time()
+            wake_at = None
+            if self._heap:
+                wake_at = self._heap[0][0]
+            if wake_at is None or wake_at > now + self.tolerance:
+                self._waiter = loop.create_future()
+                self._wake_at = wake_at
+                handle = None
+                if wake_at is not None:
+                    handle = loop.call_at(wake_at, self._wake_waiter, self._waiter)
+                try:
+                    await self._waiter
+                finally:
+                    if handle is not None:
+                        handle.cancel()
+                    self._waiter = None
+                self._wakeups += 1
+                continue
+            await self._tick(now)
+
+    @staticmethod
+    def _wake_waiter(waiter):
+        if not waiter.done():
+            waiter.set_result(None)
+
+    async def _tick(self, now):
+        """
+        在调度任务中直接发送已到期连接的音频帧
+
+        _pump 每发一帧前检查写缓冲，积压的连接留到下一节拍，
+        可写的连接 send 不会等待写缓冲排空，不会拖慢其他连接
+        """
+        self._ticks += 1
+        due_streams = []
+        limit = now + self.tolerance
+        while self._heap and self._heap[0][0] <= limit:
+            due, seq, stream = heapq.heappop(self._heap)
+            if stream._heap_seq != seq:
+                continue
+            stream._heap_seq = None
+            due_streams.append((due, stream))
+        for due, stream in due_streams:
+            if stream._heap_seq is None and not stream._pumping:
+                await stream._pump(due)
+
+    def get_stats(self) -> dict:
+        samples = sorted(self._lateness)
+
+        def percentile(percent):
+            if not samples:
+                return 0.0
+            index = min(len(samples) - 1, int(len(samples) * percent / 100))
+            return samples[index] * 1000
+
+        streams = list(self._streams)
+        return {
+            "streams": len(streams),
+            "pending_frames": sum(stream.pending for stream in streams),
+            "wakeups": self._wakeups,
+            "ticks": self._ticks,
+            "frames_sent": self._frames_sent,
+            "frames_inline": self._frames_inline,
+            "frames_dropped": self._frames_dropped,
+            "write_blocked": self._write_blocked,
+            "producer_waits": self._producer_waits,
+            "jitter_p50_ms": percentile(50),
+            "jitter_p99_ms": percentile(99),
+            "jitter_max_ms": self._max_lateness * 1000,
+        }
+
+    def shutdown(self):
+        """停止调度任务并清空所有连接的待发送帧"""
+        for stream in list(self._streams):
+            stream.flush()
+        self._heap.clear()
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+
+_audio_scheduler = None
+_audio_scheduler_lock = threading.Lock()
+
+
+def get_audio_scheduler(config=None) -> AudioScheduler:
+    """
+    获取全局音频发送调度器（单例模式）
+
+    Args:
+        config: audio_scheduler配置，仅在第一次创建时生效
+
+    Returns:
+        AudioScheduler实例
+    """
+    global _audio_scheduler
+    if _audio_scheduler is None:
+        with _audio_scheduler_lock:
+            if _audio_scheduler is None:
+                config = config or {}
+                pre_buffer_frames = config.get("pre_buffer_frames")
+                low_watermark = config.get("low_watermark")
+                _audio_scheduler = AudioScheduler(
+                    tick_ms=config.get("tick_ms") or DEFAULT_TICK_MS,
+                    pre_buffer_frames=DEFAULT_PRE_BUFFER_FRAMES
+                    if pre_buffer_frames is None
+                    else pre_buffer_frames,
+                    high_watermark=config.get("high_watermark")
+                    or DEFAULT_HIGH_WATERMARK,
+                    low_watermark=DEFAULT_LOW_WATERMARK
+                    if low_watermark is None
+                    else low_watermark,
+                    write_buffer_limit=config.get("write_buffer_limit")
+                    or DEFAULT_WRITE_BUFFER_LIMIT,
+                )
+    return _audio_scheduler
+
+
+def shutdown_audio_scheduler():
+    """停止全局音频发送调度器"""
+    global _audio_scheduler
+    with _audio_scheduler_lock:
+        if _audio_scheduler is not None:
+            _audio_scheduler.shutdown()
+            _audio_scheduler = None
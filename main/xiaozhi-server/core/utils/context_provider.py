@@ -1,4 +1,4 @@
-import httpx
+from core.utils.http_client import get_http_clients
 from typing import Dict, Any, List
 from config.logger import setup_logging
 
@@ -32,7 +32,9 @@ class ContextDataProvider:
                 headers["device-id"] = device_id
                 
                 # 发送请求
-                response = httpx.get(url, headers=headers, timeout=3)
+                response = get_http_clients().get_client().get(
+                    url, headers=headers, timeout=3
+                )
                 
                 if response.status_code == 200:
                     result = response.json()
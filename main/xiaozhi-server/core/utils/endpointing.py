@@ -0,0 +1,278 @@
+"""
+语音结束判定（断句）
+
+原先VAD在检测到非语音后固定等待 min_silence_duration_ms 才判定一句话结束，每轮对话都要付出
+完整的等待时间。这里把断句抽象为可替换的 Endpointer，由 SileroVADProviderBase 在每个音频块
+推理后调用：
+- fixed：固定静音时长，与原先行为一致
+- adaptive：结合以下信号为每句话选择静音时长，并限制在 [min_ms, max_ms] 之间
+    - VAD概率：静音段的平均语音概率偏高（犹豫、换气）时延长，干净的静音时缩短
+    - 流式ASR中间结果：以句末标点或语气词结尾时缩短，以连接词、口头禅结尾时延长到最大值
+    - 语速：说话越慢，句中停顿通常越长
+    - 设备历史：记录每个设备句中停顿的时长（包括判定结束后很快又继续说话的停顿），
+      静音时长不低于其常见停顿
+- 也可以在配置中填写 "模块路径.类名" 使用自定义实现，构造参数为 (vad配置, 默认静音时长ms)
+"""
+
+import importlib
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 16k采样率下每个512采样点音频块的时长
+FRAME_MS = 32
+
+DEFAULT_MIN_MS = 200
+DEFAULT_MAX_MS = 1000
+
+# 表示一句话已经说完的结尾
+COMPLETE_ENDINGS = ("。", "？", "！", "?", "!", ".", "吗", "呢", "吧", "啦", "嘛")
+# 表示话还没说完的结尾
+CONTINUATION_ENDINGS = (
+    "，", ",", "、", "：", ":",
+    "然后", "还有", "就是", "那个", "这个", "因为", "所以", "但是", "而且", "或者",
+    "如果", "比如", "的话", "和", "跟", "嗯", "呃", "额",
+    "and", "or", "but", "so", "because", "um", "uh", "the",
+)
+
+
+class EndpointState:
+    """单个连接当前这句话的断句信号"""
+
+    def __init__(self):
+        self.endpoint_ms = None
+        self.last_voice_ms = None
+        self.reset(0.0)
+
+    def reset(self, now_ms):
+        self.utterance_start_ms = now_ms
+        self.voiced_ms = 0.0
+        self.partial_text = ""
+        self.silence_prob_sum = 0.0
+        self.silence_frames = 0
+
+    def mark_endpoint(self, now_ms, last_voice_ms):
+        """记录上一句话的结束时间，用于识别过早断句"""
+        self.endpoint_ms = now_ms
+        self.last_voice_ms = last_voice_ms
+
+
+def _get_state(conn) -> EndpointState:
+    if getattr(conn, "endpoint_state", None) is None:
+        conn.endpoint_state = EndpointState()
+    return conn.endpoint_state
+
+
+class EndpointerBase(ABC):
+    """断句策略，同一个实例被所有连接共享，连接私有的状态保存在 conn.endpoint_state 中"""
+
+    def __init__(self, config, silence_ms):
+        self.silence_ms = silence_ms
+
+    def on_frame(self, conn, speech_prob, have_voice, now_ms):
+        """每个音频块推理后、判断是否说完之前调用"""
+        pass
+
+    def on_partial_text(self, conn, text):
+        """收到流式ASR的中间结果"""
+        pass
+
+    def on_endpoint(self, conn, now_ms):
+        """判定一句话结束"""
+        pass
+
+    @abstractmethod
+    def silence_timeout_ms(self, conn, now_ms) -> float:
+        """当前这句话需要持续多长时间的静音才算说完"""
+        pass
+
+    def get_stats(self) -> dict:
+        return {}
+
+
+class FixedEndpointer(EndpointerBase):
+    """固定静音时长"""
+
+    def silence_timeout_ms(self, conn, now_ms) -> float:
+        return self.silence_ms
+
+
+class DevicePauseHistory:
+    """按设备记录最近的句中停顿时长"""
+
+    def __init__(self, max_devices=10000, max_samples=50):
+        self.max_devices = max_devices
+        self.max_samples = max_samples
+        self._pauses = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, device_id, pause_ms):
+        with self._lock:
+            pauses = self._pauses.get(device_id)
+            if pauses is None:
+                pauses = self._pauses[device_id] = deque(maxlen=self.max_samples)
+                if len(self._pauses) > self.max_devices:
+                    self._pauses.popitem(last=False)
+            else:
+                self._pauses.move_to_end(device_id)
+            pauses.append(pause_ms)
+
+    def quantile(self, device_id, q, min_samples):
+        """返回设备句中停顿时长的q分位数，样本不足时返回None"""
+        with self._lock:
+            pauses = self._pauses.get(device_id)
+            if pauses is None or len(pauses) < min_samples:
+                return None
+            ordered = sorted(pauses)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class AdaptiveEndpointer(EndpointerBase):
+    """结合VAD概率、流式ASR中间结果、语速和设备历史，为每句话选择静音时长"""
+
+    def __init__(self, config, silence_ms):
+        super().__init__(config, silence_ms)
+        self.min_ms = float(config.get("endpointing_min_ms") or DEFAULT_MIN_MS)
+        self.max_ms = float(config.get("endpointing_max_ms") or DEFAULT_MAX_MS)
+        if self.max_ms < self.min_ms:
+            self.max_ms = self.min_ms
+        self.base_ms = min(max(float(silence_ms), self.min_ms), self.max_ms)
+        # 以句末标点结尾时静音时长的缩放比例
+        self.complete_factor = 0.5
+        # 正常语速（字/秒），偏离时按比例调整静音时长
+        self.reference_rate = 4.0
+        # 静音段平均语音概率高于该值视为犹豫，低于clean_prob视为干净的静音
+        self.hesitation_prob = 0.15
+        self.clean_prob = 0.05
+        # 低于该时长的停顿不计入设备历史（多为VAD抖动）
+        self.min_pause_ms = 3 * FRAME_MS
+        self.history_quantile = 0.9
+        self.history_min_samples = 5
+        self.history_margin_ms = 60
+        # 判定结束后这么短时间内又开始说话，视为过早断句，把这次停顿计入设备历史
+        self.resume_window_ms = 600
+        self.history = DevicePauseHistory()
+        self._endpoints = 0
+        self._timeout_sum = 0.0
+        self._stats_lock = threading.Lock()
+
+    def on_frame(self, conn, speech_prob, have_voice, now_ms):
+        state = _get_state(conn)
+        if have_voice:
+            if not conn.client_have_voice:
+                # 新的一句话
+                if (
+                    state.endpoint_ms is not None
+                    and now_ms - state.endpoint_ms <= self.resume_window_ms
+                ):
+                    # 刚判定结束就继续说话，上一次其实是句中停顿
+                    self._record_pause(conn, now_ms - state.last_voice_ms - FRAME_MS)
+                state.endpoint_ms = None
+                state.reset(now_ms)
+            else:
+                # 停顿后又继续说话，说明这是句中停顿
+                self._record_pause(conn, now_ms - conn.last_activity_time - FRAME_MS)
+            state.voiced_ms += FRAME_MS
+            state.silence_prob_sum = 0.0
+            state.silence_frames = 0
+        elif conn.client_have_voice:
+            state.silence_prob_sum += speech_prob
+            state.silence_frames += 1
+
+    def _record_pause(self, conn, pause_ms):
+        device_id = getattr(conn, "device_id", None)
+        if device_id and pause_ms >= self.min_pause_ms:
+            self.history.record(device_id, pause_ms)
+
+    def on_partial_text(self, conn, text):
+        _get_state(conn).partial_text = (text or "").strip()
+
+    def on_endpoint(self, conn, now_ms):
+        _get_state(conn).mark_endpoint(now_ms, conn.last_activity_time)
+        timeout = now_ms - conn.last_activity_time
+        with self._stats_lock:
+            self._endpoints += 1
+            self._timeout_sum += timeout
+
+    @staticmethod
+    def _text_signal(text):
+        """返回 1 表示以句末结尾，-1 表示话未说完，0 表示无法判断"""
+        lowered = text.lower()
+        if lowered.endswith(CONTINUATION_ENDINGS):
+            return -1
+        if lowered.endswith(COMPLETE_ENDINGS):
+            return 1
+        return 0
+
+    def silence_timeout_ms(self, conn, now_ms) -> float:
+        state = _get_state(conn)
+        timeout = self.base_ms
+
+        text_signal = 0
+        if state.partial_text:
+            text_signal = self._text_signal(state.partial_text)
+            if text_signal < 0:
+                return self.max_ms
+            if text_signal > 0:
+                timeout *= self.complete_factor
+            # 语速越慢，句中停顿通常越长
+            if state.voiced_ms > 0:
+                rate = len(state.partial_text) / (state.voiced_ms / 1000)
+                timeout *= min(max(self.reference_rate / rate, 0.75), 1.5)
+
+        if state.silence_frames:
+            mean_prob = state.silence_prob_sum / state.silence_frames
+            if mean_prob >= self.hesitation_prob:
+                timeout *= 1.25
+            elif mean_prob <= self.clean_prob:
+                timeout *= 0.85
+
+        if text_signal <= 0:
+            device_id = getattr(conn, "device_id", None)
+            if device_id:
+                typical_pause = self.history.quantile(
+                    device_id, self.history_quantile, self.history_min_samples
+                )
+                if typical_pause is not None:
+                    timeout = max(timeout, typical_pause + self.history_margin_ms)
+
+        return min(max(timeout, self.min_ms), self.max_ms)
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "endpoints": self._endpoints,
+                "avg_silence_ms": (
+                    self._timeout_sum / self._endpoints if self._endpoints else 0.0
+                ),
+            }
+
+
+ENDPOINTERS = {
+    "fixed": FixedEndpointer,
+    "adaptive": AdaptiveEndpointer,
+}
+
+
+def create_endpointer(config, silence_ms) -> EndpointerBase:
+    """
+    根据VAD配置创建断句策略
+
+    Args:
+        config: VAD配置，endpointing 可以是 fixed、adaptive 或 "模块路径.类名"
+        silence_ms: 默认静音时长（min_silence_duration_ms）
+    """
+    name = str(config.get("endpointing") or "fixed").strip()
+    endpointer_class = ENDPOINTERS.get(name.lower())
+    if endpointer_class is None:
+        try:
+            module_name, class_name = name.rsplit(".", 1)
+            endpointer_class = getattr(importlib.import_module(module_name), class_name)
+        except (ValueError, ImportError, AttributeError) as e:
+            logger.bind(tag=TAG).error(f"无法加载断句策略 {name}，使用固定静音时长: {e}")
+            endpointer_class = FixedEndpointer
+    return endpointer_class(config, silence_ms)
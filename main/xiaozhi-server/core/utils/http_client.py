@@ -0,0 +1,338 @@
+"""
+全局HTTP客户端
+
+TTS/ASR/LLM等提供者原先每句话都新建 aiohttp.ClientSession 或直接调用 requests/httpx，
+每次请求都要重新进行DNS解析、TCP和TLS握手。这里统一提供复用连接的HTTP客户端：
+- 异步：按事件循环各自维护一个 aiohttp.ClientSession，按主机保持长连接
+- 同步：进程内共享一个 httpx.Client，安装了h2时启用HTTP/2
+- 原先每句话用 asyncio.run 执行的协程，改为在线程持有的长期事件循环中执行，
+  使同一线程的多次请求能复用同一个会话；线程退出前调用 close_thread_loop 关闭，
+  未调用就已结束的线程，其事件循环和会话在其他线程新建事件循环时回收
+"""
+
+import asyncio
+import threading
+import importlib.util
+import aiohttp
+import httpx
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_LIMIT = 100
+DEFAULT_LIMIT_PER_HOST = 20
+DEFAULT_KEEPALIVE_TIMEOUT = 60
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_TIMEOUT = 60
+
+
+class HTTPClientRegistry:
+    """HTTP客户端注册表"""
+
+    def __init__(
+        self,
+        limit=DEFAULT_LIMIT,
+        limit_per_host=DEFAULT_LIMIT_PER_HOST,
+        keepalive_timeout=DEFAULT_KEEPALIVE_TIMEOUT,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        timeout=DEFAULT_TIMEOUT,
+        http2=True,
+    ):
+        """
+        Args:
+            limit: 连接池总连接数上限
+            limit_per_host: 每个主机的连接数上限
+            keepalive_timeout: 空闲长连接保持时间（秒）
+            connect_timeout: 建立连接超时（秒）
+            timeout: 默认请求总超时（秒），单次请求可以自行覆盖
+            http2: 同步客户端是否启用HTTP/2，需要安装h2
+        """
+        self.limit = int(limit)
+        self.limit_per_host = int(limit_per_host)
+        self.keepalive_timeout = float(keepalive_timeout)
+        self.connect_timeout = float(connect_timeout)
+        self.timeout = float(timeout)
+        self.http2 = bool(http2) and importlib.util.find_spec("h2") is not None
+        # 事件循环 -> (创建会话的线程, 会话)
+        self._sessions = {}
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """获取当前事件循环对应的会话，需在事件循环中调用，调用方不要关闭会话"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._sessions.get(loop)
+            if entry is not None and not entry[1].closed:
+                return entry[1]
+            stale = self._pop_stale_sessions()
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    keepalive_timeout=self.keepalive_timeout,
+                    ttl_dns_cache=300,
+                ),
+                timeout=aiohttp.ClientTimeout(
+                    total=self.timeout, sock_connect=self.connect_timeout
+                ),
+            )
+            self._sessions[loop] = (threading.current_thread(), session)
+        for stale_loop, stale_session in stale:
+            self._close_session(stale_loop, stale_session)
+        return session
+
+    def get_client(self) -> httpx.Client:
+        """获取进程内共享的同步客户端，线程安全，调用方不要关闭"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        http2=self.http2,
+                        limits=httpx.Limits(
+                            max_connections=self.limit,
+                            max_keepalive_connections=self.limit_per_host,
+                            keepalive_expiry=self.keepalive_timeout,
+                        ),
+                        timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                    )
+        return self._client
+
+    def stream_timeout(self, sock_read=None) -> aiohttp.ClientTimeout:
+        """
+        流式响应（如LLM的SSE）使用的超时：不限制总时长，只限制建立连接和两次读取之间的间隔
+
+        Args:
+            sock_read: 两次读取之间的最长等待时间（秒），None表示不限制
+        """
+        return aiohttp.ClientTimeout(
+            total=None, sock_connect=self.connect_timeout, sock_read=sock_read
+        )
+
+    def _pop_stale_sessions(self):
+        """取出事件循环已关闭或所属线程已结束的会话，需在持有锁时调用"""
+        stale = []
+        for loop, (thread, session) in list(self._sessions.items()):
+            if loop.is_closed() or session.closed or not thread.is_alive():
+                del self._sessions[loop]
+                stale.append((loop, session))
+        return stale
+
+    def release_loop(self, loop):
+        """取出事件循环对应的会话，由调用方关闭，事件循环即将关闭时调用"""
+        with self._lock:
+            entry = self._sessions.pop(loop, None)
+        return entry[1] if entry is not None else None
+
+    @staticmethod
+    def _close_session(loop, session):
+        if session.closed or loop.is_closed():
+            return
+        try:
+            if loop.is_running():
+                asyncio.run_coroutine_threadsafe(session.close(), loop)
+                return
+        except Exception as e:
+            logger.bind(tag=TAG).debug(f"关闭HTTP会话失败: {e}")
+            return
+
+        # 所属线程已结束，事件循环空闲；当前线程可能正在运行其他事件循环，
+        # 不能直接run_until_complete，交给临时线程关闭
+        def close_in_thread():
+            _shutdown_loop(loop, session)
+
+        threading.Thread(target=close_in_thread, daemon=True).start()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "http2": self.http2,
+                "limit": self.limit,
+                "limit_per_host": self.limit_per_host,
+            }
+
+    def close(self):
+        """关闭所有会话和同步客户端"""
+        with self._lock:
+            sessions = [(loop, entry[1]) for loop, entry in self._sessions.items()]
+            self._sessions.clear()
+            client, self._client = self._client, None
+        for loop, session in sessions:
+            self._close_session(loop, session)
+        if client is not None:
+            client.close()
+
+
+_thread_loops = threading.local()
+
+
+class CancelScope:
+    """
+    从其他线程取消 run_coroutine 正在执行的协程
+
+    在工作线程中用 with scope: 包住阻塞调用，其他线程调用 scope.cancel() 后，
+    正在执行的协程被取消，之后的 run_coroutine 直接抛出 CancelledError
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self._lock = threading.Lock()
+        self._tasks = set()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            tasks = list(self._tasks)
+        for loop, task in tasks:
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+
+    def _add(self, loop, task) -> bool:
+        with self._lock:
+            if self.cancelled:
+                return False
+            self._tasks.add((loop, task))
+            return True
+
+    def _remove(self, loop, task):
+        with self._lock:
+            self._tasks.discard((loop, task))
+
+    def __enter__(self):
+        _thread_loops.scope = self
+        return self
+
+    def __exit__(self, *exc_info):
+        _thread_loops.scope = None
+        return False
+
+
+# run_coroutine 创建的事件循环 -> 所属线程
+_loop_threads = {}
+_loop_threads_lock = threading.Lock()
+
+
+def _shutdown_loop(loop, session=None):
+    """在当前线程关闭空闲的事件循环，先关闭其HTTP会话和未完成的任务"""
+    try:
+        if session is not None and not session.closed:
+            loop.run_until_complete(session.close())
+        tasks = asyncio.all_tasks(loop)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        loop.run_until_complete(loop.shutdown_asyncgens())
+    except Exception as e:
+        logger.bind(tag=TAG).debug(f"关闭事件循环失败: {e}")
+    finally:
+        loop.close()
+
+
+def _reap_thread_loops():
+    """关闭所属线程已结束的事件循环，包括没有HTTP会话的事件循环"""
+    with _loop_threads_lock:
+        dead = [
+            loop
+            for loop, thread in _loop_threads.items()
+            if loop.is_closed() or not thread.is_alive()
+        ]
+        for loop in dead:
+            del _loop_threads[loop]
+    for loop in dead:
+        if loop.is_closed():
+            continue
+        session = _http_clients.release_loop(loop) if _http_clients else None
+        if session is None or session.closed:
+            loop.close()
+        else:
+            # 当前线程可能在关闭会话时被阻塞，交给临时线程关闭
+            HTTPClientRegistry._close_session(loop, session)
+
+
+def close_thread_loop():
+    """关闭当前线程 run_coroutine 使用的事件循环及其HTTP会话，在线程退出前调用"""
+    loop = getattr(_thread_loops, "loop", None)
+    _thread_loops.loop = None
+    if loop is None or loop.is_closed():
+        return
+    with _loop_threads_lock:
+        _loop_threads.pop(loop, None)
+    session = _http_clients.release_loop(loop) if _http_clients else None
+    _shutdown_loop(loop, session)
+
+
+def run_coroutine(coro):
+    """
+    在当前线程持有的长期事件循环中执行协程并返回结果，用于替代 asyncio.run
+
+    asyncio.run 每次都会新建并关闭事件循环，绑定在循环上的HTTP会话无法复用；
+    线程退出前需调用 close_thread_loop 关闭该事件循环
+
+    Raises:
+        asyncio.CancelledError: 所在的CancelScope已被取消
+    """
+    loop = getattr(_thread_loops, "loop", None)
+    if loop is None or loop.is_closed():
+        _reap_thread_loops()
+        loop = asyncio.new_event_loop()
+        _thread_loops.loop = loop
+        with _loop_threads_lock:
+            _loop_threads[loop] = threading.current_thread()
+    scope = getattr(_thread_loops, "scope", None)
+    if scope is None:
+        return loop.run_until_complete(coro)
+
+    task = loop.create_task(coro)
+    if not scope._add(loop, task):
+        task.cancel()
+    try:
+        return loop.run_until_complete(task)
+    finally:
+        scope._remove(loop, task)
+
+
+_http_clients = None
+_http_clients_lock = threading.Lock()
+
+
+def get_http_clients(config=None) -> HTTPClientRegistry:
+    """
+    获取全局HTTP客户端注册表（单例模式）
+
+    Args:
+        config: http_client配置，仅在第一次创建时生效
+
+    Returns:
+        HTTPClientRegistry实例
+    """
+    global _http_clients
+    if _http_clients is None:
+        with _http_clients_lock:
+            if _http_clients is None:
+                config = config or {}
+                _http_clients = HTTPClientRegistry(
+                    limit=config.get("limit") or DEFAULT_LIMIT,
+                    limit_per_host=config.get("limit_per_host") or DEFAULT_LIMIT_PER_HOST,
+                    keepalive_timeout=config.get("keepalive_timeout")
+                    or DEFAULT_KEEPALIVE_TIMEOUT,
+                    connect_timeout=config.get("connect_timeout")
+                    or DEFAULT_CONNECT_TIMEOUT,
+                    timeout=config.get("timeout") or DEFAULT_TIMEOUT,
+                    http2=str(config.get("http2", True)).lower() in ("true", "1", "yes"),
+                )
+    return _http_clients
+
+
+def close_http_clients():
+    """关闭全局HTTP客户端"""
+    global _http_clients
+    with _http_clients_lock:
+        if _http_clients is not None:
+            _http_clients.close()
+            _http_clients = None
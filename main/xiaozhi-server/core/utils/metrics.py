@@ -0,0 +1,147 @@
+"""
+Prometheus文本格式的运行指标，由HTTP服务的 /metrics 接口输出
+
+- LatencyHistogram：耗时直方图（秒）
+- register_stats_source：注册全局服务的 get_stats，其中的数值输出为gauge
+- register_collector：注册直接生成指标文本的采集函数（如单轮对话耗时直方图）
+"""
+
+import re
+import threading
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+METRIC_PREFIX = "xiaozhi"
+# 耗时直方图的分桶上限（秒），最后一个桶为+Inf
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_NAME_RE = re.compile(r"[^a-zA-Z0-9_]")
+
+
+class LatencyHistogram:
+    """耗时直方图，按Prometheus的累计分桶输出"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def render(self, name, labels) -> list:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(
+                f"{name}_bucket{format_labels({**labels, 'le': _format_value(bound)})} {cumulative}"
+            )
+        lines.append(f"{name}_bucket{format_labels({**labels, 'le': '+Inf'})} {self.count}")
+        lines.append(f"{name}_sum{format_labels(labels)} {_format_value(self.sum)}")
+        lines.append(f"{name}_count{format_labels(labels)} {self.count}")
+        return lines
+
+
+def metric_name(*parts) -> str:
+    return "_".join(_NAME_RE.sub("_", str(part)) for part in (METRIC_PREFIX,) + parts)
+
+
+def format_labels(labels) -> str:
+    if not labels:
+        return ""
+    items = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        items.append(f'{key}="{value}"')
+    return "{" + ",".join(items) + "}"
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+_stats_sources = {}
+_collectors = []
+_registry_lock = threading.Lock()
+
+
+def register_stats_source(name, get_stats, label=None):
+    """
+    注册一个全局服务的运行指标
+
+    Args:
+        name: 指标名前缀，如 provider_pool
+        get_stats: 返回dict的函数，其中的数值输出为 xiaozhi_{name}_{key}，
+            值为 {名称: 数值} 的字典时名称作为name标签
+        label: 不为空时get_stats返回 {标签值: {key: 数值}}，标签值作为该标签输出
+    """
+    with _registry_lock:
+        _stats_sources[name] = (get_stats, label)
+
+
+def register_collector(collect):
+    """注册采集函数，collect() 返回若干行Prometheus文本"""
+    with _registry_lock:
+        if collect not in _collectors:
+            _collectors.append(collect)
+
+
+def _flatten(name, stats, labels, gauges):
+    for key, value in stats.items():
+        if isinstance(value, bool):
+            value = int(value)
+        if isinstance(value, (int, float)):
+            gauges.setdefault(metric_name(name, key), []).append((labels, value))
+        elif isinstance(value, dict):
+            for sub_key, sub_value in value.items():
+                if isinstance(sub_value, (int, float)):
+                    gauges.setdefault(metric_name(name, key), []).append(
+                        ({**labels, "name": sub_key}, sub_value)
+                    )
+
+
+def render_metrics() -> str:
+    with _registry_lock:
+        sources = list(_stats_sources.items())
+        collectors = list(_collectors)
+
+    lines = []
+    for collect in collectors:
+        try:
+            lines.extend(collect())
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"采集运行指标失败: {e}")
+
+    gauges = {}
+    for name, (get_stats, label) in sources:
+        try:
+            stats = get_stats()
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"获取{name}运行指标失败: {e}")
+            continue
+        if not stats:
+            continue
+        if label:
+            for label_value, sub_stats in stats.items():
+                if isinstance(sub_stats, dict):
+                    _flatten(name, sub_stats, {label: label_value}, gauges)
+        else:
+            _flatten(name, stats, {}, gauges)
+    for name, samples in gauges.items():
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in samples:
+            lines.append(f"{name}{format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -1,6 +1,7 @@
 from typing import Dict, Any
 from config.logger import setup_logging
 from core.utils import tts, llm, intent, memory, vad, asr
+from core.utils.provider_pool import get_provider_pool, is_shareable
 
 TAG = __name__
 logger = setup_logging()
@@ -15,12 +16,15 @@ def initialize_modules(
     init_tts=False,
     init_memory=False,
     init_intent=False,
+    pooled=None,
 ) -> Dict[str, Any]:
     """
     初始化所有模块组件
 
     Args:
         config: 配置字典
+        pooled: 传入列表时，可共享的模块从全局实例池获取，并把获取到的实例追加到列表中，
+            使用方不再需要时调用 get_provider_pool().release_all(pooled)
 
     Returns:
         Dict[str, Any]: 包含所有初始化后的模块的字典
@@ -41,9 +45,12 @@ def initialize_modules(
             if "type" not in config["LLM"][select_llm_module]
             else config["LLM"][select_llm_module]["type"]
         )
-        modules["llm"] = llm.create_instance(
+        modules["llm"] = create_pooled(
+            "llm",
             llm_type,
             config["LLM"][select_llm_module],
+            lambda: llm.create_instance(llm_type, config["LLM"][select_llm_module]),
+            pooled,
         )
         logger.bind(tag=TAG).info(f"初始化组件: llm成功 {select_llm_module}")
 
@@ -84,20 +91,32 @@ def initialize_modules(
             if "type" not in config["VAD"][select_vad_module]
             else config["VAD"][select_vad_module]["type"]
         )
-        modules["vad"] = vad.create_instance(
+        modules["vad"] = create_pooled(
+            "vad",
             vad_type,
             config["VAD"][select_vad_module],
+            lambda: vad.create_instance(vad_type, config["VAD"][select_vad_module]),
+            pooled,
         )
         logger.bind(tag=TAG).info(f"初始化组件: vad成功 {select_vad_module}")
 
     # 初始化ASR模块
     if init_asr:
         select_asr_module = config["selected_module"]["ASR"]
-        modules["asr"] = initialize_asr(config)
+        modules["asr"] = initialize_asr(config, pooled)
         logger.bind(tag=TAG).info(f"初始化组件: asr成功 {select_asr_module}")
     return modules
 
 
+def create_pooled(kind, provider_type, module_config, factory, pooled=None):
+    """pooled为列表且该模块可共享时从全局实例池获取实例，否则直接创建"""
+    if pooled is None or not is_shareable(kind, provider_type):
+        return factory()
+    instance = get_provider_pool().acquire(kind, provider_type, module_config, factory)
+    pooled.append(instance)
+    return instance
+
+
 def initialize_tts(config):
     select_tts_module = config["selected_module"]["TTS"]
     tts_type = (
@@ -113,17 +132,22 @@ def initialize_tts(config):
     return new_tts
 
 
-def initialize_asr(config):
+def initialize_asr(config, pooled=None):
     select_asr_module = config["selected_module"]["ASR"]
     asr_type = (
         select_asr_module
         if "type" not in config["ASR"][select_asr_module]
         else config["ASR"][select_asr_module]["type"]
     )
-    new_asr = asr.create_instance(
+    delete_audio = str(config.get("delete_audio", True)).lower() in ("true", "1", "yes")
+    new_asr = create_pooled(
+        "asr",
         asr_type,
-        config["ASR"][select_asr_module],
-        str(config.get("delete_audio", True)).lower() in ("true", "1", "yes"),
+        [config["ASR"][select_asr_module], delete_audio],
+        lambda: asr.create_instance(
+            asr_type, config["ASR"][select_asr_module], delete_audio
+        ),
+        pooled,
     )
     logger.bind(tag=TAG).info("ASR模块初始化完成")
     return new_asr
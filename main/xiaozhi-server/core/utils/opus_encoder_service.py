@@ -0,0 +1,240 @@
+"""
+Opus编码服务
+
+原先每句话都要新建一个Opus编码器，每一帧还要经过切片、补零拼接、
+np.frombuffer、tobytes多次拷贝。这里统一提供：
+- 按 (采样率, 通道数, 应用模式) 复用的编码器池，归还时重置编码器状态
+- 基于内存地址偏移的分帧，编码时不再拷贝PCM数据
+- 一次调用返回整段音频全部Opus帧的批量接口
+- 可通过配置调整的比特率和复杂度
+"""
+
+import ctypes
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Any, List
+
+import numpy as np
+import opuslib_next
+import opuslib_next.api
+import opuslib_next.api.encoder
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 单个Opus包的最大字节数
+MAX_PACKET_BYTES = 4000
+# 每个编码器规格最多保留的空闲编码器数量
+DEFAULT_MAX_IDLE = 16
+
+
+def iter_pcm_frames(pcm, frame_bytes: int):
+    """
+    按帧切分PCM数据，返回memoryview切片，不拷贝数据
+
+    最后一帧不足时补零，只有这一帧会产生拷贝
+    """
+    view = memoryview(pcm).cast("B")
+    full_end = len(view) - len(view) % frame_bytes
+    for offset in range(0, full_end, frame_bytes):
+        yield view[offset : offset + frame_bytes]
+    if full_end < len(view):
+        last_frame = bytearray(frame_bytes)
+        last_frame[: len(view) - full_end] = view[full_end:]
+        yield memoryview(last_frame)
+
+
+class PooledOpusEncoder:
+    """可复用的Opus编码器，直接按内存地址编码，并复用输出缓冲区"""
+
+    def __init__(self, sample_rate, channels, application, bitrate=None, complexity=None):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.application = application
+        self.encoder = opuslib_next.Encoder(sample_rate, channels, application)
+        if bitrate:
+            self.encoder.bitrate = int(bitrate)
+        if complexity is not None:
+            self.encoder.complexity = int(complexity)
+        self._output = (ctypes.c_char * MAX_PACKET_BYTES)()
+
+    def reset(self):
+        """重置编码器状态，比特率、复杂度等设置保持不变"""
+        self.encoder.reset_state()
+
+    def encode_address(self, address: int, frame_size: int) -> bytes:
+        """编码内存地址处的一帧16位PCM数据"""
+        result = opuslib_next.api.encoder.libopus_encode(
+            self.encoder.encoder_state,
+            ctypes.cast(address, opuslib_next.api.c_int16_pointer),
+            frame_size,
+            self._output,
+            MAX_PACKET_BYTES,
+        )
+        if result < 0:
+            raise opuslib_next.OpusError(result)
+        return ctypes.string_at(self._output, result)
+
+    def encode_pcm(self, pcm, frame_size: int, callback: Callable[[Any], Any] = None):
+        """
+        将整段PCM数据编码为Opus帧
+
+        Args:
+            pcm: 16位小端PCM数据（bytes、bytearray、memoryview或int16数组）
+            frame_size: 每帧每通道的采样点数
+            callback: 每编码一帧调用一次，为空时返回帧列表
+        """
+        if not isinstance(pcm, np.ndarray):
+            view = memoryview(pcm).cast("B")
+            # 原始PCM可能是奇数字节，末尾补零到整数个采样点，与原先按字节补零一致
+            if len(view) % 2:
+                padded = bytearray(len(view) + 1)
+                padded[:-1] = view
+                pcm = padded
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        frame_samples = frame_size * self.channels
+        full_end = len(samples) - len(samples) % frame_samples
+        base = samples.ctypes.data if len(samples) else 0
+        frames = [] if callback is None else None
+        emit = callback or frames.append
+
+        for offset in range(0, full_end, frame_samples):
+            emit(self.encode_address(base + offset * 2, frame_size))
+
+        # 最后一帧不足时补零
+        if full_end < len(samples):
+            last_frame = np.zeros(frame_samples, dtype=np.int16)
+            last_frame[: len(samples) - full_end] = samples[full_end:]
+            emit(self.encode_address(last_frame.ctypes.data, frame_size))
+        return frames
+
+
+class OpusEncoderService:
+    """Opus编码服务"""
+
+    def __init__(self, bitrate=None, complexity=None, max_idle=DEFAULT_MAX_IDLE):
+        """
+        Args:
+            bitrate: 比特率(bps)，为空时使用libopus默认值
+            complexity: 编码复杂度0-10，越高音质越好、CPU消耗越大，为空时使用libopus默认值
+            max_idle: 每种编码器规格最多保留的空闲编码器数量
+        """
+        self.bitrate = int(bitrate) if bitrate else None
+        self.complexity = int(complexity) if complexity not in (None, "") else None
+        self.max_idle = max(1, int(max_idle))
+        self._idle = defaultdict(list)
+        self._lock = threading.Lock()
+        self._created = 0
+        self._reused = 0
+
+    def acquire(
+        self, sample_rate=16000, channels=1, application=opuslib_next.APPLICATION_AUDIO
+    ) -> PooledOpusEncoder:
+        """从池中取出一个编码器，没有空闲编码器时新建"""
+        key = (sample_rate, channels, application)
+        with self._lock:
+            idle = self._idle[key]
+            if idle:
+                self._reused += 1
+                return idle.pop()
+            self._created += 1
+        return PooledOpusEncoder(
+            sample_rate, channels, application, self.bitrate, self.complexity
+        )
+
+    def release(self, encoder: PooledOpusEncoder):
+        """归还编码器，归还前重置状态，避免上一段音频影响下一段"""
+        try:
+            encoder.reset()
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"重置Opus编码器失败，丢弃该编码器: {e}")
+            return
+        key = (encoder.sample_rate, encoder.channels, encoder.application)
+        with self._lock:
+            if len(self._idle[key]) < self.max_idle:
+                self._idle[key].append(encoder)
+
+    @contextmanager
+    def encoder(
+        self, sample_rate=16000, channels=1, application=opuslib_next.APPLICATION_AUDIO
+    ):
+        """以上下文管理器的方式借用编码器"""
+        encoder = self.acquire(sample_rate, channels, application)
+        try:
+            yield encoder
+        finally:
+            self.release(encoder)
+
+    def encode_frames(
+        self,
+        pcm,
+        sample_rate=16000,
+        channels=1,
+        frame_duration_ms=60,
+        application=opuslib_next.APPLICATION_AUDIO,
+    ) -> List[bytes]:
+        """
+        批量编码，一次调用返回整段PCM数据的全部Opus帧
+
+        Args:
+            pcm: 16位小端PCM数据
+            sample_rate: 采样率
+            channels: 通道数
+            frame_duration_ms: 帧时长(毫秒)
+        """
+        frame_size = sample_rate * frame_duration_ms // 1000
+        with self.encoder(sample_rate, channels, application) as encoder:
+            return encoder.encode_pcm(pcm, frame_size)
+
+    def encode_stream(
+        self,
+        pcm,
+        callback: Callable[[Any], Any],
+        sample_rate=16000,
+        channels=1,
+        frame_duration_ms=60,
+        application=opuslib_next.APPLICATION_AUDIO,
+    ):
+        """编码整段PCM数据，每得到一帧调用一次callback"""
+        frame_size = sample_rate * frame_duration_ms // 1000
+        with self.encoder(sample_rate, channels, application) as encoder:
+            encoder.encode_pcm(pcm, frame_size, callback)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "created": self._created,
+                "reused": self._reused,
+                "idle": sum(len(idle) for idle in self._idle.values()),
+                "bitrate": self.bitrate,
+                "complexity": self.complexity,
+            }
+
+
+_opus_encoder_service = None
+_opus_encoder_service_lock = threading.Lock()
+
+
+def get_opus_encoder_service(config=None) -> OpusEncoderService:
+    """
+    获取全局Opus编码服务（单例模式）
+
+    Args:
+        config: opus_encoder配置，仅在第一次创建时生效
+
+    Returns:
+        OpusEncoderService实例
+    """
+    global _opus_encoder_service
+    if _opus_encoder_service is None:
+        with _opus_encoder_service_lock:
+            if _opus_encoder_service is None:
+                config = config or {}
+                _opus_encoder_service = OpusEncoderService(
+                    bitrate=config.get("bitrate"),
+                    complexity=config.get("complexity"),
+                    max_idle=config.get("max_idle") or DEFAULT_MAX_IDLE,
+                )
+    return _opus_encoder_service
@@ -10,6 +10,7 @@ import gc
 from opuslib_next import Encoder
 from opuslib_next import constants
 from typing import Optional, Callable, Any
+from core.utils.opus_encoder_service import get_opus_encoder_service
 
 class OpusEncoderUtils:
     """PCM到Opus的编码器"""
@@ -31,9 +32,12 @@ class OpusEncoderUtils:
         # 总帧大小 = 每帧样本数 * 通道数
         self.total_frame_size = self.frame_size * channels
 
-        # 比特率和复杂度设置
-        self.bitrate = 24000  # bps
-        self.complexity = 10  # 最高质量
+        # 比特率和复杂度设置，优先使用opus_encoder配置
+        encoder_service = get_opus_encoder_service()
+        self.bitrate = encoder_service.bitrate or 24000  # bps
+        self.complexity = (
+            encoder_service.complexity if encoder_service.complexity is not None else 10
+        )  # 默认最高质量
 
         # 缓冲区初始化为空
         self.buffer = np.array([], dtype=np.int16)
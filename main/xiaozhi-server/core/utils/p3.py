@@ -56,4 +56,42 @@ def decode_opus_from_bytes(input_bytes):
         total_frames += 1
 
     total_duration = (total_frames * frame_duration_ms) / 1000.0
-    return opus_datas, total_duration
\ No newline at end of file
+    return opus_datas, total_duration
+
+def encode_opus_to_file(opus_datas, output_file):
+    """
+    将 Opus 数据包列表按p3格式写入文件
+    """
+    with open(output_file, 'wb') as f:
+        for opus_data in opus_datas:
+            # 头部（4字节）：[1字节类型，1字节保留，2字节长度]
+            f.write(struct.pack('>BBH', 0, 0, len(opus_data)))
+            f.write(opus_data)
+
+
+def decode_opus_from_file_stream(input_file, callback):
+    """
+    从p3文件中逐帧解码 Opus 数据，每解出一帧调用一次callback
+    """
+    with open(input_file, 'rb') as f:
+        _decode_opus_stream(f, callback)
+
+
+def decode_opus_from_bytes_stream(input_bytes, callback):
+    """
+    从p3二进制数据中逐帧解码 Opus 数据，每解出一帧调用一次callback
+    """
+    import io
+    _decode_opus_stream(io.BytesIO(input_bytes), callback)
+
+
+def _decode_opus_stream(f, callback):
+    while True:
+        header = f.read(4)
+        if not header:
+            break
+        _, _, data_len = struct.unpack('>BBH', header)
+        opus_data = f.read(data_len)
+        if len(opus_data) != data_len:
+            raise ValueError(f"Data length({len(opus_data)}) mismatch({data_len}).")
+        callback(opus_data)
@@ -0,0 +1,224 @@
+"""
+按配置共享的提供者实例池
+
+开启智控台后，每个设备连接时都会用自己的差异化配置重新创建LLM、VLLM、VAD、ASR等模块，
+以及意图识别、记忆总结使用的专用LLM。成千上万的设备往往只对应少数几个智能体配置，
+重复创建的实例完全相同。这里按「模块类别 + 类型 + 配置内容」的稳定哈希缓存实例：
+- 无状态或线程安全的提供者（LLM、VLLM、本地ASR、VAD）在连接之间共享，按引用计数管理
+- 引用计数归零后进入空闲状态，超过 idle_ttl 秒或空闲实例超过 max_idle 个时淘汰
+- TTS、远程ASR、记忆、意图识别等持有连接私有状态的模块不共享，仍为每个连接单独创建
+"""
+
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_IDLE_TTL = 300
+DEFAULT_MAX_IDLE = 64
+
+# 可以共享的模块类别
+SHAREABLE_KINDS = ("llm", "vllm", "vad", "asr")
+# 可以共享的ASR类型：本地模型一个实例可以被多个连接共享，远程ASR每个连接持有独立的websocket和线程
+SHAREABLE_ASR_TYPES = ("fun_local", "sherpa_onnx_local", "vosk", "mock")
+
+
+def config_key(kind, provider_type, config) -> str:
+    """模块配置的稳定哈希，字典键的顺序不影响结果"""
+    payload = json.dumps(
+        [kind, provider_type, config], sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def is_shareable(kind, provider_type) -> bool:
+    if kind == "asr":
+        return provider_type in SHAREABLE_ASR_TYPES
+    return kind in SHAREABLE_KINDS
+
+
+class _PoolEntry:
+    __slots__ = ("key", "kind", "instance", "refs", "idle_since")
+
+    def __init__(self, key, kind, instance):
+        self.key = key
+        self.kind = kind
+        self.instance = instance
+        self.refs = 0
+        self.idle_since = None
+
+
+class ProviderPool:
+    """提供者实例池，线程安全"""
+
+    def __init__(self, idle_ttl=DEFAULT_IDLE_TTL, max_idle=DEFAULT_MAX_IDLE):
+        """
+        Args:
+            idle_ttl: 实例不再被任何连接使用后保留的时间（秒）
+            max_idle: 最多保留的空闲实例数
+        """
+        self.idle_ttl = float(idle_ttl)
+        self.max_idle = int(max_idle)
+        self._entries = {}
+        # id(实例) -> 条目，释放时查找
+        self._by_instance = {}
+        # 空闲条目，按进入空闲的先后排序
+        self._idle = OrderedDict()
+        # 同一配置的创建锁，避免大量设备同时连接时重复创建
+        self._creating = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def acquire(self, kind, provider_type, config, factory):
+        """
+        获取配置对应的共享实例，引用计数加一；不存在时调用 factory() 创建
+
+        不可共享的类别直接调用 factory() 返回新实例，release 时会被忽略
+        """
+        if not is_shareable(kind, provider_type):
+            return factory()
+        key = config_key(kind, provider_type, config)
+        instance = self._take(key)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            create_lock = self._creating.setdefault(key, threading.Lock())
+        with create_lock:
+            # 等待期间其他线程可能已经创建好了
+            instance = self._take(key)
+            if instance is not None:
+                return instance
+            try:
+                instance = factory()
+                with self._lock:
+                    entry = _PoolEntry(key, kind, instance)
+                    entry.refs = 1
+                    self._entries[key] = entry
+                    self._by_instance[id(instance)] = entry
+                    self.misses += 1
+            finally:
+                with self._lock:
+                    self._creating.pop(key, None)
+        logger.bind(tag=TAG).debug(f"创建共享{kind}实例: {provider_type}")
+        return instance
+
+    def _take(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry.refs += 1
+            if entry.idle_since is not None:
+                entry.idle_since = None
+                self._idle.pop(key, None)
+            self.hits += 1
+            return entry.instance
+
+    def release(self, instance):
+        """连接不再使用该实例，引用计数减一"""
+        if instance is None:
+            return
+        with self._lock:
+            entry = self._by_instance.get(id(instance))
+            if entry is None or entry.instance is not instance or entry.refs <= 0:
+                return
+            entry.refs -= 1
+            if entry.refs == 0:
+                entry.idle_since = time.monotonic()
+                self._idle[entry.key] = entry
+        self.evict_idle()
+
+    def release_all(self, instances):
+        for instance in instances:
+            self.release(instance)
+
+    def evict_idle(self):
+        """淘汰空闲超时或超出数量上限的实例"""
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            while self._idle:
+                key, entry = next(iter(self._idle.items()))
+                if (
+                    len(self._idle) <= self.max_idle
+                    and now - entry.idle_since < self.idle_ttl
+                ):
+                    break
+                del self._idle[key]
+                del self._entries[key]
+                self._by_instance.pop(id(entry.instance), None)
+                evicted.append(entry)
+            self.evictions += len(evicted)
+        for entry in evicted:
+            logger.bind(tag=TAG).debug(f"淘汰空闲的共享{entry.kind}实例")
+        return len(evicted)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "instances": len(self._entries),
+                "idle": len(self._idle),
+                "refs": sum(entry.refs for entry in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_instance.clear()
+            self._idle.clear()
+
+
+_provider_pool = None
+_provider_pool_lock = threading.Lock()
+
+
+def is_provider_pool_enabled(config) -> bool:
+    """判断配置中是否开启了实例池，默认开启"""
+    pool_config = config.get("provider_pool") or {}
+    if not isinstance(pool_config, dict):
+        return True
+    return str(pool_config.get("enable", True)).lower() in ("true", "1", "yes")
+
+
+def get_provider_pool(config=None) -> ProviderPool:
+    """
+    获取全局提供者实例池（单例模式）
+
+    Args:
+        config: provider_pool配置，仅在第一次创建时生效
+
+    Returns:
+        ProviderPool实例
+    """
+    global _provider_pool
+    if _provider_pool is None:
+        with _provider_pool_lock:
+            if _provider_pool is None:
+                config = config or {}
+                _provider_pool = ProviderPool(
+                    idle_ttl=config.get("idle_ttl") or DEFAULT_IDLE_TTL,
+                    max_idle=config.get("max_idle") or DEFAULT_MAX_IDLE,
+                )
+    return _provider_pool
+
+
+def shutdown_provider_pool():
+    """清空全局提供者实例池"""
+    global _provider_pool
+    with _provider_pool_lock:
+        if _provider_pool is not None:
+            _provider_pool.clear()
+            _provider_pool = None
@@ -0,0 +1,535 @@
+"""
+全局聊天记录上报服务
+
+原先每个连接各自启动上报线程，每条上报都在线程池中 asyncio.run 一次（新建事件循环和HTTP客户端），
+并把opus解码为WAV后再上传。这里改为全服务共用一个上报服务：
+- 一个后台线程持有长期存在的事件循环和HTTP连接池，所有连接的上报进入同一个队列
+- 攒够 max_batch_size 条或等待 flush_interval_ms 后成批上传，批内并发发送
+- 音频默认仍解码为WAV，智控台可以直接用聊天记录中的音频注册声纹；
+  可配置为 ogg，把opus包直接封装为Ogg/Opus，不需要解码，体积约为WAV的1/10，
+  但无法再从聊天记录注册声纹
+- 内存队列有上限：队列已满或manager-api不可用时，上报写入磁盘暂存目录，恢复后按写入顺序补传；
+  暂存目录超过上限时丢弃最早的记录
+"""
+
+import os
+import json
+import time
+import asyncio
+import threading
+from collections import deque
+from config.logger import setup_logging
+from config.manage_api_client import (
+    ManageApiClient,
+    build_report_payload,
+    send_report,
+)
+from core.utils.util import opus_datas_to_ogg_bytes, opus_datas_to_wav_bytes
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_FLUSH_INTERVAL_MS = 500
+DEFAULT_UPLOAD_CONCURRENCY = 8
+DEFAULT_MAX_PENDING = 2000
+DEFAULT_SPOOL_DIR = os.path.join("data", "report_spool")
+DEFAULT_SPOOL_MAX_MB = 512
+DEFAULT_RETRY_INTERVAL = 30
+
+AUDIO_ENCODERS = {
+    "ogg": opus_datas_to_ogg_bytes,
+    "wav": opus_datas_to_wav_bytes,
+}
+
+
+class ReportSpool:
+    """上报的磁盘暂存，每次写入一个JSON Lines文件，文件名按写入顺序递增，线程安全"""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        # (路径, 字节数, 条数)，最早写入的在前
+        self._files = deque()
+        self._bytes = 0
+        self._items = 0
+        self._seq = 0
+        self.dropped = 0
+        if self.max_bytes > 0:
+            self._load()
+
+    def _load(self):
+        """加载上次运行遗留的暂存文件"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            names = sorted(
+                name for name in os.listdir(self.directory) if name.endswith(".jsonl")
+            )
+        except OSError as e:
+            logger.bind(tag=TAG).error(f"上报暂存目录不可用: {self.directory}, {e}")
+            self.max_bytes = 0
+            return
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                continue
+            self._files.append((path, len(data), data.count(b"\n")))
+            self._bytes += len(data)
+            self._items += data.count(b"\n")
+        if self._files:
+            logger.bind(tag=TAG).info(
+                f"发现{self._items}条未完成的聊天记录上报，将在manager-api可用时补传"
+            )
+
+    def _new_path(self):
+        self._seq += 1
+        return os.path.join(self.directory, f"{time.time_ns()}-{self._seq:06d}.jsonl")
+
+    @staticmethod
+    def _dump(path, payloads) -> int:
+        """先写临时文件再改名，避免进程退出时留下不完整的文件"""
+        data = "".join(
+            json.dumps(payload, ensure_ascii=False) + "\n" for payload in payloads
+        ).encode("utf-8")
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+        return len(data)
+
+    def write(self, payloads) -> bool:
+        """暂存一批上报，超出容量时丢弃最早的文件"""
+        if not payloads:
+            return True
+        if self.max_bytes <= 0:
+            self.dropped += len(payloads)
+            return False
+        with self._lock:
+            path = self._new_path()
+            try:
+                size = self._dump(path, payloads)
+            except OSError as e:
+                logger.bind(tag=TAG).error(f"写入上报暂存文件失败: {e}")
+                self.dropped += len(payloads)
+                return False
+            self._files.append((path, size, len(payloads)))
+            self._bytes += size
+            self._items += len(payloads)
+            while self._bytes > self.max_bytes and len(self._files) > 1:
+                self._discard(self._files.popleft())
+        return True
+
+    def _discard(self, entry):
+        path, size, count = entry
+        self._bytes -= size
+        self._items -= count
+        self.dropped += count
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        logger.bind(tag=TAG).warning(f"上报暂存超过上限，丢弃最早的{count}条记录")
+
+    def peek(self, max_items):
+        """
+        读取最早的若干个暂存文件，合计不超过max_items条（至少一个文件）
+
+        Returns:
+            [(路径, 上报列表)]
+        """
+        with self._lock:
+            paths, count = [], 0
+            for path, _, items in self._files:
+                if paths and count + items > max_items:
+                    break
+                paths.append(path)
+                count += items
+        entries = []
+        for path in paths:
+            payloads = []
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            payloads.append(json.loads(line))
+                        except ValueError:
+                            continue
+            except OSError as e:
+                logger.bind(tag=TAG).error(f"读取上报暂存文件失败: {path}, {e}")
+            entries.append((path, payloads))
+        return entries
+
+    def _index(self, path):
+        for index, entry in enumerate(self._files):
+            if entry[0] == path:
+                return index
+        return -1
+
+    def remove(self, path):
+        """暂存文件已全部补传"""
+        with self._lock:
+            index = self._index(path)
+            if index < 0:
+                return
+            _, size, count = self._files[index]
+            del self._files[index]
+            self._bytes -= size
+            self._items -= count
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def replace(self, path, payloads):
+        """暂存文件只补传了一部分，保留剩余的上报"""
+        if not payloads:
+            self.remove(path)
+            return
+        with self._lock:
+            index = self._index(path)
+            # 补传期间已因超出容量被丢弃
+            if index < 0:
+                return
+            try:
+                size = self._dump(path, payloads)
+            except OSError as e:
+                logger.bind(tag=TAG).error(f"更新上报暂存文件失败: {e}")
+                return
+            _, old_size, old_count = self._files[index]
+            self._files[index] = (path, size, len(payloads))
+            self._bytes += size - old_size
+            self._items += len(payloads) - old_count
+
+    def __len__(self):
+        with self._lock:
+            return self._items
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "spool_files": len(self._files),
+                "spool_items": self._items,
+                "spool_bytes": self._bytes,
+                "spool_dropped": self.dropped,
+            }
+
+
+class ReportService:
+    """聊天记录上报服务"""
+
+    def __init__(
+        self,
+        audio_format="wav",
+        max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+        flush_interval_ms=DEFAULT_FLUSH_INTERVAL_MS,
+        upload_concurrency=DEFAULT_UPLOAD_CONCURRENCY,
+        max_pending=DEFAULT_MAX_PENDING,
+        spool_dir=DEFAULT_SPOOL_DIR,
+        spool_max_mb=DEFAULT_SPOOL_MAX_MB,
+        retry_interval=DEFAULT_RETRY_INTERVAL,
+    ):
+        """
+        Args:
+            audio_format: 上报音频格式，wav 或 ogg
+            max_batch_size: 每批最多上报的条数
+            flush_interval_ms: 收到第一条上报后最多等待多久凑成一批
+            upload_concurrency: 同时发送的上报请求数
+            max_pending: 内存中最多等待上报的条数，超出的直接写入磁盘
+            spool_dir: 磁盘暂存目录
+            spool_max_mb: 磁盘暂存上限（MB），0表示不暂存
+            retry_interval: manager-api不可用时，多久后再尝试上报（秒）
+        """
+        audio_format = str(audio_format or "wav").lower()
+        if audio_format not in AUDIO_ENCODERS:
+            logger.bind(tag=TAG).warning(f"不支持的上报音频格式 {audio_format}，使用wav")
+            audio_format = "wav"
+        self.audio_format = audio_format
+        self._encode_audio = AUDIO_ENCODERS[audio_format]
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.flush_interval = max(0, int(flush_interval_ms)) / 1000
+        self.upload_concurrency = max(1, int(upload_concurrency))
+        self.max_pending = max(1, int(max_pending))
+        self.retry_interval = float(retry_interval)
+        self.spool = ReportSpool(spool_dir, float(spool_max_mb) * 1024 * 1024)
+
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._stopped = False
+        # 在此之前不再尝试上传，直接写入磁盘
+        self._retry_at = 0.0
+        self._wakeup = None
+        self._semaphore = None
+
+        # 指标
+        self._submitted = 0
+        self._uploaded = 0
+        self._failed = 0
+        self._spooled = 0
+        self._replayed = 0
+        self._overflowed = 0
+        self._batches = 0
+        self._batched = 0
+        self._audio_bytes = 0
+        self._encode_seconds = 0.0
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run_loop, name="report-worker", daemon=True
+        )
+        self._thread.start()
+        logger.bind(tag=TAG).info(
+            f"聊天记录上报服务已启动，音频格式{self.audio_format}，每批最多{self.max_batch_size}条"
+        )
+
+    def submit(
+        self, mac_address, session_id, chat_type, content, opus_datas, report_time
+    ):
+        """
+        提交一条上报，可在任意线程调用，不会阻塞等待上传
+
+        Args:
+            opus_datas: opus包列表，不上报音频时为None
+        """
+        if not content:
+            return
+        item = (mac_address, session_id, chat_type, content, opus_datas, report_time)
+        with self._lock:
+            self._submitted += 1
+            overflow = self._stopped or len(self._pending) >= self.max_pending
+            if overflow:
+                self._overflowed += 1
+            else:
+                self._pending.append(item)
+        if overflow:
+            # 上报堆积，直接写入磁盘，等待后台补传
+            if self.spool.write(self._encode([item])):
+                self._spooled += 1
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._notify)
+        except RuntimeError:
+            pass
+
+    def _notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _encode(self, items):
+        """把上报转换为请求体，音频按配置的格式编码"""
+        start = time.process_time()
+        payloads = []
+        for mac_address, session_id, chat_type, content, opus_datas, report_time in items:
+            audio = None
+            if opus_datas:
+                try:
+                    audio = self._encode_audio(opus_datas)
+                    self._audio_bytes += len(audio)
+                except Exception as e:
+                    logger.bind(tag=TAG).error(f"上报音频编码失败: {e}")
+            payloads.append(
+                build_report_payload(
+                    mac_address, session_id, chat_type, content, audio, report_time
+                )
+            )
+        self._encode_seconds += time.process_time() - start
+        return payloads
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._worker())
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"聊天记录上报服务异常退出: {e}")
+        finally:
+            self._loop.close()
+
+    async def _worker(self):
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.upload_concurrency)
+        try:
+            while not self._stopped:
+                # 优先上传实时的上报，空闲时补传磁盘中的上报
+                if not self._pending and self._can_replay():
+                    await self._replay_spool()
+                    continue
+                batch = await self._next_batch()
+                if batch:
+                    await self._flush(batch)
+        finally:
+            # 停止时未上传的上报写入磁盘，下次启动后补传
+            with self._lock:
+                remaining, self._pending = list(self._pending), deque()
+            if remaining and self.spool.write(self._encode(remaining)):
+                self._spooled += len(remaining)
+            if ManageApiClient._instance is not None:
+                await ManageApiClient.close_async_client()
+
+    def _can_replay(self):
+        return (
+            len(self.spool) > 0
+            and time.monotonic() >= self._retry_at
+            and ManageApiClient._instance is not None
+        )
+
+    async def _wait(self, timeout):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _next_batch(self):
+        """等待下一批上报：攒够max_batch_size条或距第一条超过flush_interval"""
+        self._wakeup.clear()
+        if not self._pending and not self._stopped:
+            # 空闲时定期醒来，检查manager-api恢复后是否需要补传
+            await self._wait(1.0)
+        if not self._pending:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(self._pending) < self.max_batch_size and not self._stopped:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._wakeup.clear()
+            await self._wait(remaining)
+        with self._lock:
+            count = min(len(self._pending), self.max_batch_size)
+            return [self._pending.popleft() for _ in range(count)]
+
+    async def _flush(self, batch):
+        payloads = self._encode(batch)
+        self._batches += 1
+        self._batched += len(batch)
+        if ManageApiClient._instance is None:
+            return
+        if time.monotonic() < self._retry_at:
+            retry = payloads
+        else:
+            retry = await self._upload(payloads)
+        if retry and self.spool.write(retry):
+            self._spooled += len(retry)
+
+    async def _upload(self, payloads):
+        """并发上传一批上报，返回需要稍后重试的上报"""
+        last_error = None
+
+        async def send(payload):
+            nonlocal last_error
+            async with self._semaphore:
+                try:
+                    await send_report(payload)
+                    return None
+                except Exception as e:
+                    if ManageApiClient._should_retry(e):
+                        last_error = e
+                        return payload
+                    self._failed += 1
+                    logger.bind(tag=TAG).error(f"聊天记录上报失败: {e}")
+                    return None
+
+        results = await asyncio.gather(*(send(payload) for payload in payloads))
+        retry = [payload for payload in results if payload is not None]
+        self._uploaded += len(payloads) - len(retry)
+        if retry:
+            self._retry_at = time.monotonic() + self.retry_interval
+            logger.bind(tag=TAG).warning(
+                f"manager-api暂时不可用，{len(retry)}条上报写入磁盘，"
+                f"{self.retry_interval:.0f}秒后重试: {last_error}"
+            )
+        return retry
+
+    async def _replay_spool(self):
+        """补传最早的几个暂存文件"""
+        entries = self.spool.peek(self.max_batch_size)
+        payloads = [payload for _, items in entries for payload in items]
+        retry = []
+        for start in range(0, len(payloads), self.max_batch_size):
+            chunk = payloads[start : start + self.max_batch_size]
+            if time.monotonic() < self._retry_at:
+                retry.extend(chunk)
+            else:
+                retry.extend(await self._upload(chunk))
+        self._replayed += len(payloads) - len(retry)
+        retry_ids = {id(payload) for payload in retry}
+        for path, items in entries:
+            self.spool.replace(path, [item for item in items if id(item) in retry_ids])
+
+    def get_stats(self) -> dict:
+        """获取运行指标"""
+        with self._lock:
+            pending = len(self._pending)
+        stats = {
+            "audio_format": self.audio_format,
+            "submitted": self._submitted,
+            "uploaded": self._uploaded,
+            "failed": self._failed,
+            "pending": pending,
+            "spooled": self._spooled,
+            "replayed": self._replayed,
+            "overflowed": self._overflowed,
+            "batches": self._batches,
+            "avg_batch_size": self._batched / self._batches if self._batches else 0.0,
+            "audio_bytes": self._audio_bytes,
+            "encode_cpu_seconds": self._encode_seconds,
+        }
+        stats.update(self.spool.get_stats())
+        return stats
+
+    def shutdown(self, timeout=5.0):
+        """停止服务，未上传的上报写入磁盘"""
+        with self._lock:
+            self._stopped = True
+        try:
+            self._loop.call_soon_threadsafe(self._notify)
+        except RuntimeError:
+            pass
+        self._thread.join(timeout)
+
+
+_report_service = None
+_report_service_lock = threading.Lock()
+
+
+def get_report_service(config=None) -> ReportService:
+    """
+    获取全局聊天记录上报服务（单例模式）
+
+    Args:
+        config: report_service配置，仅在第一次创建时生效
+
+    Returns:
+        ReportService实例
+    """
+    global _report_service
+    if _report_service is None:
+        with _report_service_lock:
+            if _report_service is None:
+                config = config or {}
+                _report_service = ReportService(
+                    audio_format=config.get("audio_format") or "wav",
+                    max_batch_size=config.get("max_batch_size")
+                    or DEFAULT_MAX_BATCH_SIZE,
+                    flush_interval_ms=config.get(
+                        "flush_interval_ms", DEFAULT_FLUSH_INTERVAL_MS
+                    ),
+                    upload_concurrency=config.get("upload_concurrency")
+                    or DEFAULT_UPLOAD_CONCURRENCY,
+                    max_pending=config.get("max_pending") or DEFAULT_MAX_PENDING,
+                    spool_dir=config.get("spool_dir") or DEFAULT_SPOOL_DIR,
+                    spool_max_mb=config.get("spool_max_mb", DEFAULT_SPOOL_MAX_MB),
+                    retry_interval=config.get("retry_interval")
+                    or DEFAULT_RETRY_INTERVAL,
+                )
+    return _report_service
+
+
+def shutdown_report_service():
+    """关闭全局聊天记录上报服务"""
+    global _report_service
+    with _report_service_lock:
+        if _report_service is not None:
+            _report_service.shutdown()
+            _report_service = None
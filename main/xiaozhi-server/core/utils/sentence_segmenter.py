@@ -0,0 +1,136 @@
+"""
+大模型流式输出的增量断句
+
+原先每收到一个token都把已收到的全部文本重新拼接，再对每个标点做一次rfind，
+一段长回答的断句开销随长度平方增长。这里只扫描新收到的字符：
+- 第一句使用包含逗号的标点集合，尽快送出第一段以降低首帧延迟，之后使用句末标点
+- 可设置一段的最少字数（不足时继续累积）和最多字数（长时间没有标点时强制切分）
+- 数字中间的小数点、千分位逗号、时间冒号不作为断句位置，如 3.14、1,000、10:30
+- 切出的一段去除首尾标点和表情后通过回调输出
+"""
+
+from core.utils import textUtils
+
+PUNCTUATIONS = ("。", "？", "?", "！", "!", "；", ";", "：")
+FIRST_SENTENCE_PUNCTUATIONS = ("，", "~", "、", ",") + PUNCTUATIONS
+# 两侧都是数字时不断句的标点
+NUMERIC_SEPARATORS = frozenset(".,:：，")
+# 超过最多字数时优先在这些位置切分
+SOFT_BREAKS = frozenset("，,、~ \t\n")
+
+
+class StreamingSegmenter:
+    """增量断句器，feed 和 flush 需在同一线程中调用"""
+
+    def __init__(
+        self,
+        on_segment,
+        punctuations=PUNCTUATIONS,
+        first_sentence_punctuations=FIRST_SENTENCE_PUNCTUATIONS,
+        min_chars=0,
+        max_chars=0,
+    ):
+        """
+        Args:
+            on_segment: on_segment(text) 每切出一段时调用，text已去除首尾标点和表情且不为空
+            punctuations: 第一句之后的断句标点
+            first_sentence_punctuations: 第一句的断句标点
+            min_chars: 第一句之后一段的最少字数，0表示不限制
+            max_chars: 一段的最多字数，0表示不限制
+        """
+        self.on_segment = on_segment
+        self.punctuations = frozenset(punctuations)
+        self.first_sentence_punctuations = frozenset(first_sentence_punctuations)
+        self.min_chars = max(0, int(min_chars or 0))
+        self.max_chars = max(0, int(max_chars or 0))
+        self.reset()
+
+    def configure(self, config):
+        """按 tts_segmenter 配置设置最少、最多字数"""
+        config = config or {}
+        if config.get("min_chars") is not None:
+            self.min_chars = max(0, int(config["min_chars"]))
+        if config.get("max_chars") is not None:
+            self.max_chars = max(0, int(config["max_chars"]))
+
+    def reset(self):
+        """开始新的一轮回答"""
+        self._pending = ""
+        # 下次从该位置继续扫描，之前的字符都不是断句位置
+        self._scan_pos = 0
+        self._soft_break = -1
+        self.is_first_sentence = True
+
+    @property
+    def pending(self) -> str:
+        """尚未切出的文本"""
+        return self._pending
+
+    def feed(self, text):
+        """追加一段文本，切出的每一段通过 on_segment 输出"""
+        if not text:
+            return
+        self._pending += text
+        pending = self._pending
+        i = self._scan_pos
+        while i < len(pending):
+            char = pending[i]
+            punctuations = (
+                self.first_sentence_punctuations
+                if self.is_first_sentence
+                else self.punctuations
+            )
+            if char in punctuations:
+                if char in NUMERIC_SEPARATORS and i > 0 and pending[i - 1].isdigit():
+                    if i + 1 >= len(pending):
+                        # 还不知道后面是不是数字，等下一段文本再判断
+                        break
+                    if pending[i + 1].isdigit():
+                        i += 1
+                        continue
+                if self._cut(i + 1):
+                    pending = self._pending
+                    i = 0
+                    continue
+            if char in SOFT_BREAKS:
+                self._soft_break = i
+            if self.max_chars and i + 1 >= self.max_chars:
+                cut = self._soft_break + 1 if self._soft_break >= 0 else i + 1
+                self._cut(cut, force=True)
+                pending = self._pending
+                i = self._scan_pos
+                continue
+            i += 1
+        self._scan_pos = i
+
+    def _cut(self, end, force=False) -> bool:
+        """在end处切出一段，未达到最少字数时不切分并返回False"""
+        segment = textUtils.get_string_no_punctuation_or_emoji(self._pending[:end])
+        if (
+            not force
+            and segment
+            and not self.is_first_sentence
+            and len(segment) < self.min_chars
+        ):
+            return False
+        self._pending = self._pending[end:]
+        self._soft_break = -1
+        # 强制切分时剩余部分已扫描过，但其中的标点需要重新判断
+        self._scan_pos = 0
+        if segment:
+            self.is_first_sentence = False
+            self.on_segment(segment)
+        return True
+
+    def flush(self) -> str:
+        """
+        取出剩余的全部文本，由调用方决定如何合成（如最后一段需要附带结束标记）
+
+        Returns:
+            str: 去除首尾标点和表情后的剩余文本，可能为空
+        """
+        segment = textUtils.get_string_no_punctuation_or_emoji(self._pending)
+        self._pending = ""
+        self._scan_pos = 0
+        self._soft_break = -1
+        return segment
@@ -0,0 +1,254 @@
+"""
+流式ASR推测执行
+
+流式ASR（doubao_stream、aliyun_stream、xunfei_stream）在用户说话过程中就会返回中间结果，
+而对话要等到最终结果和VAD静音窗口结束后才开始。开启 speculative_chat 后：
+- 中间结果在 stable_ms 内保持不变时，提前用该文本请求大模型，输出先缓存起来
+- 最终文本与推测文本一致（忽略标点和空格）时命中，对话直接使用已缓存的输出并继续接收
+- 文本发生变化或最终文本不一致时取消推测请求，按原流程重新请求
+- 统计命中/未命中次数、节省的时间以及被浪费的输出token数
+"""
+
+import time
+import asyncio
+import threading
+import contextlib
+from config.logger import setup_logging
+from core.utils.util import remove_punctuation_and_length
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_STABLE_MS = 300
+DEFAULT_MIN_CHARS = 2
+
+
+def is_speculative_chat_enabled(config) -> bool:
+    """判断配置中是否开启了推测执行"""
+    speculative_config = config.get("speculative_chat") or {}
+    if not isinstance(speculative_config, dict):
+        return False
+    return str(speculative_config.get("enable", False)).lower() in ("true", "1", "yes")
+
+
+def _normalize(text):
+    _, normalized = remove_punctuation_and_length(text or "")
+    return normalized
+
+
+def _item_text(item):
+    """流式输出的一项（文本或 (文本, 工具调用)）中的文本"""
+    if isinstance(item, tuple):
+        item = item[0]
+    return item if isinstance(item, str) else ""
+
+
+class SpeculativeChatStats:
+    """推测执行的全局统计"""
+
+    def __init__(self):
+        self.attempts = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self.wasted_tokens = 0
+        self.wasted_chars = 0
+        self._lock = threading.Lock()
+
+    def record_attempt(self):
+        with self._lock:
+            self.attempts += 1
+
+    def record_hit(self, saved_ms):
+        with self._lock:
+            self.hits += 1
+            self.saved_ms += saved_ms
+
+    def record_miss(self, wasted_tokens, wasted_chars):
+        with self._lock:
+            self.misses += 1
+            self.wasted_tokens += wasted_tokens
+            self.wasted_chars += wasted_chars
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            finished = self.hits + self.misses
+            return {
+                "attempts": self.attempts,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / finished if finished else 0.0,
+                "avg_saved_ms": self.saved_ms / self.hits if self.hits else 0.0,
+                "wasted_tokens": self.wasted_tokens,
+                "wasted_chars": self.wasted_chars,
+            }
+
+
+_stats = SpeculativeChatStats()
+
+
+def get_speculative_chat_stats() -> SpeculativeChatStats:
+    """获取推测执行的全局统计"""
+    return _stats
+
+
+class SpeculativeRun:
+    """一次推测的大模型请求，输出缓存在内存中，命中后可从头回放并继续接收"""
+
+    def __init__(self, text, functions):
+        self.text = text
+        self.normalized = _normalize(text)
+        self.functions = functions
+        self.items = []
+        self.done = False
+        self.start_time = time.monotonic()
+        self.task = None
+        self._changed = asyncio.Event()
+
+    def start(self, conn):
+        self.task = asyncio.create_task(self._pump(conn))
+        return self
+
+    async def _pump(self, conn):
+        try:
+            memory_str = None
+            if conn.memory is not None:
+                memory_str = await conn.memory.query_memory(self.text)
+            # 与正式对话相同的上下文，只是尚未写入本轮的用户消息
+            dialogue = conn.dialogue.get_llm_dialogue_with_memory(
+                memory_str, conn.config.get("voiceprint", {})
+            )
+            dialogue.append({"role": "user", "content": self.text})
+            if self.functions is not None:
+                stream = conn.llm.aresponse_with_functions(
+                    conn.session_id, dialogue, functions=self.functions
+                )
+            else:
+                stream = conn.llm.aresponse(conn.session_id, dialogue)
+            async with contextlib.aclosing(stream):
+                async for item in stream:
+                    self.items.append(item)
+                    self._changed.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"推测请求大模型失败: {e}")
+        finally:
+            self.done = True
+            self._changed.set()
+
+    async def replay(self):
+        """从头输出已缓存的内容，再继续输出后续内容；提前关闭时取消上游请求"""
+        index = 0
+        try:
+            while True:
+                while index < len(self.items):
+                    yield self.items[index]
+                    index += 1
+                if self.done:
+                    return
+                self._changed.clear()
+                await self._changed.wait()
+        finally:
+            if not self.done:
+                self.cancel()
+
+    def cancel(self):
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+    def wasted(self):
+        """返回 (已生成的token数, 已生成的字数)"""
+        return len(self.items), sum(len(_item_text(item)) for item in self.items)
+
+
+class SpeculativeChat:
+    """单个连接的推测执行控制器，所有方法需在连接的事件循环中调用"""
+
+    def __init__(self, conn, stable_ms=DEFAULT_STABLE_MS, min_chars=DEFAULT_MIN_CHARS):
+        self.conn = conn
+        self.stable_ms = int(stable_ms)
+        self.min_chars = int(min_chars)
+        self._pending = None
+        self._timer = None
+        self._run = None
+
+    @classmethod
+    def from_config(cls, conn):
+        config = conn.config.get("speculative_chat") or {}
+        return cls(
+            conn,
+            stable_ms=config.get("stable_ms") or DEFAULT_STABLE_MS,
+            min_chars=config.get("min_chars") or DEFAULT_MIN_CHARS,
+        )
+
+    def on_partial(self, text):
+        """收到流式ASR的中间结果"""
+        normalized = _normalize(text)
+        if len(normalized) < self.min_chars or normalized == self._pending:
+            return
+        self._pending = normalized
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.create_task(self._start_when_stable(text, normalized))
+
+    async def _start_when_stable(self, text, normalized):
+        await asyncio.sleep(self.stable_ms / 1000)
+        if self._run is not None:
+            if self._run.normalized == normalized:
+                return
+            # 中间结果已经变化，之前的推测作废
+            self._discard(self._run, "中间结果变化")
+        conn = self.conn
+        # 声纹识别会把说话人信息拼入最终文本，推测必然不命中
+        if conn.need_bind or conn.voiceprint_provider or conn.llm is None:
+            return
+        functions = None
+        if conn.intent_type == "function_call" and hasattr(conn, "func_handler"):
+            functions = conn.func_handler.get_functions()
+        _stats.record_attempt()
+        self._run = SpeculativeRun(text, functions).start(conn)
+        logger.bind(tag=TAG).debug(f"中间结果已稳定，推测请求大模型: {text}")
+
+    def claim(self, query):
+        """
+        用最终文本认领推测结果
+
+        Returns:
+            命中时返回 SpeculativeRun，否则返回 None
+        """
+        self._reset_pending()
+        run, self._run = self._run, None
+        if run is None:
+            return None
+        if run.normalized == _normalize(query) and not (run.done and not run.items):
+            saved_ms = (time.monotonic() - run.start_time) * 1000
+            _stats.record_hit(saved_ms)
+            logger.bind(tag=TAG).info(
+                f"推测命中，提前{saved_ms:.0f}ms请求大模型，已缓存{len(run.items)}个token"
+            )
+            return run
+        self._discard(run, "最终文本不一致")
+        return None
+
+    def cancel(self):
+        """本轮语音结束或连接关闭时，取消未被认领的推测"""
+        self._reset_pending()
+        run, self._run = self._run, None
+        if run is not None:
+            self._discard(run, "未被使用")
+
+    def _reset_pending(self):
+        self._pending = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    @staticmethod
+    def _discard(run, reason):
+        run.cancel()
+        wasted_tokens, wasted_chars = run.wasted()
+        _stats.record_miss(wasted_tokens, wasted_chars)
+        logger.bind(tag=TAG).debug(
+            f"推测未命中（{reason}）: {run.text}，浪费{wasted_tokens}个token"
+        )
@@ -35,24 +35,9 @@ EMOJI_RANGES = [
 ]
 
 
-def get_string_no_punctuation_or_emoji(s):
-    """去除字符串首尾的空格、标点符号和表情符号"""
-    chars = list(s)
-    # 处理开头的字符
-    start = 0
-    while start < len(chars) and is_punctuation_or_emoji(chars[start]):
-        start += 1
-    # 处理结尾的字符
-    end = len(chars) - 1
-    while end >= start and is_punctuation_or_emoji(chars[end]):
-        end -= 1
-    return "".join(chars[start : end + 1])
-
-
-def is_punctuation_or_emoji(char):
-    """检查字符是否为空格、指定标点或表情符号"""
-    # 定义需要去除的中英文标点（包括全角/半角）
-    punctuation_set = {
+# 需要去除的中英文标点（包括全角/半角）
+PUNCTUATION_SET = frozenset(
+    [
         "，",
         ",",  # 中文逗号 + 英文逗号
         "。",
@@ -71,10 +56,30 @@ def is_punctuation_or_emoji(char):
         "]",  # 方括号
         "【",
         "】",  # 中文方括号
-    }
-    if char.isspace() or char in punctuation_set:
-        return True
-    return is_emoji(char)
+    ]
+)
+# 预先展开EMOJI_RANGES，判断时只需一次集合查找，不再逐个区间比较
+EMOJI_CHARS = frozenset(
+    chr(code_point)
+    for start, end in EMOJI_RANGES
+    for code_point in range(start, end + 1)
+)
+# Unicode空白字符都在U+3000以内
+_WHITESPACE_CHARS = "".join(chr(c) for c in range(0x3001) if chr(c).isspace())
+# str.strip 使用的字符集合：空白、标点、表情
+_STRIP_CHARS = _WHITESPACE_CHARS + "".join(PUNCTUATION_SET) + "".join(EMOJI_CHARS)
+# str.translate 使用的删除表
+_EMOJI_AND_NEWLINE_TABLE = dict.fromkeys(map(ord, EMOJI_CHARS | {"\n"}))
+
+
+def get_string_no_punctuation_or_emoji(s):
+    """去除字符串首尾的空格、标点符号和表情符号"""
+    return s.strip(_STRIP_CHARS)
+
+
+def is_punctuation_or_emoji(char):
+    """检查字符是否为空格、指定标点或表情符号"""
+    return char.isspace() or char in PUNCTUATION_SET or char in EMOJI_CHARS
 
 
 async def get_emotion(conn, text):
@@ -104,10 +109,9 @@ async def get_emotion(conn, text):
 
 def is_emoji(char):
     """检查字符是否为emoji表情"""
-    code_point = ord(char)
-    return any(start <= code_point <= end for start, end in EMOJI_RANGES)
+    return char in EMOJI_CHARS
 
 
 def check_emoji(text):
     """去除文本中的所有emoji表情"""
-    return ''.join(char for char in text if not is_emoji(char) and char != "\n")
+    return text.translate(_EMOJI_AND_NEWLINE_TABLE)
@@ -3,6 +3,7 @@ import re
 import sys
 from config.logger import setup_logging
 import importlib
+from core.utils.textUtils import EMOJI_CHARS
 
 logger = setup_logging()
 
@@ -27,6 +28,15 @@ punctuation_set = {
     "】",  # 中文方括号
     "~",  # 波浪号
 }
+# 英文、空白和基本标点以外的字符
+NON_PLAIN_CHARS = re.compile(
+    "[^\\x00-\\x7f\\s" + re.escape("".join(punctuation_set)) + "]"
+)
+# MarkdownCleaner.REGEXES 中每个正则都至少需要其中一个字符才能匹配
+MARKDOWN_CHARS = re.compile(r'[`#*_\[>|+\-$\n]')
+# 流式清理时行内标记最多等待的字数
+MAX_HOLD_CHARS = 100
+
 
 def create_instance(class_name, *args, **kwargs):
     # 创建TTS实例
@@ -64,7 +74,13 @@ class MarkdownCleaner:
         """
         当匹配到一个整段表格块时，回调该函数。
         """
-        block_text = match.group('table_block')
+        return MarkdownCleaner.table_to_text(match.group('table_block'))
+
+    @staticmethod
+    def table_to_text(block_text: str) -> str:
+        """
+        把连续的表格行转换为便于朗读的文本
+        """
         lines = block_text.strip('\n').split('\n')
 
         parsed_table = []
@@ -129,10 +145,375 @@ class MarkdownCleaner:
         主入口方法：依序执行所有正则，移除或替换 Markdown 元素
         """
         # 检查文本是否全为英文和基本标点符号
-        if text and all((c.isascii() or c.isspace() or c in punctuation_set) for c in text):
+        if text and not NON_PLAIN_CHARS.search(text):
             # 保留原始空格，直接返回
             return text
+        # 不含任何Markdown标记字符时，所有正则都不会匹配
+        if not MARKDOWN_CHARS.search(text):
+            return text.strip()
 
         for regex, replacement in MarkdownCleaner.REGEXES:
             text = regex.sub(replacement, text)
-        return text.strip()
\ No newline at end of file
+        return text.strip()
+
+
+# 流式清理：合成前删除的表情，以及跟在表情后的变体选择符、零宽连接符、组合键帽
+_TTS_DELETE_TABLE = dict.fromkeys(map(ord, EMOJI_CHARS | set("\ufe0f\u200d\u20e3")))
+# 成对出现的粗体标记（未配对时原正则同样会整体去除），奇数个时保留一个作为斜体标记
+_DOUBLE_MARKERS = re.compile(r'\*{2,}|_{2,}')
+_TRAILING_MARKERS = re.compile(r'(?:\*+|_+)\Z')
+# 行内需要处理的字符，其余字符直接输出
+_INLINE_SPECIAL = re.compile(r'[`$*_!\[]')
+# 行中间的token不含这些字符时可以直接输出
+_STREAM_SPECIAL = re.compile(r'[`$*_!\[\n]')
+_HEADING_HEAD = re.compile(r'#+\s*')
+_QUOTE_HEAD = re.compile(r'>+\s*')
+_LIST_HEAD = re.compile(r'[*+\-]\s*')
+_BLANK_LINES = re.compile(r'\n{2,}')
+
+# 行类型
+_TEXT, _HEADING, _QUOTE, _LIST, _TABLE_ROW = range(5)
+# 块状态
+_FENCE, _FORMULA = "```", "$$"
+# 行内标记的判断结果
+_MATCH, _LITERAL, _HOLD = range(3)
+
+
+def _drop_double_markers(m: re.Match) -> str:
+    marker = m.group()
+    return marker[0] * (len(marker) % 2)
+
+
+class StreamingMarkdownCleaner:
+    """
+    按大模型输出的token增量清理Markdown和表情，feed 和 flush 需在同一线程中调用
+
+    与 MarkdownCleaner.clean_markdown 对整段文本的清理结果一致，区别在于：
+    - 一次扫描完成，只在标记尚未闭合时暂存该标记之后的文本，其余文本立即输出
+    - 跨token的标记也能识别，如 "**" 与 "重点**" 分两次输出
+    - 行内标记最多等待 max_hold 个字，仍未闭合时按普通字符输出
+    - 同时去除表情，未闭合的代码块和公式块直接丢弃
+    - 只有以 "|" 开头的行视为表格行
+    """
+
+    def __init__(self, max_hold=MAX_HOLD_CHARS):
+        self.max_hold = max(2, int(max_hold))
+        self.reset()
+
+    def reset(self):
+        """开始新的一轮回答"""
+        self._buf = ""
+        # 上次输入末尾的 * 或 _，与后续输入连起来再判断是否成对
+        self._marker_tail = ""
+        self._block = None
+        self._line_start = True
+        self._line_kind = None
+        # 当前行已处理的最后一个字符，用于判断 $ 前是否为字母数字
+        self._prev = ""
+        # 行首标记之后只有空白时，原正则的 \s* 会继续吞掉换行和空白行
+        self._swallow = False
+        self._table = []
+        self._started = False
+        # 尚未输出的空白，后面有文字时再输出，用于去除首尾空白和合并空行
+        self._pending_ws = ""
+
+    def feed(self, text) -> str:
+        """
+        追加一段文本
+
+        Returns:
+            str: 本次可以确定的清理后文本，可能为空
+        """
+        if not text:
+            return ""
+        text = text.translate(_TTS_DELETE_TABLE)
+        if (
+            not self._buf
+            and not self._marker_tail
+            and not self._line_start
+            and self._block is None
+            and not _STREAM_SPECIAL.search(text)
+        ):
+            # 行中间的普通文本，不需要暂存
+            out = []
+            self._emit(text, out)
+            if text:
+                self._prev = text[-1]
+            return "".join(out)
+        text = self._marker_tail + text
+        tail = _TRAILING_MARKERS.search(text)
+        self._marker_tail = tail.group() if tail else ""
+        if tail:
+            text = text[: tail.start()]
+        self._buf += _DOUBLE_MARKERS.sub(_drop_double_markers, text)
+        out = []
+        self._drain(out, final=False)
+        return "".join(out)
+
+    def flush(self) -> str:
+        """
+        结束本轮回答，输出剩余文本后重置
+
+        Returns:
+            str: 剩余的清理后文本，可能为空
+        """
+        self._buf += _DOUBLE_MARKERS.sub(_drop_double_markers, self._marker_tail)
+        self._marker_tail = ""
+        out = []
+        self._drain(out, final=True)
+        self._emit_table(out)
+        self.reset()
+        return "".join(out)
+
+    def _drain(self, out, final):
+        while self._buf:
+            if self._block is not None:
+                end = self._buf.find(self._block)
+                if end < 0:
+                    # 结束符可能被拆开，保留末尾几个字符
+                    keep = 0 if final else len(self._block) - 1
+                    self._buf = self._buf[len(self._buf) - keep :] if keep else ""
+                    return
+                self._buf = self._buf[end + len(self._block) :]
+                self._block = None
+                continue
+            newline = self._buf.find("\n")
+            line = self._buf if newline < 0 else self._buf[:newline]
+            consumed, block = self._process_line(line, final or newline >= 0, out)
+            if block is not None:
+                self._buf = self._buf[consumed:]
+                self._block = block
+                continue
+            if consumed < len(line):
+                # 尚无法确定，等待后续文本
+                self._buf = self._buf[consumed:]
+                return
+            if newline < 0:
+                self._buf = ""
+                return
+            self._buf = self._buf[newline + 1 :]
+            if self._line_kind != _TABLE_ROW and not self._swallow:
+                self._emit("\n", out)
+            self._line_start = True
+            self._line_kind = None
+            self._prev = ""
+
+    def _process_line(self, line, line_final, out):
+        """处理一行（不含换行符）中可以确定的部分，返回 (已处理的字符数, 遇到的块状态)"""
+        start = 0
+        if self._line_start:
+            head = self._line_head(line, line_final)
+            if head is None:
+                return 0, None
+            kind, start = head
+            if kind != _TABLE_ROW:
+                self._emit_table(out)
+            self._line_start = False
+            self._line_kind = kind
+            if kind == _TABLE_ROW:
+                row, _, _ = self._scan(line, True, "", allow_blocks=False)
+                self._table.append(row)
+                return len(line), None
+            if kind in (_LIST, _QUOTE):
+                # 原正则的 ^\s* 会连同前面的空白行一起替换
+                newline = self._pending_ws.find("\n")
+                if newline >= 0:
+                    self._pending_ws = self._pending_ws[: newline + 1]
+            if kind == _LIST:
+                self._emit("- ", out)
+            elif kind == _TEXT and not self._swallow:
+                # 保留缩进
+                self._emit(line[:start], out)
+            if start < len(line):
+                self._swallow = False
+            elif kind != _TEXT:
+                self._swallow = True
+            if start:
+                self._prev = line[start - 1]
+        text, consumed, block = self._scan(line[start:], line_final, self._prev)
+        self._emit(text, out)
+        consumed += start
+        if consumed > start:
+            self._prev = line[consumed - 1]
+        return consumed, block
+
+    def _line_head(self, line, line_final):
+        """判断行类型，返回 (行类型, 正文开始位置)，尚无法确定时返回None"""
+        indent = len(line) - len(line.lstrip())
+        if indent == len(line):
+            return (_TEXT, indent) if line_final else None
+        char = line[indent]
+        if char == "|":
+            # 表格行需要整行处理
+            return (_TABLE_ROW, 0) if line_final else None
+        if char == "#" and indent == 0:
+            kind, head = _HEADING, _HEADING_HEAD.match(line)
+        elif char == ">":
+            kind, head = _QUOTE, _QUOTE_HEAD.match(line, indent)
+        elif char in "+-" or (
+            char == "*" and (indent + 1 == len(line) or line[indent + 1].isspace())
+        ):
+            if char == "*" and indent + 1 == len(line) and not line_final:
+                return None
+            kind, head = _LIST, _LIST_HEAD.match(line, indent)
+        elif char == "*":
+            # 原正则先处理斜体，斜体不成立时才作为列表
+            status = self._match_emphasis(line, indent, line_final)[0]
+            if status == _HOLD:
+                return None
+            return (_TEXT, indent) if status == _MATCH else (_LIST, indent + 1)
+        else:
+            return _TEXT, indent
+        if head.end() == len(line) and not line_final:
+            # 后面可能还有空白
+            return None
+        return kind, head.end()
+
+    def _scan(self, s, final, prev, allow_blocks=True):
+        """
+        处理行内标记
+
+        Returns:
+            (清理后的文本, 已处理的字符数, 遇到的块状态)
+        """
+        out = []
+        i, n = 0, len(s)
+        while i < n:
+            m = _INLINE_SPECIAL.search(s, i)
+            if m is None:
+                out.append(s[i:])
+                i = n
+                break
+            if m.start() > i:
+                out.append(s[i : m.start()])
+                i = m.start()
+            char = s[i]
+            if char == "`":
+                if allow_blocks:
+                    if s.startswith(_FENCE, i):
+                        return "".join(out), i + len(_FENCE), _FENCE
+                    if not final and _FENCE.startswith(s[i:]):
+                        break
+                status = _LITERAL
+            elif char == "$":
+                if allow_blocks:
+                    if s.startswith(_FORMULA, i):
+                        return "".join(out), i + len(_FORMULA), _FORMULA
+                    if not final and i + 1 == n:
+                        break
+                status, inner_start, inner_end, end = self._match_dollar(
+                    s, i, final, s[i - 1] if i else prev
+                )
+            elif char in "*_":
+                status, inner_start, inner_end, end = self._match_emphasis(
+                    s, i, final
+                )
+            elif char == "!":
+                if i + 1 == n:
+                    status = _LITERAL if final else _HOLD
+                elif s[i + 1] == "[":
+                    status, inner_start, inner_end, end = self._match_link(
+                        s, i + 1, final, i
+                    )
+                else:
+                    status = _LITERAL
+            else:
+                status, inner_start, inner_end, end = self._match_link(s, i, final, i)
+
+            if status == _HOLD:
+                break
+            if status == _LITERAL:
+                out.append(char)
+                i += 1
+                continue
+            if char != "!":
+                inner = s[inner_start:inner_end]
+                inner_prev = s[inner_start - 1]
+                inner, _, _ = self._scan(inner, True, inner_prev, allow_blocks=False)
+                if char == "$" and not MarkdownCleaner.NORMAL_FORMULA_CHARS.search(
+                    inner
+                ):
+                    # 纯数字/货币等保留 $
+                    inner = f"${inner}$"
+                out.append(inner)
+            i = end
+        return "".join(out), i, None
+
+    def _undecided(self, s, start, final):
+        """需要的字符不在等待范围内：已到行尾或已等待 max_hold 个字时按普通字符处理"""
+        if final or len(s) - start >= self.max_hold:
+            return _LITERAL, 0, 0, 0
+        return _HOLD, 0, 0, 0
+
+    def _match_emphasis(self, s, i, final):
+        """斜体 *文本* 或 _文本_，标记内侧不能是空白"""
+        marker = s[i]
+        limit = min(len(s), i + self.max_hold)
+        if i + 1 >= limit:
+            return self._undecided(s, i, final)
+        if s[i + 1].isspace():
+            return _LITERAL, 0, 0, 0
+        end = s.find(marker, i + 1, limit)
+        while end >= 0 and s[end - 1].isspace():
+            end = s.find(marker, end + 1, limit)
+        if end < 0:
+            return self._undecided(s, i, final)
+        return _MATCH, i + 1, end, end + 1
+
+    def _match_dollar(self, s, i, final, prev):
+        """行内公式 $...$，两侧不能紧挨字母数字"""
+        if prev.isascii() and prev.isalnum():
+            return _LITERAL, 0, 0, 0
+        limit = min(len(s), i + self.max_hold)
+        end = s.find("$", i + 1, limit)
+        if end < 0:
+            return self._undecided(s, i, final)
+        if end == i + 1:
+            return _LITERAL, 0, 0, 0
+        if end + 1 < limit:
+            after = s[end + 1]
+        elif final and end + 1 == len(s):
+            after = ""
+        else:
+            return self._undecided(s, i, final)
+        if after.isascii() and after.isalnum():
+            return _LITERAL, 0, 0, 0
+        return _MATCH, i + 1, end, end + 1
+
+    def _match_link(self, s, i, final, start):
+        """链接 [文本](地址)，图片时 start 为 "!" 的位置"""
+        limit = min(len(s), start + self.max_hold)
+        label_end = s.find("]", i + 1, limit)
+        if label_end < 0 or label_end + 1 >= limit:
+            if label_end >= 0 and final and label_end + 1 == len(s):
+                return _LITERAL, 0, 0, 0
+            return self._undecided(s, start, final)
+        if s[label_end + 1] != "(":
+            return _LITERAL, 0, 0, 0
+        end = s.find(")", label_end + 2, limit)
+        if end < 0:
+            return self._undecided(s, start, final)
+        return _MATCH, i + 1, label_end, end + 1
+
+    def _emit_table(self, out):
+        if self._table:
+            self._emit(MarkdownCleaner.table_to_text("\n".join(self._table)), out)
+            self._table = []
+
+    def _emit(self, text, out):
+        """输出文本，首尾空白暂不输出"""
+        if not text:
+            return
+        body_start = len(text) - len(text.lstrip())
+        if body_start == len(text):
+            self._pending_ws += text
+            return
+        body_end = len(text.rstrip())
+        if self._started:
+            whitespace = self._pending_ws + text[:body_start]
+            if "\n\n" in whitespace:
+                whitespace = _BLANK_LINES.sub("\n", whitespace)
+            out.append(whitespace)
+        out.append(text[body_start:body_end])
+        self._pending_ws = text[body_end:]
+        self._started = True
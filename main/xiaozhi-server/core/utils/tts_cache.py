@@ -0,0 +1,263 @@
+"""
+句子级TTS音频缓存
+
+设备会反复播报相同的短句（问候语、"好的"、错误提示等），这里按
+(提供者, 音色, 参数, 规范化后的文本, 音频格式) 缓存最终的音频帧列表，
+命中时直接复用，跳过TTS接口调用和音频编码。
+
+- 内存层：按字节数限制容量的LRU
+- 磁盘层（可选）：以p3格式保存在指定目录，进程重启后仍可命中
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from config.logger import setup_logging
+from core.utils import p3
+
+TAG = __name__
+logger = setup_logging()
+
+# 每隔多少次查询输出一次统计信息
+STATS_LOG_INTERVAL = 100
+
+
+def _normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+class TTSAudioCache:
+    """TTS音频缓存"""
+
+    def __init__(
+        self,
+        max_memory_bytes=64 * 1024 * 1024,
+        disk_dir=None,
+        max_disk_bytes=512 * 1024 * 1024,
+        max_text_length=50,
+    ):
+        self.max_memory_bytes = int(max_memory_bytes)
+        self.max_disk_bytes = int(max_disk_bytes)
+        self.max_text_length = int(max_text_length)
+        self.disk_dir = disk_dir or None
+        self._entries = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "saved_ms": 0.0}
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._disk_bytes = sum(
+                self._disk_entry_size(entry.path)
+                for entry in os.scandir(self.disk_dir)
+                if entry.name.endswith(".p3")
+            )
+
+    def make_key(self, provider_name, voice, params, text, audio_format="opus"):
+        """
+        生成缓存键，文本过长时返回None表示不缓存
+
+        Args:
+            provider_name: TTS提供者名称
+            voice: 当前音色
+            params: 影响合成结果的其他参数（字符串）
+            text: 待合成的文本
+            audio_format: 输出的音频格式
+        """
+        text = _normalize_text(text)
+        if not text or len(text) > self.max_text_length:
+            return None
+        raw = "\x1f".join((provider_name, str(voice), params, audio_format, text))
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        查询缓存
+
+        Returns:
+            (音频帧列表, 原合成耗时ms) 或 None
+        """
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._record_hit(entry[1])
+                return entry
+        entry = self._load_from_disk(key)
+        with self._lock:
+            if entry is not None:
+                self._stats["disk_hits"] += 1
+                self._record_hit(entry[1])
+                self._put_memory(key, entry)
+            else:
+                self._stats["misses"] += 1
+                self._maybe_log_stats()
+        return entry
+
+    def put(self, key, frames, synth_ms):
+        """写入缓存"""
+        if key is None or not frames:
+            return
+        entry = (list(frames), float(synth_ms))
+        with self._lock:
+            self._put_memory(key, entry)
+        self._save_to_disk(key, entry)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def _record_hit(self, synth_ms):
+        self._stats["hits"] += 1
+        self._stats["saved_ms"] += synth_ms
+        self._maybe_log_stats()
+
+    def _maybe_log_stats(self):
+        lookups = self._stats["hits"] + self._stats["misses"]
+        if lookups and lookups % STATS_LOG_INTERVAL == 0:
+            logger.bind(tag=TAG).info(
+                f"TTS缓存命中率: {self._stats['hits'] / lookups:.1%} "
+                f"({self._stats['hits']}/{lookups})，"
+                f"累计节省合成耗时: {self._stats['saved_ms']:.0f}ms，"
+                f"内存占用: {self._memory_bytes / 1024:.0f}KB"
+            )
+
+    @staticmethod
+    def _entry_size(entry):
+        return sum(len(frame) for frame in entry[0])
+
+    def _put_memory(self, key, entry):
+        """写入内存层，需在持有锁时调用"""
+        size = self._entry_size(entry)
+        if size > self.max_memory_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= self._entry_size(old)
+        self._entries[key] = entry
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._memory_bytes -= self._entry_size(evicted)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.p3")
+
+    @staticmethod
+    def _disk_entry_size(path):
+        """磁盘缓存条目占用的字节数，含同名的元数据文件"""
+        size = 0
+        for file_path in (path, path + ".json"):
+            try:
+                size += os.path.getsize(file_path)
+            except OSError:
+                pass
+        return size
+
+    def _load_from_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            frames, _ = p3.decode_opus_from_file(path)
+            # 原合成耗时保存在同名的元数据文件中
+            with open(path + ".json", "r", encoding="utf-8") as f:
+                synth_ms = json.load(f).get("synth_ms", 0.0)
+            os.utime(path)
+            return frames, synth_ms
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"读取TTS磁盘缓存失败: {path}, {e}")
+            return None
+
+    def _save_to_disk(self, key, entry):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            if os.path.exists(path):
+                return
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            p3.encode_opus_to_file(entry[0], tmp_path)
+            with open(path + ".json", "w", encoding="utf-8") as f:
+                json.dump({"synth_ms": entry[1], "created": time.time()}, f)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self._disk_bytes += self._disk_entry_size(path)
+                over_limit = self._disk_bytes > self.max_disk_bytes
+            if over_limit:
+                self._evict_disk()
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"写入TTS磁盘缓存失败: {path}, {e}")
+
+    def _evict_disk(self):
+        """按最近访问时间淘汰磁盘缓存，直到低于容量上限的90%"""
+        files = sorted(
+            (entry for entry in os.scandir(self.disk_dir) if entry.name.endswith(".p3")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        target = self.max_disk_bytes * 0.9
+        for entry in files:
+            with self._lock:
+                if self._disk_bytes <= target:
+                    break
+            try:
+                size = self._disk_entry_size(entry.path)
+                os.remove(entry.path)
+                if os.path.exists(entry.path + ".json"):
+                    os.remove(entry.path + ".json")
+                with self._lock:
+                    self._disk_bytes -= size
+            except OSError:
+                continue
+
+
+_tts_cache = None
+_tts_cache_lock = threading.Lock()
+
+
+def get_tts_cache(config=None):
+    """
+    获取全局TTS音频缓存（单例模式）
+
+    Args:
+        config: 完整配置，服务启动时传入以根据其中的tts_cache配置创建缓存
+
+    Returns:
+        TTSAudioCache实例，未开启或尚未创建时返回None
+    """
+    global _tts_cache
+    if _tts_cache is None and config is not None:
+        with _tts_cache_lock:
+            if _tts_cache is None:
+                cache_config = config.get("tts_cache") or {}
+                if str(cache_config.get("enable", False)).lower() not in ("true", "1", "yes"):
+                    _tts_cache = False
+                else:
+                    _tts_cache = TTSAudioCache(
+                        max_memory_bytes=float(cache_config.get("max_memory_mb") or 64)
+                        * 1024
+                        * 1024,
+                        disk_dir=cache_config.get("disk_dir") or None,
+                        max_disk_bytes=float(cache_config.get("max_disk_mb") or 512)
+                        * 1024
+                        * 1024,
+                        max_text_length=cache_config.get("max_text_length") or 50,
+                    )
+                    logger.bind(tag=TAG).info(f"TTS音频缓存已开启: {cache_config}")
+    return _tts_cache or None
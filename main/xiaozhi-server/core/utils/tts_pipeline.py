@@ -0,0 +1,193 @@
+"""
+非流式TTS的流水线合成
+
+非流式TTS原先逐句合成：上一句合成完才开始请求下一句，而大模型通常早已输出了后面的句子，
+上一句播放完时下一句还没合成好，设备上就出现停顿。开启后每个连接最多同时合成 window 句：
+- 每句话的音频成为队首之前先缓存，成为队首后直接写入音频队列，播放顺序与文本顺序一致
+- 合成在全局共享、有上限的线程池中执行
+- 打断时丢弃未播放的合成结果，尚未开始的合成不再执行，进行中的合成请求被取消
+"""
+
+import asyncio
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
+from config.logger import setup_logging
+from core.utils.http_client import CancelScope
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_WINDOW = 1
+DEFAULT_MAX_WORKERS = 32
+
+
+class SynthSlot:
+    """一句话的合成结果，音频通过 put 写入"""
+
+    def __init__(self, audio_queue):
+        self.audio_queue = audio_queue
+        self.items = []
+        self.is_head = False
+        self.done = False
+        self.cancelled = False
+        self.scope = CancelScope()
+        self.future = None
+        self._lock = threading.Lock()
+
+    def put(self, item):
+        with self._lock:
+            if self.cancelled:
+                return
+            if self.is_head:
+                self.audio_queue.put(item)
+            else:
+                self.items.append(item)
+
+    def promote(self):
+        """成为队首：写入已缓存的音频，之后的音频直接写入音频队列"""
+        with self._lock:
+            if self.cancelled:
+                return
+            self.is_head = True
+            for item in self.items:
+                self.audio_queue.put(item)
+            self.items.clear()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            self.items.clear()
+        self.scope.cancel()
+        if self.future is not None:
+            self.future.cancel()
+
+
+class TTSSynthPipeline:
+    """单个连接的流水线合成，submit/drain 在TTS文本处理线程中调用，cancel 可在任意线程调用"""
+
+    def __init__(self, audio_queue, window, executor):
+        self.audio_queue = audio_queue
+        self.window = max(1, int(window))
+        self.executor = executor
+        self._slots = collections.deque()
+        self._cond = threading.Condition()
+        # 每次打断加一，等待窗口时被打断的句子不再提交
+        self._generation = 0
+
+    def submit(self, synthesize, text) -> bool:
+        """
+        提交一句话的合成，进行中的句子达到window时阻塞等待
+
+        Args:
+            synthesize: synthesize(text, slot) 执行合成，音频通过 slot.put 按音频队列的格式写入
+            text: 合成文本
+
+        Returns:
+            bool: 是否已提交，等待期间被打断时返回False
+        """
+        slot = SynthSlot(self.audio_queue)
+        with self._cond:
+            generation = self._generation
+            while len(self._slots) >= self.window and generation == self._generation:
+                self._cond.wait()
+            if generation != self._generation:
+                return False
+            try:
+                slot.future = self.executor.submit(self._run, synthesize, text, slot)
+            except RuntimeError:
+                # 服务退出时线程池已关闭
+                return False
+            self._slots.append(slot)
+            if len(self._slots) == 1:
+                slot.promote()
+        return True
+
+    def _run(self, synthesize, text, slot):
+        try:
+            if not slot.cancelled:
+                with slot.scope:
+                    synthesize(text, slot)
+        except asyncio.CancelledError:
+            logger.bind(tag=TAG).debug(f"合成已取消: {text}")
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"流水线合成失败: {text}，错误: {e}")
+        finally:
+            self._finish(slot)
+
+    def _finish(self, slot):
+        with self._cond:
+            slot.done = True
+            while self._slots and self._slots[0].done:
+                self._slots.popleft()
+                if self._slots:
+                    self._slots[0].promote()
+            self._cond.notify_all()
+
+    def drain(self):
+        """等待所有已提交的句子合成完成并写入音频队列"""
+        with self._cond:
+            while self._slots:
+                self._cond.wait()
+
+    def cancel(self):
+        """打断：取消所有未完成的合成，已缓存的音频不再写入音频队列"""
+        with self._cond:
+            slots = list(self._slots)
+            self._slots.clear()
+            self._generation += 1
+            self._cond.notify_all()
+        for slot in slots:
+            slot.cancel()
+        if slots:
+            logger.bind(tag=TAG).debug(f"打断，取消{len(slots)}句流水线合成")
+
+
+_synth_executor = None
+_synth_executor_lock = threading.Lock()
+
+
+def get_tts_synth_executor(max_workers=None) -> ThreadPoolExecutor:
+    """
+    获取流水线合成的全局线程池（单例模式）
+
+    Args:
+        max_workers: 线程池上限，仅在第一次创建时生效
+
+    Returns:
+        ThreadPoolExecutor实例
+    """
+    global _synth_executor
+    if _synth_executor is None:
+        with _synth_executor_lock:
+            if _synth_executor is None:
+                workers = int(max_workers) if max_workers else DEFAULT_MAX_WORKERS
+                _synth_executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="tts-synth"
+                )
+                logger.bind(tag=TAG).info(f"TTS流水线合成线程池已创建，上限{workers}")
+    return _synth_executor
+
+
+def create_synth_pipeline(config, audio_queue):
+    """
+    按 tts_pipeline 配置创建连接的流水线合成
+
+    Returns:
+        TTSSynthPipeline实例，window不大于1（逐句合成）时返回None
+    """
+    pipeline_config = config.get("tts_pipeline") or {}
+    window = int(pipeline_config.get("window") or DEFAULT_WINDOW)
+    if window <= 1:
+        return None
+    executor = get_tts_synth_executor(pipeline_config.get("max_workers"))
+    return TTSSynthPipeline(audio_queue, window, executor)
+
+
+def shutdown_tts_synth_executor():
+    """关闭流水线合成线程池，不等待进行中的合成"""
+    global _synth_executor
+    with _synth_executor_lock:
+        if _synth_executor is not None:
+            _synth_executor.shutdown(wait=False, cancel_futures=True)
+            _synth_executor = None
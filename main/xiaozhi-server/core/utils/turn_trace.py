@@ -0,0 +1,361 @@
+"""
+单轮对话耗时追踪
+
+一轮对话从判定用户说完（VAD断句、listen stop或detect文本）开始，到最后一帧音频发出结束，
+记录其中各阶段的耗时，同名阶段每轮只记录第一次：
+- vad: 最后一次检测到人声到判定说完的静音等待（自动拾音模式）
+- opus_decode: 语音结束时补充解码opus
+- asr: 语音识别，含在ASR执行服务中的排队
+- intent: 大模型意图识别
+- memory: 记忆查询
+- llm_first_token: 大模型请求到第一个输出
+- tts_first_segment: 第一段文本送入TTS到第一段音频就绪
+- first_frame / last_frame: 本轮开始到第一帧/最后一帧音频发出
+
+各阶段按模块类型汇总为直方图，由 /metrics 接口输出；
+首帧耗时超过阈值的慢对话按比例把完整明细（含设备ID）交给后台线程写入JSONL文件
+"""
+
+import os
+import json
+import time
+import random
+import threading
+import contextlib
+from collections import deque
+from typing import Optional
+from config.logger import setup_logging
+from core.utils.metrics import (
+    LatencyHistogram,
+    format_labels,
+    metric_name,
+    register_collector,
+)
+
+TAG = __name__
+logger = setup_logging()
+
+# 各阶段对应的模块，直方图以该模块的类型作为provider标签
+SPAN_COMPONENTS = {
+    "vad": "vad",
+    "opus_decode": "asr",
+    "asr": "asr",
+    "intent": "intent",
+    "memory": "memory",
+    "llm_first_token": "llm",
+    "tts_first_segment": "tts",
+}
+# 端到端的阶段涉及全部模块，provider标签为 asr|llm|tts
+END_TO_END_SPANS = ("first_frame", "last_frame")
+SPAN_ORDER = tuple(SPAN_COMPONENTS) + END_TO_END_SPANS
+# 等待写入文件的慢对话记录上限，超过后丢弃新记录
+SLOW_LOG_QUEUE_SIZE = 1000
+
+
+def _provider_name(provider) -> str:
+    if provider is None:
+        return "-"
+    return type(provider).__module__.rsplit(".", 1)[-1]
+
+
+class TurnTrace:
+    """一轮对话的耗时记录，只在连接所在的事件循环中读写"""
+
+    def __init__(self, tracer, conn, kind):
+        self.tracer = tracer
+        self.kind = kind
+        self.device_id = getattr(conn, "device_id", None)
+        self.session_id = getattr(conn, "session_id", None)
+        self.providers = {
+            component: _provider_name(getattr(conn, component, None))
+            for component in ("vad", "asr", "intent", "memory", "llm", "tts")
+        }
+        self.start_time = time.monotonic()
+        self.start_wall_time = time.time()
+        self.spans = {}
+        self.marks = {}
+        self.last_frame_time = None
+        self.finished = False
+
+    def provider_for(self, name) -> str:
+        component = SPAN_COMPONENTS.get(name)
+        if component is not None:
+            return self.providers[component]
+        return "|".join(self.providers[c] for c in ("asr", "llm", "tts"))
+
+    def add_span(self, name, start, end):
+        if self.finished or name in self.spans:
+            return
+        self.spans[name] = (start, end)
+
+    @contextlib.contextmanager
+    def span(self, name):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add_span(name, start, time.monotonic())
+
+    def mark(self, name):
+        if name not in self.marks:
+            self.marks[name] = time.monotonic()
+
+    def on_audio_ready(self):
+        """第一段音频进入发送流程"""
+        if "tts_first_segment" not in self.spans and "tts_text" in self.marks:
+            self.add_span("tts_first_segment", self.marks["tts_text"], time.monotonic())
+
+    def on_audio_sent(self):
+        now = time.monotonic()
+        if "first_frame" not in self.spans:
+            self.add_span("first_frame", self.start_time, now)
+        self.last_frame_time = now
+
+    def finish(self, status="ok"):
+        if self.finished:
+            return
+        if self.last_frame_time is not None:
+            self.add_span("last_frame", self.start_time, self.last_frame_time)
+        self.finished = True
+        self.tracer.record(self, status)
+
+    def duration_ms(self, name) -> Optional[float]:
+        span = self.spans.get(name)
+        if span is None:
+            return None
+        return (span[1] - span[0]) * 1000
+
+    def to_dict(self, status) -> dict:
+        spans = []
+        for name in sorted(self.spans, key=SPAN_ORDER.index):
+            start, end = self.spans[name]
+            spans.append(
+                {
+                    "name": name,
+                    "provider": self.provider_for(name),
+                    "start_ms": round((start - self.start_time) * 1000, 1),
+                    "duration_ms": round((end - start) * 1000, 1),
+                }
+            )
+        return {
+            "time": time.strftime(
+                "%Y-%m-%d %H:%M:%S", time.localtime(self.start_wall_time)
+            ),
+            "device_id": self.device_id,
+            "session_id": self.session_id,
+            "kind": self.kind,
+            "status": status,
+            "providers": self.providers,
+            "first_frame_ms": self.duration_ms("first_frame"),
+            "last_frame_ms": self.duration_ms("last_frame"),
+            "spans": spans,
+        }
+
+
+class TurnTracer:
+    """汇总各轮对话的耗时直方图，按比例记录慢对话明细"""
+
+    def __init__(
+        self,
+        slow_turn_ms=3000,
+        slow_sample_rate=1.0,
+        slow_log_file="data/slow_turns.jsonl",
+        slow_log_max_mb=50,
+    ):
+        self.slow_turn_ms = float(slow_turn_ms)
+        self.slow_sample_rate = float(slow_sample_rate)
+        self.slow_log_file = slow_log_file
+        self.slow_log_max_bytes = int(float(slow_log_max_mb) * 1024 * 1024)
+        self._histograms = {}
+        self._turns = {}
+        self._slow_turns = 0
+        self._slow_logged = 0
+        self._slow_dropped = 0
+        self._lock = threading.Lock()
+        # 慢对话记录由写入线程落盘，文件轮转和写入不占用事件循环
+        self._pending_lines = deque()
+        self._writer_cond = threading.Condition()
+        self._writer = None
+        self._closed = False
+
+    def start(self, conn, kind) -> TurnTrace:
+        return TurnTrace(self, conn, kind)
+
+    def record(self, trace: TurnTrace, status):
+        first_frame_ms = trace.duration_ms("first_frame")
+        is_slow = first_frame_ms is not None and first_frame_ms >= self.slow_turn_ms
+        with self._lock:
+            for name, (start, end) in trace.spans.items():
+                key = (name, trace.provider_for(name))
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = LatencyHistogram()
+                histogram.observe(end - start)
+            turn_key = (trace.kind, status)
+            self._turns[turn_key] = self._turns.get(turn_key, 0) + 1
+            if is_slow:
+                self._slow_turns += 1
+        if is_slow and random.random() < self.slow_sample_rate:
+            self._write_slow_turn(trace.to_dict(status))
+
+    def _write_slow_turn(self, record):
+        """把慢对话记录交给写入线程，队列已满时丢弃"""
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._writer_cond:
+            if self._closed:
+                return
+            if len(self._pending_lines) >= SLOW_LOG_QUEUE_SIZE:
+                self._slow_dropped += 1
+                return
+            self._pending_lines.append(line)
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._run_writer, name="slow-turn-writer", daemon=True
+                )
+                self._writer.start()
+            self._writer_cond.notify()
+
+    def _run_writer(self):
+        while True:
+            with self._writer_cond:
+                while not self._pending_lines and not self._closed:
+                    self._writer_cond.wait()
+                lines = list(self._pending_lines)
+                self._pending_lines.clear()
+            if not lines:
+                return
+            self._append_lines(lines)
+
+    def _append_lines(self, lines):
+        try:
+            directory = os.path.dirname(self.slow_log_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if (
+                self.slow_log_max_bytes > 0
+                and os.path.exists(self.slow_log_file)
+                and os.path.getsize(self.slow_log_file) >= self.slow_log_max_bytes
+            ):
+                os.replace(self.slow_log_file, self.slow_log_file + ".1")
+            with open(self.slow_log_file, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+            with self._lock:
+                self._slow_logged += len(lines)
+        except OSError as e:
+            logger.bind(tag=TAG).warning(f"写入慢对话记录失败: {e}")
+
+    def close(self):
+        """停止写入线程，已提交的慢对话记录写完后退出"""
+        with self._writer_cond:
+            self._closed = True
+            writer = self._writer
+            self._writer_cond.notify()
+        if writer is not None:
+            writer.join(timeout=5)
+
+    def collect(self) -> list:
+        """生成 /metrics 接口的直方图和计数"""
+        with self._lock:
+            histograms = sorted(
+                self._histograms.items(),
+                key=lambda item: (SPAN_ORDER.index(item[0][0]), item[0][1]),
+            )
+            lines = []
+            name = metric_name("turn_span_seconds")
+            lines.append(f"# HELP {name} 单轮对话各阶段耗时")
+            lines.append(f"# TYPE {name} histogram")
+            for (span, provider), histogram in histograms:
+                lines.extend(histogram.render(name, {"span": span, "provider": provider}))
+            name = metric_name("turns_total")
+            lines.append(f"# TYPE {name} counter")
+            for (kind, status), count in sorted(self._turns.items()):
+                lines.append(
+                    f"{name}{format_labels({'kind': kind, 'status': status})} {count}"
+                )
+            name = metric_name("slow_turns_total")
+            lines.append(f"# HELP {name} 首帧耗时超过{self.slow_turn_ms:.0f}ms的对话数")
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {self._slow_turns}")
+            return lines
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "turns": sum(self._turns.values()),
+                "slow_turns": self._slow_turns,
+                "slow_logged": self._slow_logged,
+                "slow_dropped": self._slow_dropped,
+            }
+
+
+_turn_tracer = None
+_turn_tracer_lock = threading.Lock()
+
+
+def get_turn_tracer(config=None) -> Optional[TurnTracer]:
+    """
+    获取全局单轮对话耗时追踪（单例模式）
+
+    Args:
+        config: turn_trace配置，服务启动时传入以创建
+
+    Returns:
+        TurnTracer实例，未开启或尚未创建时返回None
+    """
+    global _turn_tracer
+    if _turn_tracer is None and config is not None:
+        with _turn_tracer_lock:
+            if _turn_tracer is None:
+                if str(config.get("enable", True)).lower() not in ("true", "1", "yes"):
+                    _turn_tracer = False
+                else:
+                    _turn_tracer = TurnTracer(
+                        slow_turn_ms=config.get("slow_turn_ms", 3000),
+                        slow_sample_rate=config.get("slow_sample_rate", 1.0),
+                        slow_log_file=config.get("slow_log_file")
+                        or "data/slow_turns.jsonl",
+                        slow_log_max_mb=config.get("slow_log_max_mb", 50),
+                    )
+                    register_collector(_turn_tracer.collect)
+    return _turn_tracer or None
+
+
+def shutdown_turn_tracer():
+    """停止慢对话写入线程，写完已提交的记录"""
+    global _turn_tracer
+    with _turn_tracer_lock:
+        if _turn_tracer:
+            _turn_tracer.close()
+        _turn_tracer = None
+
+
+def start_turn(conn, kind) -> Optional[TurnTrace]:
+    """开始一轮对话的追踪，上一轮未结束的记为superseded"""
+    previous = getattr(conn, "turn_trace", None)
+    if previous is not None:
+        previous.finish("superseded")
+    tracer = get_turn_tracer()
+    conn.turn_trace = tracer.start(conn, kind) if tracer is not None else None
+    return conn.turn_trace
+
+
+def get_turn_trace(conn) -> Optional[TurnTrace]:
+    """当前进行中的追踪，未开启追踪或本轮已结束时返回None"""
+    trace = getattr(conn, "turn_trace", None)
+    if trace is None or trace.finished:
+        return None
+    return trace
+
+
+def trace_span(conn, name):
+    """记录当前轮次的一个阶段，没有进行中的追踪时不做任何事"""
+    trace = get_turn_trace(conn)
+    if trace is None:
+        return contextlib.nullcontext()
+    return trace.span(name)
+
+
+def finish_turn(conn, status="ok"):
+    trace = get_turn_trace(conn)
+    if trace is not None:
+        trace.finish(status)
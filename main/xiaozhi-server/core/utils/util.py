@@ -3,18 +3,24 @@ import os
 import json
 import copy
 import wave
+import zlib
+import struct
+import random
 import socket
 import requests
 import subprocess
-import numpy as np
 import opuslib_next
 import gc
 from io import BytesIO
 from core.utils import p3
-from pydub import AudioSegment
+from core.utils.audio_decode import decode_audio_to_pcm
+from core.utils.opus_encoder_service import get_opus_encoder_service, iter_pcm_frames
 from typing import Callable, Any
 
 TAG = __name__
+# 60ms一帧，16kHz/单声道/16位PCM每帧960个采样点
+PCM_FRAME_BYTES = 960 * 2
+
 emoji_map = {
     "neutral": "😶",
     "happy": "🙂",
@@ -256,16 +262,8 @@ def audio_to_data_stream(
     file_type = os.path.splitext(audio_file_path)[1]
     if file_type:
         file_type = file_type.lstrip(".")
-    # 读取音频文件，-nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
-    audio = AudioSegment.from_file(
-        audio_file_path, format=file_type, parameters=["-nostdin"]
-    )
-
-    # 转换为单声道/16kHz采样率/16位小端编码（确保与编码器匹配）
-    audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-
-    # 获取原始PCM数据（16位小端）
-    raw_data = audio.raw_data
+    # 解码为单声道/16kHz采样率/16位小端PCM（确保与编码器匹配）
+    raw_data = decode_audio_to_pcm(audio_file_path, file_type)
     pcm_to_data_stream(raw_data, is_opus, callback)
 
 
@@ -280,45 +278,13 @@ def audio_to_data(audio_file_path: str, is_opus: bool = True) -> list[bytes]:
     file_type = os.path.splitext(audio_file_path)[1]
     if file_type:
         file_type = file_type.lstrip(".")
-    # 读取音频文件，-nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
-    audio = AudioSegment.from_file(
-        audio_file_path, format=file_type, parameters=["-nostdin"]
-    )
-
-    # 转换为单声道/16kHz采样率/16位小端编码（确保与编码器匹配）
-    audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-
-    # 获取原始PCM数据（16位小端）
-    raw_data = audio.raw_data
-
-    # 初始化Opus编码器
-    encoder = opuslib_next.Encoder(16000, 1, opuslib_next.APPLICATION_AUDIO)
+    # 解码为单声道/16kHz采样率/16位小端PCM（确保与编码器匹配）
+    raw_data = decode_audio_to_pcm(audio_file_path, file_type)
 
-    # 编码参数
-    frame_duration = 60  # 60ms per frame
-    frame_size = int(16000 * frame_duration / 1000)  # 960 samples/frame
-
-    datas = []
-    # 按帧处理所有音频数据（包括最后一帧可能补零）
-    for i in range(0, len(raw_data), frame_size * 2):  # 16bit=2bytes/sample
-        # 获取当前帧的二进制数据
-        chunk = raw_data[i : i + frame_size * 2]
-
-        # 如果最后一帧不足，补零
-        if len(chunk) < frame_size * 2:
-            chunk += b"\x00" * (frame_size * 2 - len(chunk))
-
-        if is_opus:
-            # 转换为numpy数组处理
-            np_frame = np.frombuffer(chunk, dtype=np.int16)
-            # 编码Opus数据
-            frame_data = encoder.encode(np_frame.tobytes(), frame_size)
-        else:
-            frame_data = chunk if isinstance(chunk, bytes) else bytes(chunk)
-
-        datas.append(frame_data)
-
-    return datas
+    if is_opus:
+        # 批量编码，一次返回全部Opus帧
+        return get_opus_encoder_service().encode_frames(raw_data)
+    return [bytes(frame) for frame in iter_pcm_frames(raw_data, PCM_FRAME_BYTES)]
 
 
 def audio_bytes_to_data_stream(
@@ -331,41 +297,22 @@ def audio_bytes_to_data_stream(
         # 直接用p3解码
         return p3.decode_opus_from_bytes_stream(audio_bytes, callback)
     else:
-        # 其他格式用pydub
-        audio = AudioSegment.from_file(
-            BytesIO(audio_bytes), format=file_type, parameters=["-nostdin"]
-        )
-        audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-        raw_data = audio.raw_data
+        # 其他格式在进程内解码
+        raw_data = decode_audio_to_pcm(audio_bytes, file_type)
         pcm_to_data_stream(raw_data, is_opus, callback)
 
 
 def pcm_to_data_stream(raw_data, is_opus=True, callback: Callable[[Any], Any] = None):
-    # 初始化Opus编码器
-    encoder = opuslib_next.Encoder(16000, 1, opuslib_next.APPLICATION_AUDIO)
-
-    # 编码参数
-    frame_duration = 60  # 60ms per frame
-    frame_size = int(16000 * frame_duration / 1000)  # 960 samples/frame
-
-    # 按帧处理所有音频数据（包括最后一帧可能补零）
-    for i in range(0, len(raw_data), frame_size * 2):  # 16bit=2bytes/sample
-        # 获取当前帧的二进制数据
-        chunk = raw_data[i : i + frame_size * 2]
-
-        # 如果最后一帧不足，补零
-        if len(chunk) < frame_size * 2:
-            chunk += b"\x00" * (frame_size * 2 - len(chunk))
-
-        if is_opus:
-            # 转换为numpy数组处理
-            np_frame = np.frombuffer(chunk, dtype=np.int16)
-            # 编码Opus数据
-            frame_data = encoder.encode(np_frame.tobytes(), frame_size)
-            callback(frame_data)
-        else:
-            frame_data = chunk if isinstance(chunk, bytes) else bytes(chunk)
-            callback(frame_data)
+    """
+    将16kHz/单声道/16位PCM数据按60ms分帧，逐帧回调opus/pcm数据
+    """
+    if is_opus:
+        # 使用编码器池中的编码器，按内存地址逐帧编码，不拷贝PCM数据
+        get_opus_encoder_service().encode_stream(raw_data, callback)
+    else:
+        # 最后一帧不足时补零
+        for frame in iter_pcm_frames(raw_data, PCM_FRAME_BYTES):
+            callback(bytes(frame))
 
 
 def opus_datas_to_wav_bytes(opus_datas, sample_rate=16000, channels=1):
@@ -402,6 +349,94 @@ def opus_datas_to_wav_bytes(opus_datas, sample_rate=16000, channels=1):
                 pass
 
 
+# 按位反转每个字节，用于借助zlib.crc32计算Ogg的CRC
+_BIT_REVERSE = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+# Opus各配置的单帧时长（48kHz下的采样点数），见RFC 6716 3.1节
+_OPUS_FRAME_SAMPLES = (
+    [480, 960, 1920, 2880] * 3  # SILK
+    + [480, 960] * 2  # Hybrid
+    + [120, 240, 480, 960] * 4  # CELT
+)
+
+
+def _ogg_crc(data) -> int:
+    """Ogg页校验和（CRC-32，多项式0x04c11db7，不反射，初值0）"""
+    crc = zlib.crc32(data.translate(_BIT_REVERSE), 0xFFFFFFFF) ^ 0xFFFFFFFF
+    return int(f"{crc:032b}"[::-1], 2)
+
+
+def opus_packet_samples(packet) -> int:
+    """根据TOC字节计算一个opus包在48kHz下的采样点数"""
+    if not packet:
+        return 0
+    toc = packet[0]
+    code = toc & 0x03
+    if code == 0:
+        frames = 1
+    elif code != 3:
+        frames = 2
+    elif len(packet) > 1:
+        frames = packet[1] & 0x3F
+    else:
+        return 0
+    return _OPUS_FRAME_SAMPLES[toc >> 3] * frames
+
+
+def _ogg_page(serial, sequence, granule, header_type, segments, body) -> bytes:
+    header = bytearray(
+        struct.pack(
+            "<4sBBqIIIB",
+            b"OggS",
+            0,
+            header_type,
+            granule,
+            serial,
+            sequence,
+            0,
+            len(segments),
+        )
+    )
+    header.extend(segments)
+    page = bytes(header) + body
+    crc = _ogg_crc(page)
+    return page[:22] + struct.pack("<I", crc) + page[26:]
+
+
+def opus_datas_to_ogg_bytes(opus_datas, sample_rate=16000, channels=1):
+    """
+    将opus帧列表直接封装为Ogg/Opus字节流（RFC 7845），不解码音频
+
+    体积与原始opus数据基本相同，约为同等时长16kHz WAV的十分之一
+    """
+    serial = random.getrandbits(32)
+    pages = []
+    opus_head = struct.pack(
+        "<8sBBHIhB", b"OpusHead", 1, channels, 0, sample_rate, 0, 0
+    )
+    opus_tags = struct.pack("<8sI", b"OpusTags", 6) + b"xiaozh" + struct.pack("<I", 0)
+    pages.append(_ogg_page(serial, 0, 0, 0x02, [len(opus_head)], opus_head))
+    pages.append(_ogg_page(serial, 1, 0, 0x00, [len(opus_tags)], opus_tags))
+
+    packets = [packet for packet in opus_datas if packet]
+    sequence = 2
+    granule = 0
+    segments, body = [], []
+    for packet in packets:
+        lacing = [255] * (len(packet) // 255) + [len(packet) % 255]
+        if segments and len(segments) + len(lacing) > 255:
+            pages.append(
+                _ogg_page(serial, sequence, granule, 0x00, segments, b"".join(body))
+            )
+            sequence += 1
+            segments, body = [], []
+        segments.extend(lacing)
+        body.append(packet)
+        granule += opus_packet_samples(packet)
+    # 最后一页带结束标记，没有音频数据时也输出一个空的结束页
+    pages.append(_ogg_page(serial, sequence, granule, 0x04, segments, b"".join(body)))
+    return b"".join(pages)
+
+
 def check_vad_update(before_config, new_config):
     if (
         new_config.get("selected_module") is None
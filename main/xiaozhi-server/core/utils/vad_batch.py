@@ -0,0 +1,224 @@
+"""
+跨连接批量VAD推理引擎
+
+各连接把待检测的32ms音频块（16k采样率下512个采样点）提交到引擎，
+引擎在后台线程中把所有连接的待处理音频块合并成一个批次，执行一次前向推理，
+再把结果分发回各连接。每个连接拥有独立的RNN状态和上下文，互不干扰。
+"""
+
+import asyncio
+import threading
+import numpy as np
+from concurrent.futures import Future
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+SAMPLE_RATE = 16000
+CHUNK_SAMPLES = 512
+CONTEXT_SAMPLES = 64
+STATE_SHAPE = (2, 1, 128)
+# int16转float32的缩放系数
+SCALE = np.float32(1.0 / 32768.0)
+
+
+class VADStreamState:
+    """
+    单个连接的VAD模型状态和音频缓冲
+
+    音频使用预分配的int16环形缓冲区保存，取音频块时只移动读写位置，
+    并直接转换到预分配的float32暂存区，处理过程中不产生逐块的内存分配。
+    """
+
+    def __init__(self, capacity=CHUNK_SAMPLES * 8):
+        self.state = np.zeros(STATE_SHAPE, dtype=np.float32)
+        # 模型输入行：前64个采样点为上一块的上下文，后512个为当前音频块
+        self.inputs = np.zeros((1, CONTEXT_SAMPLES + CHUNK_SAMPLES), dtype=np.float32)
+        self.context = self.inputs[0, :CONTEXT_SAMPLES]
+        # 最近一次解码的opus包及其PCM，供ASR在语音结束时复用
+        self.last_packet = None
+        self.last_pcm = None
+        self.last_decode_ms = 0.0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self._ring = np.zeros(capacity, dtype=np.int16)
+        self._scratch = np.zeros((capacity // CHUNK_SAMPLES, CHUNK_SAMPLES), dtype=np.float32)
+        self._read = 0
+        self._size = 0
+
+    def reset(self):
+        self.state = np.zeros(STATE_SHAPE, dtype=np.float32)
+        self.inputs.fill(0)
+        self.clear_audio()
+
+    def clear_audio(self):
+        """清空尚未处理的音频"""
+        self._read = 0
+        self._size = 0
+
+    @property
+    def buffered_samples(self) -> int:
+        return self._size
+
+    def write_pcm(self, pcm):
+        """写入16bit PCM数据"""
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        count = samples.shape[0]
+        capacity = self._ring.shape[0]
+        if self._size + count > capacity:
+            # 超长音频帧，扩容（极少发生）
+            pending = self._read_range(self._size)
+            self._allocate(max(capacity * 2, (self._size + count) * 2))
+            self._ring[: pending.shape[0]] = pending
+            self._size = pending.shape[0]
+            capacity = self._ring.shape[0]
+        start = (self._read + self._size) % capacity
+        first = min(count, capacity - start)
+        self._ring[start : start + first] = samples[:first]
+        if first < count:
+            self._ring[: count - first] = samples[first:]
+        self._size += count
+
+    def _read_range(self, count):
+        """按顺序拷贝出前count个采样点（仅扩容时使用）"""
+        capacity = self._ring.shape[0]
+        indexes = (self._read + np.arange(count)) % capacity
+        return self._ring[indexes]
+
+    def read_chunks(self) -> np.ndarray:
+        """
+        取出所有完整的512采样点音频块
+
+        Returns:
+            (N, 512) float32，为暂存区视图，下次调用 read_chunks 前有效
+        """
+        count = self._size // CHUNK_SAMPLES
+        capacity = self._ring.shape[0]
+        for i in range(count):
+            row = self._scratch[i]
+            end = self._read + CHUNK_SAMPLES
+            if end <= capacity:
+                np.multiply(self._ring[self._read : end], SCALE, out=row)
+            else:
+                # 音频块跨越缓冲区末尾，分两段转换
+                first = capacity - self._read
+                np.multiply(self._ring[self._read :], SCALE, out=row[:first])
+                np.multiply(self._ring[: end - capacity], SCALE, out=row[first:])
+            self._read = end % capacity
+        self._size -= count * CHUNK_SAMPLES
+        return self._scratch[:count]
+
+    def prepare(self, chunk) -> np.ndarray:
+        """把音频块拼接到上下文之后，返回(1, 576)的模型输入"""
+        self.inputs[0, CONTEXT_SAMPLES:] = chunk
+        return self.inputs
+
+    def commit(self, new_state):
+        """推理完成后更新RNN状态和上下文"""
+        self.state = new_state
+        self.context[:] = self.inputs[0, -CONTEXT_SAMPLES:]
+
+
+class BatchedVADEngine:
+    """
+    批量VAD推理引擎
+
+    forward_fn(inputs, states) -> (probs, new_states)
+        inputs: (B, CONTEXT_SAMPLES + CHUNK_SAMPLES) float32
+        states: (2, B, 128) float32
+        probs: (B,) 语音概率
+        new_states: (2, B, 128) 更新后的状态
+    """
+
+    def __init__(self, forward_fn, max_batch_size=256, max_wait_ms=2, name="vad-batch"):
+        self.forward_fn = forward_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self._pending = []
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, stream: VADStreamState, chunk: np.ndarray) -> Future:
+        """提交一个音频块，返回语音概率的Future"""
+        future = Future()
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("VAD批量推理引擎已停止")
+            self._pending.append((stream, chunk, future))
+            self._cond.notify()
+        return future
+
+    async def infer(self, stream: VADStreamState, chunks):
+        """在事件循环中提交同一连接的多个音频块，按顺序返回语音概率"""
+        futures = [asyncio.wrap_future(self.submit(stream, chunk)) for chunk in chunks]
+        return await asyncio.gather(*futures)
+
+    def close(self):
+        with self._cond:
+            self._stopped = True
+            pending, self._pending = self._pending, []
+            self._cond.notify_all()
+        for _, _, future in pending:
+            future.cancel()
+
+    def _take_pending(self):
+        with self._cond:
+            while not self._pending and not self._stopped:
+                self._cond.wait()
+            if self._stopped:
+                return []
+            # 推理期间到达的请求会自然积累成批次，这里再额外等待一个很短的窗口
+            if self.max_wait and len(self._pending) < self.max_batch_size:
+                self._cond.wait(self.max_wait)
+            pending, self._pending = self._pending, []
+            return pending
+
+    def _run(self):
+        while True:
+            pending = self._take_pending()
+            if not pending:
+                if self._stopped:
+                    return
+                continue
+            # 跳过已取消的请求（如连接已关闭）
+            pending = [
+                item for item in pending if item[2].set_running_or_notify_cancel()
+            ]
+            # 同一连接的音频块必须顺序推理，拆分成多轮，每轮每个连接最多一个块
+            while pending:
+                batch, deferred, seen = [], [], set()
+                for item in pending:
+                    stream_id = id(item[0])
+                    if stream_id in seen or len(batch) >= self.max_batch_size:
+                        deferred.append(item)
+                    else:
+                        seen.add(stream_id)
+                        batch.append(item)
+                self._forward(batch)
+                pending = deferred
+
+    def _forward(self, batch):
+        try:
+            inputs = np.empty(
+                (len(batch), CONTEXT_SAMPLES + CHUNK_SAMPLES), dtype=np.float32
+            )
+            for i, (stream, chunk, _) in enumerate(batch):
+                inputs[i, :CONTEXT_SAMPLES] = stream.context
+                inputs[i, CONTEXT_SAMPLES:] = chunk
+            states = np.concatenate([stream.state for stream, _, _ in batch], axis=1)
+
+            probs, new_states = self.forward_fn(inputs, states)
+
+            for i, (stream, _, future) in enumerate(batch):
+                stream.state = np.ascontiguousarray(new_states[:, i : i + 1, :])
+                stream.context[:] = inputs[i, -CONTEXT_SAMPLES:]
+                future.set_result(float(probs[i]))
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"VAD批量推理失败: {e}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
@@ -1,12 +1,13 @@
 import asyncio
 import time
 import aiohttp
-import requests
+import httpx
 from urllib.parse import urlparse, parse_qs
 from typing import Optional, Dict
 from config.logger import setup_logging
 from core.utils.cache.manager import cache_manager
 from core.utils.cache.config import CacheType
+from core.utils.http_client import get_http_clients
 
 TAG = __name__
 logger = setup_logging()
@@ -107,7 +108,7 @@ class VoiceprintProvider:
             health_url = f"{parsed_url.scheme}://{parsed_url.netloc}/voiceprint/health?key={self.api_key}"
             
             # 发送健康检查请求
-            response = requests.get(health_url, timeout=3)
+            response = get_http_clients().get_client().get(health_url, timeout=3)
             
             if response.status_code == 200:
                 result = response.json()
@@ -121,10 +122,10 @@ class VoiceprintProvider:
                 logger.bind(tag=TAG).warning(f"声纹识别服务器健康检查失败: HTTP {response.status_code}")
                 is_healthy = False
                 
-        except requests.exceptions.ConnectTimeout:
+        except httpx.ConnectTimeout:
             logger.bind(tag=TAG).warning("声纹识别服务器连接超时")
             is_healthy = False
-        except requests.exceptions.ConnectionError:
+        except httpx.ConnectError:
             logger.bind(tag=TAG).warning("声纹识别服务器连接被拒绝")
             is_healthy = False
         except Exception as e:
@@ -159,34 +160,36 @@ class VoiceprintProvider:
             
             timeout = aiohttp.ClientTimeout(total=10)
             
-            # 网络请求
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(self.api_url, headers=headers, data=data) as response:
+            # 网络请求，复用全局连接池
+            session = get_http_clients().get_session()
+            async with session.post(
+                self.api_url, headers=headers, data=data, timeout=timeout
+            ) as response:
+                
+                if response.status == 200:
+                    result = await response.json()
+                    speaker_id = result.get("speaker_id")
+                    score = result.get("score", 0)
+                    total_elapsed_time = time.monotonic() - api_start_time
+                    
+                    logger.bind(tag=TAG).info(f"声纹识别耗时: {total_elapsed_time:.3f}s")
+                    
+                    # 相似度阈值检查
+                    if score < self.similarity_threshold:
+                        logger.bind(tag=TAG).warning(f"声纹识别相似度{score:.3f}低于阈值{self.similarity_threshold}")
+                        return "未知说话人"
                     
-                    if response.status == 200:
-                        result = await response.json()
-                        speaker_id = result.get("speaker_id")
-                        score = result.get("score", 0)
-                        total_elapsed_time = time.monotonic() - api_start_time
-                        
-                        logger.bind(tag=TAG).info(f"声纹识别耗时: {total_elapsed_time:.3f}s")
-                        
-                        # 相似度阈值检查
-                        if score < self.similarity_threshold:
-                            logger.bind(tag=TAG).warning(f"声纹识别相似度{score:.3f}低于阈值{self.similarity_threshold}")
-                            return "未知说话人"
-                        
-                        if speaker_id and speaker_id in self.speaker_map:
-                            result_name = self.speaker_map[speaker_id]["name"]
-                            logger.bind(tag=TAG).info(f"声纹识别成功: {result_name} (相似度: {score:.3f})")
-                            return result_name
-                        else:
-                            logger.bind(tag=TAG).warning(f"未识别的说话人ID: {speaker_id}")
-                            return "未知说话人"
+                    if speaker_id and speaker_id in self.speaker_map:
+                        result_name = self.speaker_map[speaker_id]["name"]
+                        logger.bind(tag=TAG).info(f"声纹识别成功: {result_name} (相似度: {score:.3f})")
+                        return result_name
                     else:
-                        logger.bind(tag=TAG).error(f"声纹识别API错误: HTTP {response.status}")
-                        return None
-                        
+                        logger.bind(tag=TAG).warning(f"未识别的说话人ID: {speaker_id}")
+                        return "未知说话人"
+                else:
+                    logger.bind(tag=TAG).error(f"声纹识别API错误: HTTP {response.status}")
+                    return None
+                    
         except asyncio.TimeoutError:
             elapsed = time.monotonic() - api_start_time
             logger.bind(tag=TAG).error(f"声纹识别超时: {elapsed:.3f}s")
@@ -0,0 +1,203 @@
+import time
+import random
+import asyncio
+import threading
+import concurrent.futures
+from tabulate import tabulate
+
+from config.settings import load_config
+from core.utils.asr_service import ASRExecutionService
+
+description = "ASR执行服务与逐句创建线程池/事件循环的开销及并发对比测试"
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class ASRServicePerformanceTester:
+    def __init__(self):
+        self.config = load_config()
+        service_config = self.config.get("asr_service") or {}
+        self.max_workers = service_config.get("max_workers") or 16
+        self.setup_iterations = 200
+        self.concurrent_events = 200
+        # 模拟一次阻塞式ASR请求（本地模型）的耗时
+        self.asr_ms = 50
+        # 模拟一次远程ASR请求的网络等待范围
+        self.remote_asr_ms = (1000, 2000)
+        # 与 handle_voice_stop 相同的识别超时
+        self.asr_timeout = 15
+        self.setup_results = []
+        self.load_results = []
+
+    async def _mock_asr(self):
+        """模拟阻塞式的ASR提供者（如同步HTTP请求）"""
+        time.sleep(self.asr_ms / 1000)
+        return "测试文本", None
+
+    async def _mock_remote_asr(self):
+        """模拟远程ASR提供者，等待网络响应时不占用线程"""
+        await asyncio.sleep(random.uniform(*self.remote_asr_ms) / 1000)
+        return "测试文本", None
+
+    async def _noop(self):
+        return "测试文本", None
+
+    def _legacy_run(self, coro_fn):
+        """原实现：每句话创建线程池，线程内再创建事件循环"""
+
+        def run_in_new_loop():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                return loop.run_until_complete(coro_fn())
+            finally:
+                loop.close()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            asr_future = executor.submit(run_in_new_loop)
+            voiceprint_future = executor.submit(run_in_new_loop)
+            return asr_future.result(timeout=15), voiceprint_future.result(timeout=15)
+
+    async def _test_setup(self, service):
+        """测量空任务的单句调度开销"""
+        start = time.perf_counter()
+        for _ in range(self.setup_iterations):
+            self._legacy_run(self._noop)
+        legacy_ms = (time.perf_counter() - start) * 1000 / self.setup_iterations
+
+        start = time.perf_counter()
+        for _ in range(self.setup_iterations):
+            await asyncio.gather(
+                service.run("mock", self._noop), service.run("voiceprint", self._noop)
+            )
+        service_ms = (time.perf_counter() - start) * 1000 / self.setup_iterations
+
+        self.setup_results.append(["逐句创建线程池+事件循环", f"{legacy_ms:.3f}"])
+        self.setup_results.append(["ASR执行服务", f"{service_ms:.3f}"])
+        self.setup_results.append(["每句节省", f"{legacy_ms - service_ms:.3f}"])
+
+    async def _measure_load(self, name, handle_voice_stop):
+        """同时触发大量语音结束事件，统计完成耗时和事件循环卡顿"""
+        loop_lags = []
+        stop = asyncio.Event()
+
+        async def ticker():
+            while not stop.is_set():
+                expected = time.perf_counter() + 0.01
+                await asyncio.sleep(0.01)
+                loop_lags.append((time.perf_counter() - expected) * 1000)
+
+        peak_threads = threading.active_count()
+        timeouts = 0
+
+        async def one_event():
+            nonlocal peak_threads, timeouts
+            start = time.perf_counter()
+            try:
+                await handle_voice_stop()
+            except asyncio.TimeoutError:
+                timeouts += 1
+            peak_threads = max(peak_threads, threading.active_count())
+            return (time.perf_counter() - start) * 1000
+
+        ticker_task = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        latencies = await asyncio.gather(
+            *[one_event() for _ in range(self.concurrent_events)]
+        )
+        makespan = time.perf_counter() - start
+        stop.set()
+        await ticker_task
+
+        self.load_results.append(
+            [
+                name,
+                f"{makespan:.2f}",
+                f"{_percentile(latencies, 50):.0f}",
+                f"{_percentile(latencies, 99):.0f}",
+                f"{max(loop_lags) if loop_lags else makespan * 1000:.0f}",
+                peak_threads,
+                timeouts,
+            ]
+        )
+
+    async def run(self):
+        print("开始ASR执行服务测试...")
+        service = ASRExecutionService(max_workers=self.max_workers)
+        try:
+            await self._test_setup(service)
+
+            async def legacy_voice_stop():
+                # 原实现在事件循环中同步等待结果，会阻塞整个事件循环
+                self._legacy_run(self._mock_asr)
+
+            async def service_voice_stop():
+                await asyncio.gather(
+                    service.run("mock", self._mock_asr, timeout=self.asr_timeout),
+                    service.run("voiceprint", self._mock_asr, timeout=self.asr_timeout),
+                )
+
+            async def service_remote_voice_stop():
+                await asyncio.gather(
+                    service.run(
+                        "remote", self._mock_remote_asr, timeout=self.asr_timeout
+                    ),
+                    service.run(
+                        "voiceprint", self._mock_remote_asr, timeout=self.asr_timeout
+                    ),
+                )
+
+            print(f"测试 {self.concurrent_events} 个同时发生的语音结束事件...")
+            await self._measure_load("本地模型: 逐句创建线程池+事件循环", legacy_voice_stop)
+            await self._measure_load("本地模型: ASR执行服务", service_voice_stop)
+            await self._measure_load("远程ASR: ASR执行服务", service_remote_voice_stop)
+            stats = service.get_stats()
+        finally:
+            service.shutdown()
+
+        print("\n单句调度开销（空任务，ASR+声纹两个任务）:")
+        print(
+            tabulate(self.setup_results, headers=["方式", "耗时(ms)"], tablefmt="grid")
+        )
+        print(f"\n{self.concurrent_events}个语音结束事件同时到达:")
+        print(
+            tabulate(
+                self.load_results,
+                headers=[
+                    "方式",
+                    "总耗时(s)",
+                    "P50(ms)",
+                    "P99(ms)",
+                    "事件循环最大卡顿(ms)",
+                    "峰值线程数",
+                    "超时数",
+                ],
+                tablefmt="grid",
+            )
+        )
+        print("\nASR执行服务指标:")
+        print(tabulate([[k, v] for k, v in stats.items()], tablefmt="grid"))
+        print("\n测试说明:")
+        print(f"- 本地模型：每个ASR/声纹任务模拟阻塞 {self.asr_ms}ms，ASR执行服务工作线程 {self.max_workers} 个")
+        print(
+            f"- 远程ASR：每个任务异步等待{self.remote_asr_ms[0]}-{self.remote_asr_ms[1]}ms，"
+            f"超时{self.asr_timeout}秒（含排队时间）"
+        )
+        print("- 原实现在事件循环中同步等待识别结果，并发事件会被串行处理，远程ASR场景不再测试原实现")
+
+
+# 为了performance_tester.py的调用需求
+async def main():
+    tester = ASRServicePerformanceTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    tester = ASRServicePerformanceTester()
+    asyncio.run(tester.run())
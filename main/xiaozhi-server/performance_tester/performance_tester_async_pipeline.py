@@ -0,0 +1,203 @@
+import time
+import uuid
+import asyncio
+import threading
+from tabulate import tabulate
+
+from config.settings import load_config
+from core.providers.tts.base import TTSProviderBase
+from core.providers.tts.dto.dto import TTSMessageDTO, SentenceType, ContentType
+from core.utils.async_pipeline import get_shared_executor, shutdown_shared_executor
+
+description = "异步流水线与线程模式并发对比测试（每连接线程数/首包延迟）"
+
+# 每个模拟连接的一句回复会产生的opus帧数
+FAKE_FRAME_COUNT = 10
+FAKE_OPUS_FRAME = b"\x00" * 120
+
+
+class _SilentLogger:
+    """屏蔽模拟连接产生的大量日志"""
+
+    def bind(self, **kwargs):
+        return self
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class _FakeWebSocket:
+    def __init__(self):
+        self.first_audio_time = None
+
+    async def send(self, data):
+        if isinstance(data, bytes) and self.first_audio_time is None:
+            self.first_audio_time = time.perf_counter()
+
+
+class _MockTTS(TTSProviderBase):
+    """模拟非流式TTS：阻塞一段时间后产出固定数量的opus帧"""
+
+    def __init__(self, synth_ms):
+        super().__init__({}, delete_audio_file=True)
+        self.synth_ms = synth_ms
+
+    async def text_to_speak(self, text, output_file):
+        return None
+
+    def to_tts_stream(self, text, opus_handler=None, cleaned=False):
+        time.sleep(self.synth_ms / 1000)
+        self.tts_audio_queue.put((SentenceType.FIRST, None, text))
+        for _ in range(FAKE_FRAME_COUNT):
+            opus_handler(FAKE_OPUS_FRAME)
+
+
+class _FakeConnection:
+    def __init__(self, loop, async_pipeline):
+        self.loop = loop
+        self.async_pipeline = async_pipeline
+        self.stop_event = threading.Event()
+        self.websocket = _FakeWebSocket()
+        self.logger = _SilentLogger()
+        self.session_id = str(uuid.uuid4())
+        self.sentence_id = uuid.uuid4().hex
+        self.config = {"tts_audio_send_delay": 0}
+        self.headers = {}
+        self.client_abort = False
+        self.client_is_speaking = False
+        self.close_after_chat = False
+        self.conn_from_mqtt_gateway = False
+        self.read_config_from_api = False
+        self.max_output_size = 0
+        self.last_activity_time = 0
+        self.start_time = None
+        self.tts = None
+
+    def clearSpeakStatus(self):
+        self.client_is_speaking = False
+
+
+def _percentile(values, percent):
+    if not values:
+        return None
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class AsyncPipelinePerformanceTester:
+    def __init__(self):
+        self.config = load_config()
+        pipeline_config = self.config.get("async_pipeline") or {}
+        self.max_workers = pipeline_config.get("max_workers", 64)
+        self.connection_counts = [100, 500, 1000]
+        # 模拟一次非流式TTS调用的阻塞时长
+        self.synth_ms = 50
+        self.timeout = 60
+        self.results = []
+
+    async def _run_case(self, async_pipeline: bool, count: int):
+        loop = asyncio.get_running_loop()
+        base_threads = threading.active_count()
+
+        conns = []
+        for _ in range(count):
+            conn = _FakeConnection(loop, async_pipeline)
+            conn.tts = _MockTTS(self.synth_ms)
+            await conn.tts.open_audio_channels(conn)
+            conns.append(conn)
+        await asyncio.sleep(0.5)
+        threads_per_conn = (threading.active_count() - base_threads) / count
+
+        for conn in conns:
+            conn.start_time = time.perf_counter()
+            queue = conn.tts.tts_text_queue
+            queue.put(
+                TTSMessageDTO(
+                    sentence_id=conn.sentence_id,
+                    sentence_type=SentenceType.FIRST,
+                    content_type=ContentType.ACTION,
+                )
+            )
+            queue.put(
+                TTSMessageDTO(
+                    sentence_id=conn.sentence_id,
+                    sentence_type=SentenceType.MIDDLE,
+                    content_type=ContentType.TEXT,
+                    content_detail="你好，我是小智。",
+                )
+            )
+            queue.put(
+                TTSMessageDTO(
+                    sentence_id=conn.sentence_id,
+                    sentence_type=SentenceType.LAST,
+                    content_type=ContentType.ACTION,
+                )
+            )
+
+        deadline = time.perf_counter() + self.timeout
+        while time.perf_counter() < deadline and any(
+            c.websocket.first_audio_time is None for c in conns
+        ):
+            await asyncio.sleep(0.05)
+
+        latencies = sorted(
+            (c.websocket.first_audio_time - c.start_time) * 1000
+            for c in conns
+            if c.websocket.first_audio_time is not None
+        )
+
+        for conn in conns:
+            conn.stop_event.set()
+            for task in (
+                getattr(conn.tts, "tts_priority_task", None),
+                getattr(conn.tts, "audio_play_priority_task", None),
+            ):
+                if task and not task.done():
+                    task.cancel()
+        # 等待线程模式下的轮询线程退出
+        await asyncio.sleep(1.5)
+
+        self.results.append(
+            [
+                "异步流水线" if async_pipeline else "独立线程",
+                count,
+                f"{threads_per_conn:.2f}",
+                f"{_percentile(latencies, 50):.1f}" if latencies else "-",
+                f"{_percentile(latencies, 99):.1f}" if latencies else "-",
+                f"{len(latencies)}/{count}",
+            ]
+        )
+
+    def _print_results(self):
+        headers = ["模式", "连接数", "每连接线程数", "首包P50(ms)", "首包P99(ms)", "完成数"]
+        print("\n异步流水线并发测试结果:")
+        print(tabulate(self.results, headers=headers, tablefmt="grid"))
+        print("\n测试说明:")
+        print(f"- 每次TTS合成模拟阻塞 {self.synth_ms}ms，共享线程池上限 {self.max_workers}")
+        print("- 每连接线程数：打开音频通道后新增的线程数 / 连接数")
+        print("- 首包延迟：从投递文本到第一帧音频发送到websocket的耗时")
+
+    async def run(self):
+        print("开始异步流水线并发测试...")
+        get_shared_executor(self.max_workers)
+        try:
+            for count in self.connection_counts:
+                for async_pipeline in (False, True):
+                    print(
+                        f"测试 {'异步流水线' if async_pipeline else '独立线程'} 模式，{count} 个连接..."
+                    )
+                    await self._run_case(async_pipeline, count)
+        finally:
+            shutdown_shared_executor()
+        self._print_results()
+
+
+# 为了performance_tester.py的调用需求
+async def main():
+    tester = AsyncPipelinePerformanceTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    tester = AsyncPipelinePerformanceTester()
+    asyncio.run(tester.run())
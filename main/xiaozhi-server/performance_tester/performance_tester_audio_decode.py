@@ -0,0 +1,138 @@
+import os
+import time
+import struct
+import asyncio
+import concurrent.futures
+from io import BytesIO
+from pydub import AudioSegment
+from tabulate import tabulate
+
+from core.utils.util import audio_bytes_to_data_stream, audio_to_data, pcm_to_data_stream
+
+description = "TTS音频解码：逐句启动ffmpeg与进程内解码的句子吞吐对比测试"
+
+
+def _legacy_audio_bytes_to_data_stream(audio_bytes, file_type, is_opus, callback):
+    """原实现：除p3以外的格式都通过pydub启动ffmpeg子进程解码"""
+    if file_type == "p3":
+        return audio_bytes_to_data_stream(audio_bytes, file_type, is_opus, callback)
+    audio = AudioSegment.from_file(
+        BytesIO(audio_bytes), format=file_type, parameters=["-nostdin"]
+    )
+    audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
+    pcm_to_data_stream(audio.raw_data, is_opus, callback)
+
+
+class AudioDecodePerformanceTester:
+    def __init__(self):
+        self.wav_file = "config/assets/wakeup_words.wav"
+        self.mp3_file = "config/assets/tts_notify.mp3"
+        # 每种格式、每种实现处理的句子数
+        self.sentences = 100
+        # 模拟多个连接同时合成
+        self.concurrency = 8
+        self.results = []
+
+    def _load_samples(self):
+        samples = {}
+        for file_type, path in (("wav", self.wav_file), ("mp3", self.mp3_file)):
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    samples[file_type] = f.read()
+            else:
+                print(f"未找到测试音频: {path}，跳过{file_type}")
+
+        # 用wav生成p3数据，每帧4字节头部+opus数据
+        if os.path.exists(self.wav_file):
+            frames = audio_to_data(self.wav_file, is_opus=True)
+            samples["p3"] = b"".join(
+                struct.pack(">BBH", 0, 0, len(frame)) + frame for frame in frames
+            )
+        return samples
+
+    def _run_once(self, convert, audio_bytes, file_type):
+        frames = []
+        convert(audio_bytes, file_type, True, frames.append)
+        return len(frames)
+
+    def _measure(self, convert, audio_bytes, file_type, workers):
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        if workers == 1:
+            for _ in range(self.sentences):
+                self._run_once(convert, audio_bytes, file_type)
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+                list(
+                    pool.map(
+                        lambda _: self._run_once(convert, audio_bytes, file_type),
+                        range(self.sentences),
+                    )
+                )
+        return time.perf_counter() - start, time.process_time() - cpu_start
+
+    def _test(self, name, convert, audio_bytes, file_type, workers):
+        # process_time不包含ffmpeg子进程，单独统计子进程CPU
+        before = os.times()
+        elapsed, cpu = self._measure(convert, audio_bytes, file_type, workers)
+        after = os.times()
+        child_cpu = (after.children_user + after.children_system) - (
+            before.children_user + before.children_system
+        )
+        total_cpu = cpu + child_cpu
+        self.results.append(
+            [
+                file_type,
+                name,
+                workers,
+                f"{self.sentences / elapsed:.1f}",
+                f"{elapsed * 1000 / self.sentences:.2f}",
+                f"{total_cpu * 1000 / self.sentences:.2f}",
+            ]
+        )
+
+    async def run(self):
+        print("开始TTS音频解码测试...")
+        samples = self._load_samples()
+        for file_type, audio_bytes in samples.items():
+            for workers in (1, self.concurrency):
+                print(f"测试 {file_type} 格式，{workers} 线程...")
+                if file_type != "p3":
+                    self._test(
+                        "pydub+ffmpeg子进程",
+                        _legacy_audio_bytes_to_data_stream,
+                        audio_bytes,
+                        file_type,
+                        workers,
+                    )
+                self._test(
+                    "进程内解码",
+                    audio_bytes_to_data_stream,
+                    audio_bytes,
+                    file_type,
+                    workers,
+                )
+
+        print("\nTTS音频解码测试结果:")
+        print(
+            tabulate(
+                self.results,
+                headers=["格式", "实现", "线程数", "句子/秒", "每句耗时(ms)", "每句CPU(ms)"],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print(f"- 每组处理{self.sentences}句，包含解码、重采样和Opus编码")
+        print("- 每句CPU包含ffmpeg子进程消耗的CPU时间")
+        print("- p3格式本身不经过ffmpeg，作为对照")
+
+
+# 为了performance_tester.py的调用需求
+async def main():
+    tester = AudioDecodePerformanceTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    tester = AudioDecodePerformanceTester()
+    asyncio.run(tester.run())
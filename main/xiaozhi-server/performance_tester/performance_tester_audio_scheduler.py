@@ -0,0 +1,253 @@
+import time
+import random
+import asyncio
+from tabulate import tabulate
+
+from core.utils.audio_scheduler import AudioScheduler
+
+description = "音频发送调度：1000路音频同时播放时的定时器唤醒次数与发送抖动测试"
+
+FRAME_MS = 60
+PRE_BUFFER = 5
+
+
+class _CountingLoop(asyncio.SelectorEventLoop):
+    """统计定时器数量的事件循环，asyncio.sleep 和调度器的定时唤醒都经过 call_at"""
+
+    def __init__(self):
+        super().__init__()
+        self.timers = 0
+
+    def call_at(self, when, callback, *args, context=None):
+        self.timers += 1
+        return super().call_at(when, callback, *args, context=context)
+
+
+class _LegacyRateController:
+    """原 AudioRateController 的发送逻辑：每个连接每帧各自 asyncio.sleep"""
+
+    def __init__(self, frame_duration=FRAME_MS):
+        self.frame_duration = frame_duration
+        self.queue = []
+        self.play_position = 0
+        self.start_timestamp = time.time()
+
+    def add_audio(self, opus_packet):
+        self.queue.append(opus_packet)
+
+    async def check_queue(self, send_audio_callback):
+        while self.queue:
+            elapsed_ms = (time.time() - self.start_timestamp) * 1000
+            if elapsed_ms < self.play_position:
+                await asyncio.sleep((self.play_position - elapsed_ms) / 1000)
+                continue
+            opus_packet = self.queue.pop(0)
+            self.play_position += self.frame_duration
+            await send_audio_callback(opus_packet)
+
+
+class _FakeWebSocket:
+    """记录每帧的发送时间"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.sent = []
+
+    async def send(self, data):
+        self.sent.append(self.loop.time())
+
+
+class _FakeConn:
+    def __init__(self, loop):
+        self.client_abort = False
+        self.websocket = _FakeWebSocket(loop)
+
+
+class AudioSchedulerPerformanceTester:
+    def __init__(self):
+        self.streams = 1000
+        self.frames = 100
+        # 繁忙场景：每20ms有一次4ms的同步计算占用事件循环
+        self.busy_block_ms = 4
+        self.busy_interval_ms = 20
+        # 单次结果受系统调度影响较大，每个场景重复多次取中位数
+        self.repeats = 5
+        self.results = []
+
+    async def _legacy_stream(self, conn, start_delay):
+        """与原 _sendAudio_single 相同：前5帧直接发送，之后经过流控器"""
+        await asyncio.sleep(start_delay)
+        controller = _LegacyRateController()
+        for i in range(self.frames):
+            if i < PRE_BUFFER:
+                await conn.websocket.send(b"frame")
+                continue
+            controller.add_audio(b"frame")
+            await controller.check_queue(conn.websocket.send)
+
+    async def _scheduler_stream(self, scheduler, conn, start_delay):
+        await asyncio.sleep(start_delay)
+        stream = scheduler.open_stream(
+            conn, lambda packet, flow_control: conn.websocket.send(packet), FRAME_MS
+        )
+        flow_control = {}
+        for _ in range(self.frames):
+            await stream.put(b"frame", flow_control)
+        await stream.drain()
+
+    async def _busy(self, stop):
+        """模拟事件循环上的其他计算（如编解码、JSON处理）"""
+        blocks = 0
+        while not stop.is_set():
+            end = time.perf_counter() + self.busy_block_ms / 1000
+            while time.perf_counter() < end:
+                pass
+            blocks += 1
+            await asyncio.sleep(self.busy_interval_ms / 1000)
+        return blocks
+
+    async def _scenario(self, mode, busy):
+        loop = asyncio.get_running_loop()
+        rng = random.Random(1)
+        conns = [_FakeConn(loop) for _ in range(self.streams)]
+        delays = [rng.uniform(0, FRAME_MS / 1000) for _ in range(self.streams)]
+        scheduler = AudioScheduler(pre_buffer_frames=PRE_BUFFER) if mode else None
+
+        stop = asyncio.Event()
+        busy_task = asyncio.create_task(self._busy(stop)) if busy else None
+        timers_before = loop.timers
+        cpu_start = time.process_time()
+        start = loop.time()
+        if scheduler is None:
+            tasks = [self._legacy_stream(c, d) for c, d in zip(conns, delays)]
+        else:
+            tasks = [
+                self._scheduler_stream(scheduler, c, d) for c, d in zip(conns, delays)
+            ]
+        await asyncio.gather(*tasks)
+        elapsed = loop.time() - start
+        cpu = time.process_time() - cpu_start
+        stop.set()
+        busy_blocks = await busy_task if busy_task else 0
+        if scheduler is not None:
+            scheduler.shutdown()
+        # 扣除每个连接的启动延迟和繁忙任务自身的定时器
+        timers = loop.timers - timers_before - self.streams - busy_blocks
+
+        lateness, first_delays, underruns = [], [], 0
+        for conn, delay in zip(conns, delays):
+            t0 = start + delay
+            sent = conn.websocket.sent
+            # 理想发送时间：前5帧和第6帧在开始时发送，之后每60ms一帧
+            first = sent[0]
+            play_end = first
+            for i, t in enumerate(sent):
+                ideal = first + max(0, i - PRE_BUFFER) * FRAME_MS / 1000
+                lateness.append((t - ideal) * 1000)
+                # 设备按实时速度播放，帧到达时缓冲已播完即为卡顿
+                if i > 0 and t > play_end:
+                    underruns += 1
+                play_end = max(play_end, t) + FRAME_MS / 1000
+            first_delays.append((first - t0) * 1000)
+
+        lateness.sort()
+        first_delays.sort()
+        stats = scheduler.get_stats() if scheduler is not None else None
+        return {
+            "elapsed": elapsed,
+            "timers_per_sec": timers / elapsed,
+            "wakeups_per_sec": (
+                (stats["wakeups"] / elapsed) if stats else timers / elapsed
+            ),
+            "cpu": cpu,
+            "p50": lateness[len(lateness) // 2],
+            "p99": lateness[int(len(lateness) * 0.99)],
+            "max": lateness[-1],
+            "first_p99": first_delays[int(len(first_delays) * 0.99)],
+            "underruns": underruns,
+        }
+
+    def _run_scenario(self, mode, busy):
+        loop = _CountingLoop()
+        try:
+            return loop.run_until_complete(self._scenario(mode, busy))
+        finally:
+            loop.close()
+
+    async def run(self):
+        print("开始音频发送调度测试...")
+        for busy in (False, True):
+            for mode in (False, True):
+                name = "全局调度器" if mode else "原实现(每连接sleep)"
+                print(f"测试{name}，{'繁忙' if busy else '空闲'}事件循环...")
+                runs = [
+                    await asyncio.to_thread(self._run_scenario, mode, busy)
+                    for _ in range(self.repeats)
+                ]
+                result = {
+                    key: sorted(run[key] for run in runs)[len(runs) // 2]
+                    for key in runs[0]
+                }
+                self.results.append(
+                    [
+                        "繁忙" if busy else "空闲",
+                        name,
+                        f"{result['timers_per_sec']:.0f}",
+                        f"{result['wakeups_per_sec']:.0f}",
+                        f"{result['cpu']:.2f}",
+                        f"{result['p50']:.2f}",
+                        f"{result['p99']:.2f}",
+                        f"{result['max']:.2f}",
+                        f"{result['first_p99']:.2f}",
+                        result["underruns"],
+                    ]
+                )
+
+        print(f"\n{self.streams}路音频发送测试结果:")
+        print(
+            tabulate(
+                self.results,
+                headers=[
+                    "事件循环",
+                    "实现",
+                    "定时器/秒",
+                    "唤醒/秒",
+                    "CPU(s)",
+                    "抖动p50(ms)",
+                    "抖动p99(ms)",
+                    "抖动max(ms)",
+                    "首帧延迟p99(ms)",
+                    "设备卡顿次数",
+                ],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print(
+            f"- {self.streams}个连接在{FRAME_MS}ms内随机开始，每个连接发送"
+            f"{self.frames}帧{FRAME_MS}ms的音频"
+        )
+        print("- 定时器/秒：事件循环每秒新建的定时器数，原实现每帧一次 asyncio.sleep")
+        print("- 唤醒/秒：原实现等于定时器数；调度器为调度任务每秒被唤醒的次数")
+        print(
+            f"- 抖动：每帧实际发送时间与理想发送时间之差，前{PRE_BUFFER + 1}帧在开始时发送，"
+            f"之后每{FRAME_MS}ms一帧；负值为提前发送（调度器同一次唤醒发送半个节拍内到期的帧）"
+        )
+        print("- 首帧延迟：连接开始播放到第一帧发出的时间，单独统计，不计入抖动")
+        print(
+            f"- 繁忙：事件循环每{self.busy_interval_ms}ms被同步计算占用"
+            f"{self.busy_block_ms}ms"
+        )
+        print("- 设备卡顿次数：按实时速度播放，帧到达时设备缓冲已播完的次数")
+        print(f"- 每个场景运行{self.repeats}次，各项取中位数")
+
+
+# 为了performance_tester.py的调用需求
+async def main():
+    tester = AudioSchedulerPerformanceTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    tester = AudioSchedulerPerformanceTester()
+    asyncio.run(tester.run())
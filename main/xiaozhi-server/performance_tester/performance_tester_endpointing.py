@@ -0,0 +1,244 @@
+import os
+import asyncio
+from collections import deque
+from types import SimpleNamespace
+import numpy as np
+from tabulate import tabulate
+
+from config.settings import load_config
+from core.utils.audio_decode import decode_audio_to_pcm
+from core.utils.endpointing import FRAME_MS, create_endpointer
+from core.utils.vad_batch import VADStreamState, CHUNK_SAMPLES
+
+description = "VAD断句策略离线评估：回放WAV录音，统计过早断句次数与平均节省的等待时间"
+
+SAMPLE_RATE = 16000
+
+
+class EndpointingPerformanceTester:
+    """
+    离线回放一个目录下的WAV录音（每个文件视为一句话），对比不同断句策略
+
+    - 语音概率由配置中的SileroOnnxVAD逐块推理得到，断句判断直接调用 _update_voice_state
+    - 同名.txt文件作为转写文本，按已说话时长比例模拟流式ASR的中间结果
+    - 把相邻两段录音以不同停顿拼接成一句话，模拟句中停顿
+    - 判定结束后仍有语音，记为过早断句；否则统计从最后一个语音块到判定结束的等待时间
+    """
+
+    def __init__(self):
+        self.config = load_config()
+        vad_config = self.config.get("VAD", {}).get("SileroOnnxVAD", {})
+        self.vad_config = dict(vad_config, batch_inference=False)
+        self.wav_dir = os.environ.get("ENDPOINTING_WAV_DIR") or os.path.join(
+            os.getcwd(), "config", "assets"
+        )
+        self.join_pauses_ms = [
+            int(value)
+            for value in os.environ.get("ENDPOINTING_JOIN_PAUSE_MS", "300,600").split(",")
+            if value.strip()
+        ]
+        # 每句话后补充的静音时长
+        self.tail_silence_ms = 1500
+        # 模拟流式ASR中间结果相对音频的延迟
+        self.partial_lag_ms = 160
+        # 同一设备重复回放的轮数，自适应策略会逐步积累设备历史
+        self.rounds = 3
+        self.results = []
+
+    def _load_utterances(self):
+        """读取录音和转写文本，返回 [(名称, float32音频, 文本)]"""
+        utterances = []
+        for file_name in sorted(os.listdir(self.wav_dir)):
+            if not file_name.endswith(".wav"):
+                continue
+            path = os.path.join(self.wav_dir, file_name)
+            pcm = decode_audio_to_pcm(path, "wav")
+            audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+            text = ""
+            text_path = os.path.splitext(path)[0] + ".txt"
+            if os.path.exists(text_path):
+                with open(text_path, "r", encoding="utf-8") as f:
+                    text = f.read().strip()
+            utterances.append((file_name, audio, text))
+
+        joined = []
+        for pause_ms in self.join_pauses_ms:
+            pause = np.zeros(SAMPLE_RATE * pause_ms // 1000, dtype=np.float32)
+            for (name_a, audio_a, text_a), (name_b, audio_b, text_b) in zip(
+                utterances, utterances[1:]
+            ):
+                joined.append(
+                    (
+                        f"{name_a}+{pause_ms}ms+{name_b}",
+                        np.concatenate([audio_a, pause, audio_b]),
+                        (text_a.rstrip("。？！?!.") + "，" + text_b) if text_a else text_b,
+                    )
+                )
+        return utterances + joined
+
+    def _probs(self, vad, audio):
+        """补充结尾静音后逐块推理，返回每块的语音概率"""
+        tail = np.zeros(SAMPLE_RATE * self.tail_silence_ms // 1000, dtype=np.float32)
+        audio = np.concatenate([audio, tail])
+        stream = VADStreamState()
+        probs = []
+        for start in range(0, len(audio) - CHUNK_SAMPLES + 1, CHUNK_SAMPLES):
+            inputs = stream.prepare(audio[start : start + CHUNK_SAMPLES])
+            out, new_state = vad._forward(inputs, stream.state)
+            stream.commit(new_state)
+            probs.append(float(out[0]))
+        return probs
+
+    def _voiced(self, vad, probs):
+        """复现双阈值判断，返回每块是否为语音"""
+        voiced, last = [], False
+        for prob in probs:
+            if prob >= vad.vad_threshold:
+                last = True
+            elif prob <= vad.vad_threshold_low:
+                last = False
+            voiced.append(last)
+        return voiced
+
+    def _replay(self, vad, conn, probs, voiced, text, start_ms):
+        """
+        回放一句话；过早断句后与线上一样，后面的语音作为新的一句话继续回放
+
+        Returns:
+            (是否过早断句, 最后一个语音块到判定结束的等待时间ms)，未判定结束时等待时间为None
+        """
+        conn.client_voice_window = deque(maxlen=5)
+        conn.last_is_voice = False
+        conn.client_have_voice = False
+        conn.client_voice_stop = False
+
+        voiced_frames = np.cumsum(voiced)
+        total_voiced = int(voiced_frames[-1]) if len(voiced_frames) else 0
+        last_voiced = max((i for i, v in enumerate(voiced) if v), default=-1)
+        lag_frames = self.partial_lag_ms // FRAME_MS
+        last_partial = None
+        premature = False
+
+        for i, prob in enumerate(probs):
+            now_ms = start_ms + i * FRAME_MS
+            if text and total_voiced and i >= lag_frames:
+                heard = int(voiced_frames[i - lag_frames])
+                partial = text[: round(len(text) * heard / total_voiced)]
+                if partial and partial != last_partial:
+                    vad.on_partial_text(conn, partial)
+                    last_partial = partial
+            vad._update_voice_state(conn, prob, now_ms)
+            if conn.client_voice_stop:
+                if i >= last_voiced:
+                    return premature, (i - last_voiced) * FRAME_MS
+                # 对应 conn.reset_vad_states()
+                premature = True
+                conn.client_have_voice = False
+                conn.client_voice_stop = False
+        return premature, None
+
+    def _evaluate(self, name, vad, endpointer, samples):
+        vad.endpointer = endpointer
+        conn = SimpleNamespace(device_id="endpointing-tester", endpoint_state=None)
+        premature, latencies, missed = 0, [], 0
+        start_ms = 0
+        for _ in range(self.rounds):
+            for probs, voiced, text in samples:
+                is_premature, latency = self._replay(
+                    vad, conn, probs, voiced, text, start_ms
+                )
+                # 句与句之间间隔足够长，不会被当作过早断句后的继续说话
+                start_ms += len(probs) * FRAME_MS + 10000
+                if is_premature:
+                    premature += 1
+                elif latency is None:
+                    missed += 1
+                else:
+                    latencies.append(latency)
+        total = len(samples) * self.rounds
+        avg_latency = sum(latencies) / len(latencies) if latencies else 0.0
+        return [name, total, premature, f"{premature / total * 100:.1f}%", missed, avg_latency]
+
+    async def run(self):
+        print("开始断句策略离线评估...")
+        from core.providers.vad.silero_onnx import VADProvider
+
+        vad = VADProvider(self.vad_config)
+        utterances = self._load_utterances()
+        if not utterances:
+            print(f"目录 {self.wav_dir} 下没有WAV文件")
+            return
+        samples = []
+        for _, audio, text in utterances:
+            probs = self._probs(vad, audio)
+            samples.append((probs, self._voiced(vad, probs), text))
+        with_text = sum(1 for _, _, text in utterances if text)
+
+        silence_ms = vad.silence_threshold_ms
+        min_ms = float(self.vad_config.get("endpointing_min_ms") or 200)
+        max_ms = float(self.vad_config.get("endpointing_max_ms") or 1000)
+        strategies = [
+            (f"fixed {silence_ms}ms（当前配置）", {"endpointing": "fixed"}, silence_ms),
+            (f"fixed {int(max_ms)}ms", {"endpointing": "fixed"}, max_ms),
+            (
+                f"adaptive {int(min_ms)}~{int(max_ms)}ms",
+                {
+                    "endpointing": "adaptive",
+                    "endpointing_min_ms": min_ms,
+                    "endpointing_max_ms": max_ms,
+                },
+                max_ms,
+            ),
+        ]
+        rows = [
+            self._evaluate(name, vad, create_endpointer(config, default_ms), samples)
+            for name, config, default_ms in strategies
+        ]
+        # 以最保守的固定最大静音时长为基准计算节省的等待时间
+        baseline = rows[1][5]
+        for row in rows:
+            saved = baseline - row[5]
+            row[5] = f"{row[5]:.0f}"
+            row.append(f"{saved:.0f}")
+        self.results = rows
+
+        print("\n断句策略评估结果:")
+        print(
+            tabulate(
+                self.results,
+                headers=[
+                    "策略",
+                    "句数",
+                    "过早断句",
+                    "过早断句率",
+                    "未断句",
+                    "平均等待(ms)",
+                    f"较fixed {int(max_ms)}ms节省(ms)",
+                ],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print(
+            f"- 录音目录: {self.wav_dir}，共{len(utterances)}句（含拼接句），"
+            f"其中{with_text}句有转写文本；每种策略回放{self.rounds}轮"
+        )
+        print(
+            f"- 拼接句：相邻两段录音之间插入{self.join_pauses_ms}ms静音，模拟句中停顿"
+        )
+        print("- 过早断句：判定结束后仍有语音；平均等待：最后一个语音块到判定结束的时间")
+        print(
+            "- 可通过环境变量 ENDPOINTING_WAV_DIR 指定录音目录（同名.txt为转写文本），"
+            "ENDPOINTING_JOIN_PAUSE_MS 指定拼接停顿"
+        )
+
+
+# 为了performance_tester.py的调用需求
+async def main():
+    tester = EndpointingPerformanceTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    tester = EndpointingPerformanceTester()
+    asyncio.run(tester.run())
@@ -0,0 +1,210 @@
+import time
+import asyncio
+import threading
+import aiohttp
+import requests
+from aiohttp import web
+from tabulate import tabulate
+
+from core.utils.http_client import HTTPClientRegistry, run_coroutine
+
+description = "HTTP连接池：逐句新建连接与复用长连接的TTS首字节延迟对比测试"
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class _StandInTTSServer:
+    """
+    本地模拟的流式HTTP TTS服务
+
+    本机回环网络没有真实的DNS解析、TCP和TLS握手开销，这里在每个新连接的第一个请求上
+    延迟 handshake_ms 来模拟公网建立连接的耗时，复用的长连接则没有这部分延迟
+    """
+
+    def __init__(self, handshake_ms=80, first_chunk_ms=30, chunks=10):
+        self.handshake_ms = handshake_ms
+        self.first_chunk_ms = first_chunk_ms
+        self.chunks = chunks
+        self.port = None
+        self.new_connections = 0
+        self._seen_transports = set()
+        self._loop = None
+        self._runner = None
+        self._ready = threading.Event()
+
+    async def _handle(self, request):
+        transport = request.transport
+        # 持有连接对象本身，避免连接释放后id被复用导致漏计
+        if transport not in self._seen_transports:
+            self._seen_transports.add(transport)
+            self.new_connections += 1
+            await asyncio.sleep(self.handshake_ms / 1000)
+        await request.read()
+        response = web.StreamResponse()
+        response.content_type = "audio/pcm"
+        await response.prepare(request)
+        await asyncio.sleep(self.first_chunk_ms / 1000)
+        # 每块60ms的16kHz单声道PCM
+        for _ in range(self.chunks):
+            await response.write(b"\x00" * 1920)
+        await response.write_eof()
+        return response
+
+    async def _start(self):
+        app = web.Application()
+        app.router.add_post("/tts", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self._start())
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        self._ready.wait()
+        return f"http://127.0.0.1:{self.port}/tts"
+
+    def stop(self):
+        future = asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop)
+        future.result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+class HTTPClientPerformanceTester:
+    def __init__(self):
+        self.sentences = 30
+        self.connections = 8
+        self.results = []
+
+    async def _legacy_sentence(self, url):
+        """原实现：每句话新建ClientSession，请求完即关闭"""
+        start = time.perf_counter()
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, json={"text": "你好"}) as resp:
+                async for _ in resp.content.iter_any():
+                    first_byte = (time.perf_counter() - start) * 1000
+                    break
+                await resp.read()
+        return first_byte
+
+    async def _pooled_sentence(self, registry, url):
+        """新实现：复用当前事件循环的全局会话"""
+        start = time.perf_counter()
+        session = registry.get_session()
+        async with session.post(url, json={"text": "你好"}) as resp:
+            async for _ in resp.content.iter_any():
+                first_byte = (time.perf_counter() - start) * 1000
+                break
+            await resp.read()
+        return first_byte
+
+    def _legacy_sync_sentence(self, url):
+        start = time.perf_counter()
+        first_byte = None
+        with requests.post(url, json={"text": "你好"}, stream=True) as resp:
+            for _ in resp.iter_content(1920):
+                if first_byte is None:
+                    first_byte = (time.perf_counter() - start) * 1000
+        return first_byte
+
+    def _pooled_sync_sentence(self, registry, url):
+        start = time.perf_counter()
+        first_byte = None
+        with registry.get_client().stream("POST", url, json={"text": "你好"}) as resp:
+            for _ in resp.iter_bytes(1920):
+                if first_byte is None:
+                    first_byte = (time.perf_counter() - start) * 1000
+        return first_byte
+
+    async def _measure(self, name, server, tts_thread):
+        """模拟多个连接各自的TTS线程，逐句请求"""
+        before = server.new_connections
+        latencies = await asyncio.gather(
+            *[asyncio.to_thread(tts_thread) for _ in range(self.connections)]
+        )
+        latencies = [value for thread_values in latencies for value in thread_values]
+        self.results.append(
+            [
+                name,
+                len(latencies),
+                server.new_connections - before,
+                f"{sum(latencies) / len(latencies):.1f}",
+                f"{_percentile(latencies, 50):.1f}",
+                f"{_percentile(latencies, 99):.1f}",
+            ]
+        )
+
+    async def run(self):
+        print("开始HTTP连接池测试...")
+        server = _StandInTTSServer()
+        url = server.start()
+        registry = HTTPClientRegistry()
+        try:
+
+            def legacy_async():
+                return [
+                    asyncio.run(self._legacy_sentence(url)) for _ in range(self.sentences)
+                ]
+
+            def pooled_async():
+                return [
+                    run_coroutine(self._pooled_sentence(registry, url))
+                    for _ in range(self.sentences)
+                ]
+
+            def legacy_sync():
+                return [self._legacy_sync_sentence(url) for _ in range(self.sentences)]
+
+            def pooled_sync():
+                return [
+                    self._pooled_sync_sentence(registry, url)
+                    for _ in range(self.sentences)
+                ]
+
+            print("测试异步请求...")
+            await self._measure("aiohttp 逐句新建会话+asyncio.run", server, legacy_async)
+            await self._measure("aiohttp 全局连接池+线程长期事件循环", server, pooled_async)
+            print("测试同步请求...")
+            await self._measure("requests 一次性请求", server, legacy_sync)
+            await self._measure("httpx 全局共享客户端", server, pooled_sync)
+        finally:
+            registry.close()
+            server.stop()
+
+        print("\n每句首字节延迟测试结果:")
+        print(
+            tabulate(
+                self.results,
+                headers=["实现", "句子数", "新建连接数", "平均(ms)", "P50(ms)", "P99(ms)"],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print(f"- {self.connections}个并发连接，每个连接在自己的TTS线程中依次合成{self.sentences}句")
+        print(
+            f"- 模拟服务每个新连接额外延迟{server.handshake_ms}ms（DNS+TCP+TLS握手），"
+            f"首个音频块延迟{server.first_chunk_ms}ms"
+        )
+
+
+# 为了performance_tester.py的调用需求
+async def main():
+    tester = HTTPClientPerformanceTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    tester = HTTPClientPerformanceTester()
+    asyncio.run(tester.run())
@@ -0,0 +1,267 @@
+import json
+import time
+import asyncio
+import threading
+import contextlib
+import aiohttp
+from aiohttp import web
+from tabulate import tabulate
+
+from core.providers.llm.base import LLMProviderBase
+from core.providers.llm.openai.openai import LLMProvider
+
+description = "LLM流式打断：打断后上游流式连接的关闭延迟与多生成token数对比测试"
+
+
+class _FakeOpenAIServer:
+    """
+    本地模拟的OpenAI兼容流式接口，按固定间隔逐个推送token
+
+    记录每个请求推送的token数，以及客户端断开连接（或流正常结束）的时间
+    """
+
+    def __init__(self, token_interval_ms=50, total_tokens=100):
+        self.token_interval_ms = token_interval_ms
+        self.total_tokens = total_tokens
+        self.port = None
+        self.records = []
+        self._loop = None
+        self._runner = None
+        self._ready = threading.Event()
+
+    @staticmethod
+    def _chunk(content):
+        data = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "fake-model",
+            "choices": [
+                {"index": 0, "delta": {"content": content}, "finish_reason": None}
+            ],
+        }
+        return f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+    async def _ping(self, request):
+        return web.Response(text="pong")
+
+    async def _chat(self, request):
+        record = {"sent": 0, "end_time": None, "disconnected": False}
+        self.records.append(record)
+        await request.read()
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        try:
+            for i in range(self.total_tokens):
+                await response.write(self._chunk(f"字{i}"))
+                record["sent"] += 1
+                await asyncio.sleep(self.token_interval_ms / 1000)
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+        except (asyncio.CancelledError, ConnectionResetError):
+            # 客户端关闭连接
+            record["disconnected"] = True
+            raise
+        finally:
+            record["end_time"] = time.perf_counter()
+        return response
+
+    async def _start(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._chat)
+        app.router.add_get("/ping", self._ping)
+        # 客户端断开时立即取消处理协程，及时记录断开时间
+        self._runner = web.AppRunner(app, handler_cancellation=True)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self._start())
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        self._ready.wait()
+        return f"http://127.0.0.1:{self.port}"
+
+    def stop(self):
+        future = asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop)
+        future.result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def _dialogue():
+    return [
+        {"role": "system", "content": "你是小智"},
+        {"role": "user", "content": "给我讲一个很长的故事"},
+    ]
+
+
+class LLMCancelPerformanceTester:
+    def __init__(self):
+        self.rounds = 10
+        # 收到多少个token后打断
+        self.abort_after = 5
+        # 等待上游关闭连接的最长时间（秒）
+        self.wait_timeout = 3
+        self.results = []
+
+    async def _measure_rtt(self, base_url):
+        """用长连接上的小请求测量回环往返时间"""
+        samples = []
+        async with aiohttp.ClientSession() as session:
+            for _ in range(20):
+                start = time.perf_counter()
+                async with session.get(f"{base_url}/ping") as resp:
+                    await resp.read()
+                samples.append((time.perf_counter() - start) * 1000)
+        return sorted(samples)[len(samples) // 2]
+
+    async def _wait_closed(self, record):
+        deadline = time.perf_counter() + self.wait_timeout
+        while record["end_time"] is None and time.perf_counter() < deadline:
+            await asyncio.sleep(0.001)
+
+    async def _legacy_round(self, server, provider):
+        """原实现：工作线程迭代同步流，每收到一个token检查client_abort标记后break"""
+        received = []
+        client_abort = threading.Event()
+
+        def chat():
+            for content in provider.response("session", _dialogue()):
+                if client_abort.is_set():
+                    break
+                received.append(content)
+
+        worker = asyncio.create_task(asyncio.to_thread(chat))
+        while len(received) < self.abort_after:
+            await asyncio.sleep(0.001)
+        record = server.records[-1]
+        abort_time, sent_at_abort = time.perf_counter(), record["sent"]
+        client_abort.set()
+        await worker
+        await self._wait_closed(record)
+        return abort_time, sent_at_abort, record
+
+    async def _task_round(self, server, make_stream):
+        """新实现：对话作为任务运行，打断时直接取消任务"""
+        received = []
+
+        async def chat():
+            stream = make_stream()
+            async with contextlib.aclosing(stream):
+                async for content in stream:
+                    received.append(content)
+
+        task = asyncio.create_task(chat())
+        while len(received) < self.abort_after:
+            await asyncio.sleep(0.001)
+        record = server.records[-1]
+        abort_time, sent_at_abort = time.perf_counter(), record["sent"]
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        await self._wait_closed(record)
+        return abort_time, sent_at_abort, record
+
+    async def _test(self, name, run_round):
+        latencies, extra_tokens, unclosed = [], [], 0
+        for _ in range(self.rounds):
+            abort_time, sent_at_abort, record = await run_round()
+            if record["end_time"] is None or not record["disconnected"]:
+                unclosed += 1
+            end_time = record["end_time"] or time.perf_counter()
+            latencies.append((end_time - abort_time) * 1000)
+            extra_tokens.append(record["sent"] - sent_at_abort)
+            # 等待上一轮遗留的连接结束，避免影响下一轮
+            await self._wait_closed(record)
+        self.results.append(
+            [
+                name,
+                self.rounds,
+                unclosed,
+                f"{sum(latencies) / len(latencies):.1f}",
+                f"{max(latencies):.1f}",
+                f"{sum(extra_tokens) / len(extra_tokens):.1f}",
+            ]
+        )
+        return max(latencies)
+
+    async def run(self):
+        print("开始LLM流式打断测试...")
+        server = _FakeOpenAIServer()
+        base_url = server.start()
+        config = {
+            "model_name": "fake-model",
+            "api_key": "sk-fake-key-for-local-test",
+            "base_url": f"{base_url}/v1",
+            "timeout": 30,
+        }
+        provider = LLMProvider(config)
+        try:
+            rtt_ms = await self._measure_rtt(base_url)
+
+            print("测试原实现（同步流+打断标记）...")
+            await self._test(
+                "同步流+client_abort标记",
+                lambda: self._legacy_round(server, provider),
+            )
+            print("测试线程桥接（未实现原生异步的提供者）...")
+            await self._test(
+                "aresponse默认实现(线程桥接)+取消任务",
+                lambda: self._task_round(
+                    server,
+                    lambda: LLMProviderBase.aresponse(provider, "session", _dialogue()),
+                ),
+            )
+            print("测试原生异步流...")
+            native_max = await self._test(
+                "原生aresponse+取消任务",
+                lambda: self._task_round(
+                    server, lambda: provider.aresponse("session", _dialogue())
+                ),
+            )
+        finally:
+            server.stop()
+
+        print("\n打断后上游连接关闭测试结果:")
+        print(
+            tabulate(
+                self.results,
+                headers=[
+                    "实现",
+                    "轮数",
+                    "未关闭连接数",
+                    "平均关闭延迟(ms)",
+                    "最大关闭延迟(ms)",
+                    "打断后多生成token数",
+                ],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print(
+            f"- 模拟服务每{server.token_interval_ms}ms推送一个token，共{server.total_tokens}个；"
+            f"收到{self.abort_after}个token后打断"
+        )
+        print("- 关闭延迟：从打断到模拟服务感知连接断开（或流正常结束）的时间")
+        print(
+            f"- 回环RTT约{rtt_ms:.2f}ms；原生异步流取消后立即关闭连接，最大关闭延迟{native_max:.2f}ms"
+            f"（RTT加事件循环调度开销），不需要等待下一个token"
+        )
+        print("- 同步流和线程桥接只能在收到下一个token后才关闭连接，延迟取决于上游的token间隔")
+
+
+# 为了performance_tester.py的调用需求
+async def main():
+    tester = LLMCancelPerformanceTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    tester = LLMCancelPerformanceTester()
+    asyncio.run(tester.run())
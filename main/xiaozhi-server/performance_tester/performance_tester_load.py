@@ -0,0 +1,489 @@
+import os
+import json
+import time
+import random
+import asyncio
+from urllib.parse import urlparse
+import numpy as np
+import psutil
+import websockets
+import opuslib_next
+from tabulate import tabulate
+
+from config.settings import load_config
+from core.utils.audio_decode import decode_audio_to_pcm
+from core.providers.tts.mock import mock_frame_count
+
+description = "WebSocket并发压测：模拟N台设备按真实协议对话，统计连接耗时、首包延迟、丢帧、音频抖动及服务端CPU/内存"
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 960
+FRAME_SECONDS = 0.06
+
+
+def _percentile(values, p):
+    if not values:
+        return "-"
+    return f"{np.percentile(values, p):.0f}"
+
+
+class _StageStats:
+    """一个压测阶段内的统计数据，阶段切换后新的数据记入下一阶段"""
+
+    def __init__(self, devices):
+        self.devices = devices
+        self.online = 0
+        self.connect_ms = []
+        self.connect_failed = 0
+        self.turns = 0
+        self.turn_failed = 0
+        self.first_audio_ms = []
+        self.expected_frames = 0
+        self.received_frames = 0
+        # 下行每帧相对设备播放时刻的迟到时间，>0表示设备播放会断续
+        self.late_ms = []
+        # 上行每帧实际发送时刻相对60ms节拍的偏差，反映压测端自身是否过载
+        self.send_lag_ms = []
+        self.abort_ms = []
+        self.frames_after_abort = 0
+        self.server_cpu = []
+        self.server_rss = []
+        self.client_cpu = []
+
+
+class _Turn:
+    """一轮对话中下行消息的记录"""
+
+    def __init__(self, tts_config):
+        self.tts_config = tts_config
+        self.sent_at = None
+        self.first_audio_at = None
+        self.first_audio = asyncio.Event()
+        self.stopped = asyncio.Event()
+        self.frames_after_stop = 0
+        self.expected_frames = 0
+        self.received_frames = 0
+        self.late_ms = []
+        self._sentence = None
+
+    def _close_sentence(self):
+        if self._sentence and self.tts_config is not None:
+            text, frames = self._sentence["text"], self._sentence["frames"]
+            self.expected_frames += mock_frame_count(text, self.tts_config)
+            self.received_frames += frames
+        self._sentence = None
+
+    def on_tts(self, state, text, now):
+        if state == "sentence_start":
+            self._close_sentence()
+            self._sentence = {"text": text or "", "frames": 0, "first_at": None}
+        elif state == "stop":
+            self._close_sentence()
+            self.stopped.set()
+
+    def on_audio(self, now):
+        if self.stopped.is_set():
+            self.frames_after_stop += 1
+            return
+        if self.first_audio_at is None:
+            self.first_audio_at = now
+            self.first_audio.set()
+        sentence = self._sentence
+        if sentence is None:
+            return
+        if sentence["first_at"] is None:
+            sentence["first_at"] = now
+        # 设备从收到第一帧开始连续播放，第i帧应在 first_at + i*60ms 之前到达
+        due = sentence["first_at"] + sentence["frames"] * FRAME_SECONDS
+        self.late_ms.append(max(0.0, now - due) * 1000)
+        sentence["frames"] += 1
+
+
+class _Device:
+    """一台模拟设备：一条WebSocket连接，循环进行语音/文字对话，按比例打断"""
+
+    def __init__(self, tester, index):
+        self.tester = tester
+        self.device_id = f"10:00:00:00:{index // 256 % 256:02x}:{index % 256:02x}"
+        self.client_id = f"load-tester-{index}"
+        self.ws = None
+        self.hello = asyncio.Event()
+        self.turn = None
+
+    async def run(self):
+        tester = self.tester
+        stats = tester.stage
+        start = time.perf_counter()
+        reader = None
+        try:
+            self.ws = await websockets.connect(
+                tester.url,
+                additional_headers={
+                    "device-id": self.device_id,
+                    "client-id": self.client_id,
+                    "protocol-version": "1",
+                },
+                ping_interval=None,
+                max_size=None,
+                open_timeout=tester.timeout,
+            )
+            reader = asyncio.create_task(self._read())
+            await self.ws.send(
+                json.dumps(
+                    {
+                        "type": "hello",
+                        "version": 1,
+                        "transport": "websocket",
+                        "features": {"mcp": True},
+                        "audio_params": {
+                            "format": "opus",
+                            "sample_rate": SAMPLE_RATE,
+                            "channels": 1,
+                            "frame_duration": int(FRAME_SECONDS * 1000),
+                        },
+                    }
+                )
+            )
+            await asyncio.wait_for(self.hello.wait(), tester.timeout)
+        except Exception:
+            stats.connect_failed += 1
+            await self._close(reader)
+            return
+        stats.connect_ms.append((time.perf_counter() - start) * 1000)
+        tester.online += 1
+        try:
+            # 错开各设备的第一轮对话，避免所有设备同时说话
+            await asyncio.sleep(random.uniform(0, tester.turn_interval))
+            while not tester.stopping.is_set() and reader and not reader.done():
+                await self._turn()
+                await asyncio.sleep(random.uniform(0.5, 1.5) * tester.turn_interval)
+        except (websockets.ConnectionClosed, OSError):
+            pass
+        finally:
+            tester.online -= 1
+            await self._close(reader)
+
+    async def _close(self, reader):
+        if self.ws is not None:
+            try:
+                await self.ws.close()
+            except Exception:
+                pass
+        if reader is not None:
+            reader.cancel()
+
+    async def _read(self):
+        try:
+            async for message in self.ws:
+                now = time.perf_counter()
+                turn = self.turn
+                if isinstance(message, bytes):
+                    if turn is not None:
+                        turn.on_audio(now)
+                    continue
+                try:
+                    msg = json.loads(message)
+                except ValueError:
+                    continue
+                if msg.get("type") == "hello":
+                    self.hello.set()
+                elif msg.get("type") == "tts" and turn is not None:
+                    turn.on_tts(msg.get("state"), msg.get("text"), now)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def _send_speech(self):
+        """listen start -> 按60ms节拍发送opus帧 -> listen stop"""
+        await self.ws.send(
+            json.dumps({"type": "listen", "mode": "manual", "state": "start"})
+        )
+        base = time.perf_counter()
+        for index, packet in enumerate(self.tester.uplink_frames):
+            due = base + index * FRAME_SECONDS
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.tester.stage.send_lag_ms.append(
+                max(0.0, time.perf_counter() - due) * 1000
+            )
+            await self.ws.send(packet)
+        await self.ws.send(
+            json.dumps({"type": "listen", "mode": "manual", "state": "stop"})
+        )
+
+    async def _turn(self):
+        tester = self.tester
+        abort = random.random() < tester.abort_ratio
+        turn = _Turn(tester.tts_config)
+        self.turn = turn
+        if random.random() < tester.detect_ratio:
+            await self.ws.send(
+                json.dumps(
+                    {"type": "listen", "state": "detect", "text": tester.detect_text}
+                )
+            )
+        else:
+            await self._send_speech()
+        turn.sent_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(turn.first_audio.wait(), tester.timeout)
+            tester.stage.first_audio_ms.append(
+                (turn.first_audio_at - turn.sent_at) * 1000
+            )
+            if abort:
+                await asyncio.sleep(tester.abort_after)
+                abort_at = time.perf_counter()
+                await self.ws.send(json.dumps({"type": "abort"}))
+                await asyncio.wait_for(turn.stopped.wait(), tester.timeout)
+                tester.stage.abort_ms.append((time.perf_counter() - abort_at) * 1000)
+                # 统计打断后服务端仍在下发的音频帧
+                await asyncio.sleep(0.5)
+                tester.stage.frames_after_abort += turn.frames_after_stop
+            else:
+                await asyncio.wait_for(turn.stopped.wait(), tester.timeout)
+        except asyncio.TimeoutError:
+            tester.stage.turn_failed += 1
+            return
+        finally:
+            self.turn = None
+        stats = tester.stage
+        stats.turns += 1
+        stats.late_ms.extend(turn.late_ms)
+        if not abort:
+            stats.expected_frames += turn.expected_frames
+            stats.received_frames += turn.received_frames
+
+
+class _ResourceMonitor:
+    """每秒采样服务端进程及压测端自身的CPU、内存"""
+
+    def __init__(self, tester, pid, port):
+        self.tester = tester
+        self.server = self._find_server(pid, port)
+        self.client = psutil.Process()
+
+    @staticmethod
+    def _find_server(pid, port):
+        try:
+            if pid:
+                return psutil.Process(int(pid))
+            for conn in psutil.net_connections(kind="tcp"):
+                if conn.status == psutil.CONN_LISTEN and conn.laddr.port == port:
+                    return psutil.Process(conn.pid) if conn.pid else None
+        except (psutil.Error, ValueError):
+            pass
+        return None
+
+    async def run(self):
+        processes = [p for p in (self.server, self.client) if p is not None]
+        for process in processes:
+            process.cpu_percent(None)
+        while True:
+            await asyncio.sleep(1)
+            stats = self.tester.stage
+            try:
+                if self.server is not None:
+                    stats.server_cpu.append(self.server.cpu_percent(None))
+                    stats.server_rss.append(self.server.memory_info().rss)
+            except psutil.Error:
+                self.server = None
+            stats.client_cpu.append(self.client.cpu_percent(None))
+
+
+class LoadPerformanceTester:
+    def __init__(self):
+        self.config = load_config()
+        port = int(self.config.get("server", {}).get("port", 8000))
+        self.url = os.environ.get("LOAD_WS_URL") or f"ws://127.0.0.1:{port}/xiaozhi/v1/"
+        self.steps = [
+            int(value)
+            for value in os.environ.get("LOAD_STEPS", "1,10,50,100").split(",")
+            if value.strip()
+        ]
+        self.stage_seconds = float(os.environ.get("LOAD_STAGE_SECONDS", "30"))
+        # 每秒新建连接数，阶段开始时按此速率补足设备
+        self.connect_rate = float(os.environ.get("LOAD_CONNECT_RATE", "50"))
+        self.speech_seconds = float(os.environ.get("LOAD_SPEECH_SECONDS", "2"))
+        self.speech_file = os.environ.get("LOAD_SPEECH_FILE") or os.path.join(
+            "config", "assets", "bind_not_found.wav"
+        )
+        self.turn_interval = float(os.environ.get("LOAD_TURN_INTERVAL", "2"))
+        self.detect_ratio = float(os.environ.get("LOAD_DETECT_RATIO", "0.3"))
+        self.abort_ratio = float(os.environ.get("LOAD_ABORT_RATIO", "0.2"))
+        self.abort_after = float(os.environ.get("LOAD_ABORT_AFTER_MS", "500")) / 1000
+        self.detect_text = os.environ.get("LOAD_DETECT_TEXT", "给我讲个笑话吧")
+        self.timeout = float(os.environ.get("LOAD_TIMEOUT", "30"))
+        self.server_pid = os.environ.get("LOAD_SERVER_PID")
+        self.server_port = urlparse(self.url).port or port
+        self.tts_config = self._mock_tts_config()
+        self.uplink_frames = self._make_uplink_frames()
+        self.stage = None
+        self.online = 0
+        self.stopping = None
+        self.results = []
+
+    def _mock_tts_config(self):
+        """服务端使用MockTTS时才能计算每句应收帧数，否则不统计丢帧"""
+        selected = self.config.get("selected_module", {}).get("TTS")
+        tts_config = self.config.get("TTS", {}).get(selected, {})
+        if tts_config.get("type") != "mock":
+            return None
+        return tts_config
+
+    def _make_uplink_frames(self):
+        """
+        用内置提示音中的人声编码出设备上行的opus帧，所有设备共用
+
+        需要是真实人声：服务端在manual模式下仍会运行VAD，非人声会被提前判定为说完
+        """
+        pcm = decode_audio_to_pcm(self.speech_file, "wav")
+        frame_bytes = FRAME_SAMPLES * 2
+        count = max(16, int(self.speech_seconds / FRAME_SECONDS))
+        pcm = (pcm * (count * frame_bytes // len(pcm) + 1))[: count * frame_bytes]
+        encoder = opuslib_next.Encoder(SAMPLE_RATE, 1, opuslib_next.APPLICATION_VOIP)
+        return [
+            encoder.encode(pcm[i * frame_bytes : (i + 1) * frame_bytes], FRAME_SAMPLES)
+            for i in range(count)
+        ]
+
+    def _summarize(self, stats):
+        expected, received = stats.expected_frames, stats.received_frames
+        if self.tts_config is None:
+            dropped = "-"
+        else:
+            lost = max(0, expected - received)
+            dropped = f"{lost}/{expected}" + (
+                f" ({lost / expected * 100:.2f}%)" if expected else ""
+            )
+        server_cpu = (
+            f"{np.mean(stats.server_cpu):.0f}/{np.max(stats.server_cpu):.0f}"
+            if stats.server_cpu
+            else "-"
+        )
+        server_rss = (
+            f"{np.max(stats.server_rss) / 1024 / 1024:.0f}" if stats.server_rss else "-"
+        )
+        client_cpu = f"{np.mean(stats.client_cpu):.0f}" if stats.client_cpu else "-"
+        latency_row = [
+            stats.devices,
+            stats.online,
+            f"{_percentile(stats.connect_ms, 50)}/{_percentile(stats.connect_ms, 99)}",
+            stats.connect_failed,
+            f"{stats.turns}/{stats.turn_failed}",
+            _percentile(stats.first_audio_ms, 50),
+            _percentile(stats.first_audio_ms, 90),
+            _percentile(stats.first_audio_ms, 99),
+            f"{_percentile(stats.abort_ms, 50)}/{_percentile(stats.abort_ms, 99)}",
+        ]
+        audio_row = [
+            stats.devices,
+            dropped,
+            f"{_percentile(stats.late_ms, 99)}/{np.max(stats.late_ms):.0f}"
+            if stats.late_ms
+            else "-",
+            _percentile(stats.send_lag_ms, 99),
+            stats.frames_after_abort,
+            server_cpu,
+            server_rss,
+            client_cpu,
+        ]
+        return latency_row, audio_row
+
+    async def _ramp_to(self, devices, target):
+        while len(devices) < target:
+            device = _Device(self, len(devices))
+            devices.append(asyncio.create_task(device.run()))
+            await asyncio.sleep(1 / self.connect_rate)
+
+    async def run(self):
+        print(f"开始并发压测: {self.url}")
+        print(f"阶段设备数: {self.steps}，每阶段{self.stage_seconds:.0f}秒")
+        if self.tts_config is None:
+            print("当前配置的TTS不是MockTTS，将不统计丢帧")
+        self.stopping = asyncio.Event()
+        self.stage = _StageStats(0)
+        monitor = _ResourceMonitor(self, self.server_pid, self.server_port)
+        if monitor.server is None:
+            print("未找到服务端进程，不统计服务端CPU/内存（可通过LOAD_SERVER_PID指定）")
+        monitor_task = asyncio.create_task(monitor.run())
+        devices = []
+        try:
+            for target in self.steps:
+                self.stage = _StageStats(target)
+                print(f"阶段: {target}台设备...")
+                await self._ramp_to(devices, target)
+                await asyncio.sleep(self.stage_seconds)
+                self.stage.online = self.online
+                self.results.append(self._summarize(self.stage))
+        finally:
+            self.stopping.set()
+            monitor_task.cancel()
+            if devices:
+                await asyncio.wait(devices, timeout=self.timeout)
+                for task in devices:
+                    task.cancel()
+
+        print("\n连接与时延:")
+        print(
+            tabulate(
+                [row[0] for row in self.results],
+                headers=[
+                    "设备数",
+                    "在线",
+                    "连接耗时p50/p99(ms)",
+                    "连接失败",
+                    "完成/超时轮数",
+                    "首包延迟p50(ms)",
+                    "p90(ms)",
+                    "p99(ms)",
+                    "打断响应p50/p99(ms)",
+                ],
+                tablefmt="grid",
+            )
+        )
+        print("\n音频与资源:")
+        print(
+            tabulate(
+                [row[1] for row in self.results],
+                headers=[
+                    "设备数",
+                    "丢帧/应收帧",
+                    "下行迟到p99/最大(ms)",
+                    "上行发送偏差p99(ms)",
+                    "打断后残留帧",
+                    "服务端CPU%均值/峰值",
+                    "服务端RSS峰值(MB)",
+                    "压测端CPU%",
+                ],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print(
+            f"- 每轮对话按{self.detect_ratio:.0%}的比例发送文字(detect)，其余为{self.speech_seconds:.0f}秒语音"
+            f"（listen start、60ms节拍的opus帧、listen stop）；{self.abort_ratio:.0%}的对话在收到首包"
+            f"{self.abort_after * 1000:.0f}ms后发送abort"
+        )
+        print("- 首包延迟：语音从listen stop、文字从detect发出到收到第一帧下行音频的时间")
+        print(
+            f"- 超时轮数：{self.timeout:.0f}秒内未收到首包或tts stop的对话，"
+            "常见原因是服务端连接初始化尚未完成时设备已开始说话，音频被丢弃"
+        )
+        print(
+            "- 丢帧：未打断的对话中，按MockTTS的时长参数计算每句应收帧数，与实际收到的帧数比较"
+        )
+        print(
+            "- 下行迟到：每句从第一帧开始按60ms连续播放，帧到达时间晚于其播放时刻的时长，>0即设备播放断续"
+        )
+        print("- 上行发送偏差：压测端实际发送时刻相对60ms节拍的延后，偏大说明压测端自身过载")
+
+
+# 为了performance_tester.py的调用需求
+async def main():
+    tester = LoadPerformanceTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    tester = LoadPerformanceTester()
+    asyncio.run(tester.run())
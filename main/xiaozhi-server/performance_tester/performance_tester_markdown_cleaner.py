@@ -0,0 +1,310 @@
+import time
+import random
+import asyncio
+from tabulate import tabulate
+
+from core.utils import textUtils
+from core.utils.tts import MarkdownCleaner, StreamingMarkdownCleaner, punctuation_set
+
+description = "TTS文本清理：Markdown/表情清理的吞吐对比与输出一致性测试"
+
+# 一致性用例：大模型常见的回答格式，流式清理的结果应与原正则清理完全一致
+GOLDEN_CASES = [
+    ("纯文本", "今天天气很好，适合出门散步。记得带上水和防晒霜！"),
+    (
+        "标题与列表",
+        "# 今天的天气\n\n**晴天**，气温*二十度*左右。\n\n- 早上：凉爽\n- 中午：较热\n* 晚上：有风\n+ 夜里：降温",
+    ),
+    ("有序列表", "步骤如下：\n1. 打开设置\n2. 选择网络\n3. 连接WiFi"),
+    ("引用", "> 提示：记得防晒。\n>> 嵌套引用\n正文继续。"),
+    ("粗体斜体", "***重点内容***，以及__下划线粗体__和_斜体_，还有**跨越，多个，逗号的粗体**。"),
+    ("链接与图片", "这是[官方文档](https://example.com/docs)，还有一张图片![示意图](a.png)。"),
+    ("代码块", "代码如下：\n```python\nprint('你好。')\nx = a**2\n```\n运行后会输出你好。"),
+    ("行内代码", "使用`pip install`命令安装。"),
+    (
+        "表格",
+        "| 城市 | 气温 | 天气 |\n|---|:---:|---|\n| 北京 | 20度 | **晴** |\n| 上海 | 25度 | 多云 |\n\n以上是天气情况。",
+    ),
+    ("单行表格", "| 名称 | 价格 |\n\n就这些。"),
+    ("行内公式", "公式 $E=mc^2$ 很有名，其中 $m$ 是质量，价格是 $100$ 元。"),
+    ("块级公式", "积分结果为：\n$$\n\\int_0^1 x dx = \\frac{1}{2}\n$$\n也就是二分之一。"),
+    ("表情", "😊你好呀！今天过得怎么样🤔？我很开心😂"),
+    ("多余空行", "第一段。\n\n\n\n第二段。\n\n第三段。"),
+    ("数字与符号", "温度是-5度到+3度，比例为3:2，网址是www.example.com。"),
+    (
+        "综合",
+        "## 推荐\n\n> 以下内容仅供参考\n\n1. **《三体》**：[豆瓣](https://book.douban.com/subject/2567698/)评分*9.3*\n"
+        "2. **《活着》**：讲述了福贵的一生😢\n\n| 书名 | 作者 |\n|---|---|\n| 三体 | 刘慈欣 |\n\n"
+        "```\n代码不朗读\n```\n希望对你有帮助！😊",
+    ),
+]
+
+# 有意与原正则不同的情况
+KNOWN_DIFFS = [
+    (
+        "链接地址含下划线",
+        "见[文档](https://a.com/x_y)_注意_",
+        "原正则先处理斜体，地址中的下划线被当作斜体标记",
+    ),
+    (
+        "表格最后一行无换行",
+        "| 城市 | 气温 |\n|---|---|\n| 北京 | 20度 |",
+        "原正则要求每个表格行以换行结尾，最后一行会原样朗读",
+    ),
+    ("相邻行内公式", "$x+1$$y+2$", "原正则把中间的 $$ 当作块级公式删除"),
+    ("未闭合的代码块", "示例：\n```python\nprint(1)", "流式清理无法等到代码块结束，直接丢弃"),
+]
+
+ANSWER_PARAGRAPHS = [
+    "今天的天气非常好，阳光明媚，适合出门散步。根据最新的数据，气温大约在二十三到二十八度之间。",
+    "如果你打算去公园，记得带上水和防晒霜！另外，晚上八点以后可能会有小雨，出门最好带把伞。",
+    "## 出行建议\n\n- **早上**：适合晨跑，空气清新\n- **中午**：紫外线较强，注意防晒\n- *晚上*：可能有雨\n\n",
+    "| 时段 | 气温 | 天气 |\n|---|---|---|\n| 早上 | 23度 | 晴 |\n| 下午 | 28度 | 多云 |\n\n",
+    "更多信息可以查看[天气网站](https://weather.example.com)。😊\n\n",
+]
+
+
+def _legacy_clean_markdown(text):
+    """原实现：逐字符判断是否全为英文，之后依次执行全部正则"""
+    if text and all(
+        (c.isascii() or c.isspace() or c in punctuation_set) for c in text
+    ):
+        return text
+    for regex, replacement in MarkdownCleaner.REGEXES:
+        text = regex.sub(replacement, text)
+    return text.strip()
+
+
+def _legacy_is_emoji(char):
+    code_point = ord(char)
+    return any(start <= code_point <= end for start, end in textUtils.EMOJI_RANGES)
+
+
+def _legacy_get_string_no_punctuation_or_emoji(s):
+    chars = list(s)
+    start = 0
+    while start < len(chars) and (
+        chars[start].isspace()
+        or chars[start] in textUtils.PUNCTUATION_SET
+        or _legacy_is_emoji(chars[start])
+    ):
+        start += 1
+    end = len(chars) - 1
+    while end >= start and (
+        chars[end].isspace()
+        or chars[end] in textUtils.PUNCTUATION_SET
+        or _legacy_is_emoji(chars[end])
+    ):
+        end -= 1
+    return "".join(chars[start : end + 1])
+
+
+def _legacy_check_emoji(text):
+    return "".join(char for char in text if not _legacy_is_emoji(char) and char != "\n")
+
+
+def _remove_emoji(text):
+    return "".join(char for char in text if not textUtils.is_emoji(char))
+
+
+def _tokenize(text, seed):
+    """按大模型的输出粒度切成1-3个字的token"""
+    rng = random.Random(seed)
+    tokens, i = [], 0
+    while i < len(text):
+        n = rng.randint(1, 3)
+        tokens.append(text[i : i + n])
+        i += n
+    return tokens
+
+
+def _stream_clean(tokens):
+    cleaner = StreamingMarkdownCleaner()
+    return "".join(cleaner.feed(token) for token in tokens) + cleaner.flush()
+
+
+def _split_sentences(text):
+    """与非流式TTS相同，按句末标点切成句子后逐句清理"""
+    sentences, start = [], 0
+    for i, char in enumerate(text):
+        if char in "。！？!?\n":
+            sentences.append(text[start : i + 1])
+            start = i + 1
+    if start < len(text):
+        sentences.append(text[start:])
+    return sentences
+
+
+class MarkdownCleanerPerformanceTester:
+    def __init__(self):
+        self.split_seeds = 20
+        self.answer_chars = 4096
+        self.rounds = 20
+        self.fuzz_strings = 2000
+
+    def _golden(self):
+        rows, failures = [], 0
+        for name, text in GOLDEN_CASES:
+            expected = _legacy_clean_markdown(text)
+            gate_ok = MarkdownCleaner.clean_markdown(text) == expected
+            expected_stream = _legacy_clean_markdown(_remove_emoji(text))
+            stream_ok = all(
+                _stream_clean(_tokenize(text, seed)) == expected_stream
+                for seed in range(self.split_seeds)
+            ) and _stream_clean([text]) == expected_stream
+            failures += (not gate_ok) + (not stream_ok)
+            rows.append(
+                [
+                    name,
+                    len(text),
+                    "一致" if gate_ok else "不一致",
+                    "一致" if stream_ok else "不一致",
+                ]
+            )
+        return rows, failures
+
+    def _known_diffs(self):
+        rows = []
+        for name, text, reason in KNOWN_DIFFS:
+            rows.append(
+                [
+                    name,
+                    repr(_legacy_clean_markdown(text)),
+                    repr(_stream_clean(_tokenize(text, 0))),
+                    reason,
+                ]
+            )
+        return rows
+
+    def _text_utils_parity(self):
+        rng = random.Random(0)
+        alphabet = list("你好，。！!,.:：-－、[]【】“”\" \n\tab12") + list("😊🤔☀✨🚀🧠🫠")
+        mismatches = 0
+        for _ in range(self.fuzz_strings):
+            s = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+            if textUtils.get_string_no_punctuation_or_emoji(
+                s
+            ) != _legacy_get_string_no_punctuation_or_emoji(s):
+                mismatches += 1
+            if textUtils.check_emoji(s) != _legacy_check_emoji(s):
+                mismatches += 1
+        return mismatches
+
+    def _throughput(self, func, items, total_chars):
+        best = None
+        for _ in range(self.rounds):
+            start = time.perf_counter()
+            for item in items:
+                func(item)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return total_chars / best
+
+    def _bench(self):
+        rng = random.Random(1)
+        plain = "".join(rng.choice(ANSWER_PARAGRAPHS[:2]) for _ in range(200))
+        markdown = "".join(rng.choice(ANSWER_PARAGRAPHS) for _ in range(200))
+        rows = []
+        for label, answer in (("纯文本", plain), ("含Markdown", markdown)):
+            answer = answer[: self.answer_chars]
+            sentences = _split_sentences(answer)
+            tokens = _tokenize(answer, 0)
+            size = len(answer)
+            legacy = self._throughput(_legacy_clean_markdown, sentences, size)
+            results = [
+                ("原实现：逐句正则清理", legacy),
+                (
+                    "逐句正则清理（快速判断）",
+                    self._throughput(MarkdownCleaner.clean_markdown, sentences, size),
+                ),
+                (
+                    "原实现：逐token正则清理",
+                    self._throughput(_legacy_clean_markdown, tokens, size),
+                ),
+                ("逐token流式清理", self._throughput(_stream_clean, [tokens], size)),
+                ("原实现：整段正则清理", self._throughput(_legacy_clean_markdown, [answer], size)),
+                ("整段流式清理", self._throughput(_stream_clean, [[answer]], size)),
+            ]
+            for i, (name, chars_per_second) in enumerate(results):
+                rows.append(
+                    [
+                        label if i == 0 else "",
+                        name,
+                        f"{chars_per_second / 1e6:.2f}",
+                        f"{chars_per_second / legacy:.2f}x",
+                    ]
+                )
+
+        segments = _split_sentences(plain[: self.answer_chars])
+        total = sum(len(s) for s in segments)
+        for name, legacy_func, new_func in (
+            (
+                "去除首尾标点表情",
+                _legacy_get_string_no_punctuation_or_emoji,
+                textUtils.get_string_no_punctuation_or_emoji,
+            ),
+            ("去除表情(check_emoji)", _legacy_check_emoji, textUtils.check_emoji),
+        ):
+            legacy = self._throughput(legacy_func, segments, total)
+            new = self._throughput(new_func, segments, total)
+            rows.append([name, "原实现：逐字符遍历区间", f"{legacy / 1e6:.2f}", "1.00x"])
+            rows.append(
+                ["", "预计算集合/删除表", f"{new / 1e6:.2f}", f"{new / legacy:.2f}x"]
+            )
+        return rows
+
+    async def run(self):
+        print("开始TTS文本清理测试...")
+        golden_rows, failures = self._golden()
+        print("\n输出一致性测试结果:")
+        print(
+            tabulate(
+                golden_rows,
+                headers=["用例", "字数", "clean_markdown", "流式清理"],
+                tablefmt="grid",
+            )
+        )
+        print("\n有意不同的情况:")
+        print(
+            tabulate(
+                self._known_diffs(),
+                headers=["用例", "原正则", "流式清理", "原因"],
+                tablefmt="grid",
+            )
+        )
+        mismatches = self._text_utils_parity()
+        print(
+            f"\n标点表情工具函数：随机{self.fuzz_strings}个字符串，与原实现不一致{mismatches}处"
+        )
+
+        print("\n吞吐测试结果:")
+        print(
+            tabulate(
+                self._bench(),
+                headers=["文本", "实现", "百万字/秒", "相对原实现"],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print(
+            f"- 一致性：原正则对整段文本的清理结果为标准输出，流式清理按1-3个字随机切分"
+            f"{self.split_seeds}次并整段输入一次，结果都需一致（流式清理会去除表情，比较时标准输出也先去除表情）"
+        )
+        print(f"- 一致性用例共{len(GOLDEN_CASES)}个，不一致{failures}项")
+        print(
+            f"- 吞吐：{self.answer_chars}字的回答，逐句清理按句末标点切句后逐句调用，"
+            f"流式清理逐token输入；取{self.rounds}轮中最快的一轮"
+        )
+        print("- 逐token正则清理是双流式TTS原来的用法，跨token的Markdown标记无法清理")
+        print("- 流式清理同时去除表情，非流式TTS在断句前、双流式TTS在发送前使用")
+
+
+# 为了performance_tester.py的调用需求
+async def main():
+    tester = MarkdownCleanerPerformanceTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    tester = MarkdownCleanerPerformanceTester()
+    asyncio.run(tester.run())
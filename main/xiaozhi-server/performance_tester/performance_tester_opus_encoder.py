@@ -0,0 +1,135 @@
+import time
+import asyncio
+import numpy as np
+import opuslib_next
+from tabulate import tabulate
+
+from core.utils.opus_encoder_service import OpusEncoderService
+
+description = "Opus编码：逐句新建编码器与编码器池、批量编码及不同复杂度的帧吞吐对比测试"
+
+FRAME_SIZE = 960
+
+
+def _legacy_pcm_to_data_stream(raw_data, callback):
+    """原实现：每句新建编码器，每帧切片、补零拼接并多次拷贝"""
+    encoder = opuslib_next.Encoder(16000, 1, opuslib_next.APPLICATION_AUDIO)
+    for i in range(0, len(raw_data), FRAME_SIZE * 2):
+        chunk = raw_data[i : i + FRAME_SIZE * 2]
+        if len(chunk) < FRAME_SIZE * 2:
+            chunk += b"\x00" * (FRAME_SIZE * 2 - len(chunk))
+        np_frame = np.frombuffer(chunk, dtype=np.int16)
+        callback(encoder.encode(np_frame.tobytes(), FRAME_SIZE))
+
+
+class OpusEncoderPerformanceTester:
+    def __init__(self):
+        self.sentences = 200
+        # 每句约3秒音频
+        self.sentence_seconds = 3
+        self.results = []
+
+    def _make_sentence(self):
+        """生成类似语音的测试音频：多个谐波叠加噪声"""
+        rng = np.random.default_rng(0)
+        t = np.arange(16000 * self.sentence_seconds) / 16000
+        signal = sum(np.sin(2 * np.pi * f * t) for f in (180, 360, 720, 1440))
+        signal = signal / 4 * 8000 + rng.normal(0, 500, len(t))
+        # 末尾补半帧，覆盖补零逻辑
+        return np.clip(signal[: len(t) - FRAME_SIZE // 2], -32768, 32767).astype(np.int16).tobytes()
+
+    def _test(self, name, encode_sentence, pcm):
+        frame_count = 0
+        start, cpu_start = time.perf_counter(), time.process_time()
+        for _ in range(self.sentences):
+            frame_count += encode_sentence(pcm)
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+        self.results.append(
+            [
+                name,
+                frame_count,
+                f"{frame_count / elapsed:.0f}",
+                f"{cpu * 1e6 / frame_count:.1f}",
+                f"{elapsed * 1000 / self.sentences:.2f}",
+            ]
+        )
+
+    def _check_odd_length(self, service, pcm):
+        """奇数字节的原始PCM：编码结果需与原实现按字节补零一致"""
+        odd_pcm = pcm + b"\x01"
+        expected = []
+        _legacy_pcm_to_data_stream(odd_pcm, expected.append)
+        streamed = []
+        service.encode_stream(odd_pcm, streamed.append)
+        batched = service.encode_frames(memoryview(odd_pcm))
+        self.odd_length_result = [
+            ["逐帧回调", len(streamed), streamed == expected],
+            ["批量编码", len(batched), batched == expected],
+        ]
+
+    async def run(self):
+        print("开始Opus编码测试...")
+        pcm = self._make_sentence()
+
+        def legacy(data):
+            frames = []
+            _legacy_pcm_to_data_stream(data, frames.append)
+            return len(frames)
+
+        self._test("逐句新建编码器", legacy, pcm)
+
+        service = OpusEncoderService()
+
+        def pooled_stream(data):
+            frames = []
+            service.encode_stream(data, frames.append)
+            return len(frames)
+
+        self._test("编码器池+逐帧回调", pooled_stream, pcm)
+        self._test("编码器池+批量编码", lambda data: len(service.encode_frames(data)), pcm)
+        self._check_odd_length(service, pcm)
+
+        for complexity in (10, 5, 2):
+            tuned = OpusEncoderService(bitrate=24000, complexity=complexity)
+            self._test(
+                f"批量编码(24kbps,复杂度{complexity})",
+                lambda data: len(tuned.encode_frames(data)),
+                pcm,
+            )
+
+        print("\nOpus编码测试结果:")
+        print(
+            tabulate(
+                self.results,
+                headers=["实现", "帧数", "吞吐(帧/秒)", "每帧CPU(us)", "每句耗时(ms)"],
+                tablefmt="grid",
+            )
+        )
+        print(f"\n奇数字节PCM（{len(pcm) + 1}字节）编码结果:")
+        print(
+            tabulate(
+                self.odd_length_result,
+                headers=["实现", "帧数", "与原实现一致"],
+                tablefmt="grid",
+            )
+        )
+        print("\n编码器池统计:")
+        print(tabulate([[k, v] for k, v in service.get_stats().items()], tablefmt="grid"))
+        print("\n测试说明:")
+        print(
+            f"- 共{self.sentences}句，每句约{self.sentence_seconds}秒16kHz单声道音频，60ms一帧"
+        )
+        print("- 前三行使用libopus默认比特率和复杂度，与原实现一致")
+        print("- 流式TTS（OpusEncoderUtils）默认使用24kbps、复杂度10，可通过opus_encoder配置调整")
+
+
+# 为了performance_tester.py的调用需求
+async def main():
+    tester = OpusEncoderPerformanceTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    tester = OpusEncoderPerformanceTester()
+    asyncio.run(tester.run())
@@ -0,0 +1,152 @@
+import time
+import asyncio
+from tabulate import tabulate
+
+from plugins_func.register import FunctionItem, ToolType, Action, ActionResponse
+from core.providers.tools.server_plugins.plugin_runtime import (
+    PluginRuntime,
+    PluginTimeoutError,
+)
+
+description = "服务端插件执行层：插件卡住时事件循环响应性与直接调用的对比测试"
+
+
+def _hanging_plugin(conn, location=None):
+    """模拟没有设置超时、对方网站迟迟不响应的同步插件"""
+    time.sleep(3)
+    return ActionResponse(Action.REQLLM, "晴", None)
+
+
+def _slow_plugin(conn, location=None):
+    """模拟一次正常的同步HTTP请求"""
+    time.sleep(0.2)
+    return ActionResponse(Action.REQLLM, "晴", None)
+
+
+async def _async_plugin(conn, location=None):
+    """async def 定义的插件"""
+    await asyncio.sleep(0.2)
+    return ActionResponse(Action.REQLLM, "晴", None)
+
+
+class PluginRuntimePerformanceTester:
+    def __init__(self):
+        self.calls = 20
+        self.results = []
+
+    async def _measure(self, name, call_plugin):
+        """并发调用插件，同时用10ms的定时任务模拟音频收发，统计事件循环卡顿"""
+        loop_lags = []
+        stop = asyncio.Event()
+
+        async def ticker():
+            while not stop.is_set():
+                expected = time.perf_counter() + 0.01
+                await asyncio.sleep(0.01)
+                loop_lags.append((time.perf_counter() - expected) * 1000)
+
+        async def one_call():
+            try:
+                await call_plugin()
+                return "ok"
+            except PluginTimeoutError:
+                return "timeout"
+
+        ticker_task = asyncio.create_task(ticker())
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        statuses = await asyncio.gather(*[one_call() for _ in range(self.calls)])
+        makespan = time.perf_counter() - start
+        stop.set()
+        await ticker_task
+
+        self.results.append(
+            [
+                name,
+                self.calls,
+                statuses.count("timeout"),
+                f"{makespan:.2f}",
+                f"{max(loop_lags):.0f}",
+                sum(1 for lag in loop_lags if lag > 100),
+            ]
+        )
+
+    async def run(self):
+        print("开始服务端插件执行层测试...")
+        hanging = FunctionItem(
+            "hanging_weather", {}, _hanging_plugin, ToolType.SYSTEM_CTL, timeout=1
+        )
+        slow = FunctionItem("slow_weather", {}, _slow_plugin, ToolType.SYSTEM_CTL)
+        async_item = FunctionItem("async_weather", {}, _async_plugin, ToolType.SYSTEM_CTL)
+
+        runtime = PluginRuntime(max_workers=16, timeout=5, max_concurrency=4)
+        try:
+            # 原实现：在事件循环中直接调用同步插件
+            async def legacy_call(item=slow):
+                item.func(None)
+
+            print("测试直接调用同步插件...")
+            await self._measure("直接调用-同步插件(200ms)", legacy_call)
+
+            print("测试插件执行层...")
+            await self._measure(
+                "执行层-同步插件(200ms)", lambda: runtime.run(slow, None)
+            )
+            await self._measure(
+                "执行层-卡住的插件(超时1s)", lambda: runtime.run(hanging, None)
+            )
+            await self._measure(
+                "执行层-async插件(200ms)", lambda: runtime.run(async_item, None)
+            )
+            stats = runtime.get_stats()
+        finally:
+            runtime.shutdown()
+
+        print("\n事件循环响应性测试结果:")
+        print(
+            tabulate(
+                self.results,
+                headers=["场景", "调用数", "超时数", "总耗时(s)", "事件循环最大卡顿(ms)", "卡顿>100ms次数"],
+                tablefmt="grid",
+            )
+        )
+        print("\n插件耗时直方图:")
+        rows = []
+        for name, histogram in stats.items():
+            rows.append(
+                [
+                    name,
+                    histogram["count"],
+                    histogram["timeouts"],
+                    f"{histogram['avg_ms']:.0f}",
+                    f"{histogram['p50_ms']:.0f}",
+                    f"{histogram['p99_ms']:.0f}",
+                    ", ".join(
+                        f"{bucket}:{count}"
+                        for bucket, count in histogram["buckets"].items()
+                        if count
+                    ),
+                ]
+            )
+        print(
+            tabulate(
+                rows,
+                headers=["插件", "调用数", "超时数", "平均(ms)", "P50(ms)", "P99(ms)", "分桶"],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print(f"- 每个场景并发调用{self.calls}次，单插件并发上限4，工作线程16个")
+        print("- 直接调用时同步插件在事件循环中执行，期间所有连接的音频收发都会停顿")
+        print("- 卡住的插件超时后立即返回，并发名额直到线程真正结束才归还")
+
+
+# 为了performance_tester.py的调用需求
+async def main():
+    tester = PluginRuntimePerformanceTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    tester = PluginRuntimePerformanceTester()
+    asyncio.run(tester.run())
@@ -0,0 +1,192 @@
+import json
+import time
+import asyncio
+import hashlib
+from aiohttp import web
+from tabulate import tabulate
+
+from config.manage_api_client import (
+    ManageApiClient,
+    get_agent_models,
+    get_agent_models_cached,
+    get_private_config_cache,
+    invalidate_private_config,
+)
+
+description = "设备差异化配置缓存：重连风暴下的配置获取延迟与manager-api请求量对比测试"
+
+
+class _StubManageApi:
+    """
+    本地模拟的manager-api /config/agent-models 接口
+
+    每个请求模拟固定的数据库查询耗时，并限制同时处理的请求数（模拟Java线程池/数据库连接池），
+    支持ETag：If-None-Match与当前配置一致时返回304
+    """
+
+    def __init__(self, agents=10, latency_ms=30, concurrency=20):
+        self.agents = agents
+        self.latency_ms = latency_ms
+        self.requests = 0
+        self.not_modified = 0
+        self._semaphore = None
+        self._concurrency = concurrency
+        self._runner = None
+
+    def _agent_config(self, mac_address):
+        index = int(mac_address.rsplit(":", 1)[-1], 16) % self.agents
+        return {
+            "selected_module": {"LLM": f"LLM_{index}"},
+            "LLM": {f"LLM_{index}": {"type": "openai", "model_name": f"model-{index}"}},
+            "prompt": f"你是智能体{index}",
+        }
+
+    async def _agent_models(self, request):
+        self.requests += 1
+        body = await request.json()
+        async with self._semaphore:
+            await asyncio.sleep(self.latency_ms / 1000)
+        data = self._agent_config(body["macAddress"])
+        payload = json.dumps({"code": 0, "msg": "success", "data": data}, ensure_ascii=False)
+        etag = '"' + hashlib.sha1(payload.encode("utf-8")).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            self.not_modified += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(
+            text=payload, content_type="application/json", headers={"ETag": etag}
+        )
+
+    async def start(self):
+        self._semaphore = asyncio.Semaphore(self._concurrency)
+        app = web.Application()
+        app.router.add_post("/xiaozhi/config/agent-models", self._agent_models)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/xiaozhi/"
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+class PrivateConfigCachePerformanceTester:
+    def __init__(self):
+        self.devices = 500
+        self.agents = 10
+        self.ttl = 5
+        self.results = []
+        self.selected_module = {"VAD": "SileroVAD", "ASR": "FunASR", "LLM": "ChatGLMLLM"}
+
+    def _mac(self, device):
+        return f"aa:bb:cc:dd:{device // 256:02x}:{device % 256:02x}"
+
+    async def _storm(self, name, server, get_config):
+        """所有设备同时重连，记录每个设备获取配置的耗时"""
+        requests_before = server.requests
+        not_modified_before = server.not_modified
+
+        async def connect(device):
+            start = time.perf_counter()
+            await get_config(self._mac(device), self._mac(device), self.selected_module)
+            return (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        latencies = sorted(
+            await asyncio.gather(*[connect(device) for device in range(self.devices)])
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        # 等待后台刷新完成后再统计请求数
+        cache = get_private_config_cache()
+        while cache is not None and cache.get_stats()["refreshing"]:
+            await asyncio.sleep(0.05)
+        self.results.append(
+            [
+                name,
+                self.devices,
+                f"{sum(latencies) / len(latencies):.1f}",
+                f"{latencies[int(len(latencies) * 0.99) - 1]:.1f}",
+                f"{elapsed:.0f}",
+                server.requests - requests_before,
+                server.not_modified - not_modified_before,
+            ]
+        )
+
+    async def run(self):
+        print("开始差异化配置缓存测试...")
+        server = _StubManageApi(agents=self.agents)
+        url = await server.start()
+        ManageApiClient(
+            {
+                "manager-api": {
+                    "url": url,
+                    "secret": "test-secret",
+                    "max_retries": 0,
+                    "timeout": 120,
+                }
+            }
+        )
+        cache_config = {"enable": True, "ttl": self.ttl, "stale_ttl": 3600}
+        get_private_config_cache(cache_config)
+
+        async def cached(mac_address, client_id, selected_module):
+            return await get_agent_models_cached(
+                mac_address, client_id, selected_module, cache_config
+            )
+
+        try:
+            # 预热：建立到manager-api的长连接，避免首轮测试包含建连耗时
+            await self._storm("预热", server, get_agent_models)
+            self.results.clear()
+            await self._storm("无缓存", server, get_agent_models)
+            await self._storm("缓存：冷启动", server, cached)
+            await self._storm(f"缓存：{self.ttl}秒内再次重连", server, cached)
+            await asyncio.sleep(self.ttl + 0.1)
+            await self._storm("缓存：过期后重连（后台刷新）", server, cached)
+            invalidate_private_config()
+            await self._storm("缓存：update_config失效后重连", server, cached)
+            stats = get_private_config_cache().get_stats()
+        finally:
+            await server.stop()
+
+        print("\n重连风暴测试结果:")
+        print(
+            tabulate(
+                self.results,
+                headers=[
+                    "场景",
+                    "设备数",
+                    "平均获取耗时(ms)",
+                    "P99获取耗时(ms)",
+                    "全部完成耗时(ms)",
+                    "manager-api请求数",
+                    "其中304",
+                ],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print(
+            f"- 模拟manager-api每个请求耗时{server.latency_ms}ms，最多同时处理"
+            f"{server._concurrency}个请求，{self.devices}个设备共用{self.agents}个智能体"
+        )
+        print(
+            f"- 缓存有效期{self.ttl}秒；过期后先返回旧配置，后台带If-None-Match刷新，未变化时返回304"
+        )
+        print("- 模拟服务与设备在同一事件循环中，全部完成耗时包含后台刷新占用事件循环的时间")
+        print(
+            f"- 缓存统计：命中{stats['hits']}次，过期命中{stats['stale_hits']}次，"
+            f"未命中{stats['misses']}次，未变化{stats['not_modified']}次"
+        )
+
+
+# 为了performance_tester.py的调用需求
+async def main():
+    tester = PrivateConfigCachePerformanceTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    tester = PrivateConfigCachePerformanceTester()
+    asyncio.run(tester.run())
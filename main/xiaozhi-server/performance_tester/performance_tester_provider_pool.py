@@ -0,0 +1,164 @@
+import gc
+import os
+import time
+import asyncio
+import tracemalloc
+from tabulate import tabulate
+
+from config.logger import setup_logging
+from core.utils.modules_initialize import initialize_modules
+from core.utils.provider_pool import get_provider_pool
+
+description = "模块实例池：大量设备共享少数智能体配置时的连接初始化耗时与内存占用对比测试"
+
+logger = setup_logging()
+
+VAD_MODEL_DIR = os.path.join("models", "snakers4_silero-vad")
+
+
+def _rss_mb():
+    """当前进程的常驻内存（MB）"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def _llm_config(index):
+    """第index个智能体的差异化配置"""
+    return {
+        "selected_module": {"LLM": f"LLM_{index}"},
+        "LLM": {
+            f"LLM_{index}": {
+                "type": "openai",
+                "model_name": f"model-{index}",
+                "api_key": f"sk-fake-key-{index}",
+                "base_url": "http://127.0.0.1:9/v1",
+                "temperature": 0.7,
+            },
+        },
+    }
+
+
+def _vad_config(index):
+    return {
+        "selected_module": {"VAD": f"VAD_{index}"},
+        "VAD": {
+            f"VAD_{index}": {
+                "type": "silero_onnx",
+                "model_dir": VAD_MODEL_DIR,
+                "threshold": 0.5,
+                "threshold_low": round(0.2 + index * 0.01, 2),
+                "min_silence_duration_ms": 200,
+                "batch_inference": False,
+            },
+        },
+    }
+
+
+class ProviderPoolPerformanceTester:
+    def __init__(self):
+        self.devices = 1000
+        self.configs = 10
+        # VAD模型每个实例都要加载ONNX模型，设备数取小一些
+        self.vad_devices = 100
+        self.results = []
+
+    def _connect_all(self, make_config, devices, init_flags, use_pool):
+        """模拟devices个设备依次连接，所有连接保持在线，返回每个连接的初始化耗时和内存增量"""
+        gc.collect()
+        rss_before = _rss_mb()
+        tracemalloc.start()
+        connections = []
+        durations = []
+        for device in range(devices):
+            config = make_config(device % self.configs)
+            pooled = [] if use_pool else None
+            start = time.perf_counter()
+            modules = initialize_modules(logger, config, pooled=pooled, **init_flags)
+            durations.append((time.perf_counter() - start) * 1000)
+            connections.append((modules, pooled))
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rss_delta = _rss_mb() - rss_before
+        instances = len({id(m) for modules, _ in connections for m in modules.values()})
+
+        # 所有设备断开
+        if use_pool:
+            for _, pooled in connections:
+                get_provider_pool().release_all(pooled)
+        connections.clear()
+        gc.collect()
+        return durations, traced_peak / 1024 / 1024, rss_delta, instances
+
+    def _test(self, name, make_config, devices, init_flags):
+        rows = []
+        for label, use_pool in (("每个连接单独创建", False), ("实例池共享", True)):
+            durations, traced_mb, rss_mb, instances = self._connect_all(
+                make_config, devices, init_flags, use_pool
+            )
+            durations.sort()
+            rows.append(
+                [
+                    name,
+                    label,
+                    devices,
+                    instances,
+                    f"{sum(durations) / len(durations):.3f}",
+                    f"{durations[int(len(durations) * 0.99) - 1]:.3f}",
+                    f"{sum(durations):.0f}",
+                    f"{traced_mb:.1f}",
+                    f"{rss_mb:.1f}",
+                ]
+            )
+        self.results.extend(rows)
+
+    async def run(self):
+        print("开始模块实例池测试...")
+        pool = get_provider_pool()
+        print(f"测试LLM：{self.devices}个设备，{self.configs}种配置...")
+        self._test("LLM(openai)", _llm_config, self.devices, {"init_llm": True})
+        if os.path.exists(VAD_MODEL_DIR):
+            print(f"测试VAD：{self.vad_devices}个设备，{self.configs}种配置...")
+            self._test(
+                "VAD(SileroOnnxVAD)", _vad_config, self.vad_devices, {"init_vad": True}
+            )
+        stats = pool.get_stats()
+
+        print("\n连接初始化测试结果:")
+        print(
+            tabulate(
+                self.results,
+                headers=[
+                    "模块",
+                    "方式",
+                    "设备数",
+                    "实例数",
+                    "平均初始化耗时(ms)",
+                    "P99初始化耗时(ms)",
+                    "总耗时(ms)",
+                    "Python内存峰值(MB)",
+                    "常驻内存增量(MB)",
+                ],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print(
+            f"- 设备按编号轮流使用{self.configs}种智能体配置，所有设备连接完成后再统一断开"
+        )
+        print("- Python内存峰值由tracemalloc统计，ONNX Runtime等原生库的内存只体现在常驻内存增量中")
+        print("- 初始化耗时在开启tracemalloc的情况下统计，绝对值偏大，两种方式之间可直接比较")
+        print(
+            f"- 实例池统计：命中{stats['hits']}次，创建{stats['misses']}次，"
+            f"断开后空闲实例{stats['idle']}个（超过idle_ttl后淘汰）"
+        )
+
+
+# 为了performance_tester.py的调用需求
+async def main():
+    tester = ProviderPoolPerformanceTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    tester = ProviderPoolPerformanceTester()
+    asyncio.run(tester.run())
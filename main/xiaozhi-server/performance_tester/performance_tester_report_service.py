@@ -0,0 +1,327 @@
+import os
+import time
+import shutil
+import asyncio
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import opuslib_next
+from aiohttp import web
+from tabulate import tabulate
+
+from config.manage_api_client import ManageApiClient, report as manage_report
+from core.utils.audio_decode import decode_audio_to_pcm
+from core.utils.report_service import ReportService
+from core.utils.util import opus_datas_to_wav_bytes
+
+description = "聊天记录上报：每1000轮对话的上报CPU耗时与上传流量对比，及manager-api停机期间的磁盘暂存补传测试"
+
+SAMPLE_RATE = 16000
+FRAME_BYTES = 960 * 2
+
+
+class _StubManageApi:
+    """
+    在独立线程中运行的模拟manager-api /agent/chat-history/report 接口
+
+    统计请求数和请求体字节数；down为True时返回503，模拟manager-api停机
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self.down = False
+        self.loop = None
+        self._runner = None
+        self._thread = None
+
+    async def _report(self, request):
+        body = await request.read()
+        if self.down:
+            return web.Response(status=503)
+        self.requests += 1
+        self.bytes += len(body)
+        return web.json_response({"code": 0, "msg": "success", "data": True})
+
+    async def _serve(self, started):
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_post("/xiaozhi/agent/chat-history/report", self._report)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        started.set()
+
+    def start(self):
+        started = threading.Event()
+        self.loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.loop.create_task(self._serve(started))
+            self.loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        started.wait()
+        return f"http://127.0.0.1:{self.port}/xiaozhi/"
+
+    def cpu_seconds(self):
+        """模拟服务所在线程已使用的CPU时间，用于从进程CPU时间中扣除"""
+
+        async def thread_time():
+            return time.thread_time()
+
+        return asyncio.run_coroutine_threadsafe(thread_time(), self.loop).result()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(5)
+
+
+class ReportServicePerformanceTester:
+    def __init__(self):
+        self.turns = 1000
+        self.connections = 50
+        # 每轮对话：用户说话约3秒，智能体回复约6秒
+        self.user_seconds = 3
+        self.reply_seconds = 6
+        self.results = []
+
+    def _make_audio(self):
+        """用内置提示音编码出指定时长的opus包，模拟设备上传和TTS合成的音频"""
+        assets = os.path.join("config", "assets")
+        pcm = b"".join(
+            decode_audio_to_pcm(os.path.join(assets, name), "wav")
+            for name in sorted(os.listdir(assets))
+            if name.endswith(".wav")
+        )
+        encoder = opuslib_next.Encoder(SAMPLE_RATE, 1, opuslib_next.APPLICATION_AUDIO)
+        packets = []
+        for start in range(0, len(pcm) - FRAME_BYTES + 1, FRAME_BYTES):
+            packets.append(encoder.encode(pcm[start : start + FRAME_BYTES], 960))
+
+        def take(seconds):
+            count = seconds * 1000 // 60
+            return [packets[i % len(packets)] for i in range(count)]
+
+        return take(self.user_seconds), take(self.reply_seconds)
+
+    def _reports(self, user_audio, reply_audio):
+        """每轮对话两条上报：用户语音识别结果 + 智能体回复"""
+        items = []
+        for turn in range(self.turns):
+            mac = f"aa:bb:cc:dd:{turn % self.connections // 256:02x}:{turn % self.connections % 256:02x}"
+            session = f"session-{turn % self.connections}"
+            items.append((mac, session, 1, f"第{turn}轮用户说的话", user_audio))
+            items.append((mac, session, 2, f"第{turn}轮智能体的回复，" * 4, reply_audio))
+        return items
+
+    async def _wait_received(self, server, expected, timeout=300):
+        deadline = time.monotonic() + timeout
+        while server.requests < expected and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+
+    async def _measure(self, name, server, submit_all, expected, finish=None):
+        requests_before, bytes_before = server.requests, server.bytes
+        cpu_before = time.process_time() - server.cpu_seconds()
+        start = time.perf_counter()
+        submit_all()
+        await self._wait_received(server, requests_before + expected)
+        if finish:
+            finish()
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - server.cpu_seconds() - cpu_before
+        received = server.requests - requests_before
+        uploaded = server.bytes - bytes_before
+        self.results.append(
+            [
+                name,
+                f"{received}/{expected}",
+                f"{cpu:.2f}",
+                f"{cpu * 1000 / self.turns:.2f}",
+                f"{uploaded / 1024 / 1024:.1f}",
+                f"{uploaded / self.turns / 1024:.1f}",
+                f"{elapsed:.1f}",
+            ]
+        )
+        return cpu, uploaded
+
+    def _old_path(self, items):
+        """原实现：每个连接一个线程池，每条上报 asyncio.run 一次，音频解码为WAV"""
+        executors = [ThreadPoolExecutor(max_workers=5) for _ in range(self.connections)]
+
+        def process(item):
+            mac, session, chat_type, content, audio = item
+            asyncio.run(
+                manage_report(
+                    mac_address=mac,
+                    session_id=session,
+                    chat_type=chat_type,
+                    content=content,
+                    audio=opus_datas_to_wav_bytes(audio),
+                    report_time=int(time.time()),
+                )
+            )
+
+        def submit_all():
+            for index, item in enumerate(items):
+                executors[index // 2 % self.connections].submit(process, item)
+
+        def finish():
+            for executor in executors:
+                executor.shutdown(wait=True)
+
+        return submit_all, finish
+
+    def _new_path(self, service, items):
+        def submit_all():
+            for mac, session, chat_type, content, audio in items:
+                service.submit(mac, session, chat_type, content, audio, int(time.time()))
+
+        return submit_all
+
+    async def _outage(self, server, user_audio, reply_audio, spool_dir):
+        """manager-api停机期间持续上报，恢复后统计补传情况"""
+        service = ReportService(
+            audio_format="ogg",
+            spool_dir=spool_dir,
+            max_pending=100,
+            retry_interval=1,
+        )
+        turns = 200
+        items = self._reports(user_audio, reply_audio)[: turns * 2]
+        requests_before = server.requests
+        server.down = True
+        for mac, session, chat_type, content, audio in items:
+            service.submit(mac, session, chat_type, content, audio, int(time.time()))
+        # 等待内存中的上报全部写入磁盘
+        while service.get_stats()["pending"]:
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.5)
+        during = service.get_stats()
+        server.down = False
+        start = time.perf_counter()
+        await self._wait_received(server, requests_before + len(items), timeout=60)
+        recovered = time.perf_counter() - start
+        after = service.get_stats()
+        service.shutdown()
+        return [
+            len(items),
+            during["spool_items"],
+            f"{during['spool_bytes'] / 1024 / 1024:.1f}",
+            during["overflowed"],
+            server.requests - requests_before,
+            after["spool_items"],
+            after["spool_dropped"],
+            f"{recovered:.1f}",
+        ]
+
+    async def run(self):
+        print("开始聊天记录上报测试...")
+        user_audio, reply_audio = self._make_audio()
+        items = self._reports(user_audio, reply_audio)
+        server = _StubManageApi()
+        url = server.start()
+        ManageApiClient(
+            {
+                "manager-api": {
+                    "url": url,
+                    "secret": "test-secret",
+                    "max_retries": 0,
+                    "timeout": 120,
+                }
+            }
+        )
+        spool_dir = tempfile.mkdtemp(prefix="report_spool_")
+        try:
+            print(f"原实现：{self.turns}轮对话，{len(items)}条上报...")
+            submit_all, finish = self._old_path(items)
+            old_cpu, old_bytes = await self._measure(
+                "原实现（每条asyncio.run，WAV）", server, submit_all, len(items), finish
+            )
+            rows = {}
+            for audio_format in ("wav", "ogg"):
+                print(f"上报服务（{audio_format}）...")
+                service = ReportService(
+                    audio_format=audio_format,
+                    spool_dir=os.path.join(spool_dir, audio_format),
+                )
+                rows[audio_format] = await self._measure(
+                    f"上报服务（攒批，{audio_format.upper()}）",
+                    server,
+                    self._new_path(service, items),
+                    len(items),
+                )
+                stats = service.get_stats()
+                service.shutdown()
+            print("模拟manager-api停机...")
+            outage = await self._outage(
+                server, user_audio, reply_audio, os.path.join(spool_dir, "outage")
+            )
+        finally:
+            server.stop()
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
+        print(f"\n每{self.turns}轮对话的上报开销:")
+        print(
+            tabulate(
+                self.results,
+                headers=[
+                    "方式",
+                    "送达/上报条数",
+                    "CPU耗时(s)",
+                    "每轮CPU(ms)",
+                    "上传流量(MB)",
+                    "每轮流量(KB)",
+                    "全部送达耗时(s)",
+                ],
+                tablefmt="grid",
+            )
+        )
+        new_cpu, new_bytes = rows["ogg"]
+        print(
+            f"\n上报服务（Ogg）相比原实现：每{self.turns}轮节省CPU {old_cpu - new_cpu:.2f}秒，"
+            f"节省流量 {(old_bytes - new_bytes) / 1024 / 1024:.1f}MB"
+            f"（为原来的{new_bytes / old_bytes * 100:.0f}%）"
+        )
+        print("\nmanager-api停机期间上报，恢复后补传:")
+        print(
+            tabulate(
+                [outage],
+                headers=[
+                    "上报条数",
+                    "停机期间暂存条数",
+                    "暂存大小(MB)",
+                    "内存队列溢出条数",
+                    "恢复后送达",
+                    "剩余暂存",
+                    "丢弃",
+                    "补传耗时(s)",
+                ],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print(
+            f"- 每轮对话两条上报：用户语音约{self.user_seconds}秒，智能体回复约{self.reply_seconds}秒，"
+            f"分布在{self.connections}个连接上，音频由内置提示音编码为16kHz/60ms的opus包"
+        )
+        print("- CPU耗时为本进程CPU时间扣除模拟manager-api线程后的值，流量为上报请求体大小（含base64）")
+        print(
+            f"- 上报服务平均每批{stats['avg_batch_size']:.1f}条；停机测试中内存队列上限100条，"
+            "超出部分由提交方直接写入磁盘"
+        )
+
+
+# 为了performance_tester.py的调用需求
+async def main():
+    tester = ReportServicePerformanceTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    tester = ReportServicePerformanceTester()
+    asyncio.run(tester.run())
@@ -0,0 +1,190 @@
+import time
+import random
+import asyncio
+import statistics
+from tabulate import tabulate
+
+from core.utils import textUtils
+from core.utils.sentence_segmenter import (
+    StreamingSegmenter,
+    PUNCTUATIONS,
+    FIRST_SENTENCE_PUNCTUATIONS,
+)
+
+description = "TTS增量断句：2KB回答逐token断句的耗时对比测试"
+
+SENTENCES = [
+    "今天的天气非常好，阳光明媚，适合出门散步。",
+    "根据最新的数据，气温大约在二十三到二十八度之间；",
+    "如果你打算去公园，记得带上水和防晒霜！",
+    "另外，晚上八点以后可能会有小雨，出门最好带把伞？",
+    "需要我帮你查一下明天的天气吗：",
+    "好的，我会继续为你关注天气变化。",
+]
+
+
+class _LegacySegmenter:
+    """原实现：每个token都重新拼接全部文本，再对每个标点做一次rfind"""
+
+    def __init__(self):
+        self.tts_text_buff = []
+        self.processed_chars = 0
+        self.is_first_sentence = True
+
+    def feed(self, token):
+        self.tts_text_buff.append(token)
+        full_text = "".join(self.tts_text_buff)
+        current_text = full_text[self.processed_chars :]
+        last_punct_pos = -1
+        punctuations = (
+            FIRST_SENTENCE_PUNCTUATIONS if self.is_first_sentence else PUNCTUATIONS
+        )
+        for punct in punctuations:
+            pos = current_text.rfind(punct)
+            if (pos != -1 and last_punct_pos == -1) or (
+                pos != -1 and pos < last_punct_pos
+            ):
+                last_punct_pos = pos
+        if last_punct_pos != -1:
+            segment_text_raw = current_text[: last_punct_pos + 1]
+            segment_text = textUtils.get_string_no_punctuation_or_emoji(
+                segment_text_raw
+            )
+            self.processed_chars += len(segment_text_raw)
+            self.is_first_sentence = False
+            return segment_text
+        return None
+
+    def flush(self):
+        full_text = "".join(self.tts_text_buff)
+        return textUtils.get_string_no_punctuation_or_emoji(
+            full_text[self.processed_chars :]
+        )
+
+
+def _make_answer(size_bytes, seed):
+    rng = random.Random(seed)
+    parts = []
+    while len("".join(parts).encode("utf-8")) < size_bytes:
+        parts.append(rng.choice(SENTENCES))
+    return "".join(parts)
+
+
+def _tokenize(text, seed):
+    """按大模型的输出粒度切成1-3个字的token"""
+    rng = random.Random(seed)
+    tokens, i = [], 0
+    while i < len(text):
+        n = rng.randint(1, 3)
+        tokens.append(text[i : i + n])
+        i += n
+    return tokens
+
+
+class SegmenterPerformanceTester:
+    def __init__(self):
+        self.answer_sizes = [2048, 8192, 32768]
+        self.rounds = 20
+
+    def _run_legacy(self, tokens):
+        segmenter = _LegacySegmenter()
+        segments = []
+        token_times = []
+        for token in tokens:
+            start = time.perf_counter()
+            segment = segmenter.feed(token)
+            token_times.append(time.perf_counter() - start)
+            if segment:
+                segments.append(segment)
+        remaining = segmenter.flush()
+        if remaining:
+            segments.append(remaining)
+        return segments, token_times
+
+    def _run_streaming(self, tokens):
+        segments = []
+        segmenter = StreamingSegmenter(segments.append)
+        token_times = []
+        for token in tokens:
+            start = time.perf_counter()
+            segmenter.feed(token)
+            token_times.append(time.perf_counter() - start)
+        remaining = segmenter.flush()
+        if remaining:
+            segments.append(remaining)
+        return segments, token_times
+
+    def _bench(self, run, tokens):
+        totals, per_token_max = [], []
+        segments = None
+        for _ in range(self.rounds):
+            segments, token_times = run(tokens)
+            totals.append(sum(token_times))
+            per_token_max.append(max(token_times))
+        return segments, statistics.median(totals), statistics.median(per_token_max)
+
+    async def run(self):
+        print("开始TTS增量断句测试...")
+        results = []
+        for size in self.answer_sizes:
+            answer = _make_answer(size, seed=size)
+            tokens = _tokenize(answer, seed=size)
+            legacy_segments, legacy_total, legacy_max = self._bench(
+                self._run_legacy, tokens
+            )
+            new_segments, new_total, new_max = self._bench(self._run_streaming, tokens)
+            results.append(
+                [
+                    f"{len(answer.encode('utf-8'))}B/{len(tokens)}",
+                    "原实现(全文拼接+rfind)",
+                    f"{legacy_total * 1000:.2f}",
+                    f"{legacy_total / len(tokens) * 1e6:.2f}",
+                    f"{legacy_max * 1e6:.1f}",
+                    len(legacy_segments),
+                    "-",
+                ]
+            )
+            results.append(
+                [
+                    "",
+                    "增量断句",
+                    f"{new_total * 1000:.2f}",
+                    f"{new_total / len(tokens) * 1e6:.2f}",
+                    f"{new_max * 1e6:.1f}",
+                    len(new_segments),
+                    "一致" if new_segments == legacy_segments else "不一致",
+                ]
+            )
+
+        print("\n逐token断句测试结果:")
+        print(
+            tabulate(
+                results,
+                headers=[
+                    "回答大小/token数",
+                    "实现",
+                    "总耗时(ms)",
+                    "每token(us)",
+                    "最慢token(us)",
+                    "切出段数",
+                    "分段结果",
+                ],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print(f"- 每个回答逐token（1-3个字）送入断句器，取{self.rounds}轮的中位数")
+        print("- 原实现每个token都要拼接已收到的全部文本，耗时随回答长度增长")
+        print("- 增量断句只扫描新收到的字符，每token耗时与回答长度无关")
+        print("- 分段结果：与原实现切出的各段文本逐一比较")
+
+
+# 为了performance_tester.py的调用需求
+async def main():
+    tester = SegmenterPerformanceTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    tester = SegmenterPerformanceTester()
+    asyncio.run(tester.run())
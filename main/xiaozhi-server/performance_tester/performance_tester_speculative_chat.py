@@ -0,0 +1,157 @@
+import time
+import asyncio
+from types import SimpleNamespace
+from tabulate import tabulate
+
+from core.utils.dialogue import Dialogue, Message
+from core.providers.llm.base import LLMProviderBase
+from core.utils.speculative_chat import SpeculativeChat, get_speculative_chat_stats
+
+description = "流式ASR推测执行：静音窗口内提前请求大模型与最终结果后再请求的首token延迟对比测试"
+
+
+class _FakeLLM(LLMProviderBase):
+    """模拟的大模型：固定首token延迟，之后按固定间隔输出"""
+
+    def __init__(self, first_token_ms=500, token_interval_ms=30, tokens=40):
+        self.first_token_ms = first_token_ms
+        self.token_interval_ms = token_interval_ms
+        self.tokens = tokens
+        self.generated = 0
+
+    def response(self, session_id, dialogue, **kwargs):
+        raise NotImplementedError
+
+    async def aresponse(self, session_id, dialogue, **kwargs):
+        await asyncio.sleep(self.first_token_ms / 1000)
+        for i in range(self.tokens):
+            self.generated += 1
+            yield f"好{i}"
+            await asyncio.sleep(self.token_interval_ms / 1000)
+
+
+def _make_conn(llm):
+    dialogue = Dialogue()
+    dialogue.put(Message(role="system", content="你是小智"))
+    return SimpleNamespace(
+        config={"speculative_chat": {"enable": True}},
+        dialogue=dialogue,
+        memory=None,
+        llm=llm,
+        session_id="session",
+        need_bind=False,
+        voiceprint_provider=None,
+        intent_type="nointent",
+    )
+
+
+class SpeculativeChatPerformanceTester:
+    def __init__(self):
+        self.connections = 20
+        # 用户说话时长，期间每200ms返回一次中间结果
+        self.speech_ms = 1200
+        self.partial_interval_ms = 200
+        # VAD静音窗口（min_silence_duration_ms默认值）
+        self.silence_ms = 1000
+        self.results = []
+
+    def _partials(self, text):
+        steps = self.speech_ms // self.partial_interval_ms
+        for i in range(1, steps + 1):
+            yield text[: max(1, len(text) * i // steps)]
+
+    async def _utterance(self, llm, speculative, final_text, partial_text):
+        """模拟一句话：说话过程中收到中间结果，静音窗口结束后得到最终结果并开始对话"""
+        conn = _make_conn(llm)
+        controller = SpeculativeChat.from_config(conn) if speculative else None
+        for partial in self._partials(partial_text):
+            if controller is not None:
+                controller.on_partial(partial)
+            await asyncio.sleep(self.partial_interval_ms / 1000)
+        speech_end = time.perf_counter()
+        await asyncio.sleep(self.silence_ms / 1000)
+
+        prefetched = controller.claim(final_text) if controller is not None else None
+        if prefetched is not None:
+            stream = prefetched.replay()
+        else:
+            stream = llm.aresponse(conn.session_id, conn.dialogue.get_llm_dialogue())
+        first_token_ms = None
+        async for _ in stream:
+            if first_token_ms is None:
+                first_token_ms = (time.perf_counter() - speech_end) * 1000
+        if controller is not None:
+            controller.cancel()
+        return first_token_ms
+
+    async def _test(self, name, speculative, final_text, partial_text):
+        before = get_speculative_chat_stats().get_stats()
+        llm = _FakeLLM()
+        latencies = await asyncio.gather(
+            *[
+                self._utterance(llm, speculative, final_text, partial_text)
+                for _ in range(self.connections)
+            ]
+        )
+        after = get_speculative_chat_stats().get_stats()
+        # 每个场景单独统计
+        stats = {
+            key: after[key] - before[key] for key in ("hits", "misses", "wasted_tokens")
+        }
+        self.results.append(
+            [
+                name,
+                self.connections,
+                f"{sum(latencies) / len(latencies):.0f}",
+                f"{max(latencies):.0f}",
+                stats["hits"],
+                stats["misses"],
+                stats["wasted_tokens"],
+                llm.generated,
+            ]
+        )
+
+    async def run(self):
+        print("开始流式ASR推测执行测试...")
+        text = "明天北京的天气怎么样"
+        await self._test("原流程：最终结果后请求", False, text, text)
+        await self._test("推测执行：中间结果与最终结果一致", True, text, text)
+        await self._test(
+            "推测执行：最终结果被修正", True, "明天北京的天气怎么样啊", "明天北京的天汽怎么样"
+        )
+
+        print("\n说话结束到首个token的延迟测试结果:")
+        print(
+            tabulate(
+                self.results,
+                headers=[
+                    "场景",
+                    "连接数",
+                    "平均首token延迟(ms)",
+                    "最大首token延迟(ms)",
+                    "命中",
+                    "未命中",
+                    "浪费token数",
+                    "大模型总输出token数",
+                ],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print(
+            f"- 用户说话{self.speech_ms}ms，每{self.partial_interval_ms}ms返回一次中间结果，"
+            f"VAD静音窗口{self.silence_ms}ms"
+        )
+        print("- 模拟大模型首token延迟500ms，之后每30ms输出一个token，共40个")
+        print("- 中间结果保持300ms不变后开始推测；未命中时按原流程重新请求，已生成的token计为浪费")
+
+
+# 为了performance_tester.py的调用需求
+async def main():
+    tester = SpeculativeChatPerformanceTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    tester = SpeculativeChatPerformanceTester()
+    asyncio.run(tester.run())
@@ -0,0 +1,287 @@
+import time
+import queue
+import asyncio
+import threading
+import statistics
+from tabulate import tabulate
+
+from core.providers.tts.mock import TTSProvider as MockTTSProvider
+from core.providers.tts.dto.dto import TTSMessageDTO, SentenceType, ContentType
+from core.utils.tts_pipeline import create_synth_pipeline, shutdown_tts_synth_executor
+
+description = "非流式TTS流水线合成：多句回答的句间停顿与打断取消测试"
+
+# 服务端每帧opus为60ms音频
+FRAME_SECONDS = 0.06
+
+ANSWER = (
+    "好的，我来看看。今天是晴天。气温二十度左右。很适合出门散步。"
+    "傍晚可能起风。记得带件外套。还有什么想聊的吗？"
+)
+
+
+class _FakeConn:
+    """TTS文本处理线程用到的连接属性"""
+
+    def __init__(self, window):
+        self.config = {"tts_pipeline": {"window": window}}
+        self.stop_event = threading.Event()
+        self.client_abort = False
+        self.audio_format = "opus"
+        self.sentence_id = "bench"
+        self.max_output_size = 0
+        self.headers = {"device-id": "bench"}
+
+
+class _CountingTTS(MockTTSProvider):
+    """记录每次合成请求是完成还是被取消"""
+
+    def __init__(self, config):
+        super().__init__(config, delete_audio_file=True)
+        self.completed = 0
+        self.cancelled = 0
+        self._lock = threading.Lock()
+
+    async def text_to_speak(self, text, output_file):
+        try:
+            result = await super().text_to_speak(text, output_file)
+        except asyncio.CancelledError:
+            with self._lock:
+                self.cancelled += 1
+            raise
+        with self._lock:
+            self.completed += 1
+        return result
+
+
+class TTSPipelinePerformanceTester:
+    def __init__(self):
+        # 模拟TTS接口耗时（毫秒），音频时长为每字200ms
+        self.synth_delays_ms = [800, 1500]
+        self.windows = [1, 2, 3]
+        # 模拟大模型每30ms输出2个字
+        self.chunk_chars = 2
+        self.token_interval = 0.03
+        # 打断测试：收到第一帧音频后多久打断
+        self.abort_after = 0.5
+        self.results = []
+        self.abort_results = []
+
+    def _feed_llm(self, tts, conn, stop_at=None):
+        """按大模型的输出节奏把文本送入TTS文本队列"""
+        tts.tts_text_queue.put(
+            TTSMessageDTO(
+                sentence_id="bench",
+                sentence_type=SentenceType.FIRST,
+                content_type=ContentType.ACTION,
+            )
+        )
+        for start in range(0, len(ANSWER), self.chunk_chars):
+            if stop_at is not None and stop_at.is_set():
+                return
+            tts.tts_text_queue.put(
+                TTSMessageDTO(
+                    sentence_id="bench",
+                    sentence_type=SentenceType.MIDDLE,
+                    content_type=ContentType.TEXT,
+                    content_detail=ANSWER[start : start + self.chunk_chars],
+                )
+            )
+            time.sleep(self.token_interval)
+        tts.tts_text_queue.put(
+            TTSMessageDTO(
+                sentence_id="bench",
+                sentence_type=SentenceType.LAST,
+                content_type=ContentType.ACTION,
+            )
+        )
+
+    def _start(self, window, synth_delay_ms):
+        conn = _FakeConn(window)
+        tts = _CountingTTS({"delay_ms": synth_delay_ms, "ms_per_char": 200})
+        tts.conn = conn
+        tts.synth_pipeline = create_synth_pipeline(conn.config, tts.tts_audio_queue)
+        threading.Thread(target=tts.tts_text_priority_thread, daemon=True).start()
+        return conn, tts
+
+    def _play(self, tts, start_time, timeout=60):
+        """
+        模拟设备按实时速度播放收到的音频
+
+        Returns:
+            (首帧时间, 句间停顿列表, 句内卡顿总时长, 播放结束时间)
+        """
+        play_end = None
+        first_frame = None
+        sentence_start = False
+        gaps, stalls = [], 0.0
+        deadline = start_time + timeout
+        while time.perf_counter() < deadline:
+            try:
+                sentence_type, audio, _ = tts.tts_audio_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if sentence_type == SentenceType.LAST:
+                break
+            if sentence_type == SentenceType.FIRST:
+                sentence_start = True
+                continue
+            if not isinstance(audio, bytes):
+                continue
+            now = time.perf_counter()
+            if first_frame is None:
+                first_frame = now - start_time
+            if play_end is not None and now > play_end:
+                if sentence_start:
+                    gaps.append(now - play_end)
+                else:
+                    stalls += now - play_end
+            elif play_end is not None and sentence_start:
+                gaps.append(0.0)
+            sentence_start = False
+            play_end = max(now, play_end or now) + FRAME_SECONDS
+        return first_frame, gaps, stalls, (play_end or time.perf_counter()) - start_time
+
+    def _test_gaps(self, window, synth_delay_ms):
+        conn, tts = self._start(window, synth_delay_ms)
+        start_time = time.perf_counter()
+        feeder = threading.Thread(target=self._feed_llm, args=(tts, conn), daemon=True)
+        feeder.start()
+        first_frame, gaps, stalls, play_end = self._play(tts, start_time)
+        feeder.join()
+        conn.stop_event.set()
+        self.results.append(
+            [
+                synth_delay_ms,
+                window,
+                f"{first_frame * 1000:.0f}",
+                len(gaps),
+                f"{statistics.mean(gaps) * 1000:.0f}" if gaps else "-",
+                f"{max(gaps) * 1000:.0f}" if gaps else "-",
+                f"{(sum(gaps) + stalls) * 1000:.0f}",
+                f"{play_end:.2f}",
+            ]
+        )
+
+    def _abort_round(self, window, synth_delay_ms):
+        conn, tts = self._start(window, synth_delay_ms)
+        stop_feed = threading.Event()
+        feeder = threading.Thread(
+            target=self._feed_llm, args=(tts, conn, stop_feed), daemon=True
+        )
+        start_time = time.perf_counter()
+        feeder.start()
+        # 等待第一帧音频
+        while True:
+            sentence_type, audio, _ = tts.tts_audio_queue.get(timeout=30)
+            if isinstance(audio, bytes):
+                break
+        time.sleep(self.abort_after)
+
+        # 与abortHandle相同：标记打断、停止大模型输出、取消合成并清空队列
+        conn.client_abort = True
+        stop_feed.set()
+        feeder.join()
+        tts.cancel_synthesis()
+        while True:
+            try:
+                tts.tts_text_queue.get_nowait()
+            except queue.Empty:
+                break
+        while True:
+            try:
+                tts.tts_audio_queue.get_nowait()
+            except queue.Empty:
+                break
+        abort_time = time.perf_counter()
+        # 统计打断后仍写入音频队列的帧
+        leaked = 0
+        deadline = abort_time + synth_delay_ms / 1000 * 2
+        while time.perf_counter() < deadline:
+            try:
+                _, audio, _ = tts.tts_audio_queue.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            if isinstance(audio, bytes):
+                leaked += 1
+        conn.stop_event.set()
+        self.abort_results.append(
+            [
+                synth_delay_ms,
+                window,
+                tts.completed,
+                tts.cancelled,
+                leaked,
+                f"{abort_time - start_time:.2f}",
+            ]
+        )
+
+    async def run(self):
+        print("开始非流式TTS流水线合成测试...")
+        try:
+            for synth_delay_ms in self.synth_delays_ms:
+                for window in self.windows:
+                    print(f"测试合成耗时{synth_delay_ms}ms，窗口{window}...")
+                    await asyncio.to_thread(self._test_gaps, window, synth_delay_ms)
+            for window in self.windows:
+                print(f"测试打断，窗口{window}...")
+                await asyncio.to_thread(
+                    self._abort_round, window, self.synth_delays_ms[-1]
+                )
+        finally:
+            shutdown_tts_synth_executor()
+
+        print("\n多句回答的句间停顿测试结果:")
+        print(
+            tabulate(
+                self.results,
+                headers=[
+                    "TTS耗时(ms)",
+                    "窗口",
+                    "首帧(ms)",
+                    "句间次数",
+                    "平均句间停顿(ms)",
+                    "最大句间停顿(ms)",
+                    "总静音(ms)",
+                    "播放结束(s)",
+                ],
+                tablefmt="grid",
+            )
+        )
+        print("\n打断取消测试结果:")
+        print(
+            tabulate(
+                self.abort_results,
+                headers=[
+                    "TTS耗时(ms)",
+                    "窗口",
+                    "完成的合成请求",
+                    "被取消的合成请求",
+                    "打断后写入队列的帧数",
+                    "打断时间(s)",
+                ],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print(
+            f"- 回答共{len(ANSWER)}字，模拟大模型每{self.token_interval * 1000:.0f}ms输出"
+            f"{self.chunk_chars}个字；模拟TTS固定耗时后返回每字200ms的音频"
+        )
+        print("- 设备按实时速度播放，句间停顿为上一句播放完到下一句第一帧到达的时间")
+        print("- 窗口1即原有的逐句合成，下一句要等上一句合成完才开始请求")
+        print(
+            f"- 打断测试在收到第一帧{self.abort_after * 1000:.0f}ms后打断，"
+            "打断后写入队列的帧数应为0，进行中的合成请求被取消"
+        )
+
+
+# 为了performance_tester.py的调用需求
+async def main():
+    tester = TTSPipelinePerformanceTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    tester = TTSPipelinePerformanceTester()
+    asyncio.run(tester.run())
@@ -0,0 +1,130 @@
+import time
+import asyncio
+import numpy as np
+import torch
+from tabulate import tabulate
+
+from config.settings import load_config
+from core.utils.vad_batch import (
+    BatchedVADEngine,
+    VADStreamState,
+    CHUNK_SAMPLES,
+)
+
+description = "SileroVAD逐块推理与跨连接批量推理吞吐对比测试"
+
+# 每个音频块对应的时长（毫秒）
+CHUNK_MS = CHUNK_SAMPLES / 16000 * 1000
+
+
+class VADBatchPerformanceTester:
+    def __init__(self):
+        self.config = load_config()
+        vad_config = self.config.get("VAD", {}).get("SileroVAD", {})
+        self.model_dir = vad_config.get("model_dir", "models/snakers4_silero-vad")
+        self.max_batch_size = vad_config.get("max_batch_size") or 256
+        self.stream_counts = [1, 10, 100, 500, 1000]
+        # 每路流推理的音频块数
+        self.rounds = 20
+        self.results = []
+
+    def _load_model(self):
+        model, _ = torch.hub.load(
+            repo_or_dir=self.model_dir,
+            source="local",
+            model="silero_vad",
+            force_reload=False,
+        )
+        return model
+
+    def _forward(self, inputs, states):
+        with torch.no_grad():
+            out, new_states = self.model._model(
+                torch.from_numpy(inputs), torch.from_numpy(states)
+            )
+        return out.numpy().reshape(-1), new_states.numpy()
+
+    def _make_audio(self, count):
+        """生成模拟音频：每路流使用不同频率的正弦波叠加噪声"""
+        rng = np.random.default_rng(0)
+        t = np.arange(CHUNK_SAMPLES * self.rounds) / 16000
+        audio = []
+        for i in range(count):
+            wave = 0.3 * np.sin(2 * np.pi * (120 + i % 200) * t)
+            wave += 0.05 * rng.standard_normal(t.shape[0])
+            audio.append(wave.astype(np.float32).reshape(self.rounds, CHUNK_SAMPLES))
+        return audio
+
+    def _run_per_chunk(self, audio):
+        """逐连接、逐块推理（原实现方式）"""
+        streams = [VADStreamState() for _ in audio]
+        start, cpu_start = time.perf_counter(), time.process_time()
+        for r in range(self.rounds):
+            for stream, chunks in zip(streams, audio):
+                inputs = stream.prepare(chunks[r])
+                _, new_state = self._forward(inputs, stream.state)
+                stream.commit(new_state)
+        return time.perf_counter() - start, time.process_time() - cpu_start
+
+    def _run_batched(self, audio):
+        """每轮把所有连接的音频块合并成一个批次推理"""
+        engine = BatchedVADEngine(self._forward, max_batch_size=self.max_batch_size)
+        streams = [VADStreamState() for _ in audio]
+        start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            for r in range(self.rounds):
+                futures = [
+                    engine.submit(stream, chunks[r])
+                    for stream, chunks in zip(streams, audio)
+                ]
+                for future in futures:
+                    future.result()
+        finally:
+            engine.close()
+        return time.perf_counter() - start, time.process_time() - cpu_start
+
+    def _add_result(self, mode, count, elapsed, cpu):
+        total_chunks = count * self.rounds
+        # 实时倍率：每秒处理的音频时长 / 1秒
+        realtime_factor = total_chunks * CHUNK_MS / 1000 / elapsed
+        self.results.append(
+            [
+                mode,
+                count,
+                f"{total_chunks / elapsed:.0f}",
+                f"{cpu * 1000 / total_chunks:.3f}",
+                f"{realtime_factor / count:.1f}x",
+            ]
+        )
+
+    def _print_results(self):
+        headers = ["模式", "并发流数", "吞吐(块/秒)", "每块CPU(ms)", "单流实时倍率"]
+        print("\nVAD批量推理测试结果:")
+        print(tabulate(self.results, headers=headers, tablefmt="grid"))
+        print("\n测试说明:")
+        print(f"- 每个音频块为{CHUNK_SAMPLES}采样点（{CHUNK_MS:.0f}ms），每路流推理{self.rounds}块")
+        print(f"- 批量模式单批次上限{self.max_batch_size}块")
+        print("- 单流实时倍率大于1x表示在该并发下单核即可实时处理所有流")
+
+    async def run(self):
+        print("开始VAD批量推理测试...")
+        self.model = self._load_model()
+        # 预热
+        self._run_per_chunk(self._make_audio(1))
+        for count in self.stream_counts:
+            audio = self._make_audio(count)
+            print(f"测试 {count} 路并发流...")
+            self._add_result("逐块推理", count, *self._run_per_chunk(audio))
+            self._add_result("批量推理", count, *self._run_batched(audio))
+        self._print_results()
+
+
+# 为了performance_tester.py的调用需求
+async def main():
+    tester = VADBatchPerformanceTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    tester = VADBatchPerformanceTester()
+    asyncio.run(tester.run())
@@ -0,0 +1,205 @@
+import os
+import sys
+import json
+import wave
+import asyncio
+import subprocess
+from collections import deque
+import numpy as np
+from tabulate import tabulate
+
+from config.settings import load_config
+from core.utils.vad_batch import VADStreamState, CHUNK_SAMPLES
+
+description = "SileroVAD的PyTorch与ONNX Runtime后端一致性、启动耗时与内存对比测试"
+
+# 在独立子进程中加载VAD，统计启动耗时和常驻内存；类型为none时只导入，作为对比基准
+STARTUP_SNIPPET = """
+import sys, json, time, resource
+start = time.perf_counter()
+from core.utils import vad
+if sys.argv[1] != "none":
+    provider = vad.create_instance(sys.argv[1], json.loads(sys.argv[2]))
+elapsed = time.perf_counter() - start
+rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({"seconds": elapsed, "rss_mb": rss_mb}))
+"""
+
+
+class VADOnnxPerformanceTester:
+    def __init__(self):
+        self.config = load_config()
+        vad_configs = self.config.get("VAD", {})
+        self.torch_config = dict(vad_configs.get("SileroVAD", {}), batch_inference=False)
+        self.onnx_config = dict(
+            vad_configs.get("SileroOnnxVAD", {}) or self.torch_config,
+            batch_inference=False,
+        )
+        self.vad_threshold = float(self.torch_config.get("threshold") or 0.5)
+        self.vad_threshold_low = float(self.torch_config.get("threshold_low") or 0.2)
+        self.audio_files = self._load_audio_files()
+        self.parity_results = []
+        self.startup_results = []
+
+    def _load_audio_files(self):
+        """读取config/assets下的录音，统一转换为16k单声道float32"""
+        audio_root = os.path.join(os.getcwd(), "config", "assets")
+        audio_files = []
+        for file_name in sorted(os.listdir(audio_root)):
+            if not file_name.endswith(".wav"):
+                continue
+            with wave.open(os.path.join(audio_root, file_name), "rb") as wf:
+                if wf.getsampwidth() != 2:
+                    continue
+                frames = wf.readframes(wf.getnframes())
+                channels = wf.getnchannels()
+                rate = wf.getframerate()
+            audio = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+            if channels > 1:
+                audio = audio.reshape(-1, channels).mean(axis=1)
+            if rate != 16000:
+                positions = np.arange(0, len(audio), rate / 16000)
+                audio = np.interp(positions, np.arange(len(audio)), audio).astype(
+                    np.float32
+                )
+            audio_files.append((file_name, audio))
+        return audio_files
+
+    def _run_probs(self, provider, audio):
+        """按512采样点逐块推理，返回每块的语音概率"""
+        stream = VADStreamState()
+        probs = []
+        for start in range(0, len(audio) - CHUNK_SAMPLES + 1, CHUNK_SAMPLES):
+            chunk = audio[start : start + CHUNK_SAMPLES]
+            inputs = stream.prepare(chunk)
+            out, new_state = provider._forward(inputs, stream.state)
+            stream.commit(new_state)
+            probs.append(float(out[0]))
+        return np.array(probs)
+
+    def _decisions(self, probs):
+        """复现双阈值+滑动窗口判断，返回每块的是否有语音"""
+        last_is_voice = False
+        window = deque(maxlen=5)
+        decisions = []
+        for prob in probs:
+            if prob >= self.vad_threshold:
+                is_voice = True
+            elif prob <= self.vad_threshold_low:
+                is_voice = False
+            else:
+                is_voice = last_is_voice
+            last_is_voice = is_voice
+            window.append(is_voice)
+            decisions.append(window.count(True) >= 3)
+        return np.array(decisions)
+
+    def _test_parity(self):
+        from core.providers.vad.silero_onnx import VADProvider as OnnxVADProvider
+
+        try:
+            from core.providers.vad.silero import VADProvider as TorchVADProvider
+        except ImportError as e:
+            print(f"未安装PyTorch，跳过一致性测试: {e}")
+            return
+
+        torch_vad = TorchVADProvider(self.torch_config)
+        onnx_vad = OnnxVADProvider(self.onnx_config)
+        for file_name, audio in self.audio_files:
+            torch_probs = self._run_probs(torch_vad, audio)
+            onnx_probs = self._run_probs(onnx_vad, audio)
+            diff = np.abs(torch_probs - onnx_probs)
+            agreement = np.mean(
+                self._decisions(torch_probs) == self._decisions(onnx_probs)
+            )
+            self.parity_results.append(
+                [
+                    file_name,
+                    len(torch_probs),
+                    f"{diff.max():.5f}",
+                    f"{diff.mean():.6f}",
+                    f"{agreement * 100:.2f}%",
+                ]
+            )
+
+    def _test_startup(self):
+        baseline = None
+        for name, vad_type, vad_config in (
+            ("不加载VAD(基准)", "none", {}),
+            ("PyTorch", "silero", self.torch_config),
+            ("ONNX Runtime", "silero_onnx", self.onnx_config),
+        ):
+            result = subprocess.run(
+                [sys.executable, "-c", STARTUP_SNIPPET, vad_type, json.dumps(vad_config)],
+                capture_output=True,
+                text=True,
+                cwd=os.getcwd(),
+            )
+            try:
+                data = json.loads(result.stdout.strip().splitlines()[-1])
+            except (IndexError, ValueError, KeyError):
+                error = result.stderr.strip().splitlines()
+                self.startup_results.append(
+                    [name, "失败", "-", "-", "-", error[-1] if error else ""]
+                )
+                continue
+            if baseline is None:
+                baseline = data
+            self.startup_results.append(
+                [
+                    name,
+                    f"{data['seconds']:.2f}",
+                    f"{data['seconds'] - baseline['seconds']:+.2f}",
+                    f"{data['rss_mb']:.0f}",
+                    f"{data['rss_mb'] - baseline['rss_mb']:+.0f}",
+                    "",
+                ]
+            )
+
+    def _print_results(self):
+        if self.parity_results:
+            print("\n一致性测试结果:")
+            print(
+                tabulate(
+                    self.parity_results,
+                    headers=["录音", "块数", "最大概率误差", "平均概率误差", "判断一致率"],
+                    tablefmt="grid",
+                )
+            )
+        print("\n启动耗时与内存:")
+        print(
+            tabulate(
+                self.startup_results,
+                headers=[
+                    "后端",
+                    "加载耗时(秒)",
+                    "比基准(秒)",
+                    "峰值RSS(MB)",
+                    "比基准(MB)",
+                    "错误",
+                ],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print("- 录音来自config/assets，统一重采样为16k单声道")
+        print("- 判断一致率：按双阈值+滑动窗口得到的有无语音判断在两个后端间一致的比例")
+        print("- 启动耗时与内存在独立子进程中测量，包含导入依赖和加载模型")
+        print("- 基准只导入VAD模块不创建实例，比基准即加载该后端增加的耗时和内存")
+
+    async def run(self):
+        print("开始VAD后端对比测试...")
+        self._test_parity()
+        self._test_startup()
+        self._print_results()
+
+
+# 为了performance_tester.py的调用需求
+async def main():
+    tester = VADOnnxPerformanceTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    tester = VADOnnxPerformanceTester()
+    asyncio.run(tester.run())
@@ -0,0 +1,126 @@
+import time
+import asyncio
+import tracemalloc
+import numpy as np
+from tabulate import tabulate
+
+from core.utils.vad_batch import VADStreamState, CHUNK_SAMPLES
+
+description = "VAD音频缓冲：bytearray切片与预分配环形缓冲区的CPU与内存分配对比测试"
+
+# 每个opus帧60ms，16k采样率下为960个采样点
+FRAME_SAMPLES = 960
+
+
+class _BytearrayBuffer:
+    """原实现：每取一个音频块都重新切片bytearray并转换类型"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def process(self, pcm_frame):
+        self.buffer.extend(pcm_frame)
+        chunks = []
+        while len(self.buffer) >= CHUNK_SAMPLES * 2:
+            chunk = self.buffer[: CHUNK_SAMPLES * 2]
+            self.buffer = self.buffer[CHUNK_SAMPLES * 2 :]
+            audio_int16 = np.frombuffer(chunk, dtype=np.int16)
+            chunks.append(audio_int16.astype(np.float32) / 32768.0)
+        return len(chunks)
+
+
+class _RingBuffer:
+    """新实现：预分配环形缓冲区，通过移动读写位置取音频块"""
+
+    def __init__(self):
+        self.stream = VADStreamState()
+
+    def process(self, pcm_frame):
+        self.stream.write_pcm(pcm_frame)
+        return len(self.stream.read_chunks())
+
+
+class VADRingBufferPerformanceTester:
+    def __init__(self):
+        self.stream_count = 1000
+        # 每路流送入的帧数（60ms一帧，共3秒音频）
+        self.frames_per_stream = 50
+        self.results = []
+
+    def _make_frames(self):
+        rng = np.random.default_rng(0)
+        return [
+            rng.integers(-8000, 8000, FRAME_SAMPLES, dtype=np.int16).tobytes()
+            for _ in range(16)
+        ]
+
+    def _run_case(self, buffer_cls, frames, trace):
+        buffers = [buffer_cls() for _ in range(self.stream_count)]
+        if trace:
+            tracemalloc.start()
+            base_memory, _ = tracemalloc.get_traced_memory()
+        start, cpu_start = time.perf_counter(), time.process_time()
+        chunk_count = 0
+        for i in range(self.frames_per_stream):
+            frame = frames[i % len(frames)]
+            for buffer in buffers:
+                chunk_count += buffer.process(frame)
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+        if trace:
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return chunk_count, (peak_memory - base_memory) / 1024
+        return chunk_count, elapsed, cpu
+
+    def _test(self, name, buffer_cls, frames):
+        chunk_count, elapsed, cpu = self._run_case(buffer_cls, frames, False)
+        # 内存跟踪会拖慢执行，单独跑一遍统计临时内存峰值
+        _, peak_kb = self._run_case(buffer_cls, frames, True)
+        audio_seconds = self.frames_per_stream * FRAME_SAMPLES / 16000
+        self.results.append(
+            [
+                name,
+                chunk_count,
+                f"{cpu * 1000 / audio_seconds:.1f}",
+                f"{cpu * 1e6 / chunk_count:.2f}",
+                f"{chunk_count / elapsed:.0f}",
+                f"{peak_kb:.0f}",
+            ]
+        )
+
+    def _print_results(self):
+        headers = [
+            "实现",
+            "音频块数",
+            "每秒音频CPU(ms)",
+            "每块CPU(us)",
+            "吞吐(块/秒)",
+            "临时内存峰值(KB)",
+        ]
+        print("\nVAD音频缓冲测试结果:")
+        print(tabulate(self.results, headers=headers, tablefmt="grid"))
+        print("\n测试说明:")
+        print(
+            f"- {self.stream_count}路并发流，每路送入{self.frames_per_stream}个60ms PCM帧（opus解码后的数据）"
+        )
+        print("- 每秒音频CPU：处理1秒时长的全部并发流音频所消耗的CPU时间")
+        print("- 临时内存峰值：除缓冲区本身以外，处理过程中额外分配内存的峰值（tracemalloc统计）")
+
+    async def run(self):
+        print("开始VAD音频缓冲测试...")
+        frames = self._make_frames()
+        self._test("bytearray切片", _BytearrayBuffer, frames)
+        self._test("预分配环形缓冲区", _RingBuffer, frames)
+        self._print_results()
+
+
+# 为了performance_tester.py的调用需求
+async def main():
+    tester = VADRingBufferPerformanceTester()
+    await tester.run()
+
+
+if __name__ == "__main__":
+    tester = VADRingBufferPerformanceTester()
+    asyncio.run(tester.run())
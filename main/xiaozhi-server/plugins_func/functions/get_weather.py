@@ -109,7 +109,7 @@ WEATHER_CODE_MAP = {
 
 def fetch_city_info(location, api_key, api_host):
     url = f"https://{api_host}/geo/v2/city/lookup?key={api_key}&location={location}&lang=zh"
-    response = requests.get(url, headers=HEADERS).json()
+    response = requests.get(url, headers=HEADERS, timeout=10).json()
     if response.get("error") is not None:
         logger.bind(tag=TAG).error(
             f"获取天气失败，原因：{response.get('error', {}).get('detail')}"
@@ -119,7 +119,7 @@ def fetch_city_info(location, api_key, api_host):
 
 
 def fetch_weather_page(url):
-    response = requests.get(url, headers=HEADERS)
+    response = requests.get(url, headers=HEADERS, timeout=10)
     return BeautifulSoup(response.text, "html.parser") if response.ok else None
 
 
@@ -1,7 +1,6 @@
 from plugins_func.register import register_function, ToolType, ActionResponse, Action
 from plugins_func.functions.hass_init import initialize_hass_handler
 from config.logger import setup_logging
-import asyncio
 import requests
 
 TAG = __name__
@@ -35,11 +34,8 @@ hass_play_music_function_desc = {
 )
 def hass_play_music(conn, entity_id="", media_content_id="random"):
     try:
-        # 执行音乐播放命令
-        future = asyncio.run_coroutine_threadsafe(
-            handle_hass_play_music(conn, entity_id, media_content_id), conn.loop
-        )
-        ha_response = future.result()
+        # 执行音乐播放命令，插件在工作线程中执行，直接同步请求
+        ha_response = handle_hass_play_music(conn, entity_id, media_content_id)
         return ActionResponse(
             action=Action.RESPONSE, result="退出意图已处理", response=ha_response
         )
@@ -47,14 +43,14 @@ def hass_play_music(conn, entity_id="", media_content_id="random"):
         logger.bind(tag=TAG).error(f"处理音乐意图错误: {e}")
 
 
-async def handle_hass_play_music(conn, entity_id, media_content_id):
+def handle_hass_play_music(conn, entity_id, media_content_id):
     ha_config = initialize_hass_handler(conn)
     api_key = ha_config.get("api_key")
     base_url = ha_config.get("base_url")
     url = f"{base_url}/api/services/music_assistant/play_media"
     headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
     data = {"entity_id": entity_id, "media_id": media_content_id}
-    response = requests.post(url, headers=headers, json=data)
+    response = requests.post(url, headers=headers, json=data, timeout=10)
     if response.status_code == 200:
         return f"正在播放{media_content_id}的音乐"
     else:
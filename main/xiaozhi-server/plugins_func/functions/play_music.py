@@ -33,7 +33,10 @@ play_music_function_desc = {
 }
 
 
-@register_function("play_music", play_music_function_desc, ToolType.SYSTEM_CTL)
+# 只提交播放任务，不阻塞；conn.loop.create_task 需要在事件循环线程中调用
+@register_function(
+    "play_music", play_music_function_desc, ToolType.SYSTEM_CTL, blocking=False
+)
 def play_music(conn, song_name: str):
     try:
         music_intent = (
@@ -1,3 +1,4 @@
+import inspect
 from config.logger import setup_logging
 from enum import Enum
 
@@ -42,11 +43,27 @@ class ActionResponse:
 
 
 class FunctionItem:
-    def __init__(self, name, description, func, type):
+    def __init__(
+        self,
+        name,
+        description,
+        func,
+        type,
+        timeout=None,
+        max_concurrency=None,
+        blocking=True,
+    ):
         self.name = name
         self.description = description
         self.func = func
         self.type = type
+        # 执行超时（秒）和最大并发数，为空时使用plugin_runtime配置的默认值
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        # async def 定义的插件直接在事件循环中执行
+        self.is_async = inspect.iscoroutinefunction(func)
+        # 同步插件是否可能阻塞（如发起HTTP请求），阻塞的插件放到工作线程池执行
+        self.blocking = blocking and not self.is_async
 
 
 class DeviceTypeRegistry:
@@ -79,11 +96,26 @@ class DeviceTypeRegistry:
 all_function_registry = {}
 
 
-def register_function(name, desc, type=None):
-    """注册函数到函数注册字典的装饰器"""
+def register_function(
+    name, desc, type=None, timeout=None, max_concurrency=None, blocking=True
+):
+    """
+    注册函数到函数注册字典的装饰器
+
+    Args:
+        name: 函数名
+        desc: 函数描述
+        type: 工具类型
+        timeout: 执行超时（秒）
+        max_concurrency: 最大并发数
+        blocking: 同步函数是否会阻塞，只做简单状态修改、不涉及IO的函数可设为False，
+            直接在事件循环中执行；async def 定义的函数无需设置
+    """
 
     def decorator(func):
-        all_function_registry[name] = FunctionItem(name, desc, func, type)
+        all_function_registry[name] = FunctionItem(
+            name, desc, func, type, timeout, max_concurrency, blocking
+        )
         logger.bind(tag=TAG).debug(f"函数 '{name}' 已加载，可以注册使用")
         return func
 